@@ -0,0 +1,154 @@
+"""
+Benchmark harness for key views and management commands
+
+Each target is driven through the Django test client (views) or call_command
+(commands) against the current database, normally one filled by
+generate_scale_dataset. For every target we record latency over several
+timed runs, the number of queries issued and the peak Python memory of a
+separate traced run, so runs against different dataset sizes or commits can be
+compared side by side (see the run_benchmarks command).
+"""
+import io
+import statistics
+import time
+import tracemalloc
+
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+# (name, kind, target, role): views run as the given role, commands with the given arguments
+BENCHMARK_TARGETS = [
+    ('admin_dashboard', 'view', 'admin_dashboard', 'system_admin'),
+    ('members_overview', 'view', 'members_overview', 'system_admin'),
+    ('loans_overview', 'view', 'loans_overview', 'system_admin'),
+    ('savings_overview', 'view', 'savings_overview', 'system_admin'),
+    ('expenses_overview', 'view', 'expenses_overview', 'system_admin'),
+    ('funding_overview', 'view', 'funding_overview', 'system_admin'),
+    ('projects_overview', 'view', 'projects_overview', 'system_admin'),
+    ('loan_report', 'view', 'loan_report', 'system_admin'),
+    ('member_report', 'view', 'member_report', 'system_admin'),
+    ('reports_performance', 'view', 'reports_performance', 'system_admin'),
+    ('sacco_admin_dashboard', 'view', 'sacco_admin_dashboard', 'sacco_admin'),
+    ('member_list', 'view', 'member_list', 'sacco_admin'),
+    ('check_loan_due_dates', 'command', ['check_loan_due_dates', '--dry-run'], None),
+]
+
+
+def get_benchmark_users(sacco=None):
+    """System admin and Sacco admin accounts used to drive the views, created on first use"""
+    from .models import Sacco, User
+
+    system_admin, _ = User.objects.get_or_create(
+        username='benchmark_system_admin',
+        defaults={'email': 'benchmark_system_admin@example.com', 'is_system_admin': True, 'is_staff': True}
+    )
+    sacco = sacco or Sacco.objects.filter(is_active=True).order_by('pk').first()
+    sacco_admin, _ = User.objects.get_or_create(
+        username='benchmark_sacco_admin',
+        defaults={'email': 'benchmark_sacco_admin@example.com', 'is_sacco_admin': True, 'sacco': sacco}
+    )
+    if sacco and sacco_admin.sacco_id != sacco.pk:
+        sacco_admin.sacco = sacco
+        sacco_admin.save(update_fields=['sacco'])
+    return {'system_admin': system_admin, 'sacco_admin': sacco_admin}
+
+
+def _runner(kind, target, user):
+    if kind == 'view':
+        client = Client()
+        client.force_login(user)
+        url = reverse(target)
+
+        def run():
+            response = client.get(url)
+            if response.status_code >= 400:
+                raise RuntimeError(f'{url} returned {response.status_code}')
+            return response.status_code
+    else:
+        def run():
+            call_command(*target, stdout=io.StringIO(), stderr=io.StringIO())
+            return None
+    return run
+
+
+def _percentile(values, fraction):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(fraction * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def run_target(name, kind, target, user=None, iterations=5, warmup=1):
+    """Benchmark one target and return its result row"""
+    run = _runner(kind, target, user)
+    result = {'name': name, 'kind': kind, 'target': target if kind == 'view' else ' '.join(target)}
+    try:
+        for _ in range(warmup):
+            run()
+
+        timings = []
+        for _ in range(iterations):
+            start = time.perf_counter()
+            result['status_code'] = run()
+            timings.append((time.perf_counter() - start) * 1000)
+
+        with CaptureQueriesContext(connection) as queries:
+            run()
+        result['queries'] = len(queries.captured_queries)
+
+        # Traced separately: tracemalloc slows execution too much to time alongside it
+        tracemalloc.start()
+        try:
+            run()
+            result['peak_memory_kb'] = round(tracemalloc.get_traced_memory()[1] / 1024, 1)
+        finally:
+            tracemalloc.stop()
+    except Exception as e:
+        result['error'] = str(e)
+        return result
+
+    result['latency_ms'] = {
+        'min': round(min(timings), 2),
+        'median': round(statistics.median(timings), 2),
+        'p95': round(_percentile(timings, 0.95), 2),
+        'max': round(max(timings), 2),
+    }
+    return result
+
+
+def dataset_summary():
+    """Row counts of the tables that dominate view cost"""
+    from .models import Region, Sacco
+    from members.models import Member
+    from loans.models import Loan
+    from savings.models import SavingsAccount, SavingsTransaction
+
+    return {
+        'regions': Region.objects.count(),
+        'saccos': Sacco.objects.count(),
+        'members': Member.objects.count(),
+        'loans': Loan.objects.count(),
+        'savings_accounts': SavingsAccount.objects.count(),
+        'savings_transactions': SavingsTransaction.objects.count(),
+    }
+
+
+def compare_results(current, previous):
+    """
+    Pair each current result with the previous run's result for the same
+    target: (name, previous median ms, current median ms, change %, previous
+    queries, current queries)
+    """
+    previous_by_name = {row['name']: row for row in previous.get('results', [])}
+    rows = []
+    for row in current['results']:
+        before = previous_by_name.get(row['name'])
+        if not before or 'latency_ms' not in before or 'latency_ms' not in row:
+            continue
+        old_ms = before['latency_ms']['median']
+        new_ms = row['latency_ms']['median']
+        change = (new_ms - old_ms) / old_ms * 100 if old_ms else 0.0
+        rows.append((row['name'], old_ms, new_ms, change, before.get('queries'), row.get('queries')))
+    return rows
@@ -1,17 +1,23 @@
-from accounts.models import Region
+from django.utils.functional import SimpleLazyObject
+
+from .reference_data import ReferenceData, get_regions
+
+CURRENCY_SETTINGS = {
+    'CURRENCY_CODE': 'UGX',
+    'CURRENCY_SYMBOL': 'UGX',
+}
+
+_reference_data = ReferenceData()
 
 
 def regions(request):
-    """Provide all active regions to all templates"""
+    """Provide all active regions to all templates (lazy, served from the reference data cache)"""
     return {
-        'all_regions': Region.objects.filter(is_active=True).order_by('name')
+        'all_regions': SimpleLazyObject(get_regions),
+        'reference_data': _reference_data,
     }
 
 
 def currency_settings(request):
     """Provide currency settings to all templates"""
-    return {
-        'CURRENCY_CODE': 'UGX',
-        'CURRENCY_SYMBOL': 'UGX',
-    }
-
+    return CURRENCY_SETTINGS
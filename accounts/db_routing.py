@@ -0,0 +1,90 @@
+"""
+Sending dashboard, report and export reads to a read replica
+
+Views decorated with use_read_replica (accounts/decorators.py) run their
+reads against the REPLICA_DATABASE_ALIAS database when it is configured;
+everything else, and every write, uses the primary. A replica lags behind
+the primary, so a user who has just written is pinned to the primary for
+REPLICA_STICKY_SECONDS: ReadReplicaStickinessMiddleware (accounts/middleware.py)
+pins them after any unsafe request and the decorator then leaves their reads
+on the primary until the pin expires, so they always see their own writes.
+
+Anything computed for the shared cache is read inside primary_reads(): a
+replica's stale rows cached under the current version would be served to
+every user until that version changes.
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+
+CACHE_PREFIX = 'replica_pin'
+
+_replica_reads = ContextVar('replica_reads', default=False)
+
+
+def replica_alias():
+    """The replica's database alias, or None when no replica is configured"""
+    alias = getattr(settings, 'REPLICA_DATABASE_ALIAS', 'replica')
+    return alias if alias in settings.DATABASES else None
+
+
+def sticky_seconds():
+    return getattr(settings, 'REPLICA_STICKY_SECONDS', 15)
+
+
+def _pin_key(user_id):
+    return f'{CACHE_PREFIX}:{user_id}'
+
+
+def pin_to_primary(user_id):
+    """Keep a user's reads on the primary while their latest writes replicate"""
+    cache.set(_pin_key(user_id), 1, sticky_seconds())
+
+
+def is_pinned(user_id):
+    return cache.get(_pin_key(user_id)) is not None
+
+
+@contextmanager
+def replica_reads():
+    """Route reads made inside the block to the replica, if there is one"""
+    token = _replica_reads.set(replica_alias() is not None)
+    try:
+        yield
+    finally:
+        _replica_reads.reset(token)
+
+
+@contextmanager
+def primary_reads():
+    """Route reads made inside the block to the primary, even within replica_reads()"""
+    token = _replica_reads.set(False)
+    try:
+        yield
+    finally:
+        _replica_reads.reset(token)
+
+
+class ReplicaRouter:
+    """Reads go to the replica only inside replica_reads(); writes always go to the primary"""
+
+    def db_for_read(self, model, **hints):
+        if _replica_reads.get():
+            return replica_alias() or DEFAULT_DB_ALIAS
+        # Objects loaded from the replica still read their relations from the primary
+        return DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        # Never the replica, even for objects that were loaded from it
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {DEFAULT_DB_ALIAS, replica_alias()}
+        return obj1._state.db in databases and obj2._state.db in databases
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # The replica gets its schema from the primary through replication
+        return db != replica_alias()
@@ -23,9 +23,10 @@ def sacco_admin_required(view_func):
             messages.error(request, 'Access denied. Admin privileges required.')
             return redirect('dashboard')
         
-        # Check if sacco admin's sacco is active
-        if request.user.is_sacco_admin and request.user.sacco:
-            if not request.user.sacco.is_active:
+        # Check if sacco admin's sacco is active (from the cached scope, without loading the Sacco)
+        if request.user.is_sacco_admin and request.user.sacco_id:
+            from .scope import get_user_scope
+            if not get_user_scope(request.user).sacco_active:
                 if request.headers.get('x-requested-with') == 'XMLHttpRequest':
                     return JsonResponse({'error': 'Your Sacco has been deactivated'}, status=403)
                 messages.error(request, 'Your Sacco has been deactivated. Please contact your regional administrator.')
@@ -160,3 +161,20 @@ def member_search_required(view_func):
 
 
 
+
+
+def use_read_replica(view_func):
+    """
+    Decorator for read-only dashboard, report and export views: their reads
+    go to the read replica, unless the user wrote recently and is still
+    pinned to the primary (see db_routing.py)
+    """
+    @wraps(view_func)
+    def wrapper(request, *args, **kwargs):
+        from .db_routing import is_pinned, replica_reads
+
+        if request.method not in ('GET', 'HEAD') or (request.user.is_authenticated and is_pinned(request.user.pk)):
+            return view_func(request, *args, **kwargs)
+        with replica_reads():
+            return view_func(request, *args, **kwargs)
+    return wrapper
@@ -0,0 +1,300 @@
+"""
+Per-request performance instrumentation
+
+PerformanceMonitoringMiddleware (accounts/middleware.py) activates a
+RequestMetrics collector for each request. Database time is captured through
+connection execute wrappers and template time through a wrapper around the
+Django template backend. Finished requests are folded into rolling per-view
+histograms kept in the Django cache: one bucket per time window, expiring after
+the retention period.
+"""
+import re
+import time
+from collections import Counter
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import cache
+
+# Request duration histogram bounds, in seconds (Prometheus style "le" buckets)
+DURATION_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+CACHE_PREFIX = 'perf'
+
+_current_metrics = ContextVar('request_metrics', default=None)
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r'\b\d+(?:\.\d+)?\b')
+_IN_LIST = re.compile(r'\bIN\s*\((?:\s*(?:\?|%s)\s*,?)+\)', re.IGNORECASE)
+_WHITESPACE = re.compile(r'\s+')
+
+
+def get_setting(name, default):
+    return getattr(settings, name, default)
+
+
+def window_seconds():
+    return get_setting('PERFORMANCE_WINDOW_SECONDS', 3600)
+
+
+def retention_windows():
+    return get_setting('PERFORMANCE_RETENTION_WINDOWS', 24)
+
+
+def fingerprint_sql(sql):
+    """
+    Reduce a SQL statement to its shape: literals become '?' and IN lists
+    collapse, so the same query issued with different parameters matches.
+    """
+    sql = _STRING_LITERAL.sub('?', sql)
+    sql = _NUMBER_LITERAL.sub('?', sql)
+    sql = _IN_LIST.sub('IN (...)', sql)
+    return _WHITESPACE.sub(' ', sql).strip()
+
+
+class RequestMetrics:
+    """Counters collected while a single request is processed"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.wall_time = 0.0
+        self.query_count = 0
+        self.db_time = 0.0
+        self.template_time = 0.0
+        self.response_size = 0
+        self.fingerprints = Counter()
+        self.fingerprint_time = Counter()
+        self._template_depth = 0
+
+    def record_query(self, sql, duration):
+        fingerprint = fingerprint_sql(sql)
+        self.query_count += 1
+        self.db_time += duration
+        self.fingerprints[fingerprint] += 1
+        self.fingerprint_time[fingerprint] += duration
+
+    def finish(self, response):
+        self.wall_time = time.perf_counter() - self.started
+        if not getattr(response, 'streaming', False):
+            self.response_size = len(response.content)
+        elif response.has_header('Content-Length'):
+            self.response_size = int(response['Content-Length'])
+
+    def top_repeated_queries(self, limit=5):
+        """Most repeated query shapes as (fingerprint, count, total seconds)"""
+        return [
+            (fingerprint, count, self.fingerprint_time[fingerprint])
+            for fingerprint, count in self.fingerprints.most_common(limit)
+            if count > 1
+        ]
+
+
+def activate(metrics):
+    return _current_metrics.set(metrics)
+
+
+def deactivate(token):
+    _current_metrics.reset(token)
+
+
+def current_metrics():
+    return _current_metrics.get()
+
+
+class QueryTimer:
+    """Database execute wrapper feeding query counts and timings into a RequestMetrics"""
+
+    def __init__(self, metrics):
+        self.metrics = metrics
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.metrics.record_query(sql, time.perf_counter() - start)
+
+
+_template_timer_installed = False
+
+
+def install_template_timer():
+    """Wrap the Django template backend so top-level render time is recorded"""
+    global _template_timer_installed
+    if _template_timer_installed:
+        return
+    from django.template.backends.django import Template
+
+    original_render = Template.render
+
+    def timed_render(self, context=None, request=None):
+        metrics = _current_metrics.get()
+        if metrics is None:
+            return original_render(self, context, request)
+        metrics._template_depth += 1
+        start = time.perf_counter()
+        try:
+            return original_render(self, context, request)
+        finally:
+            metrics._template_depth -= 1
+            if metrics._template_depth == 0:
+                metrics.template_time += time.perf_counter() - start
+
+    Template.render = timed_render
+    _template_timer_installed = True
+
+
+def _window_key(window, view_name=None):
+    if view_name is None:
+        return f'{CACHE_PREFIX}:{window}:views'
+    return f'{CACHE_PREFIX}:{window}:view:{view_name}'
+
+
+def _empty_stats():
+    return {
+        'count': 0,
+        'errors': 0,
+        'wall_sum': 0.0,
+        'wall_max': 0.0,
+        'db_sum': 0.0,
+        'queries_sum': 0,
+        'template_sum': 0.0,
+        'bytes_sum': 0,
+        'buckets': [0] * (len(DURATION_BUCKETS) + 1),
+    }
+
+
+def record_request(view_name, metrics, status_code=200):
+    """
+    Fold a finished request into the current window's histogram for its view
+
+    Read-modify-write on the cache is not atomic, so concurrent requests for
+    the same view can occasionally drop a sample; acceptable for trend data.
+    """
+    window = int(time.time() // window_seconds())
+    timeout = window_seconds() * (retention_windows() + 1)
+
+    views_key = _window_key(window)
+    views = cache.get(views_key) or set()
+    if view_name not in views:
+        views.add(view_name)
+        cache.set(views_key, views, timeout)
+
+    key = _window_key(window, view_name)
+    stats = cache.get(key) or _empty_stats()
+    stats['count'] += 1
+    if status_code >= 500:
+        stats['errors'] += 1
+    stats['wall_sum'] += metrics.wall_time
+    stats['wall_max'] = max(stats['wall_max'], metrics.wall_time)
+    stats['db_sum'] += metrics.db_time
+    stats['queries_sum'] += metrics.query_count
+    stats['template_sum'] += metrics.template_time
+    stats['bytes_sum'] += metrics.response_size
+    for index, bound in enumerate(DURATION_BUCKETS):
+        if metrics.wall_time <= bound:
+            stats['buckets'][index] += 1
+            break
+    else:
+        stats['buckets'][-1] += 1
+    cache.set(key, stats, timeout)
+
+
+def _quantile(buckets, count, q):
+    """
+    Estimate a quantile in milliseconds from histogram buckets (upper bound of
+    the bucket reached); None when it falls in the overflow bucket
+    """
+    if not count:
+        return 0.0
+    target = q * count
+    seen = 0
+    for index, bucket_count in enumerate(buckets[:len(DURATION_BUCKETS)]):
+        seen += bucket_count
+        if seen >= target:
+            return DURATION_BUCKETS[index] * 1000
+    return None
+
+
+def get_view_stats(windows=None):
+    """
+    Merge the retained windows into one summary per view
+
+    Returns a list of dicts sorted by total wall time, slowest first.
+    """
+    windows = windows or retention_windows()
+    current = int(time.time() // window_seconds())
+    merged = {}
+    for window in range(current - windows + 1, current + 1):
+        views = cache.get(_window_key(window)) or set()
+        if not views:
+            continue
+        window_stats = cache.get_many([_window_key(window, name) for name in views])
+        for name in views:
+            stats = window_stats.get(_window_key(window, name))
+            if not stats:
+                continue
+            total = merged.setdefault(name, _empty_stats())
+            for field in ('count', 'errors', 'wall_sum', 'db_sum', 'queries_sum', 'template_sum', 'bytes_sum'):
+                total[field] += stats[field]
+            total['wall_max'] = max(total['wall_max'], stats['wall_max'])
+            total['buckets'] = [a + b for a, b in zip(total['buckets'], stats['buckets'])]
+
+    rows = []
+    for name, stats in merged.items():
+        count = stats['count'] or 1
+        rows.append({
+            'view': name,
+            **stats,
+            'avg_ms': stats['wall_sum'] / count * 1000,
+            'max_ms': stats['wall_max'] * 1000,
+            'p50_ms': _quantile(stats['buckets'], stats['count'], 0.5),
+            'p95_ms': _quantile(stats['buckets'], stats['count'], 0.95),
+            'avg_queries': stats['queries_sum'] / count,
+            'avg_db_ms': stats['db_sum'] / count * 1000,
+            'avg_template_ms': stats['template_sum'] / count * 1000,
+            'avg_bytes': stats['bytes_sum'] / count,
+        })
+    rows.sort(key=lambda row: row['wall_sum'], reverse=True)
+    return rows
+
+
+def _escape_label(value):
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def render_prometheus(rows):
+    """
+    Render view statistics in the Prometheus text exposition format
+
+    Values are totals over the retained windows, so they drop back when an old
+    window expires; Prometheus treats that as a counter reset.
+    """
+    lines = [
+        '# HELP sacco_request_duration_seconds Request wall time per view.',
+        '# TYPE sacco_request_duration_seconds histogram',
+    ]
+    for row in rows:
+        label = _escape_label(row['view'])
+        cumulative = 0
+        for bound, bucket_count in zip(DURATION_BUCKETS, row['buckets']):
+            cumulative += bucket_count
+            lines.append(f'sacco_request_duration_seconds_bucket{{view="{label}",le="{bound}"}} {cumulative}')
+        lines.append(f'sacco_request_duration_seconds_bucket{{view="{label}",le="+Inf"}} {row["count"]}')
+        lines.append(f'sacco_request_duration_seconds_sum{{view="{label}"}} {row["wall_sum"]:.6f}')
+        lines.append(f'sacco_request_duration_seconds_count{{view="{label}"}} {row["count"]}')
+
+    counters = (
+        ('sacco_db_queries_total', 'Database queries issued per view.', 'queries_sum', '{}'),
+        ('sacco_db_time_seconds_total', 'Database time per view.', 'db_sum', '{:.6f}'),
+        ('sacco_template_render_seconds_total', 'Template render time per view.', 'template_sum', '{:.6f}'),
+        ('sacco_response_bytes_total', 'Response bytes per view.', 'bytes_sum', '{}'),
+        ('sacco_request_errors_total', 'Requests answered with a 5xx status per view.', 'errors', '{}'),
+    )
+    for name, help_text, field, value_format in counters:
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} counter')
+        for row in rows:
+            value = value_format.format(row[field])
+            lines.append(f'{name}{{view="{_escape_label(row["view"])}"}} {value}')
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,364 @@
+"""
+Management command to build a large synthetic dataset for benchmarking
+
+Rows are created with bulk_create in fixed-size batches and generated lazily,
+so memory use stays flat however many rows are requested. Every generated row
+carries the --prefix in its unique identifiers, so a dataset can be added next
+to real data and removed again with --purge.
+"""
+import random
+from array import array
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from itertools import islice
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from accounts.models import Region, District, Sacco
+from accounts.reference_data import bump_version
+from members.models import Member
+from loans.models import Loan, LoanProduct
+from loans.schedule import build_schedules
+from reports.rollups import REBUILDABLE_KINDS, first_movement_month, month_of, rebuild_rollups
+from savings.models import SavingsAccount, SavingProduct, SavingsTransaction
+
+# Named dataset sizes; explicit --members etc. override individual volumes
+PRESETS = {
+    'small': {'regions': 4, 'saccos': 10, 'members': 2000, 'loans': 5000, 'transactions': 20000},
+    'medium': {'regions': 11, 'saccos': 100, 'members': 100000, 'loans': 300000, 'transactions': 2000000},
+    'large': {'regions': 11, 'saccos': 500, 'members': 1000000, 'loans': 3000000, 'transactions': 20000000},
+}
+
+FIRST_NAMES = ['Aisha', 'Grace', 'Sarah', 'Joyce', 'Agnes', 'Florence', 'Harriet', 'Esther', 'Prossy', 'Betty']
+LAST_NAMES = ['Namutebi', 'Akello', 'Nakato', 'Atim', 'Nabirye', 'Auma', 'Kyomuhendo', 'Apio', 'Nansubuga', 'Amongin']
+LOAN_STATUSES = ['active', 'active', 'active', 'disbursed', 'closed', 'closed', 'pending_approval', 'defaulted']
+
+
+def batched(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+@contextmanager
+def explicit_timestamps(*models):
+    """
+    Let bulk_create keep the created/performed timestamps we generate instead
+    of overwriting them with now()
+    """
+    fields = [
+        field for model in models for field in model._meta.concrete_fields
+        if getattr(field, 'auto_now_add', False)
+    ]
+    for field in fields:
+        field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field in fields:
+            field.auto_now_add = True
+
+
+class Command(BaseCommand):
+    help = 'Generate a synthetic dataset of configurable size for benchmarks (see run_benchmarks)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--size', choices=sorted(PRESETS), default='small', help='Dataset preset (default: small)')
+        parser.add_argument('--regions', type=int, help='Number of regions')
+        parser.add_argument('--saccos', type=int, help='Number of Saccos')
+        parser.add_argument('--members', type=int, help='Number of members')
+        parser.add_argument('--loans', type=int, help='Number of loans')
+        parser.add_argument('--transactions', type=int, help='Number of savings transactions')
+        parser.add_argument('--batch-size', type=int, default=5000, help='Rows per bulk insert (default: 5000)')
+        parser.add_argument('--prefix', default='SCALE', help='Prefix for generated identifiers (default: SCALE)')
+        parser.add_argument('--seed', type=int, default=42, help='Random seed, for reproducible datasets')
+        parser.add_argument('--purge', action='store_true', help='Delete a previously generated dataset with this prefix and exit')
+
+    def handle(self, *args, **options):
+        self.prefix = options['prefix'].upper()
+        self.batch_size = options['batch_size']
+        self.random = random.Random(options['seed'])
+
+        if options['purge']:
+            self.purge()
+            return
+
+        volumes = dict(PRESETS[options['size']])
+        for name in volumes:
+            if options[name] is not None:
+                volumes[name] = options[name]
+        if volumes['regions'] < 1 or volumes['saccos'] < 1:
+            raise CommandError('At least one region and one Sacco are required.')
+        if Sacco.objects.filter(registration_number__startswith=f'{self.prefix}-').exists():
+            raise CommandError(f'A dataset with prefix {self.prefix} already exists; use --purge first or another --prefix.')
+
+        self.stdout.write(self.style.WARNING(
+            'Generating: ' + ', '.join(f'{count:,} {name}' for name, count in volumes.items())
+        ))
+        started = timezone.now()
+
+        with explicit_timestamps(Member, Loan, SavingsAccount, SavingsTransaction):
+            regions = self.create_regions(volumes['regions'])
+            saccos = self.create_saccos(volumes['saccos'], regions)
+            loan_products, saving_products = self.create_products(saccos)
+            members = self.create_members(volumes['members'], saccos)
+            self.create_loans(volumes['loans'], members, loan_products)
+            accounts = self.create_savings_accounts(members, saving_products)
+            self.create_transactions(volumes['transactions'], accounts)
+
+        # bulk_create sends no signals, so invalidate cached reference lists
+        # and build the monthly balance rollups explicitly
+        bump_version()
+        self.build_rollups()
+        elapsed = (timezone.now() - started).total_seconds()
+        self.stdout.write(self.style.SUCCESS(f'Dataset {self.prefix} generated in {elapsed:.1f}s'))
+
+    def bulk_insert(self, model, rows, total):
+        """Insert generated rows in batches, reporting progress"""
+        created = 0
+        for batch in batched(rows, self.batch_size):
+            with transaction.atomic():
+                model.objects.bulk_create(batch, batch_size=self.batch_size)
+            created += len(batch)
+            if created % (self.batch_size * 20) == 0 or created == total:
+                self.stdout.write(f'  {model.__name__}: {created:,}/{total:,}')
+        return created
+
+    def load_ids_with_sacco(self, queryset):
+        """(id, sacco id) pairs of freshly generated rows, in creation order, as two parallel compact arrays"""
+        ids = array('q')
+        sacco_ids = array('q')
+        for pk, sacco_id in queryset.order_by('pk').values_list('pk', 'sacco_id').iterator(chunk_size=self.batch_size):
+            ids.append(pk)
+            sacco_ids.append(sacco_id)
+        return ids, sacco_ids
+
+    def random_datetime(self, days_back):
+        return timezone.now() - timedelta(days=self.random.randint(0, days_back), seconds=self.random.randint(0, 86399))
+
+    def create_regions(self, count):
+        regions = []
+        for index in range(count):
+            region, _ = Region.objects.get_or_create(
+                name=f'{self.prefix} Region {index + 1}',
+                defaults={'description': 'Generated for benchmarks'}
+            )
+            regions.append(region)
+        districts = [
+            District(name=f'{self.prefix} District {region.pk}-{index + 1}', region=region)
+            for region in regions for index in range(5)
+        ]
+        District.objects.bulk_create(districts)
+        self.districts = list(District.objects.filter(name__startswith=f'{self.prefix} District'))
+        return regions
+
+    def create_saccos(self, count, regions):
+        districts_by_region = {}
+        for district in self.districts:
+            districts_by_region.setdefault(district.region_id, []).append(district)
+
+        def rows():
+            for index in range(count):
+                region = regions[index % len(regions)]
+                yield Sacco(
+                    name=f'{self.prefix} Sacco {index + 1}',
+                    registration_number=f'{self.prefix}-{index + 1:06d}',
+                    address='Generated',
+                    phone=f'+2567{index:08d}'[:20],
+                    email=f'sacco{index + 1}@{self.prefix.lower()}.example.com',
+                    region=region,
+                    district=self.random.choice(districts_by_region.get(region.pk) or [None]),
+                )
+
+        self.bulk_insert(Sacco, rows(), count)
+        return list(Sacco.objects.filter(registration_number__startswith=f'{self.prefix}-').order_by('pk'))
+
+    def create_products(self, saccos):
+        LoanProduct.objects.bulk_create([
+            LoanProduct(
+                sacco=sacco,
+                name='Business Loan',
+                product_code=f'{self.prefix}-L{sacco.pk}',
+                description='Generated',
+                interest_rate=Decimal('18.00'),
+                max_amount=Decimal('10000000'),
+                min_amount=Decimal('100000'),
+                max_duration_months=24,
+                min_duration_months=3,
+            ) for sacco in saccos
+        ], batch_size=self.batch_size)
+        SavingProduct.objects.bulk_create([
+            SavingProduct(
+                sacco=sacco,
+                name='Ordinary Savings',
+                product_code=f'{self.prefix}-S{sacco.pk}',
+                interest_rate=Decimal('3.00'),
+            ) for sacco in saccos
+        ], batch_size=self.batch_size)
+        loan_products = dict(
+            LoanProduct.objects.filter(product_code__startswith=f'{self.prefix}-L').values_list('sacco_id', 'pk')
+        )
+        saving_products = dict(
+            SavingProduct.objects.filter(product_code__startswith=f'{self.prefix}-S').values_list('sacco_id', 'pk')
+        )
+        return loan_products, saving_products
+
+    def create_members(self, count, saccos):
+        sacco_ids = [sacco.pk for sacco in saccos]
+
+        def rows():
+            for index in range(count):
+                joined = date.today() - timedelta(days=self.random.randint(0, 3650))
+                yield Member(
+                    sacco_id=sacco_ids[index % len(sacco_ids)],
+                    member_number=f'{self.prefix}-M{index + 1:08d}',
+                    first_name=self.random.choice(FIRST_NAMES),
+                    last_name=self.random.choice(LAST_NAMES),
+                    phone=f'07{index:08d}'[:20],
+                    gender='Female',
+                    date_of_birth=date(1960, 1, 1) + timedelta(days=self.random.randint(0, 16000)),
+                    village_town='Generated',
+                    district='Generated',
+                    date_joined=joined,
+                    status='Active' if self.random.random() < 0.9 else 'Inactive',
+                    created_at=timezone.make_aware(datetime.combine(joined, datetime.min.time())),
+                )
+
+        self.bulk_insert(Member, rows(), count)
+        return self.load_ids_with_sacco(Member.objects.filter(member_number__startswith=f'{self.prefix}-M'))
+
+    def create_loans(self, count, members, loan_products):
+        member_ids, member_saccos = members
+        if not member_ids:
+            return
+
+        def rows():
+            for index in range(count):
+                position = self.random.randrange(len(member_ids))
+                amount = Decimal(self.random.randrange(100, 5000) * 1000)
+                duration = self.random.choice([3, 6, 12, 18, 24])
+                status = self.random.choice(LOAN_STATUSES)
+                applied = self.random_datetime(1095)
+                disbursed = applied + timedelta(days=7) if status not in ('pending_approval',) else None
+                yield Loan(
+                    member_id=member_ids[position],
+                    sacco_id=member_saccos[position],
+                    product_id=loan_products[member_saccos[position]],
+                    loan_number=f'{self.prefix}-LN{index + 1:09d}',
+                    loan_ref=f'{self.prefix}-REF{index + 1:09d}',
+                    amount_requested=amount,
+                    amount_approved=amount if disbursed else None,
+                    amount_disbursed=amount if disbursed else None,
+                    principal=amount,
+                    interest_rate=Decimal('18.00'),
+                    duration_months=duration,
+                    outstanding_principal=Decimal('0') if status == 'closed' else amount,
+                    status=status,
+                    purpose='Generated',
+                    application_date=applied,
+                    disbursement_date=disbursed,
+                    maturity_date=disbursed + timedelta(days=30 * duration) if disbursed else None,
+                    created_at=applied,
+                )
+
+        self.bulk_insert(Loan, rows(), count)
+        # Installment schedules for the portfolio at risk report
+        build_schedules(
+            Loan.objects.filter(loan_number__startswith=f'{self.prefix}-LN', disbursement_date__isnull=False),
+            batch_size=self.batch_size,
+        )
+
+    def create_savings_accounts(self, members, saving_products):
+        member_ids, member_saccos = members
+
+        def rows():
+            for position, member_id in enumerate(member_ids):
+                opened = self.random_datetime(3650)
+                yield SavingsAccount(
+                    member_id=member_id,
+                    sacco_id=member_saccos[position],
+                    product_id=saving_products[member_saccos[position]],
+                    account_number=f'{self.prefix}-SA{position + 1:09d}',
+                    opened_date=opened.date(),
+                    created_at=opened,
+                )
+
+        self.bulk_insert(SavingsAccount, rows(), len(member_ids))
+        return self.load_ids_with_sacco(SavingsAccount.objects.filter(account_number__startswith=f'{self.prefix}-SA'))
+
+    def create_transactions(self, count, accounts):
+        account_ids, account_saccos = accounts
+        if not account_ids or not count:
+            return
+        # Spread transactions evenly over accounts, oldest first, keeping running balances consistent
+        per_account = max(1, count // len(account_ids))
+        now = timezone.now()
+
+        def rows():
+            created = 0
+            for account_id, sacco_id in zip(account_ids, account_saccos):
+                balance = Decimal('0')
+                moment = now - timedelta(days=per_account * 7)
+                for _ in range(per_account):
+                    if created >= count:
+                        return
+                    amount = Decimal(self.random.randrange(5, 500) * 1000)
+                    if balance > amount and self.random.random() < 0.25:
+                        txn_type, balance = 'Withdrawal', balance - amount
+                    else:
+                        txn_type, balance = 'Deposit', balance + amount
+                    moment += timedelta(days=self.random.randint(1, 13))
+                    created += 1
+                    yield SavingsTransaction(
+                        account_id=account_id,
+                        sacco_id=sacco_id,
+                        txn_type=txn_type,
+                        amount=amount,
+                        running_balance=balance,
+                        reference=f'{self.prefix}-T{created}',
+                        performed_at=min(moment, now),
+                        created_at=min(moment, now),
+                    )
+
+        total = min(count, per_account * len(account_ids))
+        self.bulk_insert(SavingsTransaction, rows(), total)
+
+        # Account balances follow the last transaction; accounts without any keep theirs
+        from django.db.models import Exists, OuterRef, Subquery
+        transactions = SavingsTransaction.objects.filter(account=OuterRef('pk'))
+        last_balance = transactions.order_by('-performed_at', '-pk').values('running_balance')[:1]
+        SavingsAccount.objects.filter(account_number__startswith=f'{self.prefix}-SA').filter(
+            Exists(transactions)
+        ).update(balance=Subquery(last_balance))
+
+    def build_rollups(self):
+        sacco_ids = list(
+            Sacco.objects.filter(registration_number__startswith=f'{self.prefix}-').values_list('pk', flat=True)
+        )
+        last = month_of(timezone.now())
+        for kind in REBUILDABLE_KINDS:
+            first = first_movement_month(kind, sacco_ids)
+            if first is not None:
+                rows = rebuild_rollups(kind, first, last, sacco_ids, batch_size=self.batch_size)
+                self.stdout.write(f'  {kind} rollups: {rows:,} account-month rows')
+
+    def purge(self):
+        saccos = Sacco.objects.filter(registration_number__startswith=f'{self.prefix}-')
+        count = saccos.count()
+        with transaction.atomic():
+            # Delete bottom-up so the large tables go in single DELETE statements
+            # instead of being collected row by row through the cascades
+            SavingsTransaction.objects.filter(account__account_number__startswith=f'{self.prefix}-SA').delete()
+            SavingsAccount.objects.filter(account_number__startswith=f'{self.prefix}-SA').delete()
+            Loan.objects.filter(loan_number__startswith=f'{self.prefix}-LN').delete()
+            Member.objects.filter(member_number__startswith=f'{self.prefix}-M').delete()
+            saccos.delete()
+            Region.objects.filter(name__startswith=f'{self.prefix} Region').delete()
+        bump_version()
+        self.stdout.write(self.style.SUCCESS(f'Removed dataset {self.prefix} ({count} Saccos)'))
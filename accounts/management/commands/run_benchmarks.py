@@ -0,0 +1,115 @@
+"""
+Management command to benchmark key views and commands against the current
+database and write the results to a JSON report
+
+    python manage.py generate_scale_dataset --size medium
+    python manage.py run_benchmarks --label medium --compare benchmark_reports/previous.json
+"""
+import json
+import subprocess
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import setup_test_environment, teardown_test_environment
+from django.utils import timezone
+
+from accounts.benchmarks import (
+    BENCHMARK_TARGETS, compare_results, dataset_summary, get_benchmark_users, run_target
+)
+
+
+def current_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            cwd=settings.BASE_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class Command(BaseCommand):
+    help = 'Benchmark key views and commands (latency, query count, peak memory) into a JSON report'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=5, help='Timed runs per target (default: 5)')
+        parser.add_argument('--warmup', type=int, default=1, help='Untimed runs before timing (default: 1)')
+        parser.add_argument('--only', nargs='+', help='Only run the named targets')
+        parser.add_argument('--sacco-id', type=int, help='Sacco the Sacco admin targets run against (default: first active Sacco)')
+        parser.add_argument('--label', default='', help='Free-form label stored in the report, e.g. the dataset size')
+        parser.add_argument('--output', help='Report path (default: benchmark_reports/benchmark-<label>-<timestamp>.json)')
+        parser.add_argument('--compare', help='Previous report to compare median latencies against')
+
+    def handle(self, *args, **options):
+        from accounts.models import Sacco
+
+        targets = BENCHMARK_TARGETS
+        if options['only']:
+            unknown = set(options['only']) - {name for name, *_ in targets}
+            if unknown:
+                raise CommandError(f'Unknown targets: {", ".join(sorted(unknown))}')
+            targets = [target for target in targets if target[0] in options['only']]
+
+        sacco = None
+        if options['sacco_id']:
+            try:
+                sacco = Sacco.objects.get(pk=options['sacco_id'])
+            except Sacco.DoesNotExist:
+                raise CommandError(f'Sacco {options["sacco_id"]} does not exist.')
+
+        users = get_benchmark_users(sacco)
+        report = {
+            'label': options['label'],
+            'commit': current_commit(),
+            'generated_at': timezone.now().isoformat(),
+            'iterations': options['iterations'],
+            'dataset': dataset_summary(),
+            'results': [],
+        }
+        self.stdout.write(self.style.WARNING(
+            'Dataset: ' + ', '.join(f'{count:,} {name}' for name, count in report['dataset'].items())
+        ))
+
+        # Lets the test client talk to 'testserver' and keeps commands from sending real email
+        setup_test_environment()
+        try:
+            for name, kind, target, role in targets:
+                result = run_target(
+                    name, kind, target, users.get(role),
+                    iterations=options['iterations'], warmup=options['warmup']
+                )
+                report['results'].append(result)
+                if 'error' in result:
+                    self.stdout.write(self.style.ERROR(f'{name:<24} failed: {result["error"]}'))
+                else:
+                    self.stdout.write(
+                        f'{name:<24} median {result["latency_ms"]["median"]:>9.1f} ms  '
+                        f'p95 {result["latency_ms"]["p95"]:>9.1f} ms  '
+                        f'{result["queries"]:>6} queries  {result["peak_memory_kb"]:>10.1f} KB'
+                    )
+        finally:
+            teardown_test_environment()
+
+        output = options['output']
+        if not output:
+            stamp = timezone.now().strftime('%Y%m%d-%H%M%S')
+            label = f'-{options["label"]}' if options['label'] else ''
+            output = Path(settings.BASE_DIR) / 'benchmark_reports' / f'benchmark{label}-{stamp}.json'
+        output = Path(output)
+        output.parent.mkdir(parents=True, exist_ok=True)
+        output.write_text(json.dumps(report, indent=2))
+        self.stdout.write(self.style.SUCCESS(f'Report written to {output}'))
+
+        if options['compare']:
+            try:
+                previous = json.loads(Path(options['compare']).read_text())
+            except (OSError, ValueError) as e:
+                raise CommandError(f'Could not read {options["compare"]}: {e}')
+            self.stdout.write(f'\nCompared with {previous.get("label") or options["compare"]} ({previous.get("commit")}):')
+            for name, old_ms, new_ms, change, old_queries, new_queries in compare_results(report, previous):
+                style = self.style.ERROR if change > 10 else self.style.SUCCESS if change < -10 else str
+                self.stdout.write(style(
+                    f'{name:<24} {old_ms:>9.1f} -> {new_ms:>9.1f} ms ({change:+.0f}%)  '
+                    f'queries {old_queries} -> {new_queries}'
+                ))
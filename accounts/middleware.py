@@ -79,3 +79,136 @@ class InactivityLogoutMiddleware:
         response = self.get_response(request)
         return response
 
+
+
+class PerformanceMonitoringMiddleware:
+    """
+    Record wall time, DB query count and time, template render time and
+    response size for every request, aggregate them per view and log slow
+    requests together with their most repeated SQL
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.excluded_paths = [
+            '/static/',
+            '/media/',
+            '/favicon.ico',
+            '/metrics',
+        ]
+
+    def __call__(self, request):
+        from django.conf import settings
+
+        if not getattr(settings, 'PERFORMANCE_MONITORING_ENABLED', True) or \
+                any(request.path.startswith(path) for path in self.excluded_paths):
+            return self.get_response(request)
+
+        from contextlib import ExitStack
+        from django.db import connections
+        from .instrumentation import RequestMetrics, QueryTimer, activate, deactivate
+
+        metrics = RequestMetrics()
+        token = activate(metrics)
+        try:
+            with ExitStack() as stack:
+                for alias in connections:
+                    stack.enter_context(connections[alias].execute_wrapper(QueryTimer(metrics)))
+                response = self.get_response(request)
+        finally:
+            deactivate(token)
+
+        metrics.finish(response)
+        self.record(request, response, metrics)
+        return response
+
+    def record(self, request, response, metrics):
+        import logging
+        from django.conf import settings
+        from .instrumentation import record_request
+
+        match = getattr(request, 'resolver_match', None)
+        view_name = match.view_name if match else 'unresolved'
+        try:
+            record_request(view_name, metrics, response.status_code)
+        except Exception as e:
+            # Metrics must never break the request itself
+            logging.getLogger('sacco.performance').warning(f'Could not record metrics for {view_name}: {e}')
+
+        slow_ms = getattr(settings, 'PERFORMANCE_SLOW_REQUEST_MS', 1000)
+        if metrics.wall_time * 1000 >= slow_ms:
+            logger = logging.getLogger('sacco.performance.slow')
+            lines = [
+                f'{request.method} {request.path} view={view_name} status={response.status_code} '
+                f'wall={metrics.wall_time * 1000:.0f}ms queries={metrics.query_count} '
+                f'db={metrics.db_time * 1000:.0f}ms template={metrics.template_time * 1000:.0f}ms '
+                f'bytes={metrics.response_size}'
+            ]
+            for fingerprint, count, seconds in metrics.top_repeated_queries():
+                lines.append(f'    x{count} ({seconds * 1000:.0f}ms) {fingerprint}')
+            logger.warning('\n'.join(lines))
+
+
+class NPlusOneDetectionMiddleware:
+    """
+    Report query shapes repeated within a request (N+1 patterns) with their
+    call sites; enabled with NPLUSONE_ENABLED (defaults to DEBUG) and turned
+    into errors with NPLUSONE_RAISE so the test suite fails on them
+    """
+
+    def __init__(self, get_response):
+        from django.conf import settings
+        from django.core.exceptions import MiddlewareNotUsed
+
+        if not getattr(settings, 'NPLUSONE_ENABLED', settings.DEBUG):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.excluded_paths = [
+            '/static/',
+            '/media/',
+            '/favicon.ico',
+        ]
+
+    def __call__(self, request):
+        if any(request.path.startswith(path) for path in self.excluded_paths):
+            return self.get_response(request)
+
+        from django.conf import settings
+        from .nplusone import NPlusOneError, QueryShapeTracker, logger, track_queries
+
+        tracker = QueryShapeTracker()
+        with track_queries(tracker):
+            response = self.get_response(request)
+
+        if tracker.violations():
+            match = getattr(request, 'resolver_match', None)
+            label = f'{request.method} {request.path} ({match.view_name if match else "unresolved"})'
+            report = tracker.report(label)
+            if getattr(settings, 'NPLUSONE_RAISE', False):
+                raise NPlusOneError(report)
+            logger.warning(report)
+        return response
+
+
+class ReadReplicaStickinessMiddleware:
+    """
+    Pin users to the primary database for a short while after any request
+    that may have written, so views reading from the replica show them their
+    own changes (accounts/db_routing.py)
+    """
+    SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS', 'TRACE')
+
+    def __init__(self, get_response):
+        from django.core.exceptions import MiddlewareNotUsed
+        from .db_routing import replica_alias
+
+        if replica_alias() is None:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if request.method not in self.SAFE_METHODS and request.user.is_authenticated:
+            from .db_routing import pin_to_primary
+            pin_to_primary(request.user.pk)
+        return response
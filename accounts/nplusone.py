@@ -0,0 +1,124 @@
+"""
+N+1 query detection for development and tests
+
+Every query issued while detection is active is reduced to its shape (see
+instrumentation.fingerprint_sql) and attributed to the innermost frame of
+project code that issued it. When one shape repeats at least the threshold
+number of times within a request (or a detect_nplusone() block) it is reported
+with its call sites, or raised as NPlusOneError when NPLUSONE_RAISE is set.
+
+    NPLUSONE_RAISE=1 python manage.py test
+
+makes the test suite fail on any view that loops over queries.
+"""
+import logging
+import os
+import sys
+from collections import Counter, defaultdict
+from contextlib import ExitStack, contextmanager
+
+from django.conf import settings
+
+from . import instrumentation
+from .instrumentation import fingerprint_sql
+
+logger = logging.getLogger('sacco.performance.nplusone')
+
+# Statements that legitimately repeat and say nothing about the view's data access
+IGNORED_PREFIXES = ('SAVEPOINT', 'RELEASE SAVEPOINT', 'ROLLBACK TO SAVEPOINT')
+
+
+class NPlusOneError(Exception):
+    """Raised when a query shape repeats more often than NPLUSONE_THRESHOLD allows"""
+
+
+def get_threshold():
+    return getattr(settings, 'NPLUSONE_THRESHOLD', 10)
+
+
+def _project_root():
+    return os.path.join(str(settings.BASE_DIR), '')
+
+
+# Frames from the detector itself are never the call site
+_SKIPPED_FILES = {os.path.abspath(__file__), os.path.abspath(instrumentation.__file__)}
+
+
+def find_call_site(depth=3):
+    """
+    Return the innermost project frames (outside Django and site-packages) on
+    the current stack as 'path:line in function' strings
+    """
+    root = _project_root()
+    frames = []
+    frame = sys._getframe(1)
+    while frame is not None and len(frames) < depth:
+        filename = os.path.abspath(frame.f_code.co_filename)
+        if (
+            filename.startswith(root)
+            and filename not in _SKIPPED_FILES
+            and 'site-packages' not in filename
+        ):
+            frames.append(f'{os.path.relpath(filename, root)}:{frame.f_lineno} in {frame.f_code.co_name}')
+        frame = frame.f_back
+    return ' <- '.join(frames) or 'unknown'
+
+
+class QueryShapeTracker:
+    """Database execute wrapper counting query shapes and where they come from"""
+
+    def __init__(self, threshold=None):
+        self.threshold = threshold or get_threshold()
+        self.counts = Counter()
+        self.call_sites = defaultdict(Counter)
+
+    def __call__(self, execute, sql, params, many, context):
+        if not sql.lstrip().upper().startswith(IGNORED_PREFIXES):
+            fingerprint = fingerprint_sql(sql)
+            self.counts[fingerprint] += 1
+            self.call_sites[fingerprint][find_call_site()] += 1
+        return execute(sql, params, many, context)
+
+    def violations(self):
+        """Repeated query shapes as (fingerprint, count, [(call site, count), ...]), worst first"""
+        return [
+            (fingerprint, count, self.call_sites[fingerprint].most_common(3))
+            for fingerprint, count in self.counts.most_common()
+            if count >= self.threshold
+        ]
+
+    def report(self, label):
+        lines = [f'Possible N+1 queries in {label}:']
+        for fingerprint, count, sites in self.violations():
+            lines.append(f'  x{count} {fingerprint}')
+            for site, site_count in sites:
+                lines.append(f'      {site_count} from {site}')
+        return '\n'.join(lines)
+
+
+@contextmanager
+def track_queries(tracker):
+    """Install a tracker on every configured database connection"""
+    from django.db import connections
+
+    with ExitStack() as stack:
+        for alias in connections:
+            stack.enter_context(connections[alias].execute_wrapper(tracker))
+        yield tracker
+
+
+@contextmanager
+def detect_nplusone(threshold=None, label='block'):
+    """
+    Fail with NPlusOneError if any query shape repeats threshold or more times
+    inside the block. Intended for tests:
+
+        with detect_nplusone(threshold=5):
+            self.client.get(reverse('loans_overview'))
+    """
+    tracker = QueryShapeTracker(threshold)
+    with track_queries(tracker):
+        yield tracker
+    if tracker.violations():
+        raise NPlusOneError(tracker.report(label))
+
@@ -1,6 +1,8 @@
 """
 Permission check functions for reusability across views
 """
+from .scope import get_user_scope
+
 
 def check_sacco_admin(user):
     """Check if user is a Sacco Admin or System Admin"""
@@ -35,24 +37,20 @@ def get_user_data_scope(user):
     if not user.is_authenticated:
         return {'error': 'User not authenticated'}
     
-    if user.is_system_admin:
+    scope = get_user_scope(user)
+    if scope.is_all:
         return {'scope': 'all', 'filters': {}}
-    elif user.is_regional_admin:
-        return {
-            'scope': 'regional',
-            'filters': {'sacco__region': user.region}
-        }
-    elif user.is_sacco_admin:
-        return {
-            'scope': 'sacco',
-            'filters': {'sacco': user.sacco}
-        }
-    else:
+    elif scope.kind == 'member':
         # Regular member - can only see their own data
         return {
             'scope': 'member',
             'filters': {'user_account': user}
         }
+    else:
+        return {
+            'scope': 'regional' if scope.kind == 'regional' else 'sacco',
+            'filters': {'sacco_id__in': sorted(scope.sacco_ids)}
+        }
 
 
 def filter_queryset_by_user_scope(queryset, user, model_type='member'):
@@ -65,75 +63,9 @@ def filter_queryset_by_user_scope(queryset, user, model_type='member'):
         model_type: Type of model ('member', 'loan', 'savings', etc.)
     
     Returns:
-        Filtered queryset
+        Filtered queryset, restricted by Sacco id (see accounts/scope.py)
     """
-    if not user.is_authenticated:
-        return queryset.none()
-    
-    if user.is_system_admin:
-        return queryset
-    
-    elif user.is_regional_admin:
-        if model_type == 'member':
-            return queryset.filter(sacco__region=user.region)
-        elif model_type == 'loan':
-            return queryset.filter(member__sacco__region=user.region)
-        elif model_type == 'savings':
-            return queryset.filter(member__sacco__region=user.region)
-        elif model_type == 'savings_transaction':
-            return queryset.filter(account__member__sacco__region=user.region)
-        elif model_type == 'saving_product':
-            return queryset.filter(sacco__region=user.region)
-        elif model_type == 'loan_product':
-            return queryset.filter(sacco__region=user.region)
-        elif model_type == 'loan_repayment':
-            return queryset.filter(loan__member__sacco__region=user.region)
-        elif model_type in ['funding', 'project', 'expense']:
-            return queryset.filter(sacco__region=user.region)
-        else:
-            return queryset.filter(sacco__region=user.region)
-
-    elif user.is_sacco_admin:
-        if model_type == 'member':
-            return queryset.filter(sacco=user.sacco)
-        elif model_type == 'loan':
-            return queryset.filter(member__sacco=user.sacco)
-        elif model_type == 'savings':
-            return queryset.filter(member__sacco=user.sacco)
-        elif model_type == 'savings_transaction':
-            return queryset.filter(account__member__sacco=user.sacco)
-        elif model_type == 'saving_product':
-            return queryset.filter(sacco=user.sacco)
-        elif model_type == 'loan_product':
-            return queryset.filter(sacco=user.sacco)
-        elif model_type == 'loan_repayment':
-            return queryset.filter(loan__member__sacco=user.sacco)
-        elif model_type in ['funding', 'project', 'expense']:
-            return queryset.filter(sacco=user.sacco)
-        else:
-            return queryset.filter(sacco=user.sacco)
-    
-    else:
-        # Regular member - can only see their own data
-        if model_type == 'member':
-            return queryset.filter(user_account=user)
-        elif model_type == 'loan':
-            return queryset.filter(member__user_account=user)
-        elif model_type == 'savings':
-            return queryset.filter(member__user_account=user)
-        elif model_type == 'savings_transaction':
-            return queryset.filter(account__member__user_account=user)
-        elif model_type == 'saving_product':
-            # Members can see saving products from their sacco
-            return queryset.filter(sacco=user.sacco)
-        elif model_type == 'loan_product':
-            # Members can see loan products from their sacco
-            return queryset.filter(sacco=user.sacco)
-        elif model_type == 'loan_repayment':
-            # Members can see their own loan repayments
-            return queryset.filter(loan__member__user_account=user)
-        else:
-            return queryset.none()
+    return get_user_scope(user).filter(queryset, model_type)
 
 
 def can_access_member_data(user, member):
@@ -150,15 +82,11 @@ def can_access_member_data(user, member):
     if not user.is_authenticated:
         return False
     
-    if user.is_system_admin:
-        return True
-    elif user.is_regional_admin:
-        return member.sacco.region == user.region
-    elif user.is_sacco_admin:
-        return member.sacco == user.sacco
-    else:
+    scope = get_user_scope(user)
+    if scope.kind == 'member':
         # Regular member - can only access their own data
-        return member.user_account == user
+        return member.user_account_id == user.id
+    return scope.can_access_sacco(member.sacco_id)
 
 
 def get_accessible_saccos(user):
@@ -173,15 +101,11 @@ def get_accessible_saccos(user):
     """
     from .models import Sacco
     
-    if not user.is_authenticated:
-        return Sacco.objects.none()
-    
-    if user.is_system_admin:
+    scope = get_user_scope(user)
+    if scope.is_all:
         return Sacco.objects.all()
-    elif user.is_regional_admin:
-        return Sacco.objects.filter(region=user.region)
-    elif user.is_sacco_admin:
-        return Sacco.objects.filter(id=user.sacco.id)
+    elif scope.kind in ('regional', 'sacco') and scope.sacco_ids:
+        return Sacco.objects.filter(id__in=sorted(scope.sacco_ids))
     else:
         return Sacco.objects.none()
 
@@ -198,15 +122,4 @@ def get_accessible_members(user):
     """
     from members.models import Member
     
-    if not user.is_authenticated:
-        return Member.objects.none()
-    
-    if user.is_system_admin:
-        return Member.objects.all()
-    elif user.is_regional_admin:
-        return Member.objects.filter(sacco__region=user.region)
-    elif user.is_sacco_admin:
-        return Member.objects.filter(sacco=user.sacco)
-    else:
-        # Regular member - can only see their own data
-        return Member.objects.filter(user_account=user)
+    return get_user_scope(user).filter(Member.objects.all(), 'member')
@@ -0,0 +1,171 @@
+"""
+Process-level cache for slow-changing reference data (regions, districts,
+active Saccos and products)
+
+Every process keeps its own copy of the reference lists together with the
+version they were loaded at. The current version lives in the shared Django
+cache and is bumped whenever a reference model is saved or deleted (see
+accounts/signals.py), and again once that change commits, so each process
+reloads on its next lookup after a change.
+"""
+import threading
+import time
+
+from django.core.cache import cache
+from django.db import transaction
+
+from .db_routing import primary_reads
+
+VERSION_CACHE_KEY = 'reference_data:version'
+
+_lock = threading.Lock()
+_state = {'version': None, 'data': {}}
+
+
+def _load_regions():
+    from .models import Region
+    return list(Region.objects.filter(is_active=True).order_by('name'))
+
+
+def _load_districts():
+    from .models import District
+    return list(District.objects.filter(is_active=True).select_related('region').order_by('name'))
+
+
+def _load_saccos():
+    from .models import Sacco
+    return list(Sacco.objects.filter(is_active=True).select_related('region', 'district').order_by('name'))
+
+
+def _load_loan_products():
+    from loans.models import LoanProduct
+    return list(LoanProduct.objects.filter(is_active=True).order_by('name'))
+
+
+def _load_saving_products():
+    from savings.models import SavingProduct
+    return list(SavingProduct.objects.filter(is_active=True).order_by('name'))
+
+
+LOADERS = {
+    'regions': _load_regions,
+    'districts': _load_districts,
+    'saccos': _load_saccos,
+    'loan_products': _load_loan_products,
+    'saving_products': _load_saving_products,
+}
+
+
+def get_version():
+    """Return the shared reference data version, initialising it if missing"""
+    version = cache.get(VERSION_CACHE_KEY)
+    if version is None:
+        # Seed with a timestamp so a cache flush never reuses an old version
+        cache.add(VERSION_CACHE_KEY, time.time_ns(), None)
+        version = cache.get(VERSION_CACHE_KEY)
+    return version
+
+
+def _increment():
+    try:
+        cache.incr(VERSION_CACHE_KEY)
+    except ValueError:
+        cache.set(VERSION_CACHE_KEY, time.time_ns(), None)
+    clear()
+
+
+def bump_version():
+    """
+    Invalidate the reference data held by every process, at once and again
+    when the current transaction commits: until then other processes still
+    read the old rows and would keep them under the first bump
+    """
+    _increment()
+    transaction.on_commit(_increment)
+
+
+def clear():
+    """Drop this process's copy of the reference data"""
+    with _lock:
+        _state['version'] = None
+        _state['data'] = {}
+
+
+def get_reference(name):
+    """
+    Get a reference list by name ('regions', 'districts', 'saccos',
+    'loan_products' or 'saving_products')
+
+    Costs one cache lookup; the database is only hit when the data has not been
+    loaded yet in this process or another process bumped the version.
+    """
+    loader = LOADERS[name]
+    version = get_version()
+    with _lock:
+        if _state['version'] != version:
+            _state['version'] = version
+            _state['data'] = {}
+        data = _state['data'].get(name)
+    if data is None:
+        with primary_reads():
+            data = loader()
+        with _lock:
+            if _state['version'] == version:
+                _state['data'][name] = data
+    return data
+
+
+def get_regions():
+    return get_reference('regions')
+
+
+def get_districts(region_id=None):
+    districts = get_reference('districts')
+    if region_id is None:
+        return districts
+    return [district for district in districts if district.region_id == region_id]
+
+
+def get_saccos(region_id=None):
+    saccos = get_reference('saccos')
+    if region_id is None:
+        return saccos
+    return [sacco for sacco in saccos if sacco.region_id == region_id]
+
+
+def get_loan_products(sacco_id=None):
+    products = get_reference('loan_products')
+    if sacco_id is None:
+        return products
+    return [product for product in products if product.sacco_id == sacco_id]
+
+
+def get_saving_products(sacco_id=None):
+    products = get_reference('saving_products')
+    if sacco_id is None:
+        return products
+    return [product for product in products if product.sacco_id == sacco_id]
+
+
+class ReferenceData:
+    """Template-friendly accessor: {{ reference_data.regions }} etc."""
+
+    @property
+    def regions(self):
+        return get_regions()
+
+    @property
+    def districts(self):
+        return get_districts()
+
+    @property
+    def saccos(self):
+        return get_saccos()
+
+    @property
+    def loan_products(self):
+        return get_loan_products()
+
+    @property
+    def saving_products(self):
+        return get_saving_products()
@@ -0,0 +1,227 @@
+"""
+Regions and districts from the DOCX files in the regions/ folder
+
+Each file is one region, named after the file, listing its districts in
+paragraphs or tables. Parsing a DOCX is the slow part, so files are parsed in
+a process pool and the results are cached in a JSON file keyed by the SHA-256
+of each file's content: re-seeding only parses files that changed. Districts
+are then inserted with one bulk_create per region.
+
+Used by the populate_regions_districts, reset_database and setup_system
+commands.
+"""
+import hashlib
+import json
+import re
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from django.db import connections
+
+# Bump when the parsing rules change so cached results are discarded
+PARSER_VERSION = 1
+
+CACHE_FILENAME = '.parse-cache.json'
+
+DISTRICT_KEYWORDS = ('district', 'districts', 'county', 'counties')
+
+SKIP_NAMES = {
+    'district', 'districts', 'region', 'regions', 'county', 'counties',
+    'name', 'total', 'list', 'of', 'the', 'and', 'or', 'in', 'at', 'on',
+    'district name', 'district names', 'no.', 's/n', 'sn', 'number',
+}
+
+COMMON_WORDS = {'the', 'and', 'for', 'are', 'with', 'from', 'this', 'that'}
+
+
+def region_name_from_filename(stem):
+    """The region name is the file name, with whitespace normalized"""
+    return ' '.join((stem or '').split())
+
+
+def extract_district_names_from_text(text):
+    """Candidate district names in a paragraph that mentions districts"""
+    districts = []
+
+    # "District: Name" or "Districts: Name1, Name2"
+    match = re.search(r'districts?:\s*([^\n]+)', text, re.IGNORECASE)
+    if match:
+        for item in re.split(r'[,;]', match.group(1)):
+            district = item.strip()
+            if len(district) > 2:
+                districts.append(district)
+
+    # Capitalized words that might be district names
+    for word in re.findall(r'\b[A-Z][a-z]+(?:\s+[A-Z][a-z]+)*\b', text):
+        if len(word) > 3 and word.lower() not in COMMON_WORDS:
+            districts.append(word)
+    return districts
+
+
+def clean_district_names(candidates):
+    """Strip numbering and bullets, drop headers and duplicates, keep order"""
+    cleaned = []
+    for district in candidates:
+        district = re.sub(r'^\d+[\.\)]\s*', '', district.strip())
+        district = re.sub(r'^[-•]\s*', '', district)
+        district = ' '.join(district.split())
+        if len(district) < 3 or district.lower() in SKIP_NAMES:
+            continue
+        if not re.search(r'[a-zA-Z]', district) or district.isdigit():
+            continue
+        if district not in cleaned:
+            cleaned.append(district)
+    return cleaned
+
+
+def parse_districts(path):
+    """District names listed in a region DOCX"""
+    from docx import Document
+
+    doc = Document(str(path))
+    districts = []
+    for para in doc.paragraphs:
+        text = (para.text or '').strip()
+        if not text:
+            continue
+        if any(keyword in text.lower() for keyword in DISTRICT_KEYWORDS):
+            districts.extend(extract_district_names_from_text(text))
+        if len(text) < 50 and text[:1].isupper() and not any(char in text for char in ':;()'):
+            if text not in districts:
+                districts.append(text)
+
+    for table in doc.tables:
+        for row in table.rows:
+            for cell in row.cells:
+                text = (cell.text or '').strip()
+                if text and len(text) < 50 and text[:1].isupper() and text not in districts:
+                    districts.append(text)
+    return clean_district_names(districts)
+
+
+def _parse_file(path):
+    """Pool task: (path, districts, error)"""
+    try:
+        return path, parse_districts(path), None
+    except Exception as exc:
+        return path, None, str(exc)
+
+
+def file_digest(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as handle:
+        for block in iter(lambda: handle.read(1024 * 1024), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _load_cache(cache_path):
+    try:
+        with open(cache_path) as handle:
+            data = json.load(handle)
+    except (OSError, ValueError):
+        return {}
+    if data.get('parser_version') != PARSER_VERSION:
+        return {}
+    return data.get('files', {})
+
+
+def _save_cache(cache_path, files):
+    try:
+        with open(cache_path, 'w') as handle:
+            json.dump({'parser_version': PARSER_VERSION, 'files': files}, handle, indent=1, sort_keys=True)
+    except OSError:
+        pass
+
+
+def parse_region_docs(regions_dir, workers=None, use_cache=True):
+    """
+    Parse every DOCX in regions_dir
+
+    Returns a list of dicts (name, file, districts, cached, error) sorted by
+    region name. Files whose content hash is in the cache are not parsed
+    again; the rest are parsed in a pool of `workers` processes (default: one
+    per CPU).
+    """
+    regions_dir = Path(regions_dir)
+    cache_path = regions_dir / CACHE_FILENAME
+    cached = _load_cache(cache_path) if use_cache else {}
+
+    entries = []
+    for path in sorted(regions_dir.glob('*.docx')):
+        entries.append({
+            'name': region_name_from_filename(path.stem),
+            'file': path.name,
+            'path': str(path),
+            'digest': file_digest(path),
+            'districts': None,
+            'cached': False,
+            'error': None,
+        })
+
+    pending = []
+    for entry in entries:
+        if entry['digest'] in cached:
+            entry['districts'] = cached[entry['digest']]
+            entry['cached'] = True
+        else:
+            pending.append(entry)
+
+    if pending:
+        by_path = {entry['path']: entry for entry in pending}
+        if workers == 1 or len(pending) == 1:
+            results = map(_parse_file, by_path)
+        else:
+            # Forked workers must not share the parent's database connections;
+            # closing is skipped inside a transaction, which it would break
+            if not any(conn.in_atomic_block for conn in connections.all()):
+                connections.close_all()
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                results = list(pool.map(_parse_file, by_path))
+        for path, districts, error in results:
+            by_path[path]['districts'] = districts
+            by_path[path]['error'] = error
+
+    if use_cache:
+        # Keep only entries for files that are still present
+        _save_cache(cache_path, {
+            entry['digest']: entry['districts'] for entry in entries if entry['districts'] is not None
+        })
+    return entries
+
+
+def upsert_regions(entries):
+    """
+    Create missing regions and districts for parsed entries
+
+    Existing rows are left alone. Returns (regions created, {region name:
+    districts created}).
+    """
+    from .models import District, Region
+    from .reference_data import bump_version
+
+    entries = [entry for entry in entries if entry['name'] and entry['districts'] is not None]
+    names = [entry['name'] for entry in entries]
+    existing_regions = set(Region.objects.filter(name__in=names).values_list('name', flat=True))
+    Region.objects.bulk_create(
+        [Region(name=name, is_active=True) for name in names if name not in existing_regions],
+        ignore_conflicts=True,
+    )
+    region_ids = dict(Region.objects.filter(name__in=names).values_list('name', 'id'))
+
+    existing_districts = set(
+        District.objects.filter(region_id__in=region_ids.values()).values_list('region_id', 'name')
+    )
+    created = {}
+    for entry in entries:
+        region_id = region_ids[entry['name']]
+        new = [name for name in entry['districts'] if (region_id, name) not in existing_districts]
+        District.objects.bulk_create(
+            [District(name=name, region_id=region_id, is_active=True) for name in new],
+            ignore_conflicts=True,
+        )
+        created[entry['name']] = len(new)
+
+    # bulk_create sends no signals, so refresh the cached reference lists here
+    bump_version()
+    return len(set(names) - existing_regions), created
@@ -0,0 +1,149 @@
+"""
+Resolved data scope of a user: which Saccos they may see
+
+The scope is resolved once per request (memoized on the user object) and
+cached across requests per user. Saccos and regions changing invalidate it
+through the reference data version (see reference_data.py), and a change of
+role or assignment on the user produces a different cache key. Scoped querysets
+then filter on plain sacco id lists instead of joining through Sacco and Region.
+Loans, savings and repayments carry their own sacco_id (accounts/tenancy.py),
+so their scoped querysets do not join through members either.
+"""
+from django.core.cache import cache
+
+from .db_routing import primary_reads
+from .reference_data import get_version
+from .tenancy import TenantQuerySet
+
+CACHE_TIMEOUT = 300
+
+# Path from each model type to its Sacco id, as used by filter_queryset_by_user_scope
+SACCO_ID_PATHS = {
+    'member': 'sacco_id',
+    'loan': 'sacco_id',
+    'savings': 'sacco_id',
+    'savings_transaction': 'sacco_id',
+    'loan_repayment': 'sacco_id',
+    'saving_product': 'sacco_id',
+    'loan_product': 'sacco_id',
+    'funding': 'sacco_id',
+    'project': 'sacco_id',
+    'expense': 'sacco_id',
+}
+
+# Path from each model type to the member's user account, for regular members
+USER_ACCOUNT_PATHS = {
+    'member': 'user_account',
+    'loan': 'member__user_account',
+    'savings': 'member__user_account',
+    'savings_transaction': 'account__member__user_account',
+    'loan_repayment': 'loan__member__user_account',
+}
+
+
+class UserScope:
+    """
+    kind is 'all' (system admin), 'regional', 'sacco', 'member' or 'none';
+    sacco_ids is None for 'all', otherwise the frozenset of accessible Sacco ids
+    """
+
+    def __init__(self, kind, sacco_ids=None, sacco_active=True, user_id=None):
+        self.kind = kind
+        self.sacco_ids = frozenset(sacco_ids) if sacco_ids is not None else None
+        self.sacco_active = sacco_active
+        self.user_id = user_id
+
+    @property
+    def is_all(self):
+        return self.kind == 'all'
+
+    def can_access_sacco(self, sacco_id):
+        return self.is_all or sacco_id in self.sacco_ids
+
+    def filter(self, queryset, model_type='member'):
+        """Restrict a queryset of the given model type to this scope"""
+        if self.kind == 'none':
+            return queryset.none()
+        if self.is_all:
+            return queryset
+
+        if self.kind == 'member':
+            path = USER_ACCOUNT_PATHS.get(model_type)
+            if path:
+                return queryset.filter(**{path: self.user_id})
+            if model_type in ('saving_product', 'loan_product'):
+                # Members can see products from their own sacco
+                return self._filter_saccos(queryset, 'sacco_id')
+            return queryset.none()
+
+        return self._filter_saccos(queryset, SACCO_ID_PATHS.get(model_type, 'sacco_id'))
+
+    def _filter_saccos(self, queryset, path):
+        if isinstance(queryset, TenantQuerySet) and path == 'sacco_id':
+            return queryset.for_saccos(self.sacco_ids or ())
+        if not self.sacco_ids:
+            return queryset.none()
+        if len(self.sacco_ids) == 1:
+            return queryset.filter(**{path: next(iter(self.sacco_ids))})
+        return queryset.filter(**{f'{path}__in': sorted(self.sacco_ids)})
+
+    def to_cache(self):
+        return {
+            'kind': self.kind,
+            'sacco_ids': sorted(self.sacco_ids) if self.sacco_ids is not None else None,
+            'sacco_active': self.sacco_active,
+            'user_id': self.user_id,
+        }
+
+
+def _role_key(user):
+    return (
+        user.pk, user.is_system_admin, user.is_regional_admin, user.is_sacco_admin,
+        user.region_id, user.sacco_id,
+    )
+
+
+def _cache_key(user):
+    role = '-'.join(str(part) for part in _role_key(user))
+    return f'user_scope:{get_version()}:{role}'
+
+
+def _resolve(user):
+    from .models import Sacco
+
+    if user.is_system_admin:
+        return UserScope('all', user_id=user.pk)
+    if user.is_regional_admin:
+        sacco_ids = Sacco.objects.filter(region_id=user.region_id).values_list('id', flat=True) if user.region_id else []
+        return UserScope('regional', sacco_ids, user_id=user.pk)
+    if user.is_sacco_admin:
+        if not user.sacco_id:
+            return UserScope('sacco', [], user_id=user.pk)
+        sacco_active = Sacco.objects.filter(id=user.sacco_id).values_list('is_active', flat=True).first()
+        return UserScope('sacco', [user.sacco_id], sacco_active=bool(sacco_active), user_id=user.pk)
+    return UserScope('member', [user.sacco_id] if user.sacco_id else [], user_id=user.pk)
+
+
+def get_user_scope(user):
+    """
+    Return the UserScope for a user, resolving it at most once per request
+    and, across requests, once per change of Saccos or of the user's role
+    """
+    if not user.is_authenticated:
+        return UserScope('none')
+
+    role = _role_key(user)
+    memo = getattr(user, '_data_scope', None)
+    if memo is not None and memo[0] == role:
+        return memo[1]
+
+    key = _cache_key(user)
+    cached = cache.get(key)
+    if cached is not None:
+        scope = UserScope(**cached)
+    else:
+        with primary_reads():
+            scope = _resolve(user)
+        cache.set(key, scope.to_cache(), CACHE_TIMEOUT)
+    user._data_scope = (role, scope)
+    return scope
@@ -80,12 +80,12 @@ class DashboardStatsService:
         """Get statistics for a specific sacco"""
         return {
             'total_members': Member.objects.filter(sacco=sacco).count(),
-            'total_loans': Loan.objects.filter(member__sacco=sacco).count(),
-            'total_savings': SavingsAccount.objects.filter(member__sacco=sacco).count(),
+            'total_loans': Loan.objects.filter(sacco=sacco).count(),
+            'total_savings': SavingsAccount.objects.filter(sacco=sacco).count(),
             'total_funding': Funding.objects.filter(sacco=sacco).count(),
-            'total_loan_amount': Loan.objects.filter(member__sacco=sacco).aggregate(
+            'total_loan_amount': Loan.objects.filter(sacco=sacco).aggregate(
                 total=Sum('amount_requested'))['total'] or 0,
-            'total_savings_balance': SavingsAccount.objects.filter(member__sacco=sacco).aggregate(
+            'total_savings_balance': SavingsAccount.objects.filter(sacco=sacco).aggregate(
                 total=Sum('balance'))['total'] or 0,
         }
     
@@ -95,12 +95,12 @@ class DashboardStatsService:
         return {
             'total_saccos': Sacco.objects.filter(region=region, is_active=True).count(),
             'total_members': Member.objects.filter(sacco__region=region).count(),
-            'total_loans': Loan.objects.filter(member__sacco__region=region).count(),
-            'total_savings': SavingsAccount.objects.filter(member__sacco__region=region).count(),
+            'total_loans': Loan.objects.filter(sacco__region=region).count(),
+            'total_savings': SavingsAccount.objects.filter(sacco__region=region).count(),
             'total_funding': Funding.objects.filter(sacco__region=region).count(),
-            'total_loan_amount': Loan.objects.filter(member__sacco__region=region).aggregate(
+            'total_loan_amount': Loan.objects.filter(sacco__region=region).aggregate(
                 total=Sum('amount_requested'))['total'] or 0,
-            'total_savings_balance': SavingsAccount.objects.filter(member__sacco__region=region).aggregate(
+            'total_savings_balance': SavingsAccount.objects.filter(sacco__region=region).aggregate(
                 total=Sum('balance'))['total'] or 0,
         }
     
@@ -0,0 +1,21 @@
+"""
+Signal handlers for the accounts app
+"""
+from django.db.models.signals import post_save, post_delete
+
+from loans.models import LoanProduct
+from savings.models import SavingProduct
+from .models import Region, District, Sacco
+from .reference_data import bump_version
+
+REFERENCE_MODELS = (Region, District, Sacco, LoanProduct, SavingProduct)
+
+
+def invalidate_reference_data(sender, **kwargs):
+    """Bump the reference data version whenever a reference model changes"""
+    bump_version()
+
+
+for _model in REFERENCE_MODELS:
+    post_save.connect(invalidate_reference_data, sender=_model, dispatch_uid=f'reference_data_save_{_model.__name__}')
+    post_delete.connect(invalidate_reference_data, sender=_model, dispatch_uid=f'reference_data_delete_{_model.__name__}')
@@ -0,0 +1,30 @@
+"""
+Tenant-scoped querysets
+
+Loans, savings accounts, savings transactions and loan repayments carry their
+Sacco id themselves (copied from the member, account or loan when they are
+saved), so scoping them to Saccos is a filter on their own sacco_id column,
+served by their sacco-first composite indexes, rather than a join through
+members. UserScope.filter (accounts/scope.py) uses for_saccos on them.
+"""
+from django.db import models
+
+
+class TenantQuerySet(models.QuerySet):
+    def for_sacco(self, sacco):
+        """Rows of one Sacco (instance or id)"""
+        return self.filter(sacco_id=getattr(sacco, 'pk', sacco))
+
+    def for_saccos(self, sacco_ids):
+        """Rows of the given Sacco ids; None means every Sacco"""
+        if sacco_ids is None:
+            return self
+        sacco_ids = sorted(set(sacco_ids))
+        if not sacco_ids:
+            return self.none()
+        if len(sacco_ids) == 1:
+            return self.filter(sacco_id=sacco_ids[0])
+        return self.filter(sacco_id__in=sacco_ids)
+
+
+TenantManager = models.Manager.from_queryset(TenantQuerySet)
@@ -234,4 +234,441 @@ class ManagementCommandTest(TestCase):
         self.assertTrue(User.objects.filter(is_regional_admin=True).exists())
         
         # Check if saccos were created
-        self.assertTrue(Sacco.objects.exists())
\ No newline at end of file
+        self.assertTrue(Sacco.objects.exists())
+
+class ReferenceDataCacheTest(TestCase):
+    def setUp(self):
+        from . import reference_data
+        self.reference_data = reference_data
+        reference_data.clear()
+        self.region = Region.objects.create(name="Cached Region")
+
+    def test_regions_served_without_queries_once_loaded(self):
+        self.assertIn(self.region, self.reference_data.get_regions())
+        with self.assertNumQueries(0):
+            self.assertIn(self.region, self.reference_data.get_regions())
+
+    def test_saving_a_region_invalidates_cache(self):
+        self.reference_data.get_regions()
+        new_region = Region.objects.create(name="Another Region")
+        self.assertIn(new_region, self.reference_data.get_regions())
+
+    def test_version_bump_from_other_process_reloads(self):
+        self.reference_data.get_regions()
+        # Simulate another process bumping the shared version
+        from django.core.cache import cache
+        cache.incr(self.reference_data.VERSION_CACHE_KEY)
+        with self.assertNumQueries(1):
+            self.reference_data.get_regions()
+
+    def test_version_bumped_again_on_commit(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            Region.objects.create(name="Uncommitted Region")
+            # What another process caches now was read before the commit
+            during = self.reference_data.get_version()
+        self.assertNotEqual(self.reference_data.get_version(), during)
+
+
+class RegionDocsTest(TestCase):
+    def setUp(self):
+        import tempfile
+        from docx import Document
+        self.regions_dir = tempfile.mkdtemp()
+        self.addCleanup(__import__('shutil').rmtree, self.regions_dir)
+        document = Document()
+        for line in ['District Name', 'Mbarara', 'Ntungamo']:
+            document.add_paragraph(line)
+        document.add_table(rows=1, cols=1).rows[0].cells[0].text = 'Kabale'
+        document.save(f'{self.regions_dir}/SOUTH  WEST REGION.docx')
+
+    def test_parse_and_upsert(self):
+        from .models import District
+        from .region_docs import parse_region_docs, upsert_regions
+
+        entries = parse_region_docs(self.regions_dir, workers=1)
+        self.assertEqual(entries[0]['name'], 'SOUTH WEST REGION')
+        self.assertEqual(entries[0]['districts'], ['Mbarara', 'Ntungamo', 'Kabale'])
+        self.assertFalse(entries[0]['cached'])
+
+        region = Region.objects.create(name='SOUTH WEST REGION')
+        District.objects.create(name='Mbarara', region=region)
+        regions_created, created = upsert_regions(entries)
+        self.assertEqual(regions_created, 0)
+        self.assertEqual(created, {'SOUTH WEST REGION': 2})
+        self.assertEqual(District.objects.filter(region=region).count(), 3)
+
+    def test_unchanged_files_are_not_parsed_again(self):
+        from unittest import mock
+        from . import region_docs
+
+        region_docs.parse_region_docs(self.regions_dir, workers=1)
+        with mock.patch.object(region_docs, 'parse_districts') as parse:
+            entries = region_docs.parse_region_docs(self.regions_dir, workers=1)
+        parse.assert_not_called()
+        self.assertTrue(entries[0]['cached'])
+        self.assertEqual(entries[0]['districts'], ['Mbarara', 'Ntungamo', 'Kabale'])
+
+
+class PerformanceMonitoringTest(TestCase):
+    def setUp(self):
+        from django.core.cache import cache
+        cache.clear()
+        self.client = Client()
+        self.system_admin = User.objects.create_user(
+            username="perfadmin",
+            email="perfadmin@example.com",
+            password="perfadmin123",
+            is_system_admin=True
+        )
+
+    def test_fingerprint_sql_normalises_literals(self):
+        from .instrumentation import fingerprint_sql
+        self.assertEqual(
+            fingerprint_sql("SELECT * FROM t WHERE id = 12 AND name = 'x'"),
+            fingerprint_sql("SELECT *  FROM t WHERE id = 7 AND name = 'yy'")
+        )
+        self.assertEqual(
+            fingerprint_sql('SELECT * FROM t WHERE id IN (1, 2, 3)'),
+            'SELECT * FROM t WHERE id IN (...)'
+        )
+
+    def test_middleware_records_view_stats(self):
+        from .instrumentation import get_view_stats
+        self.client.login(username="perfadmin", password="perfadmin123")
+        self.client.get(reverse('activity_logs'))
+        rows = {row['view']: row for row in get_view_stats()}
+        self.assertIn('activity_logs', rows)
+        self.assertEqual(rows['activity_logs']['count'], 1)
+        self.assertGreater(rows['activity_logs']['queries_sum'], 0)
+
+    def test_performance_dashboard_renders(self):
+        self.client.login(username="perfadmin", password="perfadmin123")
+        response = self.client.get(reverse('performance_dashboard'))
+        self.assertEqual(response.status_code, 200)
+
+    def test_metrics_requires_token_or_system_admin(self):
+        response = self.client.get(reverse('metrics'))
+        self.assertEqual(response.status_code, 403)
+
+        with self.settings(METRICS_TOKEN='secret'):
+            response = self.client.get(reverse('metrics'), HTTP_AUTHORIZATION='Bearer secret')
+            self.assertEqual(response.status_code, 200)
+            self.assertIn(b'sacco_request_duration_seconds', response.content)
+
+        self.client.login(username="perfadmin", password="perfadmin123")
+        response = self.client.get(reverse('metrics'))
+        self.assertEqual(response.status_code, 200)
+
+
+class NPlusOneDetectionTest(TestCase):
+    def setUp(self):
+        for index in range(3):
+            Region.objects.create(name=f"Region {index}")
+
+    def test_repeated_query_shape_is_reported_with_call_site(self):
+        from .nplusone import NPlusOneError, detect_nplusone
+        with self.assertRaises(NPlusOneError) as raised:
+            with detect_nplusone(threshold=3):
+                for region in Region.objects.all():
+                    Region.objects.filter(pk=region.pk).exists()
+        self.assertIn('x3', str(raised.exception))
+        self.assertIn('accounts/tests.py', str(raised.exception))
+
+    def test_single_query_passes(self):
+        from .nplusone import detect_nplusone
+        with detect_nplusone(threshold=3) as tracker:
+            list(Region.objects.all())
+        self.assertEqual(tracker.violations(), [])
+
+
+class ScaleDatasetTest(TestCase):
+    def test_generate_and_purge_dataset(self):
+        from io import StringIO
+        from loans.models import Loan
+        from savings.models import SavingsTransaction
+        call_command(
+            'generate_scale_dataset', regions=2, saccos=3, members=20, loans=30, transactions=60,
+            batch_size=7, prefix='T', stdout=StringIO()
+        )
+        self.assertEqual(Sacco.objects.filter(registration_number__startswith='T-').count(), 3)
+        self.assertEqual(Member.objects.filter(member_number__startswith='T-M').count(), 20)
+        self.assertEqual(Loan.objects.filter(loan_number__startswith='T-LN').count(), 30)
+        self.assertEqual(SavingsTransaction.objects.filter(reference__startswith='T-T').count(), 60)
+
+        call_command('generate_scale_dataset', prefix='T', purge=True, stdout=StringIO())
+        self.assertFalse(Sacco.objects.filter(registration_number__startswith='T-').exists())
+        self.assertFalse(Member.objects.filter(member_number__startswith='T-M').exists())
+
+
+class UserScopeTest(TestCase):
+    def setUp(self):
+        from . import reference_data
+        reference_data.clear()
+        self.region = Region.objects.create(name="Scope Region")
+        self.other_region = Region.objects.create(name="Other Region")
+        self.sacco = Sacco.objects.create(
+            name="Scope Sacco", registration_number="SCOPE001", address="Address",
+            phone="1234567890", email="scope@sacco.com", region=self.region
+        )
+        self.other_sacco = Sacco.objects.create(
+            name="Other Sacco", registration_number="SCOPE002", address="Address",
+            phone="1234567890", email="other@sacco.com", region=self.other_region
+        )
+        self.regional_admin = User.objects.create_user(
+            username="scoperegional", password="pass12345", is_regional_admin=True, region=self.region
+        )
+
+    def test_regional_scope_resolves_sacco_ids(self):
+        from .permissions import get_accessible_saccos
+        self.assertEqual(list(get_accessible_saccos(self.regional_admin)), [self.sacco])
+
+    def test_scope_is_memoized_and_cached(self):
+        from .scope import get_user_scope
+        get_user_scope(self.regional_admin)
+        with self.assertNumQueries(0):
+            get_user_scope(self.regional_admin)
+        # A fresh user object (next request) is served from the cache
+        user = User.objects.get(pk=self.regional_admin.pk)
+        with self.assertNumQueries(0):
+            self.assertEqual(get_user_scope(user).sacco_ids, {self.sacco.pk})
+
+    def test_sacco_change_invalidates_scope(self):
+        from .scope import get_user_scope
+        get_user_scope(self.regional_admin)
+        self.other_sacco.region = self.region
+        self.other_sacco.save()
+        user = User.objects.get(pk=self.regional_admin.pk)
+        self.assertEqual(get_user_scope(user).sacco_ids, {self.sacco.pk, self.other_sacco.pk})
+
+    def test_scoped_queryset_filters_by_sacco_id(self):
+        from .permissions import filter_queryset_by_user_scope
+        from loans.models import Loan
+        sql = str(filter_queryset_by_user_scope(Loan.objects.all(), self.regional_admin, 'loan').query)
+        self.assertNotIn('accounts_region', sql)
+        self.assertNotIn('accounts_sacco', sql)
+        # Loans carry their own Sacco id, so no join through members either
+        self.assertNotIn('members_member', sql)
+
+
+class TenancyTest(TestCase):
+    def setUp(self):
+        from decimal import Decimal
+        from loans.models import LoanProduct
+        from savings.models import SavingProduct
+        region = Region.objects.create(name="Tenancy Region")
+        self.sacco = Sacco.objects.create(
+            name="Tenancy Sacco", registration_number="TEN001", address="Address",
+            phone="1234567890", email="tenancy@sacco.com", region=region
+        )
+        self.other_sacco = Sacco.objects.create(
+            name="Other Tenancy Sacco", registration_number="TEN002", address="Address",
+            phone="1234567890", email="tenancy2@sacco.com", region=region
+        )
+        self.member = Member.objects.create(
+            sacco=self.sacco, member_number="TEN-M1", first_name="Test", last_name="Tenant",
+            phone="1234567890", gender="Female", date_of_birth="1990-01-01", home_address="Address",
+            village_town="Town", district="District", date_joined="2024-01-01"
+        )
+        self.loan_product = LoanProduct.objects.create(
+            sacco=self.sacco, name="Business", product_code="TEN-BIZ", description="Business loans",
+            interest_rate=Decimal('12'), max_amount=Decimal('100000'), min_amount=Decimal('100'),
+            max_duration_months=24, min_duration_months=1
+        )
+        self.saving_product = SavingProduct.objects.create(sacco=self.sacco, name="Ordinary", product_code="TEN-ORD")
+
+    def create_rows(self):
+        from decimal import Decimal
+        from loans.models import Loan, LoanRepayment
+        from savings.models import SavingsAccount, SavingsTransaction
+        loan = Loan.objects.create(
+            member=self.member, product=self.loan_product, loan_ref="TEN-1", amount_requested=Decimal('500'),
+            interest_rate=Decimal('12'), duration_months=6, purpose="Stock", status='active',
+        )
+        repayment = LoanRepayment.objects.create(loan=loan, amount=Decimal('100'), reference_number="TEN-R1")
+        account = SavingsAccount.objects.create(member=self.member, product=self.saving_product, account_number="SA-TEN-1")
+        txn = SavingsTransaction.objects.create(
+            account=account, txn_type='Deposit', amount=Decimal('50'), running_balance=Decimal('50')
+        )
+        return loan, repayment, account, txn
+
+    def test_sacco_copied_on_save(self):
+        for row in self.create_rows():
+            self.assertEqual(row.sacco_id, self.sacco.pk)
+
+    def test_for_saccos(self):
+        from loans.models import Loan
+        loan = self.create_rows()[0]
+        self.assertEqual(list(Loan.objects.for_sacco(self.sacco)), [loan])
+        self.assertEqual(list(Loan.objects.for_saccos([self.sacco.pk, self.other_sacco.pk])), [loan])
+        self.assertFalse(Loan.objects.for_saccos([self.other_sacco.pk]).exists())
+        self.assertFalse(Loan.objects.for_saccos(()).exists())
+        self.assertEqual(Loan.objects.for_saccos(None).count(), 1)
+
+    def test_member_moving_sacco_takes_rows_along(self):
+        from decimal import Decimal
+        from loans.models import Loan
+        from savings.models import SavingsAccount
+        loan = Loan.objects.create(
+            member=self.member, product=self.loan_product, loan_ref="TEN-1", amount_requested=Decimal('500'),
+            interest_rate=Decimal('12'), duration_months=6, purpose="Stock",
+        )
+        account = SavingsAccount.objects.create(member=self.member, product=self.saving_product, account_number="SA-TEN-1")
+        self.member.sacco = self.other_sacco
+        self.member.save()
+        for row in (loan, account):
+            row.refresh_from_db()
+            self.assertEqual(row.sacco_id, self.other_sacco.pk)
+
+    def test_member_with_financial_history_cannot_move(self):
+        from django.core.exceptions import ValidationError
+        rows = self.create_rows()
+        self.member.sacco = self.other_sacco
+        with self.assertRaises(ValidationError):
+            self.member.full_clean()
+        with self.assertRaises(ValidationError):
+            self.member.save()
+        self.assertEqual(Member.objects.get(pk=self.member.pk).sacco_id, self.sacco.pk)
+        for row in rows:
+            row.refresh_from_db()
+            self.assertEqual(row.sacco_id, self.sacco.pk)
+
+    def test_backfill_migration(self):
+        from importlib import import_module
+        from django.apps import apps
+        from loans.models import Loan, LoanRepayment
+        from savings.models import SavingsAccount, SavingsTransaction
+        rows = self.create_rows()
+        for model in (Loan, LoanRepayment, SavingsAccount, SavingsTransaction):
+            model.objects.update(sacco=None)
+        import_module('loans.migrations.0007_backfill_sacco').backfill_sacco(apps, None)
+        import_module('savings.migrations.0004_backfill_sacco').backfill_sacco(apps, None)
+        for row in rows:
+            row.refresh_from_db()
+            self.assertEqual(row.sacco_id, self.sacco.pk)
+
+
+class ReadReplicaRoutingTest(TestCase):
+    def setUp(self):
+        from django.core.cache import cache
+        cache.clear()
+        self.user = User.objects.create_user(username="replicauser", password="pass12345", is_system_admin=True)
+
+    def replica_settings(self):
+        # A second SQLite database standing in for the replica
+        import warnings
+        from django.conf import settings
+        warnings.filterwarnings('ignore', 'Overriding setting DATABASES', UserWarning)
+        return self.settings(DATABASES={
+            **settings.DATABASES, 'replica': {'ENGINE': 'django.db.backends.sqlite3', 'NAME': ':memory:'},
+        })
+
+    def read_alias(self, method='get'):
+        from django.db import router
+        from django.test import RequestFactory
+        from loans.models import Loan
+        from .decorators import use_read_replica
+
+        @use_read_replica
+        def view(request):
+            return (router.db_for_read(Loan), router.db_for_write(Loan))
+
+        request = getattr(RequestFactory(), method)('/')
+        request.user = self.user
+        return view(request)
+
+    def test_decorated_views_read_from_replica(self):
+        from django.db import router
+        from loans.models import Loan
+        with self.replica_settings():
+            self.assertEqual(self.read_alias(), ('replica', 'default'))
+            self.assertEqual(self.read_alias('post'), ('default', 'default'))
+            self.assertEqual(router.db_for_read(Loan), 'default')
+        # Without a replica everything stays on the primary
+        self.assertEqual(self.read_alias(), ('default', 'default'))
+
+    def test_writes_pin_user_to_primary(self):
+        from django.core.cache import cache
+        from django.http import HttpResponse
+        from django.test import RequestFactory
+        from .db_routing import _pin_key
+        from .middleware import ReadReplicaStickinessMiddleware
+        with self.replica_settings():
+            middleware = ReadReplicaStickinessMiddleware(lambda request: HttpResponse())
+            request = RequestFactory().post('/')
+            request.user = self.user
+            middleware(request)
+            self.assertEqual(self.read_alias(), ('default', 'default'))
+            cache.delete(_pin_key(self.user.pk))
+            self.assertEqual(self.read_alias(), ('replica', 'default'))
+
+    def replica_snapshot(self):
+        """A replica holding a copy of the primary as it is now, so later writes leave it behind"""
+        from contextlib import contextmanager
+        from django.db import connections
+
+        @contextmanager
+        def snapshot():
+            from django.conf import settings
+            with self.replica_settings():
+                connections.settings['replica'] = connections.configure_settings(settings.DATABASES)['replica']
+                try:
+                    connections['default'].ensure_connection()
+                    connections['replica'].ensure_connection()
+                    # iterdump() sees the test's uncommitted rows, which a backup would wait on
+                    dump = '\n'.join(connections['default'].connection.iterdump())
+                    # Tables come out in name order, before the tables they reference
+                    connections['replica'].connection.executescript(f'PRAGMA foreign_keys = OFF; {dump}')
+                    yield
+                finally:
+                    connections['replica'].close()
+                    del connections['replica']
+                    del connections.settings['replica']
+        return snapshot()
+
+    def test_cached_reads_come_from_primary(self):
+        from decimal import Decimal
+        from ledger import chart
+        from ledger.balances import trial_balance
+        from savings.models import SavingProduct, SavingsAccount, SavingsTransaction
+        from .db_routing import replica_reads
+        from .reference_data import get_saccos
+
+        region = Region.objects.create(name="Replica Region")
+        sacco = Sacco.objects.create(
+            name="Replica Sacco", registration_number="REPL001", address="Address",
+            phone="1234567890", email="replica@sacco.com", region=region
+        )
+        member = Member.objects.create(
+            sacco=sacco, member_number="REPL-M1", first_name="Test", last_name="Saver",
+            phone="1234567890", gender="Female", date_of_birth="1990-01-01", home_address="Address",
+            village_town="Town", district="District", date_joined="2024-01-01"
+        )
+        product = SavingProduct.objects.create(sacco=sacco, name="Ordinary", product_code="REPL-ORD")
+        account = SavingsAccount.objects.create(member=member, product=product, account_number="SA-REPL-1")
+        SavingsTransaction.objects.create(
+            account=account, txn_type='Deposit', amount=Decimal('200'), running_balance=Decimal('200')
+        )
+        admin = User.objects.create_user(username="replicaadmin", password="pass12345", is_sacco_admin=True, sacco=sacco)
+        self.client.force_login(admin)
+
+        with self.replica_snapshot():
+            # Written to the primary only: the replica lags behind
+            SavingsTransaction.objects.create(
+                account=account, txn_type='Deposit', amount=Decimal('50'), running_balance=Decimal('250')
+            )
+            Sacco.objects.create(
+                name="Newer Sacco", registration_number="REPL002", address="Address",
+                phone="1234567890", email="newer@sacco.com", region=region
+            )
+            self.assertEqual(SavingsTransaction.objects.using('replica').count(), 1)
+
+            response = self.client.get(reverse('ledger_trial_balance'))
+            balances = {row['code']: row['balance'] for row in response.context['report']['rows']}
+            self.assertEqual(balances[chart.MEMBER_SAVINGS], 250)
+            # What the view cached is the primary's, for every later reader too
+            with self.assertNumQueries(0):
+                cached = trial_balance(sacco.pk)
+            self.assertEqual(cached['total_credit'], 250)
+
+            with replica_reads():
+                self.assertIn("Newer Sacco", [sacco.name for sacco in get_saccos()])
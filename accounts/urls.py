@@ -17,6 +17,7 @@ urlpatterns = [
     path('region-detail/<int:region_id>/', views.region_detail, name='region_detail'),
     path('documents-update/', views.documents_update, name='documents_update'),
     path('activity-logs/', views.activity_logs, name='activity_logs'),
+    path('performance/', views.performance_dashboard, name='performance_dashboard'),
     
     # Regional Admin Management URLs
     path('regional-manage-saccos/', views.regional_manage_saccos, name='regional_manage_saccos'),
@@ -17,6 +17,7 @@ from datetime import timedelta
 from .models import Sacco, User, Region, ActivityLog
 from members.models import Member
 from .utils import log_activity, get_client_ip, get_user_agent
+from .decorators import use_read_replica
 import json
 
 
@@ -115,6 +116,7 @@ def dashboard(request):
 
 
 @login_required
+@use_read_replica
 def admin_dashboard(request):
     if not request.user.is_system_admin:
         return redirect('dashboard')
@@ -139,29 +141,24 @@ def admin_dashboard(request):
     inactive_saccos = Sacco.objects.filter(is_active=False).count()
     
     # Monthly growth trends
-    current_month = timezone.now().month
-    current_year = timezone.now().year
-    
-    # Member growth by month (last 6 months)
+    # Member growth by month (last 6 months), one grouped query
+    from reports.rollups import add_months
+    first_month = add_months(timezone.localdate().replace(day=1), -5)
+    joined = {
+        (row['date_joined__year'], row['date_joined__month']): row['total']
+        for row in Member.objects.filter(date_joined__gte=first_month)
+        .values('date_joined__year', 'date_joined__month')
+        .annotate(total=Count('id'))
+        .order_by()
+    }
     member_growth = []
     for i in range(6):
-        month = current_month - i
-        year = current_year
-        if month <= 0:
-            month += 12
-            year -= 1
-        
-        count = Member.objects.filter(
-            date_joined__year=year,
-            date_joined__month=month
-        ).count()
+        month = add_months(first_month, i)
         member_growth.append({
-            'month': f"{year}-{month:02d}",
-            'count': count
+            'month': f"{month.year}-{month.month:02d}",
+            'count': joined.get((month.year, month.month), 0)
         })
     
-    member_growth.reverse()
-    
     # Loan status distribution
     loan_status_distribution = {
         'pending': loan_stats['pending_loans'],
@@ -170,10 +167,9 @@ def admin_dashboard(request):
         'active': loan_stats['active_loans'],
     }
     
-    # Financial health metrics
-    total_assets = financial_metrics['total_savings_balance'] + financial_metrics['total_funding_amount']
-    total_liabilities = financial_metrics['total_loan_amount']
-    net_worth = total_assets - total_liabilities
+    # Financial health metrics, from the general ledger
+    from ledger.balances import current_net_assets
+    net_worth = current_net_assets()
     
     # Get system alerts
     system_alerts = DashboardStatsService.get_system_alerts()
@@ -328,6 +324,7 @@ def admin_dashboard(request):
 
 
 @login_required
+@use_read_replica
 def regional_admin_dashboard(request):
     if not request.user.is_regional_admin:
         messages.error(request, 'Access denied. Only regional administrators can access this page.')
@@ -380,8 +377,8 @@ def regional_admin_dashboard(request):
             if selected_sacco in accessible_saccos:
                 # Filter all queries by selected sacco
                 members_filter = Member.objects.filter(sacco=selected_sacco)
-                loans_filter = Loan.objects.filter(member__sacco=selected_sacco)
-                savings_filter = SavingsAccount.objects.filter(member__sacco=selected_sacco)
+                loans_filter = Loan.objects.filter(sacco=selected_sacco)
+                savings_filter = SavingsAccount.objects.filter(sacco=selected_sacco)
                 funding_filter = Funding.objects.filter(sacco=selected_sacco)
                 expenses_filter = Expense.objects.filter(sacco=selected_sacco)
                 projects_filter = Project.objects.filter(sacco=selected_sacco)
@@ -400,8 +397,8 @@ def regional_admin_dashboard(request):
         projects_query = projects_filter
     else:
         members_query = Member.objects.filter(sacco__region=region)
-        loans_query = Loan.objects.filter(member__sacco__region=region)
-        savings_query = SavingsAccount.objects.filter(member__sacco__region=region)
+        loans_query = Loan.objects.filter(sacco__region=region)
+        savings_query = SavingsAccount.objects.filter(sacco__region=region)
         funding_query = Funding.objects.filter(sacco__region=region)
         expenses_query = Expense.objects.filter(sacco__region=region)
         projects_query = Project.objects.filter(sacco__region=region)
@@ -445,12 +442,12 @@ def regional_admin_dashboard(request):
     saccos_to_display = [selected_sacco] if selected_sacco else regional_saccos
     for sacco in saccos_to_display:
         sacco_members = Member.objects.filter(sacco=sacco).count()
-        sacco_loans = Loan.objects.filter(member__sacco=sacco).count()
-        sacco_savings = SavingsAccount.objects.filter(member__sacco=sacco).count()
+        sacco_loans = Loan.objects.filter(sacco=sacco).count()
+        sacco_savings = SavingsAccount.objects.filter(sacco=sacco).count()
         sacco_funding = Funding.objects.filter(sacco=sacco).count()
-        sacco_loan_amount = Loan.objects.filter(member__sacco=sacco).aggregate(
+        sacco_loan_amount = Loan.objects.filter(sacco=sacco).aggregate(
             total=Sum('amount_requested'))['total'] or 0
-        sacco_savings_balance = SavingsAccount.objects.filter(member__sacco=sacco).aggregate(
+        sacco_savings_balance = SavingsAccount.objects.filter(sacco=sacco).aggregate(
             total=Sum('balance'))['total'] or 0
         
         saccos_with_stats.append({
@@ -553,6 +550,7 @@ def regional_admin_dashboard(request):
 
 
 @login_required
+@use_read_replica
 def sacco_admin_dashboard(request):
     if not request.user.is_sacco_admin:
         return redirect('dashboard')
@@ -583,13 +581,13 @@ def sacco_admin_dashboard(request):
     
     # Core counts
     total_members = Member.objects.filter(sacco=sacco).count()
-    total_loans = Loan.objects.filter(member__sacco=sacco).count()
-    total_savings_accounts = SavingsAccount.objects.filter(member__sacco=sacco).count()
+    total_loans = Loan.objects.filter(sacco=sacco).count()
+    total_savings_accounts = SavingsAccount.objects.filter(sacco=sacco).count()
     total_funding_sources = Funding.objects.filter(sacco=sacco).count()
     
     # Aggregated amounts
-    total_savings_balance = SavingsAccount.objects.filter(member__sacco=sacco).aggregate(total=Sum('balance'))['total'] or 0
-    loans_disbursed_amount = Loan.objects.filter(member__sacco=sacco, amount_disbursed__isnull=False).aggregate(total=Sum('amount_disbursed'))['total'] or 0
+    total_savings_balance = SavingsAccount.objects.filter(sacco=sacco).aggregate(total=Sum('balance'))['total'] or 0
+    loans_disbursed_amount = Loan.objects.filter(sacco=sacco, amount_disbursed__isnull=False).aggregate(total=Sum('amount_disbursed'))['total'] or 0
     funds_received_amount = Funding.objects.filter(sacco=sacco, status__in=['received', 'allocated', 'spent']).aggregate(total=Sum('amount'))['total'] or 0
     
     # Expenses over time (last 6 months)
@@ -604,6 +602,10 @@ def sacco_admin_dashboard(request):
         .order_by('expense_date__year', 'expense_date__month')
     )
     
+    # Savings inflows, outflows and balance (last 6 months) from the monthly rollups
+    from reports.rollups import add_months, sacco_series
+    savings_over_time = sacco_series('savings', [sacco.id], add_months(first_of_this_month, -5), first_of_this_month)
+    
     # Gender distribution
     gender_counts_qs = Member.objects.filter(sacco=sacco).values('gender').annotate(total=Count('id'))
     gender_counts = {item['gender'] or 'Other': item['total'] for item in gender_counts_qs}
@@ -611,21 +613,21 @@ def sacco_admin_dashboard(request):
     # Recent savings deposits (last 10) - case-insensitive; fallback to any recent transactions if none
     recent_savings_deposits = (
         SavingsTransaction.objects
-        .filter(account__member__sacco=sacco, txn_type__iexact='Deposit')
+        .filter(sacco=sacco, txn_type__iexact='Deposit')
         .select_related('account__member')
         .order_by('-performed_at')[:10]
     )
     if not recent_savings_deposits:
         recent_savings_deposits = (
             SavingsTransaction.objects
-            .filter(account__member__sacco=sacco)
+            .filter(sacco=sacco)
             .select_related('account__member')
             .order_by('-performed_at')[:10]
         )
     
     # Existing recent lists
     recent_members = Member.objects.filter(sacco=sacco).order_by('-date_joined')[:5]
-    recent_loans = Loan.objects.filter(member__sacco=sacco).order_by('-application_date')[:5]
+    recent_loans = Loan.objects.filter(sacco=sacco).order_by('-application_date')[:5]
     
     context = {
         'sacco': sacco,
@@ -640,6 +642,7 @@ def sacco_admin_dashboard(request):
         'funds_received_amount': funds_received_amount,
         # charts data
         'expenses_over_time': list(expenses_over_time),
+        'savings_over_time': savings_over_time,
         'gender_counts': gender_counts,
         # tables
         'recent_savings_deposits': recent_savings_deposits,
@@ -1138,6 +1141,7 @@ def regional_manage_saccos(request):
 
 
 @login_required
+@use_read_replica
 def regional_overview(request):
     """System admin view to see all regions and their Saccos"""
     if not request.user.is_system_admin:
@@ -1183,13 +1187,13 @@ def regional_overview(request):
         
         # Get regional statistics
         total_members = Member.objects.filter(sacco__region=region).count()
-        total_loans = Loan.objects.filter(member__sacco__region=region).count()
-        total_savings = SavingsAccount.objects.filter(member__sacco__region=region).count()
+        total_loans = Loan.objects.filter(sacco__region=region).count()
+        total_savings = SavingsAccount.objects.filter(sacco__region=region).count()
         total_funding = Funding.objects.filter(sacco__region=region).count()
         
         # Financial metrics
-        total_loan_amount = Loan.objects.filter(member__sacco__region=region).aggregate(total=Sum('amount_requested'))['total'] or 0
-        total_savings_balance = SavingsAccount.objects.filter(member__sacco__region=region).aggregate(total=Sum('balance'))['total'] or 0
+        total_loan_amount = Loan.objects.filter(sacco__region=region).aggregate(total=Sum('amount_requested'))['total'] or 0
+        total_savings_balance = SavingsAccount.objects.filter(sacco__region=region).aggregate(total=Sum('balance'))['total'] or 0
         total_funding_amount = Funding.objects.filter(sacco__region=region).aggregate(total=Sum('amount'))['total'] or 0
         
         # Regional admin info
@@ -1281,10 +1285,10 @@ def region_detail(request, region_id):
         
         for sacco in district_saccos:
             sacco_members = Member.objects.filter(sacco=sacco).count()
-            sacco_loans = Loan.objects.filter(member__sacco=sacco).count()
-            sacco_savings = SavingsAccount.objects.filter(member__sacco=sacco).count()
-            sacco_loan_amount = Loan.objects.filter(member__sacco=sacco).aggregate(total=Sum('amount_requested'))['total'] or 0
-            sacco_savings_balance = SavingsAccount.objects.filter(member__sacco=sacco).aggregate(total=Sum('balance'))['total'] or 0
+            sacco_loans = Loan.objects.filter(sacco=sacco).count()
+            sacco_savings = SavingsAccount.objects.filter(sacco=sacco).count()
+            sacco_loan_amount = Loan.objects.filter(sacco=sacco).aggregate(total=Sum('amount_requested'))['total'] or 0
+            sacco_savings_balance = SavingsAccount.objects.filter(sacco=sacco).aggregate(total=Sum('balance'))['total'] or 0
             
             district_saccos_with_stats.append({
                 'sacco': sacco,
@@ -1297,10 +1301,10 @@ def region_detail(request, region_id):
         
         # District statistics
         district_members = Member.objects.filter(sacco__district=district).count()
-        district_loans = Loan.objects.filter(member__sacco__district=district).count()
-        district_savings = SavingsAccount.objects.filter(member__sacco__district=district).count()
-        district_loan_amount = Loan.objects.filter(member__sacco__district=district).aggregate(total=Sum('amount_requested'))['total'] or 0
-        district_savings_balance = SavingsAccount.objects.filter(member__sacco__district=district).aggregate(total=Sum('balance'))['total'] or 0
+        district_loans = Loan.objects.filter(sacco__district=district).count()
+        district_savings = SavingsAccount.objects.filter(sacco__district=district).count()
+        district_loan_amount = Loan.objects.filter(sacco__district=district).aggregate(total=Sum('amount_requested'))['total'] or 0
+        district_savings_balance = SavingsAccount.objects.filter(sacco__district=district).aggregate(total=Sum('balance'))['total'] or 0
         
         districts_with_saccos.append({
             'district': district,
@@ -1318,10 +1322,10 @@ def region_detail(request, region_id):
     saccos_without_district_stats = []
     for sacco in saccos_without_district:
         sacco_members = Member.objects.filter(sacco=sacco).count()
-        sacco_loans = Loan.objects.filter(member__sacco=sacco).count()
-        sacco_savings = SavingsAccount.objects.filter(member__sacco=sacco).count()
-        sacco_loan_amount = Loan.objects.filter(member__sacco=sacco).aggregate(total=Sum('amount_requested'))['total'] or 0
-        sacco_savings_balance = SavingsAccount.objects.filter(member__sacco=sacco).aggregate(total=Sum('balance'))['total'] or 0
+        sacco_loans = Loan.objects.filter(sacco=sacco).count()
+        sacco_savings = SavingsAccount.objects.filter(sacco=sacco).count()
+        sacco_loan_amount = Loan.objects.filter(sacco=sacco).aggregate(total=Sum('amount_requested'))['total'] or 0
+        sacco_savings_balance = SavingsAccount.objects.filter(sacco=sacco).aggregate(total=Sum('balance'))['total'] or 0
         
         saccos_without_district_stats.append({
             'sacco': sacco,
@@ -1338,24 +1342,24 @@ def region_detail(request, region_id):
     inactive_saccos = saccos.filter(is_active=False).count()
     
     total_members = Member.objects.filter(sacco__region=region).count()
-    total_loans = Loan.objects.filter(member__sacco__region=region).count()
-    total_savings = SavingsAccount.objects.filter(member__sacco__region=region).count()
+    total_loans = Loan.objects.filter(sacco__region=region).count()
+    total_savings = SavingsAccount.objects.filter(sacco__region=region).count()
     total_funding = Funding.objects.filter(sacco__region=region).count()
     
     # Financial metrics
-    total_loan_amount = Loan.objects.filter(member__sacco__region=region).aggregate(total=Sum('amount_requested'))['total'] or 0
-    total_savings_balance = SavingsAccount.objects.filter(member__sacco__region=region).aggregate(total=Sum('balance'))['total'] or 0
+    total_loan_amount = Loan.objects.filter(sacco__region=region).aggregate(total=Sum('amount_requested'))['total'] or 0
+    total_savings_balance = SavingsAccount.objects.filter(sacco__region=region).aggregate(total=Sum('balance'))['total'] or 0
     total_funding_amount = Funding.objects.filter(sacco__region=region).aggregate(total=Sum('amount'))['total'] or 0
     
     # Loan statistics
-    pending_loans = Loan.objects.filter(member__sacco__region=region, status='pending').count()
-    approved_loans = Loan.objects.filter(member__sacco__region=region, status='approved').count()
-    active_loans = Loan.objects.filter(member__sacco__region=region, status='active').count()
+    pending_loans = Loan.objects.filter(sacco__region=region, status='pending').count()
+    approved_loans = Loan.objects.filter(sacco__region=region, status='approved').count()
+    active_loans = Loan.objects.filter(sacco__region=region, status='active').count()
     
     # Recent activity
     thirty_days_ago = timezone.now() - timedelta(days=30)
     recent_members = Member.objects.filter(sacco__region=region).select_related('sacco').order_by('-date_joined')[:10]
-    recent_loans = Loan.objects.filter(member__sacco__region=region).select_related('member__sacco').order_by('-application_date')[:10]
+    recent_loans = Loan.objects.filter(sacco__region=region).select_related('member__sacco').order_by('-application_date')[:10]
     
     # Regional admin
     regional_admin = User.objects.filter(region=region, is_regional_admin=True, is_active=True).first()
@@ -1364,10 +1368,10 @@ def region_detail(request, region_id):
     saccos_with_stats = []
     for sacco in saccos:
         sacco_members = Member.objects.filter(sacco=sacco).count()
-        sacco_loans = Loan.objects.filter(member__sacco=sacco).count()
-        sacco_savings = SavingsAccount.objects.filter(member__sacco=sacco).count()
-        sacco_loan_amount = Loan.objects.filter(member__sacco=sacco).aggregate(total=Sum('amount_requested'))['total'] or 0
-        sacco_savings_balance = SavingsAccount.objects.filter(member__sacco=sacco).aggregate(total=Sum('balance'))['total'] or 0
+        sacco_loans = Loan.objects.filter(sacco=sacco).count()
+        sacco_savings = SavingsAccount.objects.filter(sacco=sacco).count()
+        sacco_loan_amount = Loan.objects.filter(sacco=sacco).aggregate(total=Sum('amount_requested'))['total'] or 0
+        sacco_savings_balance = SavingsAccount.objects.filter(sacco=sacco).aggregate(total=Sum('balance'))['total'] or 0
         
         saccos_with_stats.append({
             'sacco': sacco,
@@ -1429,8 +1433,8 @@ def user_profile(request):
         from savings.models import SavingsAccount
         stats = {
             'total_members': Member.objects.filter(sacco=user.sacco).count(),
-            'total_loans': Loan.objects.filter(member__sacco=user.sacco).count(),
-            'total_savings': SavingsAccount.objects.filter(member__sacco=user.sacco).count(),
+            'total_loans': Loan.objects.filter(sacco=user.sacco).count(),
+            'total_savings': SavingsAccount.objects.filter(sacco=user.sacco).count(),
         }
     elif user.is_regional_admin and user.region:
         from members.models import Member
@@ -1438,7 +1442,7 @@ def user_profile(request):
         stats = {
             'total_saccos': Sacco.objects.filter(region=user.region).count(),
             'total_members': Member.objects.filter(sacco__region=user.region).count(),
-            'total_loans': Loan.objects.filter(member__sacco__region=user.region).count(),
+            'total_loans': Loan.objects.filter(sacco__region=user.region).count(),
         }
     elif user.is_system_admin:
         stats = {
@@ -1597,6 +1601,59 @@ def activity_logs(request):
     })
 
 
+
+@login_required
+def performance_dashboard(request):
+    """System admin view of per-view request timings collected by PerformanceMonitoringMiddleware"""
+    if not request.user.is_system_admin:
+        messages.error(request, 'Access denied. Only system administrators can view performance metrics.')
+        return redirect('dashboard')
+    
+    from .instrumentation import get_view_stats, retention_windows, window_seconds
+    
+    try:
+        hours = int(request.GET.get('hours', 24))
+    except (TypeError, ValueError):
+        hours = 24
+    windows = max(1, min(retention_windows(), hours * 3600 // window_seconds()))
+    
+    view_stats = get_view_stats(windows)
+    sort = request.GET.get('sort', 'total')
+    sort_keys = {
+        'total': 'wall_sum',
+        'avg': 'avg_ms',
+        'queries': 'avg_queries',
+        'db': 'avg_db_ms',
+        'count': 'count',
+    }
+    view_stats.sort(key=lambda row: row[sort_keys.get(sort, 'wall_sum')], reverse=True)
+    
+    return render(request, 'admin/performance_dashboard.html', {
+        'view_stats': view_stats,
+        'hours': hours,
+        'sort': sort,
+        'total_requests': sum(row['count'] for row in view_stats),
+        'slow_request_ms': getattr(settings, 'PERFORMANCE_SLOW_REQUEST_MS', 1000),
+    })
+
+
+def metrics(request):
+    """Prometheus scrape endpoint; requires the METRICS_TOKEN bearer token or a system admin session"""
+    from django.http import HttpResponse, HttpResponseForbidden
+    from django.utils.crypto import constant_time_compare
+    from .instrumentation import get_view_stats, render_prometheus
+    
+    token = getattr(settings, 'METRICS_TOKEN', '')
+    auth_header = request.headers.get('Authorization', '')
+    token_ok = bool(token) and constant_time_compare(auth_header, f'Bearer {token}')
+    if not token_ok and not (request.user.is_authenticated and request.user.is_system_admin):
+        return HttpResponseForbidden('Forbidden')
+    
+    return HttpResponse(
+        render_prometheus(get_view_stats()),
+        content_type='text/plain; version=0.0.4; charset=utf-8'
+    )
+
 def forgot_password(request):
     """Handle forgot password requests"""
     if request.method == 'POST':
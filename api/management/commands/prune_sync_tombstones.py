@@ -0,0 +1,30 @@
+"""
+Management command to delete delta sync tombstones past the retention window
+
+Clients that last synced before SYNC_TOMBSTONE_RETENTION_DAYS are told to
+download everything again (see api/sync.py), so older tombstones are never
+read. Deleted in chunks so the table is never locked for long:
+
+    python manage.py prune_sync_tombstones
+"""
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from api.models import SyncTombstone
+from api.sync import retention
+
+CHUNK_SIZE = 5000
+
+
+class Command(BaseCommand):
+    help = 'Delete delta sync tombstones older than SYNC_TOMBSTONE_RETENTION_DAYS'
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - retention()
+        pruned = 0
+        while True:
+            ids = list(SyncTombstone.objects.filter(deleted_at__lt=cutoff).values_list('pk', flat=True)[:CHUNK_SIZE])
+            if not ids:
+                break
+            pruned += SyncTombstone.objects.filter(pk__in=ids).delete()[0]
+        self.stdout.write(self.style.SUCCESS(f'Pruned {pruned} tombstone(s) deleted before {cutoff:%Y-%m-%d %H:%M}'))
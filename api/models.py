@@ -0,0 +1,42 @@
+from django.db import models
+
+from accounts.models import Sacco
+
+
+class SyncTombstone(models.Model):
+    """
+    A deleted member, savings account or loan repayment, kept so delta sync
+    clients (api/sync.py) learn to drop it. Loans and savings transactions
+    are only deleted with their member or account, and clients drop them
+    together with it. A member moved to another Sacco leaves one for
+    themselves and each of their accounts and loans in the old Sacco
+    (members/signals.py).
+    """
+    resource = models.CharField(max_length=30)
+    record_id = models.BigIntegerField()
+    sacco = models.ForeignKey(Sacco, on_delete=models.CASCADE, null=True, related_name='+')
+    deleted_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['sacco', 'deleted_at', 'id'], name='api_tomb_sacco_deleted_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.resource} {self.record_id} deleted {self.deleted_at:%Y-%m-%d %H:%M}"
+
+
+class UploadedTransaction(models.Model):
+    """
+    An offline savings transaction received from a field client, by the
+    client's own reference, so uploading it again does not post it twice
+    """
+    client_ref = models.CharField(max_length=64, unique=True)
+    transaction = models.ForeignKey('savings.SavingsTransaction', on_delete=models.SET_NULL, null=True, related_name='+')
+    uploaded_by = models.ForeignKey('accounts.User', on_delete=models.SET_NULL, null=True, related_name='+')
+    # When the field officer collected it, as reported by the client
+    collected_at = models.DateTimeField(null=True, blank=True)
+    received_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return self.client_ref
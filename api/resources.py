@@ -0,0 +1,129 @@
+"""
+Resources served by the versioned JSON API
+
+Each Resource names its model, the user scope model type used to restrict
+it (accounts/scope.py), the fields clients may ask for (API name to ORM
+path, read with values() so no model instances are built), the fields sent
+when none are asked for, and the query parameters it can be filtered by.
+"""
+from loans.models import Loan, LoanRepayment
+from members.models import Member
+from savings.models import SavingsAccount, SavingsTransaction
+
+
+class Resource:
+    def __init__(self, name, model, model_type, fields, default_fields, filters):
+        self.name = name
+        self.model = model
+        self.model_type = model_type
+        self.fields = fields
+        self.default_fields = default_fields
+        self.filters = filters
+
+
+MEMBERS = Resource(
+    'members', Member, 'member',
+    fields={
+        'id': 'id',
+        'sacco': 'sacco_id',
+        'member_number': 'member_number',
+        'first_name': 'first_name',
+        'last_name': 'last_name',
+        'other_names': 'other_names',
+        'phone': 'phone',
+        'email': 'email',
+        'gender': 'gender',
+        'district': 'district',
+        'status': 'status',
+        'group': 'group_id',
+        'date_joined': 'date_joined',
+        'shares_balance': 'shares_balance',
+        'savings_balance': 'savings_balance',
+        'updated_at': 'updated_at',
+    },
+    default_fields=('id', 'sacco', 'member_number', 'first_name', 'last_name', 'phone', 'status', 'updated_at'),
+    filters={'status': 'status', 'sacco': 'sacco_id', 'group': 'group_id'},
+)
+
+LOANS = Resource(
+    'loans', Loan, 'loan',
+    fields={
+        'id': 'id',
+        'sacco': 'sacco_id',
+        'member': 'member_id',
+        'product': 'product_id',
+        'loan_number': 'loan_number',
+        'loan_ref': 'loan_ref',
+        'amount_requested': 'amount_requested',
+        'amount_approved': 'amount_approved',
+        'amount_disbursed': 'amount_disbursed',
+        'interest_rate': 'interest_rate',
+        'duration_months': 'duration_months',
+        'outstanding_principal': 'outstanding_principal',
+        'outstanding_interest': 'outstanding_interest',
+        'status': 'status',
+        'application_date': 'application_date',
+        'disbursement_date': 'disbursement_date',
+        'maturity_date': 'maturity_date',
+        'updated_at': 'updated_at',
+    },
+    default_fields=(
+        'id', 'sacco', 'member', 'loan_number', 'amount_requested', 'outstanding_principal', 'status', 'updated_at',
+    ),
+    filters={'status': 'status', 'sacco': 'sacco_id', 'member': 'member_id', 'product': 'product_id'},
+)
+
+SAVINGS_ACCOUNTS = Resource(
+    'savings-accounts', SavingsAccount, 'savings',
+    fields={
+        'id': 'id',
+        'sacco': 'sacco_id',
+        'member': 'member_id',
+        'product': 'product_id',
+        'account_number': 'account_number',
+        'opened_date': 'opened_date',
+        'status': 'status',
+        'balance': 'balance',
+        'interest_accrued': 'interest_accrued',
+        'is_active': 'is_active',
+        'updated_at': 'updated_at',
+    },
+    default_fields=('id', 'sacco', 'member', 'account_number', 'status', 'balance', 'updated_at'),
+    filters={'status': 'status', 'sacco': 'sacco_id', 'member': 'member_id', 'product': 'product_id'},
+)
+
+TRANSACTIONS = Resource(
+    'transactions', SavingsTransaction, 'savings_transaction',
+    fields={
+        'id': 'id',
+        'sacco': 'sacco_id',
+        'account': 'account_id',
+        'txn_type': 'txn_type',
+        'amount': 'amount',
+        'running_balance': 'running_balance',
+        'reference': 'reference',
+        'narration': 'narration',
+        'performed_at': 'performed_at',
+        'updated_at': 'updated_at',
+    },
+    default_fields=('id', 'account', 'txn_type', 'amount', 'running_balance', 'performed_at', 'updated_at'),
+    filters={'sacco': 'sacco_id', 'account': 'account_id', 'txn_type': 'txn_type'},
+)
+
+REPAYMENTS = Resource(
+    'repayments', LoanRepayment, 'loan_repayment',
+    fields={
+        'id': 'id',
+        'sacco': 'sacco_id',
+        'loan': 'loan_id',
+        'amount': 'amount',
+        'applied_to_principal': 'applied_to_principal',
+        'applied_to_interest': 'applied_to_interest',
+        'payment_date': 'payment_date',
+        'payment_method': 'payment_method',
+        'reference_number': 'reference_number',
+        'updated_at': 'updated_at',
+    },
+    default_fields=('id', 'loan', 'amount', 'payment_date', 'payment_method', 'updated_at'),
+    filters={'sacco': 'sacco_id', 'loan': 'loan_id'},
+)
@@ -0,0 +1,27 @@
+"""
+Signal handlers for the api app: deletions leave tombstones for delta sync
+"""
+from django.db.models.signals import post_delete
+
+from accounts.models import Sacco
+from loans.models import LoanRepayment
+from members.models import Member
+from savings.models import SavingsAccount
+
+from .models import SyncTombstone
+
+
+def leave_tombstone(resource):
+    def handler(sender, instance, origin=None, **kwargs):
+        # A Sacco being deleted takes its clients' access with it
+        if isinstance(origin, Sacco) or getattr(origin, 'model', None) is Sacco:
+            return
+        SyncTombstone.objects.create(resource=resource, record_id=instance.pk, sacco_id=instance.sacco_id)
+    return handler
+
+
+# Not on loans or savings transactions, so their bulk deletes stay single
+# DELETE statements (see reports/signals.py)
+post_delete.connect(leave_tombstone('members'), sender=Member, weak=False, dispatch_uid='sync_delete_Member')
+post_delete.connect(leave_tombstone('savings-accounts'), sender=SavingsAccount, weak=False, dispatch_uid='sync_delete_SavingsAccount')
+post_delete.connect(leave_tombstone('repayments'), sender=LoanRepayment, weak=False, dispatch_uid='sync_delete_LoanRepayment')
@@ -0,0 +1,249 @@
+"""
+Delta sync for offline field clients
+
+Download: a client sends the watermark it got from its last completed sync
+(none the first time) and receives, in pages of at most PAGE_SIZE rows, the
+members, savings accounts, loans, savings transactions and loan repayments
+in its scope changed since then, plus the ids of members, accounts and
+repayments deleted since then, and of everything moved out of its scope with
+a member who changed Sacco (tombstones, api/models.py). Each resource is
+read in (updated_at, id) order from its sacco-first index and sent as one
+field list with rows as plain arrays. Every page but the last carries a
+`next` cursor; the last carries the watermark to store for the next sync.
+
+The upper bound of a sync is fixed when its first page is read, so rows
+changed while the client pages through wait for the next sync. The
+watermark handed back is that bound minus OVERLAP, so a row whose
+transaction committed just after the bound is sent again next time rather
+than missed; clients upsert by id, so repeats are harmless.
+
+Tombstones are kept for SYNC_TOMBSTONE_RETENTION_DAYS. A client whose
+watermark is older than that cannot be told what was deleted and must start
+over with a full download (SyncExpired).
+
+Upload: apply_uploads posts a batch of offline savings transactions in one
+database transaction. Each carries the client's own reference; references
+already received are reported as duplicates and not posted again.
+"""
+from datetime import timedelta
+from decimal import Decimal, InvalidOperation
+
+from django.conf import settings
+from django.core import signing
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from accounts.permissions import filter_queryset_by_user_scope
+from reports.rollups import SAVINGS_CREDIT_TYPES
+
+from .models import SyncTombstone, UploadedTransaction
+from .resources import LOANS, MEMBERS, REPAYMENTS, SAVINGS_ACCOUNTS, TRANSACTIONS
+
+# Parents before children, so a client can insert rows in the order received
+SYNC_RESOURCES = (MEMBERS, SAVINGS_ACCOUNTS, LOANS, TRANSACTIONS, REPAYMENTS)
+TOMBSTONES = len(SYNC_RESOURCES)
+
+PAGE_SIZE = 500
+MAX_UPLOAD = 500
+OVERLAP = timedelta(seconds=5)
+
+CURSOR_SALT = 'api.sync'
+
+
+class SyncError(Exception):
+    pass
+
+
+class SyncExpired(SyncError):
+    pass
+
+
+def retention():
+    return timedelta(days=getattr(settings, 'SYNC_TOMBSTONE_RETENTION_DAYS', 90))
+
+
+def _moment(value, name):
+    try:
+        moment = parse_datetime(value) if value else None
+    except ValueError:
+        moment = None
+    if moment is None:
+        raise SyncError(f'Invalid {name}.')
+    return moment if timezone.is_aware(moment) else timezone.make_aware(moment)
+
+
+def _iso(moment):
+    return moment.isoformat() if moment is not None else None
+
+
+def start(since=None):
+    """The position of a new sync: since is the client's stored watermark, or None for everything"""
+    since = _moment(since, 'watermark') if since else None
+    now = timezone.now()
+    if since is not None and since < now - retention():
+        raise SyncExpired('Watermark is older than the tombstone retention; start a full sync.')
+    return {'since': _iso(since), 'high': _iso(now), 'resource': 0, 'after': None}
+
+
+def resume(cursor):
+    try:
+        return signing.loads(cursor, salt=CURSOR_SALT)
+    except signing.BadSignature:
+        raise SyncError('Invalid cursor.')
+
+
+def _after(queryset, field, after):
+    if after is None:
+        return queryset
+    moment, pk = _moment(after[0], 'cursor'), after[1]
+    return queryset.filter(Q(**{f'{field}__gt': moment}) | Q(**{field: moment, 'id__gt': pk}))
+
+
+def _window(queryset, field, position):
+    queryset = queryset.filter(**{f'{field}__lte': _moment(position['high'], 'cursor')})
+    if position['since']:
+        queryset = queryset.filter(**{f'{field}__gt': _moment(position['since'], 'cursor')})
+    return _after(queryset, field, position['after']).order_by(field, 'id')
+
+
+def read_page(user, position, page_size=PAGE_SIZE):
+    """One page of changes from position; returns the page as sent to the client"""
+    changes, deleted = {}, {}
+    room = page_size
+    position = dict(position)
+    while position['resource'] <= TOMBSTONES and room > 0:
+        if position['resource'] < TOMBSTONES:
+            resource = SYNC_RESOURCES[position['resource']]
+            names = list(resource.fields)
+            queryset = filter_queryset_by_user_scope(resource.model.objects.all(), user, resource.model_type)
+            rows = list(
+                _window(queryset, 'updated_at', position)
+                .values_list(*[resource.fields[name] for name in names])[:room + 1]
+            )
+            last = names.index('updated_at')
+            if rows[:room]:
+                changes[resource.name] = {'fields': names, 'rows': rows[:room]}
+        else:
+            # Nothing to delete on a first download
+            queryset = filter_queryset_by_user_scope(SyncTombstone.objects.all(), user, 'sync_tombstone')
+            rows = [] if position['since'] is None else list(
+                _window(queryset, 'deleted_at', position).values_list('id', 'deleted_at', 'resource', 'record_id')[:room + 1]
+            )
+            last = 1
+            for _, _, name, record_id in rows[:room]:
+                deleted.setdefault(name, []).append(record_id)
+        if len(rows) > room:
+            row = rows[room - 1]
+            position['after'] = (_iso(row[last]), row[0])
+            room = 0
+        else:
+            position['resource'] += 1
+            position['after'] = None
+            room -= len(rows)
+
+    done = position['resource'] > TOMBSTONES
+    return {
+        'changes': changes,
+        'deleted': deleted,
+        'next': None if done else signing.dumps(position, salt=CURSOR_SALT, compress=True),
+        'watermark': _iso(_moment(position['high'], 'cursor') - OVERLAP) if done else None,
+    }
+
+
+def _parse_upload(item, accounts):
+    """(client_ref, fields, error): fields is (account, txn_type, amount, collected_at, reference, narration)"""
+    from savings.models import SavingsTransaction
+
+    client_ref = str(item.get('client_ref') or '').strip()
+    if not client_ref or len(client_ref) > 64:
+        return None, None, 'client_ref is required (at most 64 characters).'
+    try:
+        account = accounts.get(int(item.get('account')))
+    except (TypeError, ValueError):
+        account = None
+    if account is None:
+        return client_ref, None, 'Unknown savings account.'
+    if item.get('txn_type') not in dict(SavingsTransaction.TRANSACTION_TYPES):
+        return client_ref, None, 'Invalid transaction type.'
+    try:
+        amount = Decimal(str(item.get('amount')))
+    except (InvalidOperation, ValueError):
+        amount = None
+    if amount is None or not amount.is_finite() or amount <= 0:
+        return client_ref, None, 'Amount must be greater than zero.'
+    collected_at = None
+    if item.get('collected_at'):
+        try:
+            collected_at = _moment(item['collected_at'], 'collected_at')
+        except SyncError as e:
+            return client_ref, None, str(e)
+    fields = (
+        account, item['txn_type'], amount.quantize(Decimal('0.01')), collected_at,
+        str(item.get('reference') or '')[:100], str(item.get('narration') or ''),
+    )
+    return client_ref, fields, None
+
+
+def apply_uploads(user, items):
+    """
+    Post a batch of offline savings transactions, all in one database
+    transaction; returns one result per item, in order: created (with the
+    transaction id), duplicate (already received, with its transaction id)
+    or rejected (with the reason). Rejected items do not stop the others.
+    """
+    from savings.models import SavingsAccount, SavingsTransaction
+
+    if len(items) > MAX_UPLOAD:
+        raise SyncError(f'At most {MAX_UPLOAD} transactions per upload.')
+    results = []
+    with transaction.atomic():
+        account_ids = set()
+        for item in items:
+            try:
+                account_ids.add(int(item.get('account')))
+            except (AttributeError, TypeError, ValueError):
+                pass
+        scoped = filter_queryset_by_user_scope(SavingsAccount.objects.all(), user, 'savings')
+        accounts = scoped.select_for_update().in_bulk(account_ids)
+        refs = {str(item.get('client_ref') or '').strip() for item in items if isinstance(item, dict)}
+        received = dict(
+            UploadedTransaction.objects.filter(client_ref__in=refs).values_list('client_ref', 'transaction_id')
+        )
+
+        uploads, changed = [], {}
+        for item in items:
+            if not isinstance(item, dict):
+                results.append({'client_ref': None, 'status': 'rejected', 'error': 'Expected an object.'})
+                continue
+            client_ref, fields, error = _parse_upload(item, accounts)
+            if client_ref in received:
+                results.append({'client_ref': client_ref, 'status': 'duplicate', 'transaction': received[client_ref]})
+                continue
+            if error:
+                results.append({'client_ref': client_ref, 'status': 'rejected', 'error': error})
+                continue
+            account, txn_type, amount, collected_at, reference, narration = fields
+            credit = txn_type in SAVINGS_CREDIT_TYPES
+            if not credit and amount > (account.balance or 0):
+                results.append({'client_ref': client_ref, 'status': 'rejected', 'error': 'Insufficient balance.'})
+                continue
+            account.balance = (account.balance or 0) + (amount if credit else -amount)
+            changed[account.pk] = account
+            txn = SavingsTransaction(
+                account=account, sacco_id=account.sacco_id, txn_type=txn_type, amount=amount,
+                running_balance=account.balance, reference=reference, narration=narration, performed_by=user,
+            )
+            # Saved one by one so the ledger and rollups post them (ledger/signals.py)
+            txn.save()
+            received[client_ref] = txn.pk
+            uploads.append(UploadedTransaction(
+                client_ref=client_ref, transaction=txn, uploaded_by=user, collected_at=collected_at
+            ))
+            results.append({'client_ref': client_ref, 'status': 'created', 'transaction': txn.pk})
+
+        UploadedTransaction.objects.bulk_create(uploads)
+        for account in changed.values():
+            account.save(update_fields=['balance', 'updated_at'])
+    return results
@@ -0,0 +1,208 @@
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+
+from accounts.models import Region, Sacco, User
+from members.models import Member
+
+
+class ApiV1Test(TestCase):
+    def setUp(self):
+        cache.clear()
+        region = Region.objects.create(name="API Region")
+        self.sacco = Sacco.objects.create(
+            name="API Sacco", registration_number="API001", address="Address",
+            phone="1234567890", email="api@sacco.com", region=region
+        )
+        other_sacco = Sacco.objects.create(
+            name="Other API Sacco", registration_number="API002", address="Address",
+            phone="1234567890", email="api2@sacco.com", region=region
+        )
+        self.members = [
+            self.create_member(self.sacco, f"API-M{n}") for n in range(3)
+        ]
+        self.create_member(other_sacco, "API-X1")
+        User.objects.create_user(username="apiadmin", password="api12345", is_sacco_admin=True, sacco=self.sacco)
+        self.client.login(username="apiadmin", password="api12345")
+
+    def create_member(self, sacco, number):
+        return Member.objects.create(
+            sacco=sacco, member_number=number, first_name="Test", last_name=number,
+            phone="1234567890", gender="Female", date_of_birth="1990-01-01", home_address="Address",
+            village_town="Town", district="District", date_joined="2024-01-01"
+        )
+
+    def test_keyset_pages_with_sparse_fields(self):
+        url = reverse('api_v1_members')
+        first = self.client.get(url, {'fields': 'member_number', 'limit': 2}).json()
+        self.assertEqual(first['count'], 3)
+        self.assertEqual(first['results'], [
+            {'id': member.pk, 'member_number': member.member_number} for member in self.members[:2]
+        ])
+        second = self.client.get(url, {'fields': 'member_number', 'limit': 2, 'after': first['next_cursor']}).json()
+        self.assertEqual([row['id'] for row in second['results']], [self.members[2].pk])
+        self.assertIsNone(second['next_cursor'])
+
+        self.assertEqual(self.client.get(url, {'fields': 'national_id'}).status_code, 400)
+        self.assertEqual(self.client.get(url, {'sacco': 'x'}).status_code, 400)
+
+    def test_conditional_get(self):
+        url = reverse('api_v1_members')
+        response = self.client.get(url)
+        self.assertFalse(response.has_header('Last-Modified'))
+        self.assertIn('no-cache', response['Cache-Control'])
+
+        not_modified = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(not_modified.status_code, 304)
+        self.assertEqual((not_modified.content, not_modified['ETag']), (b'', response['ETag']))
+
+        member = self.members[0]
+        member.phone = "0700000000"
+        member.save()
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag']).status_code, 200)
+
+        # Deletions change the watermark too
+        etag = self.client.get(url)['ETag']
+        self.members[1].delete()
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+        # If-Modified-Since alone is never answered with 304
+        self.assertEqual(self.client.get(url, HTTP_IF_MODIFIED_SINCE='Fri, 01 Jan 2100 00:00:00 GMT').status_code, 200)
+
+    def test_dashboard_stats(self):
+        from savings.models import SavingProduct, SavingsAccount
+        product = SavingProduct.objects.create(sacco=self.sacco, name="Ordinary", product_code="API-ORD")
+        SavingsAccount.objects.create(
+            member=self.members[0], product=product, account_number="SA-API-1", balance=Decimal('250')
+        )
+        url = reverse('api_v1_dashboard')
+        response = self.client.get(url)
+        stats = response.json()
+        self.assertEqual((stats['members']['total'], Decimal(stats['savings']['balance'])), (3, 250))
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag']).status_code, 304)
+
+    def test_requires_login(self):
+        self.client.logout()
+        self.assertEqual(self.client.get(reverse('api_v1_loans')).status_code, 401)
+
+
+class SyncTest(TestCase):
+    def setUp(self):
+        from savings.models import SavingProduct, SavingsAccount
+        cache.clear()
+        region = Region.objects.create(name="Sync Region")
+        self.sacco = Sacco.objects.create(
+            name="Sync Sacco", registration_number="SYNC001", address="Address",
+            phone="1234567890", email="sync@sacco.com", region=region
+        )
+        product = SavingProduct.objects.create(sacco=self.sacco, name="Ordinary", product_code="SYNC-ORD")
+        self.members, self.accounts = [], []
+        for n in range(3):
+            member = Member.objects.create(
+                sacco=self.sacco, member_number=f"SYNC-M{n}", first_name="Test", last_name=f"Agent{n}",
+                phone="1234567890", gender="Female", date_of_birth="1990-01-01", home_address="Address",
+                village_town="Town", district="District", date_joined="2024-01-01"
+            )
+            self.members.append(member)
+            self.accounts.append(SavingsAccount.objects.create(
+                member=member, product=product, account_number=f"SA-SYNC-{n}", balance=Decimal('100')
+            ))
+        self.user = User.objects.create_user(
+            username="syncofficer", password="sync12345", is_sacco_admin=True, sacco=self.sacco
+        )
+        self.client.login(username="syncofficer", password="sync12345")
+
+    def sync_all(self, since=None):
+        """Follow the next cursors through the sync endpoint; returns (pages, watermark)"""
+        pages = [self.client.get(reverse('api_v1_sync'), {'since': since} if since else {}).json()]
+        while pages[-1]['next']:
+            pages.append(self.client.get(reverse('api_v1_sync'), {'cursor': pages[-1]['next']}).json())
+        return pages, pages[-1]['watermark']
+
+    def test_paged_full_sync(self):
+        from . import sync
+        position, pages = sync.start(), []
+        while position is not None:
+            pages.append(sync.read_page(self.user, position, page_size=2))
+            position = sync.resume(pages[-1]['next']) if pages[-1]['next'] else None
+        # The last page only finds that the remaining resources are unchanged
+        self.assertEqual([sum(len(part['rows']) for part in page['changes'].values()) for page in pages], [2, 2, 2, 0])
+        members = [row for page in pages for row in page['changes'].get('members', {}).get('rows', [])]
+        accounts = [row for page in pages for row in page['changes'].get('savings-accounts', {}).get('rows', [])]
+        self.assertEqual([row[0] for row in members], [member.pk for member in self.members])
+        self.assertEqual(len(accounts), 3)
+        self.assertIsNotNone(pages[-1]['watermark'])
+
+    def test_delta_has_only_changes_and_deletions(self):
+        from datetime import timedelta
+        from django.utils import timezone
+        from savings.models import SavingsAccount
+        now = timezone.now()
+        Member.objects.update(updated_at=now - timedelta(hours=1))
+        SavingsAccount.objects.update(updated_at=now - timedelta(hours=1))
+        since = (now - timedelta(minutes=30)).isoformat()
+
+        self.members[0].phone = "0700000000"
+        self.members[0].save()
+        deleted = self.accounts[1].pk
+        self.accounts[1].delete()
+        pages, watermark = self.sync_all(since)
+        self.assertEqual(len(pages), 1)
+        self.assertEqual(list(pages[0]['changes']), ['members'])
+        self.assertEqual([row[0] for row in pages[0]['changes']['members']['rows']], [self.members[0].pk])
+        self.assertEqual(pages[0]['deleted'], {'savings-accounts': [deleted]})
+        self.assertIsNotNone(watermark)
+
+        old = (now - timedelta(days=365)).isoformat()
+        self.assertEqual(self.client.get(reverse('api_v1_sync'), {'since': old}).status_code, 410)
+
+    def test_moved_member_leaves_tombstones(self):
+        from datetime import timedelta
+        from django.utils import timezone
+        from loans.models import Loan, LoanProduct
+        member, account = self.members[0], self.accounts[0]
+        product = LoanProduct.objects.create(
+            sacco=self.sacco, name="Business", product_code="SYNC-BIZ", description="Business loans",
+            interest_rate=Decimal('12'), max_amount=Decimal('100000'), min_amount=Decimal('100'),
+            max_duration_months=24, min_duration_months=1
+        )
+        loan = Loan.objects.create(
+            member=member, product=product, loan_ref="SYNC-1", amount_requested=Decimal('500'),
+            interest_rate=Decimal('12'), duration_months=6, purpose="Stock",
+        )
+        since = (timezone.now() - timedelta(minutes=1)).isoformat()
+
+        member.sacco = Sacco.objects.create(
+            name="Other Sync Sacco", registration_number="SYNC002", address="Address",
+            phone="1234567890", email="sync2@sacco.com", region=self.sacco.region
+        )
+        member.save()
+        pages, _ = self.sync_all(since)
+        deleted = {name: ids for page in pages for name, ids in page['deleted'].items()}
+        self.assertEqual(deleted, {'members': [member.pk], 'savings-accounts': [account.pk], 'loans': [loan.pk]})
+        self.assertNotIn(member.pk, [
+            row[0] for page in pages for row in page['changes'].get('members', {}).get('rows', [])
+        ])
+
+    def test_upload_is_idempotent(self):
+        import json
+        from savings.models import SavingsTransaction
+        account = self.accounts[0]
+        batch = {'transactions': [
+            {'client_ref': 'dev1-1', 'account': account.pk, 'txn_type': 'Deposit', 'amount': '50',
+             'collected_at': '2026-01-05T09:30:00+03:00'},
+            {'client_ref': 'dev1-2', 'account': account.pk, 'txn_type': 'Withdrawal', 'amount': '500'},
+            {'client_ref': 'dev1-3', 'account': self.accounts[1].pk, 'txn_type': 'Withdrawal', 'amount': '40'},
+        ]}
+        url = reverse('api_v1_sync_upload')
+        results = self.client.post(url, json.dumps(batch), content_type='application/json').json()['results']
+        self.assertEqual([result['status'] for result in results], ['created', 'rejected', 'created'])
+
+        again = self.client.post(url, json.dumps(batch), content_type='application/json').json()['results']
+        self.assertEqual([result['status'] for result in again], ['duplicate', 'rejected', 'duplicate'])
+        self.assertEqual(again[0]['transaction'], results[0]['transaction'])
+        self.assertEqual(SavingsTransaction.objects.count(), 2)
+        account.refresh_from_db()
+        self.assertEqual(account.balance, 150)
+        self.assertEqual(SavingsTransaction.objects.get(pk=results[2]['transaction']).running_balance, 60)
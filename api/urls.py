@@ -0,0 +1,12 @@
+from django.urls import path
+from . import views
+
+urlpatterns = [
+    path('v1/members/', views.members, name='api_v1_members'),
+    path('v1/loans/', views.loans, name='api_v1_loans'),
+    path('v1/savings-accounts/', views.savings_accounts, name='api_v1_savings_accounts'),
+    path('v1/transactions/', views.transactions, name='api_v1_transactions'),
+    path('v1/dashboard/', views.dashboard_stats, name='api_v1_dashboard'),
+    path('v1/sync/', views.sync_changes, name='api_v1_sync'),
+    path('v1/sync/upload/', views.sync_upload, name='api_v1_sync_upload'),
+]
@@ -0,0 +1,232 @@
+"""
+Versioned read API (v1) for members, loans, savings accounts, savings
+transactions and dashboard statistics
+
+Lists are keyset paged in id order (?after=<last id seen>&limit=N, next_cursor
+in the response), restricted to the user's scope, filterable by the query
+parameters each resource lists (api/resources.py) and trimmed to the fields
+asked for with ?fields=a,b (id is always included).
+
+Every response carries an ETag computed from a watermark: the latest
+updated_at and the row count of everything the request can see, so edits,
+additions and deletions all change it. The watermark costs one aggregate query
+per collection; when the client's If-None-Match still matches it, the answer
+is a bodiless 304 and no rows are read at all. There is no Last-Modified: a
+deletion or a second edit within the same second leaves the latest updated_at
+where it was, and If-Modified-Since would then answer 304 for a changed list.
+
+sync/ and sync/upload/ serve offline field clients (api/sync.py).
+"""
+import hashlib
+import json
+from functools import wraps
+
+from django.core.exceptions import ValidationError
+from django.db.models import Count, Max, Sum
+from django.http import HttpResponseNotModified, JsonResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import quote_etag
+
+from accounts.decorators import use_read_replica
+from accounts.permissions import check_admin, filter_queryset_by_user_scope
+from accounts.scope import get_user_scope
+
+from . import sync
+from .resources import LOANS, MEMBERS, SAVINGS_ACCOUNTS, TRANSACTIONS
+
+API_VERSION = 'v1'
+PAGE_SIZE = 100
+MAX_PAGE_SIZE = 500
+
+
+class ApiError(Exception):
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+def api_view(view_func=None, methods=('GET', 'HEAD'), replica=True):
+    """
+    JSON errors instead of redirects and only the given methods; reads go
+    to the replica unless replica is False
+    """
+    if view_func is None:
+        return lambda func: api_view(func, methods, replica)
+
+    @wraps(view_func)
+    def wrapper(request, *args, **kwargs):
+        if not request.user.is_authenticated:
+            return JsonResponse({'error': 'Authentication required'}, status=401)
+        if request.method not in methods:
+            return JsonResponse({'error': 'Method not allowed'}, status=405)
+        try:
+            return view_func(request, *args, **kwargs)
+        except ApiError as e:
+            return JsonResponse({'error': str(e)}, status=e.status)
+    return use_read_replica(wrapper) if replica else wrapper
+
+
+def _int_param(request, name, default=None):
+    value = request.GET.get(name)
+    if value in (None, ''):
+        return default
+    try:
+        value = int(value)
+    except ValueError:
+        raise ApiError(f'{name} must be an integer.')
+    if value < 0:
+        raise ApiError(f'{name} must not be negative.')
+    return value
+
+
+def scoped(request, resource):
+    """The resource's rows visible to the user, narrowed by the request's filters"""
+    queryset = filter_queryset_by_user_scope(resource.model.objects.all(), request.user, resource.model_type)
+    lookups = {path: request.GET[param] for param, path in resource.filters.items() if request.GET.get(param)}
+    try:
+        return queryset.filter(**lookups)
+    except (ValueError, ValidationError):
+        raise ApiError('Invalid filter value.')
+
+
+def selected_fields(request, resource):
+    """[(API name, ORM path)] for the fields asked for, id first"""
+    requested = request.GET.get('fields')
+    names = [name.strip() for name in requested.split(',') if name.strip()] if requested else resource.default_fields
+    unknown = [name for name in names if name not in resource.fields]
+    if unknown:
+        raise ApiError(f'Unknown field(s): {", ".join(unknown)}.')
+    names = ['id'] + [name for name in dict.fromkeys(names) if name != 'id']
+    return [(name, resource.fields[name]) for name in names]
+
+
+def watermark(queryset):
+    return queryset.order_by().aggregate(last_updated=Max('updated_at'), total=Count('pk'))
+
+
+def conditional_json(request, watermarks, build):
+    """
+    The JSON response build() returns, or 304 Not Modified when the client's
+    copy still matches the watermarks
+    """
+    scope = get_user_scope(request.user)
+    parts = [API_VERSION, request.get_full_path(), scope.kind, sorted(scope.sacco_ids or ()), scope.user_id]
+    parts += [(mark['last_updated'], mark['total']) for mark in watermarks]
+    etag = quote_etag(hashlib.sha256(repr(parts).encode()).hexdigest()[:32])
+
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        response = JsonResponse(build())
+    elif not isinstance(response, HttpResponseNotModified):
+        return response
+    response['ETag'] = etag
+    # Clients keep their copy but must revalidate it before every use
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+
+def list_resource(request, resource):
+    queryset = scoped(request, resource)
+    fields = selected_fields(request, resource)
+    after = _int_param(request, 'after')
+    limit = min(_int_param(request, 'limit', PAGE_SIZE) or PAGE_SIZE, MAX_PAGE_SIZE)
+    mark = watermark(queryset)
+
+    def page():
+        rows = queryset.order_by('id')
+        if after is not None:
+            rows = rows.filter(id__gt=after)
+        rows = list(rows.values_list(*[path for _, path in fields])[:limit + 1])
+        return {
+            'version': API_VERSION,
+            'count': mark['total'],
+            'results': [{name: value for (name, _), value in zip(fields, row)} for row in rows[:limit]],
+            'next_cursor': rows[limit - 1][0] if len(rows) > limit else None,
+        }
+
+    return conditional_json(request, [mark], page)
+
+
+@api_view
+def members(request):
+    return list_resource(request, MEMBERS)
+
+
+@api_view
+def loans(request):
+    return list_resource(request, LOANS)
+
+
+@api_view
+def savings_accounts(request):
+    return list_resource(request, SAVINGS_ACCOUNTS)
+
+
+@api_view
+def transactions(request):
+    return list_resource(request, TRANSACTIONS)
+
+
+@api_view
+def dashboard_stats(request):
+    """Member, loan and savings totals for the user's scope"""
+    querysets = [scoped(request, resource) for resource in (MEMBERS, LOANS, SAVINGS_ACCOUNTS, TRANSACTIONS)]
+    marks = [watermark(queryset) for queryset in querysets]
+    member_qs, loan_qs, account_qs, _ = querysets
+
+    def stats():
+        loans_by_status = dict(loan_qs.order_by().values_list('status').annotate(count=Count('pk')))
+        return {
+            'version': API_VERSION,
+            'members': {
+                'total': marks[0]['total'],
+                'active': member_qs.filter(status='Active').count(),
+            },
+            'loans': {
+                'total': marks[1]['total'],
+                'by_status': loans_by_status,
+                'outstanding_principal': loan_qs.aggregate(total=Sum('outstanding_principal'))['total'] or 0,
+            },
+            'savings': {
+                'accounts': marks[2]['total'],
+                'balance': account_qs.aggregate(total=Sum('balance'))['total'] or 0,
+                'transactions': marks[3]['total'],
+            },
+        }
+
+    return conditional_json(request, marks, stats)
+
+
+# Delta sync reads the primary: rows a lagging replica has not received yet
+# would fall before the returned watermark and never be sent
+@api_view(replica=False)
+def sync_changes(request):
+    """?since=<stored watermark> (omitted the first time) starts a sync, ?cursor=<next> continues it"""
+    try:
+        if request.GET.get('cursor'):
+            position = sync.resume(request.GET['cursor'])
+        else:
+            position = sync.start(request.GET.get('since'))
+    except sync.SyncExpired as e:
+        raise ApiError(str(e), status=410)
+    except sync.SyncError as e:
+        raise ApiError(str(e))
+    return JsonResponse({'version': API_VERSION, **sync.read_page(request.user, position)})
+
+
+@api_view(methods=('POST',), replica=False)
+def sync_upload(request):
+    """Offline savings transactions: {"transactions": [{client_ref, account, txn_type, amount, ...}]}"""
+    if not check_admin(request.user):
+        raise ApiError('Admin access required', status=403)
+    try:
+        items = json.loads(request.body).get('transactions')
+    except (ValueError, AttributeError):
+        items = None
+    if not isinstance(items, list):
+        raise ApiError('Expected a JSON object with a "transactions" list.')
+    try:
+        results = sync.apply_uploads(request.user, items)
+    except sync.SyncError as e:
+        raise ApiError(str(e))
+    return JsonResponse({'version': API_VERSION, 'results': results})
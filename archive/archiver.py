@@ -0,0 +1,158 @@
+"""
+Moving closed loans and old savings transactions to cold storage
+
+Hot tables only need what day-to-day work reads. archive_savings_transactions
+moves savings transactions performed before a cutoff date, and archive_loans
+moves loans closed or written off before it together with their repayments,
+charges, installments and collateral, into ArchivedRecord. Both work in
+chunks, each in its own transaction that copies the chunk's rows and then
+deletes them, so an interrupted run loses nothing and the next run carries on
+with whatever is left.
+
+Nothing derived from the moved rows changes. They are removed with plain
+DELETE statements that send no delete signals, so the monthly rollups, the
+general ledger and the PAR caches are not told anything was reversed.
+Readers that need history before the cutoff fall back to the archive
+(archive/reads.py).
+"""
+from datetime import datetime, time, timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import ArchivedRecord
+
+CHUNK_SIZE = 500
+LOAN_CHUNK_SIZE = 100
+
+ARCHIVED_LOAN_STATUSES = ('closed', 'written_off')
+
+
+def default_cutoff():
+    """Records before this date are past the retention window"""
+    return timezone.localdate() - timedelta(days=settings.ARCHIVE_RETENTION_DAYS)
+
+
+def start_of(day):
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def snapshot(instance):
+    """Every column of a row, by attname (foreign keys as ids)"""
+    return {field.attname: getattr(instance, field.attname) for field in instance._meta.concrete_fields}
+
+
+def _record(instance, sacco_id, parent_id, occurred_at, category='', amount=None, balance=None):
+    return ArchivedRecord(
+        model=instance._meta.label_lower, record_id=instance.pk, sacco_id=sacco_id, parent_id=parent_id,
+        occurred_at=occurred_at, category=category or '', amount=amount, balance=balance,
+        data=snapshot(instance),
+    )
+
+
+def _delete(queryset):
+    # A plain DELETE without delete signals or cascades: archiving is not a
+    # reversal, and children are always removed before their parents
+    queryset._raw_delete(queryset.db)
+
+
+def archive_savings_transactions(cutoff, sacco_ids=None, chunk_size=CHUNK_SIZE):
+    """Move savings transactions performed before the cutoff date; returns how many were moved"""
+    from api.models import UploadedTransaction
+    from reconciliation.models import StatementLine
+    from savings.models import SavingsTransaction
+
+    old = SavingsTransaction.objects.filter(performed_at__lt=start_of(cutoff))
+    if sacco_ids is not None:
+        old = old.filter(sacco_id__in=sacco_ids)
+    old = old.order_by('pk')
+
+    moved = 0
+    while True:
+        with transaction.atomic():
+            chunk = list(old.select_for_update(of=('self',))[:chunk_size])
+            if not chunk:
+                return moved
+            ArchivedRecord.objects.bulk_create([
+                _record(
+                    txn, txn.sacco_id, txn.account_id, txn.performed_at,
+                    txn.txn_type, txn.amount, txn.running_balance,
+                )
+                for txn in chunk
+            ])
+            txn_ids = [txn.pk for txn in chunk]
+            # A raw delete skips on_delete=SET_NULL, so references are cleared first
+            UploadedTransaction.objects.filter(transaction_id__in=txn_ids).update(transaction=None)
+            StatementLine.objects.filter(savings_transaction_id__in=txn_ids).update(savings_transaction=None)
+            _delete(SavingsTransaction.objects.filter(pk__in=txn_ids))
+        moved += len(chunk)
+
+
+def archive_loans(cutoff, sacco_ids=None, chunk_size=LOAN_CHUNK_SIZE):
+    """
+    Move loans closed or written off before the cutoff date, with their
+    repayments, charges, installments and collateral; returns how many loans
+    were moved
+    """
+    from loans.models import Loan, LoanCharge, LoanCollateral, LoanInstallment, LoanRepayment
+    from reconciliation.models import StatementLine
+    from reports.rollups import loan_payable
+
+    old = (
+        Loan.objects.filter(status__in=ARCHIVED_LOAN_STATUSES)
+        .annotate(finished_at=Coalesce('closed_at', 'written_off_at', 'updated_at'))
+        .filter(finished_at__lt=start_of(cutoff))
+    )
+    if sacco_ids is not None:
+        old = old.filter(sacco_id__in=sacco_ids)
+    # What the loan credited to the rollups, kept for rebuilds (reports/rollups.py)
+    old = old.annotate(payable=loan_payable()).order_by('pk')
+
+    moved = 0
+    while True:
+        with transaction.atomic():
+            loans = list(old.select_for_update(of=('self',))[:chunk_size])
+            if not loans:
+                return moved
+            sacco_of = {loan.pk: loan.sacco_id for loan in loans}
+            records = [
+                _record(
+                    loan, loan.sacco_id, loan.pk, loan.disbursement_date or loan.application_date,
+                    loan.status, loan.payable if loan.disbursement_date else None,
+                )
+                for loan in loans
+            ]
+            records += [
+                _record(
+                    repayment, sacco_of[repayment.loan_id], repayment.loan_id, repayment.payment_date,
+                    repayment.payment_method, repayment.amount, repayment.running_outstanding_principal,
+                )
+                for repayment in LoanRepayment.objects.filter(loan_id__in=sacco_of)
+            ]
+            records += [
+                _record(charge, sacco_of[charge.loan_id], charge.loan_id, charge.charged_at, charge.charge_type, charge.amount)
+                for charge in LoanCharge.objects.filter(loan_id__in=sacco_of)
+            ]
+            records += [
+                _record(
+                    installment, sacco_of[installment.loan_id], installment.loan_id,
+                    start_of(installment.due_date), '', installment.amount_due, installment.cumulative_due,
+                )
+                for installment in LoanInstallment.objects.filter(loan_id__in=sacco_of)
+            ]
+            records += [
+                _record(
+                    collateral, sacco_of[collateral.loan_id], collateral.loan_id, collateral.created_at,
+                    collateral.collateral_type, collateral.value,
+                )
+                for collateral in LoanCollateral.objects.filter(loan_id__in=sacco_of)
+            ]
+            ArchivedRecord.objects.bulk_create(records, batch_size=CHUNK_SIZE)
+            # A raw delete skips on_delete=SET_NULL, so references are cleared first
+            StatementLine.objects.filter(loan_repayment__loan_id__in=sacco_of).update(loan_repayment=None)
+            for model in (LoanRepayment, LoanCharge, LoanInstallment, LoanCollateral):
+                _delete(model.objects.filter(loan_id__in=sacco_of))
+            _delete(Loan.objects.filter(pk__in=sacco_of))
+        moved += len(loans)
@@ -0,0 +1,41 @@
+"""
+Management command to move closed loans and old savings transactions to cold storage
+
+Records older than ARCHIVE_RETENTION_DAYS (or --before) are moved chunk by
+chunk (see archive/archiver.py); an interrupted run simply carries on next
+time:
+
+    python manage.py archive_records --kind savings --before 2019-01-01 --sacco 4
+"""
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from archive.archiver import CHUNK_SIZE, archive_loans, archive_savings_transactions, default_cutoff
+
+
+class Command(BaseCommand):
+    help = 'Move closed loans and savings transactions past the retention window to the archive'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--kind', choices=('loans', 'savings'), help='Only archive this kind (default: both)')
+        parser.add_argument('--before', help='Archive records before this date, YYYY-MM-DD (default: retention window)')
+        parser.add_argument('--sacco', type=int, action='append', help='Only this Sacco id (repeatable)')
+        parser.add_argument('--chunk-size', type=int, help=f'Rows per transaction (default: {CHUNK_SIZE} transactions, 100 loans)')
+
+    def handle(self, *args, **options):
+        cutoff = default_cutoff()
+        if options['before']:
+            try:
+                cutoff = date.fromisoformat(options['before'])
+            except ValueError:
+                raise CommandError(f'Invalid date "{options["before"]}", expected YYYY-MM-DD')
+        chunk = {'chunk_size': options['chunk_size']} if options['chunk_size'] else {}
+
+        if options['kind'] in (None, 'loans'):
+            moved = archive_loans(cutoff, options['sacco'], **chunk)
+            self.stdout.write(f'loans: {moved} closed or written-off loan(s) archived')
+        if options['kind'] in (None, 'savings'):
+            moved = archive_savings_transactions(cutoff, options['sacco'], **chunk)
+            self.stdout.write(f'savings: {moved} transaction(s) archived')
+        self.stdout.write(self.style.SUCCESS(f'Archived records before {cutoff}'))
@@ -0,0 +1,37 @@
+# Generated by Django 4.2.7 on 2026-10-19 01:00
+
+import django.core.serializers.json
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('accounts', '0002_district_sacco_district'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedRecord',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('model', models.CharField(choices=[('savings.savingstransaction', 'Savings transaction'), ('loans.loan', 'Loan'), ('loans.loanrepayment', 'Loan repayment'), ('loans.loancharge', 'Loan charge'), ('loans.loaninstallment', 'Loan installment'), ('loans.loancollateral', 'Loan collateral')], max_length=40)),
+                ('record_id', models.BigIntegerField()),
+                ('parent_id', models.BigIntegerField()),
+                ('occurred_at', models.DateTimeField()),
+                ('category', models.CharField(blank=True, max_length=30)),
+                ('amount', models.DecimalField(blank=True, decimal_places=2, max_digits=16, null=True)),
+                ('balance', models.DecimalField(blank=True, decimal_places=2, max_digits=16, null=True)),
+                ('data', models.JSONField(encoder=django.core.serializers.json.DjangoJSONEncoder)),
+                ('archived_at', models.DateTimeField(auto_now_add=True)),
+                ('sacco', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_records', to='accounts.sacco')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['model', 'parent_id', 'occurred_at', 'record_id'], name='archive_parent_time_idx'), models.Index(fields=['sacco', 'model', 'occurred_at'], name='archive_sacco_time_idx')],
+                'unique_together': {('model', 'record_id')},
+            },
+        ),
+    ]
@@ -0,0 +1,54 @@
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import models
+
+from accounts.models import Sacco
+
+
+class ArchivedRecord(models.Model):
+    """
+    A row moved out of a hot table into cold storage (see archive/archiver.py)
+
+    data holds every column of the original row. The other columns copy what
+    the archived read paths filter, order and sum on:
+      parent_id    the savings account of a transaction; the loan of a loan
+                   itself and of its repayments, charges, installments and collateral
+      occurred_at  when the record took effect (performed_at, disbursement_date,
+                   payment_date, charged_at, due date, created_at)
+      category     txn_type, loan status, charge_type or collateral_type
+      amount       the record's amount; for a loan, the amount payable credited
+                   on disbursement (None if it was never disbursed)
+      balance      running_balance of a savings transaction, running
+                   outstanding principal of a repayment, cumulative_due of
+                   an installment
+    """
+    MODEL_CHOICES = [
+        ('savings.savingstransaction', 'Savings transaction'),
+        ('loans.loan', 'Loan'),
+        ('loans.loanrepayment', 'Loan repayment'),
+        ('loans.loancharge', 'Loan charge'),
+        ('loans.loaninstallment', 'Loan installment'),
+        ('loans.loancollateral', 'Loan collateral'),
+    ]
+
+    model = models.CharField(max_length=40, choices=MODEL_CHOICES)
+    record_id = models.BigIntegerField()
+    sacco = models.ForeignKey(Sacco, on_delete=models.CASCADE, related_name='archived_records')
+    parent_id = models.BigIntegerField()
+    occurred_at = models.DateTimeField()
+    category = models.CharField(max_length=30, blank=True)
+    amount = models.DecimalField(max_digits=16, decimal_places=2, null=True, blank=True)
+    balance = models.DecimalField(max_digits=16, decimal_places=2, null=True, blank=True)
+    data = models.JSONField(encoder=DjangoJSONEncoder)
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        unique_together = ('model', 'record_id')
+        indexes = [
+            # Archived rows of an account or loan in time order, see archive/reads.py
+            models.Index(fields=['model', 'parent_id', 'occurred_at', 'record_id'], name='archive_parent_time_idx'),
+            # Rollup rebuilds over a Sacco's archived months
+            models.Index(fields=['sacco', 'model', 'occurred_at'], name='archive_sacco_time_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.get_model_display()} {self.record_id}"
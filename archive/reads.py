@@ -0,0 +1,98 @@
+"""
+Reading archived records
+
+rehydrate turns an ArchivedRecord back into an unsaved instance of its
+original model (marked archived=True), so archived rows render wherever live
+ones do. The helpers below are the "include archived" read paths: savings
+balances before a date fall back to the archive when no live transaction
+precedes it, account statements can merge archived transactions into their
+pages, and an archived loan can still be opened with its repayments.
+"""
+from django.apps import apps
+from django.db import models
+from django.db.models import OuterRef, Q, Subquery
+
+from .models import ArchivedRecord
+
+SAVINGS_TRANSACTION = 'savings.savingstransaction'
+
+MONEY = models.DecimalField(max_digits=16, decimal_places=2)
+
+
+def rehydrate(record):
+    """An unsaved model instance with the archived row's values"""
+    model = apps.get_model(record.model)
+    values = {}
+    for field in model._meta.concrete_fields:
+        if field.attname not in record.data:
+            continue
+        value = record.data[field.attname]
+        if value is not None and not isinstance(field, models.JSONField):
+            value = field.to_python(value)
+        values[field.attname] = value
+    instance = model(**values)
+    instance.archived = True
+    return instance
+
+
+def archived_balance_before(account_id, moment):
+    """running_balance of an account's last archived transaction before a moment, or None"""
+    return (
+        ArchivedRecord.objects.filter(model=SAVINGS_TRANSACTION, parent_id=account_id, occurred_at__lt=moment)
+        .order_by('-occurred_at', '-record_id')
+        .values_list('balance', flat=True)
+        .first()
+    )
+
+
+def archived_balance_subquery(moment, account=OuterRef('pk')):
+    """archived_balance_before as a subquery on a SavingsAccount queryset"""
+    return Subquery(
+        ArchivedRecord.objects.filter(model=SAVINGS_TRANSACTION, parent_id=account, occurred_at__lt=moment)
+        .order_by('-occurred_at', '-record_id')
+        .values('balance')[:1],
+        output_field=MONEY,
+    )
+
+
+def _transaction(record):
+    txn = rehydrate(record)
+    # The JSON copy keeps milliseconds only; paging compares exact moments
+    txn.performed_at = record.occurred_at
+    return txn
+
+
+class ArchivedTransactions:
+    """
+    Archived savings transactions of an account over [low, high), paged like
+    live ones (see savings/statements.py read_page)
+    """
+
+    def __init__(self, account_id, low, high):
+        self.records = ArchivedRecord.objects.filter(
+            model=SAVINGS_TRANSACTION, parent_id=account_id, occurred_at__gte=low, occurred_at__lt=high
+        )
+
+    def get(self, transaction_id):
+        record = self.records.filter(record_id=transaction_id).first()
+        return _transaction(record) if record is not None else None
+
+    def after(self, cursor, limit):
+        """Up to limit transactions after the cursor row (from the start when None), in (performed_at, id) order"""
+        records = self.records
+        if cursor is not None:
+            records = records.filter(
+                Q(occurred_at__gt=cursor.performed_at) | Q(occurred_at=cursor.performed_at, record_id__gt=cursor.id)
+            )
+        return [_transaction(record) for record in records.order_by('occurred_at', 'record_id')[:limit]]
+
+
+def archived_loan(loan_id):
+    """(loan, its repayments newest first) of an archived loan, or None if it is not archived"""
+    record = ArchivedRecord.objects.filter(model='loans.loan', record_id=loan_id).first()
+    if record is None:
+        return None
+    repayments = ArchivedRecord.objects.filter(model='loans.loanrepayment', parent_id=loan_id).order_by(
+        '-occurred_at', '-record_id'
+    )
+    return rehydrate(record), [rehydrate(repayment) for repayment in repayments]
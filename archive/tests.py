@@ -0,0 +1,160 @@
+from datetime import date, datetime
+from decimal import Decimal
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from accounts.models import Region, Sacco, User
+from .archiver import archive_loans, archive_savings_transactions
+from .models import ArchivedRecord
+
+
+def moment(day):
+    return timezone.make_aware(datetime.combine(day, datetime.min.time().replace(hour=10)))
+
+
+class ArchiveTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        from members.models import Member
+        from savings.models import SavingProduct, SavingsAccount
+        region = Region.objects.create(name="Archive Region")
+        self.sacco = Sacco.objects.create(
+            name="Archive Sacco", registration_number="ARCH001", address="Address",
+            phone="1234567890", email="archive@sacco.com", region=region
+        )
+        self.member = Member.objects.create(
+            sacco=self.sacco, member_number="ARCH-M1", first_name="Test", last_name="Saver",
+            phone="1234567890", gender="Female", date_of_birth="1990-01-01", home_address="Address",
+            village_town="Town", district="District", date_joined="2015-01-01"
+        )
+        product = SavingProduct.objects.create(sacco=self.sacco, name="Ordinary", product_code="ARCH-ORD")
+        self.account = SavingsAccount.objects.create(member=self.member, product=product, account_number="SA-ARCH-1")
+
+    def post(self, txn_type, amount, balance, day):
+        from savings.models import SavingsTransaction
+        txn = SavingsTransaction.objects.create(
+            account=self.account, txn_type=txn_type, amount=Decimal(amount), running_balance=Decimal(balance)
+        )
+        SavingsTransaction.objects.filter(pk=txn.pk).update(performed_at=moment(day))
+        return txn
+
+    def test_archived_transactions_keep_balances_and_rollups(self):
+        from reports.models import AccountMonthlyBalance
+        from reports.rollups import rebuild_rollups
+        from savings.models import SavingsTransaction
+        from savings.statements import account_statement
+        self.post('Deposit', '1000', '1000', date(2018, 3, 1))
+        self.post('Withdrawal', '200', '800', date(2018, 3, 5))
+        self.post('Deposit', '50', '850', date(2024, 6, 1))
+        rebuild_rollups('savings', date(2018, 3, 1), date(2024, 6, 1))
+        before = list(AccountMonthlyBalance.objects.order_by('month').values_list('month', 'closing'))
+
+        self.assertEqual(archive_savings_transactions(date(2020, 1, 1), chunk_size=1), 2)
+        self.assertEqual(SavingsTransaction.objects.count(), 1)
+        self.assertEqual(ArchivedRecord.objects.filter(model='savings.savingstransaction').count(), 2)
+
+        statement = account_statement(self.account, date(2018, 3, 3), date(2024, 6, 30))
+        self.assertEqual((statement['opening_balance'], statement['closing_balance']), (1000, 850))
+        self.assertEqual(len(statement['rows']), 1)
+
+        # Archived transactions merged into the pages, in order across both tables
+        first = account_statement(self.account, date(2018, 1, 1), date(2024, 6, 30), page_size=2, include_archived=True)
+        self.assertEqual([row.amount for row in first['rows']], [1000, 200])
+        self.assertTrue(first['rows'][0].archived)
+        second = account_statement(
+            self.account, date(2018, 1, 1), date(2024, 6, 30), after=first['next_cursor'], page_size=2,
+            include_archived=True,
+        )
+        self.assertEqual(([row.amount for row in second['rows']], second['brought_forward']), ([50], 800))
+
+        # A rebuild counts the archived movements
+        rebuild_rollups('savings', date(2018, 3, 1), date(2024, 6, 1))
+        self.assertEqual(list(AccountMonthlyBalance.objects.order_by('month').values_list('month', 'closing')), before)
+
+    def test_archiving_clears_upload_references(self):
+        from api.models import UploadedTransaction
+        txn = self.post('Deposit', '100', '100', date(2018, 3, 1))
+        upload = UploadedTransaction.objects.create(client_ref='dev1-1', transaction=txn)
+
+        self.assertEqual(archive_savings_transactions(date(2020, 1, 1)), 1)
+        upload.refresh_from_db()
+        # The client reference stays, so the upload is still reported as a duplicate
+        self.assertIsNone(upload.transaction_id)
+
+    def test_archiving_clears_statement_line_references(self):
+        from loans.models import Loan, LoanProduct, LoanRepayment
+        from reconciliation.models import StatementImport, StatementLine
+        txn = self.post('Deposit', '100', '100', date(2018, 3, 1))
+        product = LoanProduct.objects.create(
+            sacco=self.sacco, name="Business", product_code="ARCH-BIZ", description="Business loans",
+            interest_rate=Decimal('12'), max_amount=Decimal('100000'), min_amount=Decimal('100'),
+            max_duration_months=24, min_duration_months=1
+        )
+        loan = Loan.objects.create(
+            member=self.member, product=product, loan_ref="ARCH-1", amount_requested=Decimal('300'),
+            interest_rate=Decimal('12'), duration_months=6, purpose="Stock", status='active',
+        )
+        repayment = LoanRepayment.objects.create(loan=loan, amount=Decimal('300'))
+        Loan.objects.filter(pk=loan.pk).update(status='closed', closed_at=moment(date(2018, 6, 1)))
+        statement = StatementImport.objects.create(sacco=self.sacco, provider='MTN', file='mtn.csv')
+        for row, match in enumerate([{'savings_transaction': txn}, {'loan_repayment': repayment}], start=1):
+            StatementLine.objects.create(
+                statement=statement, row_number=row, provider_tx_id=f'MP{row}', amount=Decimal('100'),
+                direction='in', occurred_at=moment(date(2018, 3, 1)), status='matched', **match
+            )
+
+        self.assertEqual(archive_savings_transactions(date(2020, 1, 1)), 1)
+        self.assertEqual(archive_loans(date(2020, 1, 1)), 1)
+        # The lines stay, without the rows they matched
+        self.assertEqual(
+            list(StatementLine.objects.order_by('row_number').values_list('savings_transaction', 'loan_repayment')),
+            [(None, None), (None, None)]
+        )
+
+    def test_closed_loans_archived_with_children(self):
+        from ledger.models import JournalEntry
+        from loans.models import Loan, LoanProduct, LoanRepayment
+        product = LoanProduct.objects.create(
+            sacco=self.sacco, name="Business", product_code="ARCH-BIZ", description="Business loans",
+            interest_rate=Decimal('12'), max_amount=Decimal('100000'), min_amount=Decimal('100'),
+            max_duration_months=24, min_duration_months=1
+        )
+        closed = Loan.objects.create(
+            member=self.member, product=product, loan_ref="ARCH-1", amount_requested=Decimal('1200'),
+            amount_approved=Decimal('1200'), amount_disbursed=Decimal('1200'), interest_rate=Decimal('12'), duration_months=12, purpose="Stock",
+            status='disbursed', disbursement_date=moment(date(2016, 1, 10)),
+        )
+        LoanRepayment.objects.create(loan=closed, amount=Decimal('1200'), reference_number="R-1")
+        Loan.objects.filter(pk=closed.pk).update(status='closed', closed_at=moment(date(2017, 1, 10)))
+        active = Loan.objects.create(
+            member=self.member, product=product, loan_ref="ARCH-2", amount_requested=Decimal('500'),
+            interest_rate=Decimal('12'), duration_months=6, purpose="Stock", status='active',
+        )
+        entries = JournalEntry.objects.count()
+
+        call_command('archive_records', '--kind', 'loans', '--before', '2020-01-01', stdout=StringIO())
+        self.assertEqual(list(Loan.objects.values_list('pk', flat=True)), [active.pk])
+        self.assertFalse(LoanRepayment.objects.exists())
+        self.assertEqual(
+            sorted(ArchivedRecord.objects.values_list('model', flat=True)), ['loans.loan', 'loans.loanrepayment']
+        )
+        self.assertEqual(ArchivedRecord.objects.get(model='loans.loan').amount, 1200)
+        # Nothing reversed in the ledger
+        self.assertEqual(JournalEntry.objects.count(), entries)
+        self.assertEqual(archive_loans(date(2020, 1, 1)), 0)
+
+        User.objects.create_user(username="archiveadmin", password="archive123", is_sacco_admin=True, sacco=self.sacco)
+        self.client.login(username="archiveadmin", password="archive123")
+        response = self.client.get(reverse('loan_profile', args=[closed.pk]))
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.context['archived'])
+        self.assertEqual((response.context['total_repaid'], len(response.context['repayments'])), (1200, 1))
+
+        # The member is deleted later: the archived loan is not found rather than an error
+        self.member.delete()
+        self.assertEqual(self.client.get(reverse('loan_profile', args=[closed.pk])).status_code, 404)
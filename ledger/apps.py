@@ -0,0 +1,9 @@
+from django.apps import AppConfig
+
+
+class LedgerConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'ledger'
+
+    def ready(self):
+        from . import signals  # noqa: F401
@@ -0,0 +1,261 @@
+"""
+Trial balance and balance sheet
+
+Account balances are never summed over the whole journal. Today's balances
+are the running totals kept on each LedgerAccount. Balances as of an earlier
+date start from the account's last AccountCheckpoint on or before it and add
+only the lines posted between the checkpoint and the date; write_checkpoints
+(run nightly by the checkpoint_ledger command) keeps that gap to about a day.
+
+Trial balances are cached per Sacco and date. Each Sacco has a version
+counter that every posting bumps (ledger/posting.py).
+"""
+import time
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import DecimalField, F, OuterRef, Q, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from accounts.db_routing import primary_reads
+
+CACHE_TIMEOUT = 60 * 60 * 24
+VERSION_KEY = 'ledger:version:{}'
+ENTRY_KEY = 'ledger:tb:{}:{}:{}'
+
+ZERO = Decimal('0')
+MONEY = DecimalField(max_digits=18, decimal_places=2)
+
+
+def get_ledger_version(sacco_id):
+    key = VERSION_KEY.format(sacco_id)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, time.time_ns(), None)
+        version = cache.get(key)
+    return version
+
+
+def _increment(key):
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, time.time_ns(), None)
+
+
+def bump_ledger_version(sacco_id):
+    """
+    Mark every cached trial balance of a Sacco stale, at once and again when
+    the current transaction commits: another request may compute one from the
+    rows as they were before the commit and cache it under the first bump
+    """
+    key = VERSION_KEY.format(sacco_id)
+    _increment(key)
+    transaction.on_commit(lambda: _increment(key))
+
+
+def _latest_checkpoints(sacco_id, as_of):
+    """{account id: (checkpoint date, debit total, credit total)} of the last checkpoints on or before as_of"""
+    from .models import AccountCheckpoint
+
+    checkpoints = AccountCheckpoint.objects.filter(account__sacco_id=sacco_id, as_of__lte=as_of)
+    last = checkpoints.filter(account=OuterRef('account')).order_by('-as_of').values('as_of')[:1]
+    return {
+        account_id: (day, debit, credit)
+        for account_id, day, debit, credit in checkpoints.filter(as_of=Subquery(last)).values_list(
+            'account_id', 'as_of', 'debit_total', 'credit_total'
+        )
+    }
+
+
+def _totals_as_of(sacco_id, as_of):
+    """
+    ({account id: (debit total, credit total)} at the end of as_of, ids of the
+    accounts with lines after their last checkpoint)
+    """
+    from .models import JournalLine, LedgerAccount
+
+    totals = {pk: (ZERO, ZERO) for pk in LedgerAccount.objects.filter(sacco_id=sacco_id).values_list('id', flat=True)}
+    since = Q(account__sacco_id=sacco_id, entry_date__lte=as_of)
+    for account_id, (day, debit, credit) in _latest_checkpoints(sacco_id, as_of).items():
+        totals[account_id] = (debit, credit)
+        since &= ~Q(account_id=account_id, entry_date__lte=day)
+    moved = []
+    delta = (
+        JournalLine.objects.filter(since)
+        .order_by()
+        .values('account_id')
+        .annotate(debit=Sum('debit'), credit=Sum('credit'))
+    )
+    for row in delta:
+        debit, credit = totals.get(row['account_id'], (ZERO, ZERO))
+        totals[row['account_id']] = (debit + (row['debit'] or ZERO), credit + (row['credit'] or ZERO))
+        moved.append(row['account_id'])
+    return totals, moved
+
+
+def account_totals(sacco_id, as_of=None):
+    """
+    {account id: (debit total, credit total)} of a Sacco's accounts at the end
+    of as_of (default: now, from the running totals)
+    """
+    from .models import LedgerAccount
+
+    if as_of is None:
+        return {
+            pk: (debit, credit)
+            for pk, debit, credit in LedgerAccount.objects.filter(sacco_id=sacco_id).values_list(
+                'id', 'debit_total', 'credit_total'
+            )
+        }
+    return _totals_as_of(sacco_id, as_of)[0]
+
+
+def _compute_trial_balance(sacco_id, as_of):
+    from .models import LedgerAccount
+
+    totals = account_totals(sacco_id, as_of)
+    rows = []
+    for account in LedgerAccount.objects.filter(sacco_id=sacco_id).order_by('code'):
+        debit, credit = totals.get(account.pk, (ZERO, ZERO))
+        net = debit - credit
+        rows.append({
+            'code': account.code,
+            'name': account.name,
+            'account_type': account.account_type,
+            'debit': net if net > 0 else ZERO,
+            'credit': -net if net < 0 else ZERO,
+            # On the account's normal side
+            'balance': net if account.is_debit_normal else -net,
+        })
+    return rows
+
+
+def trial_balance(sacco_id, as_of=None):
+    """
+    Trial balance of a Sacco at the end of as_of (default: current balances)
+
+    Returns {'as_of', 'rows', 'total_debit', 'total_credit', 'balanced'};
+    each row has code, name, account_type, debit, credit and balance.
+    """
+    if as_of is not None and as_of >= timezone.localdate():
+        as_of = None
+    key = ENTRY_KEY.format(get_ledger_version(sacco_id), sacco_id, as_of.isoformat() if as_of else 'now')
+    rows = cache.get(key)
+    if rows is None:
+        with primary_reads():
+            rows = _compute_trial_balance(sacco_id, as_of)
+        cache.set(key, rows, CACHE_TIMEOUT)
+    total_debit = sum((row['debit'] for row in rows), ZERO)
+    total_credit = sum((row['credit'] for row in rows), ZERO)
+    return {
+        'as_of': as_of or timezone.localdate(),
+        'rows': rows,
+        'total_debit': total_debit,
+        'total_credit': total_credit,
+        'balanced': total_debit == total_credit,
+    }
+
+
+def balance_sheet(sacco_ids, as_of=None):
+    """
+    Balance sheet of one or more Saccos, from their trial balances
+
+    Income less expenses is shown as current earnings under equity. Returns
+    {'as_of', 'assets', 'liabilities', 'equity' (lists of {code, name,
+    balance}), 'total_assets', 'total_liabilities', 'current_earnings',
+    'total_equity', 'total_liabilities_and_equity', 'net_assets'}.
+    """
+    sections = {'asset': {}, 'liability': {}, 'equity': {}}
+    earnings = ZERO
+    for sacco_id in sacco_ids:
+        for row in trial_balance(sacco_id, as_of)['rows']:
+            if row['account_type'] in sections:
+                line = sections[row['account_type']].setdefault(
+                    row['code'], {'code': row['code'], 'name': row['name'], 'balance': ZERO}
+                )
+                line['balance'] += row['balance']
+            elif row['account_type'] == 'income':
+                earnings += row['balance']
+            else:
+                earnings -= row['balance']
+    assets, liabilities, equity = (sorted(sections[kind].values(), key=lambda line: line['code']) for kind in sections)
+    total_assets = sum((line['balance'] for line in assets), ZERO)
+    total_liabilities = sum((line['balance'] for line in liabilities), ZERO)
+    total_equity = sum((line['balance'] for line in equity), ZERO) + earnings
+    return {
+        'as_of': as_of or timezone.localdate(),
+        'assets': assets,
+        'liabilities': liabilities,
+        'equity': equity,
+        'total_assets': total_assets,
+        'total_liabilities': total_liabilities,
+        'current_earnings': earnings,
+        'total_equity': total_equity,
+        'total_liabilities_and_equity': total_liabilities + total_equity,
+        'net_assets': total_assets - total_liabilities,
+    }
+
+
+def current_net_assets(sacco_ids=None):
+    """
+    Assets less liabilities today, over the given Saccos (default: all),
+    from one grouped aggregate of the accounts' running totals
+    """
+    from .models import LedgerAccount
+
+    accounts = LedgerAccount.objects.filter(account_type__in=['asset', 'liability'])
+    if sacco_ids is not None:
+        accounts = accounts.filter(sacco_id__in=sacco_ids)
+    # Debit less credit is an asset's balance and minus a liability's
+    nets = accounts.order_by().values('account_type').annotate(
+        net=Sum(F('debit_total') - F('credit_total'), output_field=MONEY)
+    )
+    return sum((row['net'] or ZERO for row in nets), ZERO)
+
+
+def write_checkpoints(as_of, sacco_ids=None):
+    """
+    Checkpoint, at the end of as_of, every account with lines after its last
+    checkpoint. Returns the number of checkpoints written.
+    """
+    from .models import AccountCheckpoint, LedgerAccount
+
+    accounts = LedgerAccount.objects.all()
+    if sacco_ids is not None:
+        accounts = accounts.filter(sacco_id__in=sacco_ids)
+    written = 0
+    for sacco_id in accounts.order_by().values_list('sacco_id', flat=True).distinct():
+        totals, moved = _totals_as_of(sacco_id, as_of)
+        if not moved:
+            continue
+        with transaction.atomic():
+            AccountCheckpoint.objects.filter(account_id__in=moved, as_of=as_of).delete()
+            AccountCheckpoint.objects.bulk_create([
+                AccountCheckpoint(
+                    account_id=account_id, as_of=as_of,
+                    debit_total=totals[account_id][0], credit_total=totals[account_id][1],
+                )
+                for account_id in moved
+            ])
+        written += len(moved)
+    return written
+
+
+def recompute_account_totals(sacco_ids=None):
+    """Reset running totals from the journal lines, after bulk loads that bypass post_entry"""
+    from .models import JournalLine, LedgerAccount
+
+    lines = JournalLine.objects.filter(account=OuterRef('pk')).order_by().values('account')
+
+    def total(field):
+        return Coalesce(Subquery(lines.annotate(total=Sum(field)).values('total'), output_field=MONEY), Value(ZERO), output_field=MONEY)
+
+    accounts = LedgerAccount.objects.all()
+    if sacco_ids is not None:
+        accounts = accounts.filter(sacco_id__in=sacco_ids)
+    accounts.update(debit_total=total('debit'), credit_total=total('credit'))
+    for sacco_id in accounts.order_by().values_list('sacco_id', flat=True).distinct():
+        bump_ledger_version(sacco_id)
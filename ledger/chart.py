@@ -0,0 +1,46 @@
+"""
+Default chart of accounts
+
+Every Sacco gets the same standard accounts the first time something is
+posted for it. Postings refer to accounts by code and look the ids up with
+one indexed query on (sacco, code).
+"""
+from .models import LedgerAccount
+
+CASH = '1000'
+MOBILE_MONEY = '1010'
+LOANS_RECEIVABLE = '1100'
+MEMBER_SAVINGS = '2000'
+SHARE_CAPITAL = '3000'
+RETAINED_EARNINGS = '3100'
+LOAN_INTEREST_INCOME = '4000'
+FEE_INCOME = '4100'
+GRANT_INCOME = '4200'
+OPERATING_EXPENSES = '5000'
+SAVINGS_INTEREST_EXPENSE = '5100'
+
+DEFAULT_CHART = (
+    (CASH, 'Cash on hand', 'asset'),
+    (MOBILE_MONEY, 'Mobile money float', 'asset'),
+    (LOANS_RECEIVABLE, 'Loans receivable', 'asset'),
+    (MEMBER_SAVINGS, 'Member savings deposits', 'liability'),
+    (SHARE_CAPITAL, 'Share capital', 'equity'),
+    (RETAINED_EARNINGS, 'Retained earnings', 'equity'),
+    (LOAN_INTEREST_INCOME, 'Interest income on loans', 'income'),
+    (FEE_INCOME, 'Fees and charges', 'income'),
+    (GRANT_INCOME, 'Grants and donor funding', 'income'),
+    (OPERATING_EXPENSES, 'Operating expenses', 'expense'),
+    (SAVINGS_INTEREST_EXPENSE, 'Interest paid on savings', 'expense'),
+)
+
+def chart_accounts(sacco_id):
+    """{code: LedgerAccount id} of a Sacco, creating the default chart if needed"""
+    accounts = dict(LedgerAccount.objects.filter(sacco_id=sacco_id).values_list('code', 'id'))
+    missing = [(code, name, kind) for code, name, kind in DEFAULT_CHART if code not in accounts]
+    if missing:
+        LedgerAccount.objects.bulk_create(
+            [LedgerAccount(sacco_id=sacco_id, code=code, name=name, account_type=kind) for code, name, kind in missing],
+            ignore_conflicts=True,
+        )
+        accounts = dict(LedgerAccount.objects.filter(sacco_id=sacco_id).values_list('code', 'id'))
+    return accounts
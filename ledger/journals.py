@@ -0,0 +1,90 @@
+"""
+How operational records are journalled
+
+Each function returns (sacco_id, entry_date, description, lines) for one
+record, or None when it does not belong in the ledger yet. Lines are
+(account code, debit, credit). Money received or paid with a mobile money
+transaction id goes through the mobile money float, the rest through cash.
+Loan interest is income when it is repaid, not when the loan is disbursed.
+"""
+from decimal import Decimal
+
+from django.utils import timezone
+
+from . import chart
+
+ZERO = Decimal('0')
+
+FUNDING_RECEIVED_STATUSES = ('received', 'allocated', 'spent')
+
+
+def _day(moment):
+    return timezone.localtime(moment).date() if timezone.is_aware(moment) else moment.date()
+
+
+def _money_account(mobile_money_tx_id):
+    return chart.MOBILE_MONEY if mobile_money_tx_id else chart.CASH
+
+
+def savings_journal(txn, sacco_id):
+    amount = txn.amount or ZERO
+    money = _money_account(txn.mobile_money_tx_id)
+    lines = {
+        'Deposit': [(money, amount, 0), (chart.MEMBER_SAVINGS, 0, amount)],
+        'Transfer': [(money, amount, 0), (chart.MEMBER_SAVINGS, 0, amount)],
+        'Withdrawal': [(chart.MEMBER_SAVINGS, amount, 0), (money, 0, amount)],
+        'Interest': [(chart.SAVINGS_INTEREST_EXPENSE, amount, 0), (chart.MEMBER_SAVINGS, 0, amount)],
+        'Fee': [(chart.MEMBER_SAVINGS, amount, 0), (chart.FEE_INCOME, 0, amount)],
+    }.get(txn.txn_type)
+    if not amount or lines is None or sacco_id is None:
+        return None
+    description = f'Savings {txn.txn_type.lower()} {txn.reference or ""}'.strip()
+    return sacco_id, _day(txn.performed_at), description, lines
+
+
+def loan_principal(loan):
+    return loan.amount_disbursed or loan.amount_approved or loan.amount_requested or ZERO
+
+
+def disbursement_journal(loan, sacco_id):
+    principal = loan_principal(loan)
+    if loan.disbursement_date is None or not principal or sacco_id is None:
+        return None
+    return sacco_id, _day(loan.disbursement_date), f'Loan disbursement {loan.loan_number or loan.pk}', [
+        (chart.LOANS_RECEIVABLE, principal, 0),
+        (chart.CASH, 0, principal),
+    ]
+
+
+def repayment_journal(repayment, sacco_id):
+    """Interest and fees as recorded on the repayment, the rest against principal"""
+    amount = repayment.amount or ZERO
+    if not amount or sacco_id is None:
+        return None
+    interest = min(max(repayment.applied_to_interest or ZERO, ZERO), amount)
+    fees = min(max(repayment.applied_to_fees or ZERO, ZERO), amount - interest)
+    return sacco_id, _day(repayment.payment_date), f'Loan repayment {repayment.reference_number or ""}'.strip(), [
+        (_money_account(repayment.mobile_money_tx_id), amount, 0),
+        (chart.LOANS_RECEIVABLE, 0, amount - interest - fees),
+        (chart.LOAN_INTEREST_INCOME, 0, interest),
+        (chart.FEE_INCOME, 0, fees),
+    ]
+
+
+def funding_journal(funding):
+    if funding.status not in FUNDING_RECEIVED_STATUSES or not funding.amount:
+        return None
+    received = funding.received_date or funding.created_at or timezone.now()
+    return funding.sacco_id, _day(received), f'Funding received: {funding.purpose[:100]}', [
+        (chart.CASH, funding.amount, 0),
+        (chart.GRANT_INCOME, 0, funding.amount),
+    ]
+
+
+def expense_journal(expense):
+    if not expense.amount:
+        return None
+    return expense.sacco_id, expense.expense_date, f'Expense: {expense.description[:100]}', [
+        (chart.OPERATING_EXPENSES, expense.amount, 0),
+        (chart.CASH, 0, expense.amount),
+    ]
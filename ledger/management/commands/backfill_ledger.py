@@ -0,0 +1,127 @@
+"""
+Management command to journal records that predate the ledger
+
+Savings transactions, disbursed loans, repayments, received funding and
+expenses without any journal entry are posted in chunks, dated as the
+records. Records already journalled are skipped, so the command can be rerun
+safely, e.g. after bulk imports, which send no signals. Because the entries
+are backdated, the checkpoints of the Saccos touched are rewritten.
+
+It also reverses the entries of records deleted without a delete signal:
+savings transactions and loans have none, so their bulk deletes and member
+cascades stay single DELETE statements (see ledger/signals.py). Records
+moved into the archive keep their entries. Run it nightly (cron_setup.md).
+
+    python manage.py backfill_ledger --sacco 4
+"""
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db.models import Exists, F, OuterRef
+from django.utils import timezone
+
+from archive.models import ArchivedRecord
+from expenses.models import Expense
+from funding.models import Funding
+from ledger import journals
+from ledger.balances import write_checkpoints
+from ledger.models import AccountCheckpoint, JournalEntry
+from ledger.posting import post_entries_bulk, sync_source
+from loans.models import Loan, LoanRepayment
+from savings.models import SavingsTransaction
+
+CHUNK_SIZE = 1000
+
+# Source types whose records archive/archiver.py moves to ArchivedRecord, by model label
+ARCHIVED_MODELS = {
+    'savings': 'savings.savingstransaction',
+    'loan_disbursement': 'loans.loan',
+    'loan_repayment': 'loans.loanrepayment',
+}
+
+
+def orphaned_entries(source_type, model):
+    """Current entries of a source type whose record was deleted, not archived"""
+    entries = JournalEntry.objects.filter(
+        source_type=source_type, reversal_of__isnull=True, reversed_by__isnull=True
+    ).filter(~Exists(model.objects.filter(pk=OuterRef('source_id'))))
+    if source_type in ARCHIVED_MODELS:
+        entries = entries.filter(~Exists(ArchivedRecord.objects.filter(
+            model=ARCHIVED_MODELS[source_type], record_id=OuterRef('source_id')
+        )))
+    return entries
+
+
+def sources():
+    """(source type, queryset with a ledger_sacco annotation, journal builder)"""
+    return [
+        (
+            'savings',
+            SavingsTransaction.objects.annotate(ledger_sacco=F('sacco_id')),
+            lambda txn: journals.savings_journal(txn, txn.ledger_sacco),
+        ),
+        (
+            'loan_disbursement',
+            Loan.objects.filter(disbursement_date__isnull=False).annotate(ledger_sacco=F('sacco_id')),
+            lambda loan: journals.disbursement_journal(loan, loan.ledger_sacco),
+        ),
+        (
+            'loan_repayment',
+            LoanRepayment.objects.annotate(ledger_sacco=F('sacco_id')),
+            lambda repayment: journals.repayment_journal(repayment, repayment.ledger_sacco),
+        ),
+        (
+            'funding',
+            Funding.objects.filter(status__in=journals.FUNDING_RECEIVED_STATUSES).annotate(ledger_sacco=F('sacco_id')),
+            journals.funding_journal,
+        ),
+        (
+            'expense',
+            Expense.objects.annotate(ledger_sacco=F('sacco_id')),
+            journals.expense_journal,
+        ),
+    ]
+
+
+class Command(BaseCommand):
+    help = 'Journal savings, loan, funding and expense records that have no ledger entry yet'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sacco', type=int, action='append', help='Only this Sacco id (repeatable)')
+        parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE, help='Records per chunk')
+
+    def handle(self, *args, **options):
+        sacco_ids = options['sacco']
+        touched = set()
+        for source_type, queryset, build in sources():
+            pending = queryset.filter(
+                ~Exists(JournalEntry.objects.filter(source_type=source_type, source_id=OuterRef('pk')))
+            ).order_by('pk')
+            if sacco_ids:
+                pending = pending.filter(ledger_sacco__in=sacco_ids)
+            posted, last_pk = 0, 0
+            while True:
+                chunk = list(pending.filter(pk__gt=last_pk)[:options['chunk_size']])
+                if not chunk:
+                    break
+                last_pk = chunk[-1].pk
+                posted += post_entries_bulk((source_type, record.pk, build(record)) for record in chunk)
+                touched.update(record.ledger_sacco for record in chunk if record.ledger_sacco is not None)
+            self.stdout.write(f'{source_type}: {posted} entr{"y" if posted == 1 else "ies"} posted')
+
+            orphans = orphaned_entries(source_type, queryset.model).order_by('pk')
+            if sacco_ids:
+                orphans = orphans.filter(sacco_id__in=sacco_ids)
+            reversed_count = 0
+            for source_id in list(orphans.values_list('source_id', flat=True)):
+                # Dated today, so no checkpoint needs rewriting
+                sync_source(source_type, source_id, None)
+                reversed_count += 1
+            if reversed_count:
+                self.stdout.write(f'{source_type}: {reversed_count} deleted record(s) reversed')
+
+        if touched:
+            AccountCheckpoint.objects.filter(account__sacco_id__in=touched).delete()
+            written = write_checkpoints(timezone.localdate() - timedelta(days=1), touched)
+            self.stdout.write(f'{written} checkpoint(s) rewritten')
+        self.stdout.write(self.style.SUCCESS(f'Ledger backfilled for {len(touched)} Sacco(s)'))
@@ -0,0 +1,33 @@
+"""
+Management command to checkpoint ledger account totals (see ledger/balances.py)
+
+Balances as of a past date are read from the last checkpoint before it plus
+the lines posted since, so this should run every night, for yesterday by
+default:
+
+    python manage.py checkpoint_ledger --date 2025-03-31 --sacco 4
+"""
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from ledger.balances import write_checkpoints
+
+
+class Command(BaseCommand):
+    help = 'Checkpoint ledger account totals at the end of a day (default: yesterday)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--date', help='Day to checkpoint, YYYY-MM-DD (default: yesterday)')
+        parser.add_argument('--sacco', type=int, action='append', help='Only this Sacco id (repeatable)')
+
+    def handle(self, *args, **options):
+        as_of = timezone.localdate() - timedelta(days=1)
+        if options['date']:
+            try:
+                as_of = date.fromisoformat(options['date'])
+            except ValueError:
+                raise CommandError(f'Invalid date "{options["date"]}", expected YYYY-MM-DD')
+        written = write_checkpoints(as_of, options['sacco'])
+        self.stdout.write(self.style.SUCCESS(f'{written} checkpoint(s) written for {as_of}'))
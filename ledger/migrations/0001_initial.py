@@ -0,0 +1,93 @@
+# Generated by Django 4.2.7 on 2026-10-19 00:55
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('accounts', '0002_district_sacco_district'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='JournalEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('entry_date', models.DateField()),
+                ('description', models.CharField(max_length=255)),
+                ('source_type', models.CharField(choices=[('savings', 'Savings transaction'), ('loan_disbursement', 'Loan disbursement'), ('loan_repayment', 'Loan repayment'), ('funding', 'Funding received'), ('expense', 'Expense'), ('manual', 'Manual entry')], default='manual', max_length=20)),
+                ('source_id', models.BigIntegerField(blank=True, null=True)),
+                ('posted_at', models.DateTimeField(auto_now_add=True)),
+                ('posted_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL)),
+                ('reversal_of', models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.RESTRICT, related_name='reversed_by', to='ledger.journalentry')),
+                ('sacco', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='journal_entries', to='accounts.sacco')),
+            ],
+            options={
+                'verbose_name_plural': 'Journal entries',
+                'ordering': ['-entry_date', '-id'],
+            },
+        ),
+        migrations.CreateModel(
+            name='LedgerAccount',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('code', models.CharField(max_length=10)),
+                ('name', models.CharField(max_length=100)),
+                ('account_type', models.CharField(choices=[('asset', 'Asset'), ('liability', 'Liability'), ('equity', 'Equity'), ('income', 'Income'), ('expense', 'Expense')], max_length=10)),
+                ('debit_total', models.DecimalField(decimal_places=2, default=0, max_digits=18)),
+                ('credit_total', models.DecimalField(decimal_places=2, default=0, max_digits=18)),
+                ('is_active', models.BooleanField(default=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('sacco', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='ledger_accounts', to='accounts.sacco')),
+            ],
+            options={
+                'ordering': ['sacco', 'code'],
+                'unique_together': {('sacco', 'code')},
+            },
+        ),
+        migrations.CreateModel(
+            name='AccountCheckpoint',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('as_of', models.DateField()),
+                ('debit_total', models.DecimalField(decimal_places=2, default=0, max_digits=18)),
+                ('credit_total', models.DecimalField(decimal_places=2, default=0, max_digits=18)),
+                ('account', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='checkpoints', to='ledger.ledgeraccount')),
+            ],
+            options={
+                'ordering': ['account', 'as_of'],
+            },
+        ),
+        migrations.CreateModel(
+            name='JournalLine',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('entry_date', models.DateField()),
+                ('debit', models.DecimalField(decimal_places=2, default=0, max_digits=16)),
+                ('credit', models.DecimalField(decimal_places=2, default=0, max_digits=16)),
+                ('account', models.ForeignKey(on_delete=django.db.models.deletion.RESTRICT, related_name='lines', to='ledger.ledgeraccount')),
+                ('entry', models.ForeignKey(on_delete=django.db.models.deletion.RESTRICT, related_name='lines', to='ledger.journalentry')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['account', 'entry_date'], name='ledger_line_account_date_idx')],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='journalentry',
+            index=models.Index(fields=['source_type', 'source_id'], name='ledger_entry_source_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='journalentry',
+            index=models.Index(fields=['sacco', 'entry_date'], name='ledger_entry_sacco_date_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='accountcheckpoint',
+            unique_together={('account', 'as_of')},
+        ),
+    ]
@@ -0,0 +1,124 @@
+from django.core.exceptions import ValidationError
+from django.db import models
+from accounts.models import Sacco
+
+
+class LedgerAccount(models.Model):
+    """
+    An account in a Sacco's chart of accounts (see ledger/chart.py).
+    debit_total and credit_total are running totals of every line posted to it.
+    """
+    TYPE_CHOICES = [
+        ('asset', 'Asset'),
+        ('liability', 'Liability'),
+        ('equity', 'Equity'),
+        ('income', 'Income'),
+        ('expense', 'Expense'),
+    ]
+
+    sacco = models.ForeignKey(Sacco, on_delete=models.CASCADE, related_name='ledger_accounts')
+    code = models.CharField(max_length=10)
+    name = models.CharField(max_length=100)
+    account_type = models.CharField(max_length=10, choices=TYPE_CHOICES)
+    debit_total = models.DecimalField(max_digits=18, decimal_places=2, default=0)
+    credit_total = models.DecimalField(max_digits=18, decimal_places=2, default=0)
+    is_active = models.BooleanField(default=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['sacco', 'code']
+        unique_together = ('sacco', 'code')
+
+    def __str__(self):
+        return f"{self.code} {self.name}"
+
+    @property
+    def is_debit_normal(self):
+        return self.account_type in ('asset', 'expense')
+
+    @property
+    def balance(self):
+        """Balance on the account's normal side"""
+        if self.is_debit_normal:
+            return self.debit_total - self.credit_total
+        return self.credit_total - self.debit_total
+
+
+class JournalEntry(models.Model):
+    """
+    A balanced, immutable journal entry. Entries are corrected by posting a
+    reversal (reversal_of) and a new entry, never by editing.
+    """
+    SOURCE_CHOICES = [
+        ('savings', 'Savings transaction'),
+        ('loan_disbursement', 'Loan disbursement'),
+        ('loan_repayment', 'Loan repayment'),
+        ('funding', 'Funding received'),
+        ('expense', 'Expense'),
+        ('manual', 'Manual entry'),
+    ]
+
+    sacco = models.ForeignKey(Sacco, on_delete=models.CASCADE, related_name='journal_entries')
+    entry_date = models.DateField()
+    description = models.CharField(max_length=255)
+    source_type = models.CharField(max_length=20, choices=SOURCE_CHOICES, default='manual')
+    source_id = models.BigIntegerField(null=True, blank=True)
+    reversal_of = models.OneToOneField(
+        'self', on_delete=models.RESTRICT, null=True, blank=True, related_name='reversed_by'
+    )
+    posted_by = models.ForeignKey('accounts.User', on_delete=models.SET_NULL, null=True, blank=True)
+    posted_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-entry_date', '-id']
+        verbose_name_plural = 'Journal entries'
+        indexes = [
+            models.Index(fields=['source_type', 'source_id'], name='ledger_entry_source_idx'),
+            models.Index(fields=['sacco', 'entry_date'], name='ledger_entry_sacco_date_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.entry_date} {self.description}"
+
+    def save(self, *args, **kwargs):
+        if self.pk is not None:
+            raise ValidationError('Journal entries cannot be changed; post a reversal instead.')
+        super().save(*args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        raise ValidationError('Journal entries cannot be deleted; post a reversal instead.')
+
+
+class JournalLine(models.Model):
+    """One debit or credit of a journal entry; entry_date is copied from the entry for balance queries"""
+    entry = models.ForeignKey(JournalEntry, on_delete=models.RESTRICT, related_name='lines')
+    account = models.ForeignKey(LedgerAccount, on_delete=models.RESTRICT, related_name='lines')
+    entry_date = models.DateField()
+    debit = models.DecimalField(max_digits=16, decimal_places=2, default=0)
+    credit = models.DecimalField(max_digits=16, decimal_places=2, default=0)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['account', 'entry_date'], name='ledger_line_account_date_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.account} Dr {self.debit} Cr {self.credit}"
+
+
+class AccountCheckpoint(models.Model):
+    """
+    An account's cumulative debit and credit totals at the end of a day, so
+    balances as of any date only add the lines posted after the checkpoint
+    """
+    account = models.ForeignKey(LedgerAccount, on_delete=models.CASCADE, related_name='checkpoints')
+    as_of = models.DateField()
+    debit_total = models.DecimalField(max_digits=18, decimal_places=2, default=0)
+    credit_total = models.DecimalField(max_digits=18, decimal_places=2, default=0)
+
+    class Meta:
+        ordering = ['account', 'as_of']
+        unique_together = ('account', 'as_of')
+
+    def __str__(self):
+        return f"{self.account} at {self.as_of}"
@@ -0,0 +1,176 @@
+"""
+Posting journal entries
+
+post_entry is the only writer of journal lines. It checks the entry
+balances, writes the entry and its lines, adds them to the running totals of
+the accounts and, for backdated entries, to the checkpoints already taken
+after the entry date. Entries are never edited: sync_source brings the
+journal of an operational record (a savings transaction, loan, repayment,
+funding or expense) in line with it by reversing its current entry and
+posting a new one when they differ.
+"""
+from collections import defaultdict
+from decimal import Decimal
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .balances import bump_ledger_version
+from .chart import chart_accounts
+from .models import AccountCheckpoint, JournalEntry, JournalLine, LedgerAccount
+
+ZERO = Decimal('0')
+
+
+def normalize_lines(lines):
+    """[(code, debit, credit)] as Decimals, without empty lines, in a stable order"""
+    normalized = []
+    for code, debit, credit in lines:
+        debit, credit = Decimal(debit or 0), Decimal(credit or 0)
+        if debit < 0 or credit < 0:
+            raise ValidationError(f'Negative amount on account {code}.')
+        if debit or credit:
+            normalized.append((code, debit.quantize(Decimal('0.01')), credit.quantize(Decimal('0.01'))))
+    return sorted(normalized)
+
+
+def post_entry(sacco_id, entry_date, description, lines, source_type='manual', source_id=None,
+               posted_by_id=None, reversal_of=None):
+    """
+    Post a balanced journal entry; lines are (account code, debit, credit)
+
+    Raises ValidationError if the entry does not balance or is empty.
+    """
+    lines = normalize_lines(lines)
+    debits, credits = sum(line[1] for line in lines), sum(line[2] for line in lines)
+    if not lines or debits != credits:
+        raise ValidationError(f'Journal entry does not balance: debits {debits}, credits {credits}.')
+    accounts = chart_accounts(sacco_id)
+    unknown = [code for code, _, _ in lines if code not in accounts]
+    if unknown:
+        raise ValidationError(f'Unknown ledger account(s): {", ".join(unknown)}.')
+
+    with transaction.atomic():
+        entry = JournalEntry.objects.create(
+            sacco_id=sacco_id, entry_date=entry_date, description=description[:255],
+            source_type=source_type, source_id=source_id, posted_by_id=posted_by_id, reversal_of=reversal_of,
+        )
+        JournalLine.objects.bulk_create([
+            JournalLine(entry=entry, account_id=accounts[code], entry_date=entry_date, debit=debit, credit=credit)
+            for code, debit, credit in lines
+        ])
+        totals = defaultdict(lambda: [ZERO, ZERO])
+        for code, debit, credit in lines:
+            totals[accounts[code]][0] += debit
+            totals[accounts[code]][1] += credit
+        backdated = entry_date < timezone.localdate()
+        for account_id, (debit, credit) in totals.items():
+            changes = {'debit_total': F('debit_total') + debit, 'credit_total': F('credit_total') + credit}
+            LedgerAccount.objects.filter(pk=account_id).update(**changes)
+            if backdated:
+                AccountCheckpoint.objects.filter(account_id=account_id, as_of__gte=entry_date).update(**changes)
+    bump_ledger_version(sacco_id)
+    return entry
+
+
+def entry_lines(entry):
+    return normalize_lines(entry.lines.values_list('account__code', 'debit', 'credit'))
+
+
+def reverse_entry(entry, entry_date=None, posted_by_id=None):
+    """Cancel an entry with one that swaps its debits and credits, dated today by default"""
+    return post_entry(
+        entry.sacco_id,
+        entry_date or timezone.localdate(),
+        f'Reversal of: {entry.description}',
+        [(code, credit, debit) for code, debit, credit in entry_lines(entry)],
+        source_type=entry.source_type,
+        source_id=entry.source_id,
+        posted_by_id=posted_by_id,
+        reversal_of=entry,
+    )
+
+
+def current_entry(source_type, source_id):
+    """The entry standing for a record: neither a reversal nor reversed"""
+    return (
+        JournalEntry.objects.filter(
+            source_type=source_type, source_id=source_id, reversal_of__isnull=True, reversed_by__isnull=True
+        )
+        .order_by('-id')
+        .first()
+    )
+
+
+def sync_source(source_type, source_id, journal, posted_by_id=None):
+    """
+    Make the journal of a record match what it should be
+
+    journal is (sacco_id, entry_date, description, lines) as built by
+    ledger.journals, or None when the record should not be in the ledger
+    (e.g. deleted, or a loan not yet disbursed). Returns the current entry.
+    """
+    current = current_entry(source_type, source_id)
+    if journal is not None:
+        sacco_id, entry_date, description, lines = journal
+        if (
+            current is not None and current.sacco_id == sacco_id and current.entry_date == entry_date
+            and entry_lines(current) == normalize_lines(lines)
+        ):
+            return current
+    with transaction.atomic():
+        if current is not None:
+            reverse_entry(current, posted_by_id=posted_by_id)
+        if journal is None:
+            return None
+        return post_entry(sacco_id, entry_date, description, lines, source_type, source_id, posted_by_id)
+
+
+def post_entries_bulk(items):
+    """
+    Post many record journals at once, for backfills: items are
+    (source_type, source_id, journal) with journal as for sync_source.
+    Entries and lines are bulk inserted and running totals updated once per
+    account; checkpoints are not touched. Returns the number of entries.
+    """
+    prepared = []
+    for source_type, source_id, journal in items:
+        if journal is None:
+            continue
+        sacco_id, entry_date, description, lines = journal
+        lines = normalize_lines(lines)
+        if not lines or sum(line[1] for line in lines) != sum(line[2] for line in lines):
+            raise ValidationError(f'Journal of {source_type} {source_id} does not balance.')
+        prepared.append((source_type, source_id, sacco_id, entry_date, description, lines))
+    if not prepared:
+        return 0
+
+    accounts = {sacco_id: chart_accounts(sacco_id) for sacco_id in {item[2] for item in prepared}}
+    totals = defaultdict(lambda: [ZERO, ZERO])
+    with transaction.atomic():
+        entries = JournalEntry.objects.bulk_create([
+            JournalEntry(
+                sacco_id=sacco_id, entry_date=entry_date, description=description[:255],
+                source_type=source_type, source_id=source_id,
+            )
+            for source_type, source_id, sacco_id, entry_date, description, _ in prepared
+        ])
+        journal_lines = []
+        for entry, (_, _, sacco_id, entry_date, _, lines) in zip(entries, prepared):
+            for code, debit, credit in lines:
+                account_id = accounts[sacco_id][code]
+                journal_lines.append(JournalLine(
+                    entry_id=entry.pk, account_id=account_id, entry_date=entry_date, debit=debit, credit=credit
+                ))
+                totals[account_id][0] += debit
+                totals[account_id][1] += credit
+        JournalLine.objects.bulk_create(journal_lines, batch_size=1000)
+        for account_id, (debit, credit) in totals.items():
+            LedgerAccount.objects.filter(pk=account_id).update(
+                debit_total=F('debit_total') + debit, credit_total=F('credit_total') + credit
+            )
+    for sacco_id in accounts:
+        bump_ledger_version(sacco_id)
+    return len(entries)
@@ -0,0 +1,68 @@
+"""
+Signal handlers for the ledger app: savings, loan, funding and expense
+records are journalled as they are saved
+"""
+from django.db.models.signals import post_delete, post_save
+
+from accounts.models import Sacco
+from expenses.models import Expense
+from funding.models import Funding
+from loans.models import Loan, LoanRepayment
+from savings.models import SavingsTransaction
+
+from . import journals
+from .posting import sync_source
+
+
+def journal_savings_transaction(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    sync_source('savings', instance.pk, journals.savings_journal(instance, instance.sacco_id))
+
+
+def journal_disbursement(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    journal = None
+    if instance.disbursement_date is not None:
+        journal = journals.disbursement_journal(instance, instance.sacco_id)
+    sync_source('loan_disbursement', instance.pk, journal, instance.disbursed_by_id)
+
+
+def journal_repayment(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    sync_source('loan_repayment', instance.pk, journals.repayment_journal(instance, instance.sacco_id), instance.received_by_id)
+
+
+def journal_funding(sender, instance, raw=False, **kwargs):
+    if not raw:
+        sync_source('funding', instance.pk, journals.funding_journal(instance), instance.created_by_id)
+
+
+def journal_expense(sender, instance, raw=False, **kwargs):
+    if not raw:
+        sync_source('expense', instance.pk, journals.expense_journal(instance), instance.created_by_id)
+
+
+def reverse_deleted(source_type):
+    def handler(sender, instance, origin=None, **kwargs):
+        # A Sacco being deleted takes its whole journal with it
+        if isinstance(origin, Sacco) or getattr(origin, 'model', None) is Sacco:
+            return
+        sync_source(source_type, instance.pk, None)
+    return handler
+
+
+post_save.connect(journal_savings_transaction, sender=SavingsTransaction, dispatch_uid='ledger_save_SavingsTransaction')
+post_save.connect(journal_disbursement, sender=Loan, dispatch_uid='ledger_save_Loan')
+post_save.connect(journal_repayment, sender=LoanRepayment, dispatch_uid='ledger_save_LoanRepayment')
+post_save.connect(journal_funding, sender=Funding, dispatch_uid='ledger_save_Funding')
+post_save.connect(journal_expense, sender=Expense, dispatch_uid='ledger_save_Expense')
+
+# Savings transactions and loans only on save, so their bulk deletes stay
+# single DELETE statements (see reports/signals.py); backfill_ledger reverses
+# the entries of deleted ones
+post_delete.connect(reverse_deleted('loan_repayment'), sender=LoanRepayment, weak=False, dispatch_uid='ledger_delete_LoanRepayment')
+post_delete.connect(reverse_deleted('funding'), sender=Funding, weak=False, dispatch_uid='ledger_delete_Funding')
+post_delete.connect(reverse_deleted('expense'), sender=Expense, weak=False, dispatch_uid='ledger_delete_Expense')
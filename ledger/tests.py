@@ -0,0 +1,150 @@
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+
+from accounts.models import Region, Sacco
+from . import chart
+from .balances import balance_sheet, current_net_assets, trial_balance, write_checkpoints
+from .models import JournalEntry, JournalLine, LedgerAccount
+from .posting import current_entry, post_entry
+
+
+class LedgerTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        from expenses.models import ExpenseCategory
+        from members.models import Member
+        from savings.models import SavingProduct, SavingsAccount
+        region = Region.objects.create(name="Ledger Region")
+        self.sacco = Sacco.objects.create(
+            name="Ledger Sacco", registration_number="LEDG001", address="Address",
+            phone="1234567890", email="ledger@sacco.com", region=region
+        )
+        member = Member.objects.create(
+            sacco=self.sacco, member_number="LEDG-M1", first_name="Test", last_name="Saver",
+            phone="1234567890", gender="Female", date_of_birth="1990-01-01", home_address="Address",
+            village_town="Town", district="District", date_joined="2024-01-01"
+        )
+        product = SavingProduct.objects.create(sacco=self.sacco, name="Ordinary", product_code="LEDG-ORD")
+        self.account = SavingsAccount.objects.create(member=member, product=product, account_number="SA-LEDG-1")
+        self.category = ExpenseCategory.objects.create(sacco=self.sacco, name="Rent")
+
+    def deposit(self, amount, txn_type='Deposit'):
+        from savings.models import SavingsTransaction
+        return SavingsTransaction.objects.create(
+            account=self.account, txn_type=txn_type, amount=Decimal(amount), running_balance=Decimal('0')
+        )
+
+    def balances(self, as_of=None):
+        return {row['code']: row['balance'] for row in trial_balance(self.sacco.pk, as_of)['rows']}
+
+    def test_posting_checks_balance(self):
+        with self.assertRaises(ValidationError):
+            post_entry(self.sacco.pk, timezone.localdate(), 'Broken', [(chart.CASH, 100, 0), (chart.FEE_INCOME, 0, 90)])
+        self.assertFalse(JournalEntry.objects.exists())
+
+        entry = post_entry(self.sacco.pk, timezone.localdate(), 'Fee', [(chart.CASH, 100, 0), (chart.FEE_INCOME, 0, 100)])
+        cash = LedgerAccount.objects.get(sacco=self.sacco, code=chart.CASH)
+        self.assertEqual((cash.debit_total, cash.balance), (100, 100))
+        with self.assertRaises(ValidationError):
+            entry.save()
+
+    def test_records_are_journalled_and_edits_reverse(self):
+        from expenses.models import Expense
+        txn = self.deposit('500')
+        Expense.objects.create(
+            sacco=self.sacco, category=self.category, amount=Decimal('80'), description="Office rent",
+            expense_date=timezone.localdate()
+        )
+        txn.amount = Decimal('450')
+        txn.save()
+
+        entries = JournalEntry.objects.filter(source_type='savings', source_id=txn.pk)
+        self.assertEqual(entries.count(), 3)
+        self.assertEqual(current_entry('savings', txn.pk).lines.get(account__code=chart.MEMBER_SAVINGS).credit, 450)
+        # Saving unchanged posts nothing
+        txn.save()
+        self.assertEqual(entries.count(), 3)
+
+        report = trial_balance(self.sacco.pk)
+        self.assertTrue(report['balanced'])
+        balances = self.balances()
+        self.assertEqual((balances[chart.CASH], balances[chart.MEMBER_SAVINGS]), (370, 450))
+
+        sheet = balance_sheet([self.sacco.pk])
+        self.assertEqual(sheet['total_assets'], sheet['total_liabilities'] + sheet['total_equity'])
+        self.assertEqual((sheet['current_earnings'], sheet['net_assets']), (-80, -80))
+        with self.assertNumQueries(1):
+            self.assertEqual(current_net_assets(), sheet['net_assets'])
+
+    def test_trial_balance_is_cached_until_next_posting(self):
+        self.deposit('200')
+        trial_balance(self.sacco.pk)
+        with self.assertNumQueries(0):
+            trial_balance(self.sacco.pk)
+        self.deposit('50')
+        self.assertEqual(self.balances()[chart.MEMBER_SAVINGS], 250)
+
+        # Bumped again on commit, past what other requests cached before it
+        from .balances import get_ledger_version
+        with self.captureOnCommitCallbacks(execute=True):
+            self.deposit('10')
+            during = get_ledger_version(self.sacco.pk)
+        self.assertNotEqual(get_ledger_version(self.sacco.pk), during)
+
+    def test_past_balances_from_checkpoint_and_delta(self):
+        today = timezone.localdate()
+        days = [today - timedelta(days=n) for n in (10, 6, 3)]
+        for day, amount in zip(days, (100, 40, 7)):
+            post_entry(self.sacco.pk, day, 'Deposit', [(chart.CASH, amount, 0), (chart.MEMBER_SAVINGS, 0, amount)])
+        write_checkpoints(today - timedelta(days=5))
+        self.assertEqual(self.balances(today - timedelta(days=4))[chart.CASH], 140)
+        self.assertEqual(self.balances(today - timedelta(days=1))[chart.CASH], 147)
+
+        # A backdated entry also moves the checkpoints after it
+        post_entry(self.sacco.pk, days[0], 'Late', [(chart.CASH, 5, 0), (chart.MEMBER_SAVINGS, 0, 5)])
+        self.assertEqual(self.balances(today - timedelta(days=5))[chart.CASH], 145)
+        self.assertEqual(self.balances(today - timedelta(days=11)).get(chart.CASH, 0), 0)
+
+    def test_backfill_is_idempotent(self):
+        from savings.models import SavingsTransaction
+        self.deposit('300')
+        self.deposit('25', 'Fee')
+        # Records loaded without signals, dated last year
+        JournalLine.objects.all().delete()
+        JournalEntry.objects.all().delete()
+        LedgerAccount.objects.update(debit_total=0, credit_total=0)
+        moment = timezone.make_aware(datetime(2025, 6, 1, 10))
+        SavingsTransaction.objects.update(performed_at=moment)
+
+        call_command('backfill_ledger', stdout=StringIO())
+        call_command('backfill_ledger', stdout=StringIO())
+        self.assertEqual(JournalEntry.objects.count(), 2)
+        self.assertEqual(self.balances()[chart.MEMBER_SAVINGS], 275)
+        self.assertEqual(self.balances(date(2025, 5, 31)).get(chart.MEMBER_SAVINGS, 0), 0)
+        self.assertEqual(self.balances(date(2025, 6, 1))[chart.FEE_INCOME], 25)
+
+    def test_backfill_reverses_deleted_but_not_archived_records(self):
+        from archive.archiver import archive_savings_transactions
+        from savings.models import SavingsTransaction
+        self.deposit('300')
+        deleted = self.deposit('50')
+        archived = self.deposit('20')
+        SavingsTransaction.objects.filter(pk=archived.pk).update(performed_at=timezone.make_aware(datetime(2015, 1, 5)))
+        archive_savings_transactions(date(2016, 1, 1))
+        deleted.delete()
+        self.assertEqual(self.balances()[chart.MEMBER_SAVINGS], 370)
+
+        call_command('backfill_ledger', stdout=StringIO())
+        self.assertIsNone(current_entry('savings', deleted.pk))
+        self.assertIsNotNone(current_entry('savings', archived.pk))
+        self.assertEqual(self.balances()[chart.MEMBER_SAVINGS], 320)
+        # Nothing left to reverse on the next run
+        call_command('backfill_ledger', stdout=StringIO())
+        self.assertEqual(JournalEntry.objects.count(), 4)
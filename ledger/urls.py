@@ -0,0 +1,7 @@
+from django.urls import path
+from . import views
+
+urlpatterns = [
+    path('trial-balance/', views.trial_balance, name='ledger_trial_balance'),
+    path('balance-sheet/', views.balance_sheet, name='ledger_balance_sheet'),
+]
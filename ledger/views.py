@@ -0,0 +1,59 @@
+from datetime import date
+
+from django.contrib import messages
+from django.shortcuts import redirect, render
+
+from accounts.decorators import sacco_admin_required, use_read_replica
+
+from .balances import balance_sheet as build_balance_sheet
+from .balances import trial_balance as build_trial_balance
+
+
+def _selected_sacco(request):
+    """The Sacco in ?sacco= if the user may see it, else their own, else the first they can access"""
+    from accounts.permissions import get_accessible_saccos
+
+    saccos = get_accessible_saccos(request.user).filter(is_active=True).order_by('name')
+    sacco_id = request.GET.get('sacco')
+    if sacco_id and sacco_id.isdigit():
+        sacco = saccos.filter(pk=sacco_id).first()
+        if sacco is not None:
+            return sacco, saccos
+    if request.user.sacco_id and saccos.filter(pk=request.user.sacco_id).exists():
+        return request.user.sacco, saccos
+    return saccos.first(), saccos
+
+
+def _as_of(request):
+    try:
+        return date.fromisoformat(request.GET.get('as_of', ''))
+    except ValueError:
+        return None
+
+
+@sacco_admin_required
+@use_read_replica
+def trial_balance(request):
+    sacco, saccos = _selected_sacco(request)
+    if sacco is None:
+        messages.error(request, 'No Sacco assigned to your account. Please contact your administrator.')
+        return redirect('dashboard')
+    return render(request, 'ledger/trial_balance.html', {
+        'sacco': sacco,
+        'saccos': saccos,
+        'report': build_trial_balance(sacco.pk, _as_of(request)),
+    })
+
+
+@sacco_admin_required
+@use_read_replica
+def balance_sheet(request):
+    sacco, saccos = _selected_sacco(request)
+    if sacco is None:
+        messages.error(request, 'No Sacco assigned to your account. Please contact your administrator.')
+        return redirect('dashboard')
+    return render(request, 'ledger/balance_sheet.html', {
+        'sacco': sacco,
+        'saccos': saccos,
+        'report': build_balance_sheet([sacco.pk], _as_of(request)),
+    })
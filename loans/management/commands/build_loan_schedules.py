@@ -0,0 +1,42 @@
+"""
+Management command to create installment schedules (see loans/schedule.py)
+for disbursed loans that do not have one yet, e.g. loans disbursed before
+schedules existed. Needed for the portfolio at risk report.
+"""
+from django.core.management.base import BaseCommand
+
+from loans.models import Loan
+from loans.schedule import build_schedules
+
+
+class Command(BaseCommand):
+    help = 'Create installment schedules for disbursed loans that have none'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sacco', type=int, help='Only loans of this Sacco id')
+        parser.add_argument(
+            '--rebuild',
+            action='store_true',
+            help='Replace existing schedules as well'
+        )
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        from reports.par import bump_par_version
+
+        loans = Loan.objects.filter(disbursement_date__isnull=False)
+        if options['sacco']:
+            loans = loans.filter(sacco_id=options['sacco'])
+        if not options['rebuild']:
+            loans = loans.filter(installments__isnull=True)
+
+        scheduled, skipped, sacco_ids = build_schedules(
+            loans,
+            batch_size=options['batch_size'],
+            progress=lambda done, total: self.stdout.write(f'{done}/{total} loans processed'),
+        )
+        for sacco_id in sacco_ids:
+            bump_par_version(sacco_id)
+        self.stdout.write(self.style.SUCCESS(
+            f'Scheduled {scheduled} loan(s); skipped {skipped} without amount, term or disbursement date'
+        ))
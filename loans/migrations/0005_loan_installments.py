@@ -0,0 +1,47 @@
+# Generated by Django 4.2.7 on 2026-10-18 23:46
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('loans', '0004_loan_closed_by'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LoanInstallment',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('number', models.PositiveIntegerField()),
+                ('due_date', models.DateField()),
+                ('principal_due', models.DecimalField(decimal_places=2, max_digits=14)),
+                ('interest_due', models.DecimalField(decimal_places=2, max_digits=14)),
+                ('amount_due', models.DecimalField(decimal_places=2, max_digits=14)),
+                ('cumulative_due', models.DecimalField(decimal_places=2, max_digits=14)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'ordering': ['loan', 'number'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='loanrepayment',
+            index=models.Index(fields=['loan', 'payment_date'], name='loans_repay_loan_date_idx'),
+        ),
+        migrations.AddField(
+            model_name='loaninstallment',
+            name='loan',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='installments', to='loans.loan'),
+        ),
+        migrations.AddIndex(
+            model_name='loaninstallment',
+            index=models.Index(fields=['loan', 'due_date'], name='loans_inst_loan_due_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='loaninstallment',
+            unique_together={('loan', 'number')},
+        ),
+    ]
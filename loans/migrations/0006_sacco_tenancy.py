@@ -0,0 +1,37 @@
+# Generated by Django 4.2.7 on 2026-10-19 01:03
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0002_district_sacco_district'),
+        ('loans', '0005_loan_installments'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='loan',
+            name='sacco',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='accounts.sacco'),
+        ),
+        migrations.AddField(
+            model_name='loanrepayment',
+            name='sacco',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='accounts.sacco'),
+        ),
+        migrations.AddIndex(
+            model_name='loan',
+            index=models.Index(fields=['sacco', 'status'], name='loans_loan_sacco_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='loan',
+            index=models.Index(fields=['sacco', 'application_date'], name='loans_loan_sacco_applied_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='loanrepayment',
+            index=models.Index(fields=['sacco', 'payment_date'], name='loans_repay_sacco_date_idx'),
+        ),
+    ]
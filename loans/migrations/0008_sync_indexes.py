@@ -0,0 +1,21 @@
+# Generated by Django 4.2.7 on 2026-10-19 01:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('loans', '0007_backfill_sacco'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='loan',
+            index=models.Index(fields=['sacco', 'updated_at', 'id'], name='loans_loan_sacco_updated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='loanrepayment',
+            index=models.Index(fields=['sacco', 'updated_at', 'id'], name='loans_repay_sacco_updated_idx'),
+        ),
+    ]
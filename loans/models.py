@@ -1,6 +1,7 @@
 from django.db import models
 from django.utils import timezone
 from accounts.models import Sacco
+from accounts.tenancy import TenantManager
 from members.models import Member
 import uuid
 
@@ -47,6 +48,8 @@ class Loan(models.Model):
     ]
     
     member = models.ForeignKey(Member, on_delete=models.CASCADE)
+    # The member's Sacco, copied on save so scoped queries need no join (accounts/tenancy.py)
+    sacco = models.ForeignKey(Sacco, on_delete=models.CASCADE, null=True, blank=True, editable=False, related_name='+')
     product = models.ForeignKey(LoanProduct, on_delete=models.CASCADE)
     loan_ref = models.CharField(max_length=50, unique=True, null=True, blank=True, help_text="Human-friendly loan reference")
     loan_number = models.CharField(max_length=50, unique=True, null=True, blank=True)
@@ -81,8 +84,19 @@ class Loan(models.Model):
     created_by = models.ForeignKey('accounts.User', on_delete=models.SET_NULL, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+
+    objects = TenantManager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['sacco', 'status'], name='loans_loan_sacco_status_idx'),
+            models.Index(fields=['sacco', 'application_date'], name='loans_loan_sacco_applied_idx'),
+            models.Index(fields=['sacco', 'updated_at', 'id'], name='loans_loan_sacco_updated_idx'),
+        ]
     
     def save(self, *args, **kwargs):
+        if self.sacco_id is None and self.member_id:
+            self.sacco_id = self.member.sacco_id
         if not self.loan_number:
             # Generate loan number: SACCO-YYYY-XXXXX
             year = timezone.now().year
@@ -157,6 +171,7 @@ class Loan(models.Model):
 
 class LoanRepayment(models.Model):
     loan = models.ForeignKey(Loan, on_delete=models.CASCADE, related_name='repayments')
+    sacco = models.ForeignKey(Sacco, on_delete=models.CASCADE, null=True, blank=True, editable=False, related_name='+')
     amount = models.DecimalField(max_digits=14, decimal_places=2)
     applied_to_principal = models.DecimalField(max_digits=14, decimal_places=2, default=0)
     applied_to_interest = models.DecimalField(max_digits=14, decimal_places=2, default=0)
@@ -171,10 +186,52 @@ class LoanRepayment(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    objects = TenantManager()
+
+    class Meta:
+        indexes = [
+            # Repayments of a loan up to a date, see reports/par.py
+            models.Index(fields=['loan', 'payment_date'], name='loans_repay_loan_date_idx'),
+            models.Index(fields=['sacco', 'payment_date'], name='loans_repay_sacco_date_idx'),
+            models.Index(fields=['sacco', 'updated_at', 'id'], name='loans_repay_sacco_updated_idx'),
+        ]
+
+    def save(self, *args, **kwargs):
+        if self.sacco_id is None and self.loan_id:
+            self.sacco_id = self.loan.sacco_id or self.loan.member.sacco_id
+        super().save(*args, **kwargs)
+
     def __str__(self):
         return f"{self.loan} - {self.amount}"
 
 
+class LoanInstallment(models.Model):
+    """
+    One scheduled installment of a disbursed loan (see loans/schedule.py).
+    cumulative_due is the total due up to and including this installment, so the
+    oldest unpaid installment is the first one whose cumulative_due exceeds the
+    amount repaid.
+    """
+    loan = models.ForeignKey(Loan, on_delete=models.CASCADE, related_name='installments')
+    number = models.PositiveIntegerField()
+    due_date = models.DateField()
+    principal_due = models.DecimalField(max_digits=14, decimal_places=2)
+    interest_due = models.DecimalField(max_digits=14, decimal_places=2)
+    amount_due = models.DecimalField(max_digits=14, decimal_places=2)
+    cumulative_due = models.DecimalField(max_digits=14, decimal_places=2)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['loan', 'number']
+        unique_together = ('loan', 'number')
+        indexes = [
+            models.Index(fields=['loan', 'due_date'], name='loans_inst_loan_due_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.loan} - installment {self.number}"
+
+
 class LoanCollateral(models.Model):
     """Collateral and security information for loans"""
     COLLATERAL_TYPE_CHOICES = [
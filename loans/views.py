@@ -1,10 +1,11 @@
 from django.shortcuts import render, redirect, get_object_or_404
+from django.http import Http404
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from django.db.models import Q, Sum, Count, Avg
 from django.utils import timezone
 from django.urls import reverse
-from accounts.decorators import sacco_admin_required, admin_or_member_owner_required
+from accounts.decorators import sacco_admin_required, admin_or_member_owner_required, use_read_replica
 from accounts.permissions import filter_queryset_by_user_scope, can_access_member_data, get_accessible_saccos
 from accounts.models import Sacco
 from notifications.services import NotificationService
@@ -81,7 +82,7 @@ def add_loan(request):
 
 @sacco_admin_required
 def edit_loan(request, loan_id):
-    loan = get_object_or_404(Loan, id=loan_id, member__sacco=request.user.sacco)
+    loan = get_object_or_404(Loan, id=loan_id, sacco=request.user.sacco)
     
     if request.method == 'POST':
         form = LoanForm(request.POST, instance=loan)
@@ -138,7 +139,7 @@ def loans_overview(request):
     # Build summary by sacco
     sacco_summaries = []
     for sacco in accessible_saccos:
-        sacco_loans = all_loans.filter(member__sacco=sacco)
+        sacco_loans = all_loans.filter(sacco=sacco)
         total_loans = sacco_loans.count()
         pending = sacco_loans.filter(status=LOAN_STATUS_PENDING_APPROVAL).count()
         approved = sacco_loans.filter(status=LOAN_STATUS_APPROVED).count()
@@ -181,6 +182,7 @@ def loans_overview(request):
 
 
 @sacco_admin_required
+@use_read_replica
 def view_all_loans(request):
     # Get accessible saccos for selector
     accessible_saccos = get_accessible_saccos(request.user)
@@ -208,7 +210,7 @@ def view_all_loans(request):
             selected_sacco = Sacco.objects.get(id=selected_sacco_id)
             # Verify user has access to this sacco
             if selected_sacco in accessible_saccos:
-                loans = loans.filter(member__sacco=selected_sacco)
+                loans = loans.filter(sacco=selected_sacco)
         except Sacco.DoesNotExist:
             pass
     
@@ -398,13 +400,32 @@ def repayments(request):
 
 @admin_or_member_owner_required
 def loan_profile(request, loan_id):
-    loan = get_object_or_404(Loan, id=loan_id)
+    from archive.reads import archived_loan
+
+    loan = Loan.objects.filter(id=loan_id).first()
+    archived = None
+    if loan is None:
+        # Loans moved to cold storage stay viewable for audits
+        archived = archived_loan(loan_id)
+        if archived is None:
+            raise Http404('Loan not found')
+        loan, repayments = archived
+        total_repaid = sum(repayment.amount for repayment in repayments)
     
+    from members.models import Member
+    try:
+        member = loan.member
+    except Member.DoesNotExist:
+        # Archived loans outlive their members; with no member there is no one to check access against
+        raise Http404('Loan not found')
+
     # Additional permission check for loan access
-    if not can_access_member_data(request.user, loan.member):
+    if not can_access_member_data(request.user, member):
         messages.error(request, 'Access denied. You can only view your own loan details.')
         return redirect('dashboard')
-    repayments = loan.repayments.all().order_by('-payment_date')
+    if archived is None:
+        repayments = loan.repayments.all().order_by('-payment_date')
+        total_repaid = loan.total_repayments
     breadcrumbs = [
         {'name': 'Loans', 'url': 'view_all_loans'},
         {'name': 'Loan Profile', 'url': ''}
@@ -412,6 +433,9 @@ def loan_profile(request, loan_id):
     return render(request, 'loans/loan_profile.html', {
         'loan': loan,
         'repayments': repayments,
+        'total_repaid': total_repaid,
+        'remaining_balance': max(0, loan.total_amount - total_repaid),
+        'archived': archived is not None,
         'breadcrumbs': breadcrumbs,
     })
 
@@ -475,7 +499,7 @@ def edit_loan_product(request, product_id):
 @sacco_admin_required
 def approve_loan(request, loan_id):
     """Approve a loan application"""
-    loan = get_object_or_404(Loan, id=loan_id, member__sacco=request.user.sacco)
+    loan = get_object_or_404(Loan, id=loan_id, sacco=request.user.sacco)
     
     if loan.status != LOAN_STATUS_PENDING_APPROVAL:
         messages.error(request, 'This loan cannot be approved.')
@@ -505,7 +529,7 @@ def approve_loan(request, loan_id):
 @sacco_admin_required
 def reject_loan(request, loan_id):
     """Reject a loan application"""
-    loan = get_object_or_404(Loan, id=loan_id, member__sacco=request.user.sacco)
+    loan = get_object_or_404(Loan, id=loan_id, sacco=request.user.sacco)
     
     if loan.status != LOAN_STATUS_PENDING_APPROVAL:
         messages.error(request, 'This loan cannot be rejected.')
@@ -533,15 +557,18 @@ def reject_loan(request, loan_id):
 @sacco_admin_required
 def disburse_loan(request, loan_id):
     """Disburse an approved loan"""
-    loan = get_object_or_404(Loan, id=loan_id, member__sacco=request.user.sacco)
+    loan = get_object_or_404(Loan, id=loan_id, sacco=request.user.sacco)
     
     if loan.status != LOAN_STATUS_APPROVED:
         messages.error(request, 'This loan cannot be disbursed.')
         return redirect('loan_profile', loan_id=loan_id)
     
+    from .schedule import generate_schedule
+
     loan.status = LOAN_STATUS_DISBURSED
     loan.disbursed_by = request.user
-    loan.disbursed_at = timezone.now()
+    loan.disbursement_date = timezone.now()
+    generate_schedule(loan)
     loan.save()
     
     # Send notification to member
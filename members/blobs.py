@@ -0,0 +1,209 @@
+"""
+Content-addressed storage for member attachments and documents
+
+Uploads to the attachment fields of Member and to Document.file are hashed
+(SHA-256) while they are streamed to disk in chunks and stored once under
+blobs/<aa>/<bb>/<digest><ext>: uploading the same ID scan or receipt again
+points at the existing file instead of writing a copy.
+
+Because files are shared, deleting a field's file never removes the blob.
+Every blob has a StoredBlob row whose ref_count counts the model fields
+pointing at it, maintained by the members signal handlers; the
+cleanup_document_blobs command removes blobs nobody references any more
+(after a grace period covering uploads not yet saved on a model), recounts
+references after bulk changes, and moves files stored before this layer
+existed into the blob store.
+"""
+import hashlib
+import os
+import tempfile
+from collections import Counter
+from datetime import timedelta
+
+from django.core.files.storage import FileSystemStorage
+from django.db.models import F, Q
+from django.utils import timezone
+
+BLOB_DIR = 'blobs'
+
+# Model label: file fields stored as blobs
+BLOB_FIELDS = {
+    'members.Member': (
+        'attachment_id_copy',
+        'attachment_passport_photo',
+        'attachment_proof_initial_deposit',
+        'attachment_recommendation_letter',
+    ),
+    'members.Document': ('file',),
+}
+
+# Unreferenced blobs younger than this may belong to an upload in progress
+GRACE_PERIOD = timedelta(days=1)
+
+
+def is_blob(name):
+    return bool(name) and name.startswith(f'{BLOB_DIR}/')
+
+
+class BlobStorage(FileSystemStorage):
+    """FileSystemStorage that names files after their content"""
+
+    def get_available_name(self, name, max_length=None):
+        # The final name comes from the content, see _save
+        return name
+
+    def _save(self, name, content):
+        from .models import StoredBlob
+
+        tmp_dir = self.path(f'{BLOB_DIR}/tmp')
+        os.makedirs(tmp_dir, exist_ok=True)
+        digest, size = hashlib.sha256(), 0
+        # Same filesystem as the blobs, so the final move is an atomic rename
+        with tempfile.NamedTemporaryFile(dir=tmp_dir, delete=False) as tmp:
+            if getattr(content, 'seekable', None) and content.seekable():
+                content.seek(0)
+            for chunk in content.chunks():
+                digest.update(chunk)
+                tmp.write(chunk)
+                size += len(chunk)
+        digest = digest.hexdigest()
+        extension = os.path.splitext(name)[1].lower()
+        blob_name = f'{BLOB_DIR}/{digest[:2]}/{digest[2:4]}/{digest}{extension}'
+
+        path = self.path(blob_name)
+        if os.path.exists(path):
+            os.remove(tmp.name)
+        else:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            os.replace(tmp.name, path)
+            if self.file_permissions_mode is not None:
+                os.chmod(path, self.file_permissions_mode)
+        blob, created = StoredBlob.objects.get_or_create(name=blob_name, defaults={'digest': digest, 'size': size})
+        if not created and blob.ref_count <= 0:
+            # Restart the grace period so cleanup does not remove it before
+            # the upload is saved on its model
+            StoredBlob.objects.filter(pk=blob.pk).update(released_at=timezone.now())
+        return blob_name
+
+    def delete(self, name):
+        # Blobs are shared; unreferenced ones are removed by collect_garbage
+        if not is_blob(name):
+            super().delete(name)
+
+    def purge(self, name):
+        super().delete(name)
+
+
+_storage = None
+
+
+def get_blob_storage():
+    global _storage
+    if _storage is None:
+        _storage = BlobStorage()
+    return _storage
+
+
+def blob_names(instance):
+    """Blob names referenced by a model instance"""
+    fields = BLOB_FIELDS.get(instance._meta.label, ())
+    return [name for name in (getattr(instance, field).name for field in fields) if is_blob(name)]
+
+
+def _adjust(names, delta):
+    from .models import StoredBlob
+
+    changes = {}
+    for name, count in Counter(names).items():
+        changes.setdefault(count * delta, []).append(name)
+    for change, group in changes.items():
+        updates = {'ref_count': F('ref_count') + change}
+        if delta < 0:
+            updates['released_at'] = timezone.now()
+        StoredBlob.objects.filter(name__in=group).update(**updates)
+
+
+def acquire(names):
+    _adjust([name for name in names if is_blob(name)], 1)
+
+
+def release(names):
+    _adjust([name for name in names if is_blob(name)], -1)
+
+
+def _referencing_rows():
+    """(model, field, queryset of (pk, name)) for every blob-backed field"""
+    from django.apps import apps
+
+    for label, fields in BLOB_FIELDS.items():
+        model = apps.get_model(label)
+        for field in fields:
+            yield model, field, model.objects.exclude(**{f'{field}__isnull': True}).exclude(**{field: ''}).values_list('pk', field)
+
+
+def recount(batch_size=1000):
+    """Recompute every ref_count from the model fields; returns the number corrected"""
+    from .models import StoredBlob
+
+    counts = Counter()
+    for _, _, rows in _referencing_rows():
+        counts.update(name for _, name in rows.iterator(chunk_size=batch_size) if is_blob(name))
+
+    changed = []
+    for blob in StoredBlob.objects.only('pk', 'name', 'ref_count').iterator(chunk_size=batch_size):
+        if blob.ref_count != counts.get(blob.name, 0):
+            blob.ref_count = counts.get(blob.name, 0)
+            blob.released_at = timezone.now()
+            changed.append(blob)
+    StoredBlob.objects.bulk_update(changed, ['ref_count', 'released_at'], batch_size=batch_size)
+    return len(changed)
+
+
+def collect_garbage(grace=GRACE_PERIOD, dry_run=False):
+    """Remove unreferenced blobs older than the grace period; returns (blobs, bytes)"""
+    from .models import StoredBlob
+
+    cutoff = timezone.now() - grace
+    unreferenced = StoredBlob.objects.filter(ref_count__lte=0).filter(
+        Q(released_at__lt=cutoff) | Q(released_at__isnull=True, created_at__lt=cutoff)
+    )
+    removed = freed = 0
+    storage = get_blob_storage()
+    for blob in unreferenced.iterator():
+        if not dry_run:
+            storage.purge(blob.name)
+            blob.delete()
+        removed += 1
+        freed += blob.size
+    return removed, freed
+
+
+def adopt_legacy_files(dry_run=False):
+    """
+    Move files saved before the blob store existed into it, repointing their
+    rows; returns (files moved, bytes freed by deduplication)
+    """
+    from .models import StoredBlob
+
+    storage = get_blob_storage()
+    started = timezone.now()
+    moved = freed = 0
+    adopted = set()
+    for model, field, rows in _referencing_rows():
+        for pk, name in rows.exclude(**{f'{field}__startswith': f'{BLOB_DIR}/'}).iterator():
+            if not storage.exists(name):
+                continue
+            size = storage.size(name)
+            moved += 1
+            if dry_run:
+                continue
+            with storage.open(name, 'rb') as handle:
+                blob_name = storage.save(name, handle)
+            model.objects.filter(pk=pk, **{field: name}).update(**{field: blob_name})
+            acquire([blob_name])
+            storage.purge(name)
+            # A blob that already existed means this file was a duplicate
+            if blob_name in adopted or not StoredBlob.objects.filter(name=blob_name, created_at__gte=started).exists():
+                freed += size
+            adopted.add(blob_name)
+    return moved, freed
@@ -0,0 +1,200 @@
+"""
+Resized variants of member photos and image attachments
+
+Uploads are kept as they were sent; pages show smaller re-encoded copies
+instead: a square 'thumb' for lists and a square 'profile' picture, of the
+photo and of the passport photo attachment. Variants are JPEGs recorded in
+Member.image_variants as
+{field: {'source': upload name, variant: stored name}}, so a variant is
+regenerated only when its upload changes.
+
+Generation runs after the saving transaction commits, on a small background
+thread pool (members/signals.py), never in the request. Templates pick a
+variant with the member_image tag, which falls back to the upload until its
+variants exist. build_member_image_variants backfills existing members.
+
+Variants of KYC attachments are as private as the attachments: they are
+stored under members/attachments/ (denied to direct requests in nginx.conf)
+and served through the member_attachment view. Scanned IDs, deposit proofs
+and recommendation letters get no variants at all.
+"""
+import io
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connection
+from django.db.models import Q
+from django.urls import reverse
+
+logger = logging.getLogger(__name__)
+
+# Variant name: (width, height, crop to fill). Without crop the image is
+# scaled to fit inside the box, keeping its proportions.
+VARIANTS = {
+    'thumb': (64, 64, True),
+    'profile': (240, 240, True),
+}
+
+# Member file fields and the variants they get
+FIELD_VARIANTS = {
+    'photo': ('thumb', 'profile'),
+    'attachment_passport_photo': ('thumb', 'profile'),
+}
+
+# Attachments that used to get variants; their stored copies are removed
+RETIRED_FIELDS = ('attachment_id_copy', 'attachment_proof_initial_deposit', 'attachment_recommendation_letter')
+
+JPEG_QUALITY = 80
+VARIANT_DIR = 'members/variants'
+ATTACHMENT_VARIANT_DIR = 'members/attachments/variants'
+
+_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='member-images')
+
+
+def render_variant(source, variant):
+    """JPEG bytes of an image file resized for a variant"""
+    from PIL import Image, ImageOps
+
+    width, height, crop = VARIANTS[variant]
+    with Image.open(source) as image:
+        image = ImageOps.exif_transpose(image)
+        if crop:
+            image = ImageOps.fit(image, (width, height), Image.LANCZOS)
+        else:
+            image.thumbnail((width, height), Image.LANCZOS)
+        if image.mode in ('RGBA', 'LA', 'P'):
+            image = image.convert('RGBA')
+            background = Image.new('RGB', image.size, 'white')
+            background.paste(image, mask=image.getchannel('A'))
+            image = background
+        elif image.mode != 'RGB':
+            image = image.convert('RGB')
+        buffer = io.BytesIO()
+        image.save(buffer, 'JPEG', quality=JPEG_QUALITY, optimize=True, progressive=True)
+    return buffer.getvalue()
+
+
+def variant_dir(field):
+    return ATTACHMENT_VARIANT_DIR if field.startswith('attachment_') else VARIANT_DIR
+
+
+def stale_fields(member):
+    """
+    File fields whose recorded variants do not belong to the current upload,
+    are stored outside the field's variant directory or should not exist
+    """
+    recorded = member.image_variants or {}
+    stale = [field for field in recorded if field not in FIELD_VARIANTS]
+    for field in FIELD_VARIANTS:
+        name = getattr(member, field).name or ''
+        entry = recorded.get(field) or {}
+        misplaced = any(
+            not path.startswith(variant_dir(field) + '/') for variant, path in entry.items() if variant != 'source'
+        )
+        if entry.get('source', '') != name or misplaced:
+            stale.append(field)
+    return stale
+
+
+def delete_variants(member):
+    """Remove the stored variant files of a member"""
+    for entry in (member.image_variants or {}).values():
+        _delete_files(entry)
+
+
+def _delete_files(entry):
+    for variant, name in (entry or {}).items():
+        if variant != 'source' and name:
+            default_storage.delete(name)
+
+
+def generate_variants(member_id, force=False):
+    """
+    Build the missing or outdated variants of one member
+
+    Returns the names of the fields that were processed.
+    """
+    from .models import Member
+
+    member = Member.objects.filter(pk=member_id).first()
+    if member is None:
+        return []
+    recorded = dict(member.image_variants or {})
+    fields = list(dict.fromkeys([*FIELD_VARIANTS, *recorded])) if force else stale_fields(member)
+    if not fields:
+        return []
+
+    for field in fields:
+        _delete_files(recorded.pop(field, None))
+        if field not in FIELD_VARIANTS:
+            continue
+        upload = getattr(member, field)
+        if not upload.name:
+            continue
+        entry = {'source': upload.name}
+        base = os.path.splitext(os.path.basename(upload.name))[0]
+        try:
+            for variant in FIELD_VARIANTS[field]:
+                with upload.storage.open(upload.name, 'rb') as source:
+                    content = render_variant(source, variant)
+                # Names follow the upload, so a variant lost from image_variants
+                # (e.g. overwritten by a stale save) is replaced, not duplicated
+                path = f'{variant_dir(field)}/{member.pk}/{field}-{base}-{variant}.jpg'
+                default_storage.delete(path)
+                entry[variant] = default_storage.save(path, ContentFile(content))
+        except Exception as exc:
+            # Not an image or an unreadable upload:
+            # recorded without variants so it is not retried on every save
+            logger.info('No variants for member %s %s: %s', member.pk, field, exc)
+            _delete_files(entry)
+            entry = {'source': upload.name}
+        recorded[field] = entry
+
+    # Only if the uploads did not change again meanwhile; update() sends no
+    # signals and leaves updated_at alone
+    unchanged = Q(pk=member.pk)
+    for field in FIELD_VARIANTS:
+        name = getattr(member, field).name
+        unchanged &= Q(**{field: name}) if name else Q(**{field: ''}) | Q(**{f'{field}__isnull': True})
+    Member.objects.filter(unchanged).update(image_variants=recorded)
+    return fields
+
+
+def _run(member_id):
+    try:
+        generate_variants(member_id)
+    except Exception:
+        logger.exception('Generating image variants for member %s failed', member_id)
+    finally:
+        # Pool threads each hold their own connection
+        connection.close()
+
+
+def schedule_variants(member_id):
+    """Generate a member's variants on the background pool"""
+    _executor.submit(_run, member_id)
+
+
+def variant_url(member, variant, field=None):
+    """
+    URL of a member image variant, falling back to the upload itself while
+    the variant is being generated
+
+    Without a field, the photo is used, or else the passport photo attachment.
+    """
+    fields = [field] if field else ['photo', 'attachment_passport_photo']
+    for name in fields:
+        upload = getattr(member, name, None)
+        if not upload:
+            continue
+        entry = (member.image_variants or {}).get(name) or {}
+        ready = entry.get('source') == upload.name and entry.get(variant)
+        if name == 'photo':
+            return default_storage.url(entry[variant]) if ready else upload.url
+        # Attachments and their variants are not public media
+        url = reverse('member_attachment', args=[member.pk, name]) + '?inline=1'
+        return f'{url}&variant={variant}' if ready else url
+    return ''
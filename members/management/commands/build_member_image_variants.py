@@ -0,0 +1,43 @@
+"""
+Management command to generate the resized photo and attachment variants
+(see members/images.py) of members uploaded before variants existed, or whose
+background generation was interrupted by a restart. It also removes variants
+that are no longer kept or moves them to where they now belong.
+"""
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+
+from members.images import FIELD_VARIANTS, RETIRED_FIELDS, generate_variants, stale_fields
+from members.models import Member
+
+
+class Command(BaseCommand):
+    help = 'Generate resized variants of member photos and image attachments'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sacco', type=int, help='Only members of this Sacco id')
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help='Regenerate variants that are already up to date'
+        )
+
+    def handle(self, *args, **options):
+        has_upload = Q()
+        for field in FIELD_VARIANTS:
+            has_upload |= Q(**{f'{field}__gt': ''})
+        # Members with variants that are no longer kept, so they are removed
+        for field in RETIRED_FIELDS:
+            has_upload |= Q(image_variants__has_key=field)
+        members = Member.objects.filter(has_upload).only('pk', 'image_variants', *FIELD_VARIANTS).order_by('pk')
+        if options['sacco']:
+            members = members.filter(sacco_id=options['sacco'])
+
+        processed = 0
+        for member in members.iterator(chunk_size=500):
+            if options['force'] or stale_fields(member):
+                if generate_variants(member.pk, force=options['force']):
+                    processed += 1
+                    if processed % 100 == 0:
+                        self.stdout.write(f'{processed} members processed')
+        self.stdout.write(self.style.SUCCESS(f'Generated image variants for {processed} member(s)'))
@@ -0,0 +1,45 @@
+"""
+Management command to maintain the content-addressed attachment store (see
+members/blobs.py): removes blobs no member attachment or document references
+any more. Run it daily, e.g. from cron.
+"""
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from members.blobs import GRACE_PERIOD, adopt_legacy_files, collect_garbage, recount
+
+
+class Command(BaseCommand):
+    help = 'Remove unreferenced attachment blobs'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--recount',
+            action='store_true',
+            help='Recompute reference counts from the database first (after bulk updates or deletes)'
+        )
+        parser.add_argument(
+            '--adopt',
+            action='store_true',
+            help='Move attachments saved before the blob store existed into it, deduplicating them'
+        )
+        parser.add_argument(
+            '--grace-hours',
+            type=int,
+            default=int(GRACE_PERIOD.total_seconds() // 3600),
+            help='Keep unreferenced blobs younger than this'
+        )
+        parser.add_argument('--dry-run', action='store_true', help='Report without changing anything')
+
+    def handle(self, *args, **options):
+        dry_run = options['dry_run']
+        if options['adopt']:
+            moved, saved = adopt_legacy_files(dry_run=dry_run)
+            self.stdout.write(f'Moved {moved} legacy file(s) into the blob store, {saved / 1048576:.1f} MB deduplicated')
+        if options['recount'] and not dry_run:
+            self.stdout.write(f'Corrected {recount()} reference count(s)')
+
+        removed, freed = collect_garbage(timedelta(hours=options['grace_hours']), dry_run=dry_run)
+        verb = 'Would remove' if dry_run else 'Removed'
+        self.stdout.write(self.style.SUCCESS(f'{verb} {removed} unreferenced blob(s), {freed / 1048576:.1f} MB'))
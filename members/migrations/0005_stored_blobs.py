@@ -0,0 +1,55 @@
+# Generated by Django 4.2.7 on 2026-10-19 00:03
+
+from django.db import migrations, models
+import members.blobs
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('members', '0004_member_image_variants'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StoredBlob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255, unique=True)),
+                ('digest', models.CharField(db_index=True, max_length=64)),
+                ('size', models.PositiveBigIntegerField()),
+                ('ref_count', models.IntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('released_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'verbose_name': 'Stored Blob',
+                'verbose_name_plural': 'Stored Blobs',
+            },
+        ),
+        migrations.AlterField(
+            model_name='document',
+            name='file',
+            field=models.FileField(storage=members.blobs.get_blob_storage, upload_to='documents/'),
+        ),
+        migrations.AlterField(
+            model_name='member',
+            name='attachment_id_copy',
+            field=models.FileField(blank=True, null=True, storage=members.blobs.get_blob_storage, upload_to='members/attachments/'),
+        ),
+        migrations.AlterField(
+            model_name='member',
+            name='attachment_passport_photo',
+            field=models.ImageField(blank=True, null=True, storage=members.blobs.get_blob_storage, upload_to='members/attachments/'),
+        ),
+        migrations.AlterField(
+            model_name='member',
+            name='attachment_proof_initial_deposit',
+            field=models.FileField(blank=True, null=True, storage=members.blobs.get_blob_storage, upload_to='members/attachments/'),
+        ),
+        migrations.AlterField(
+            model_name='member',
+            name='attachment_recommendation_letter',
+            field=models.FileField(blank=True, null=True, storage=members.blobs.get_blob_storage, upload_to='members/attachments/'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.7 on 2026-10-19 01:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('members', '0005_stored_blobs'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='member',
+            index=models.Index(fields=['sacco', 'updated_at', 'id'], name='members_sacco_updated_idx'),
+        ),
+    ]
@@ -4,8 +4,17 @@ from django.utils import timezone
 from accounts.models import Sacco
 import uuid
 
+from .blobs import get_blob_storage
+
 User = get_user_model()
 
+# A Sacco's ledger and monthly rollups keep their members' history; moving it
+# to another Sacco would leave balances behind in the old one
+SACCO_CHANGE_REFUSED = (
+    'A member with savings transactions, loan repayments, disbursed loans or '
+    'shares cannot move to another Sacco.'
+)
+
 
 class Member(models.Model):
     GENDER_CHOICES = [
@@ -92,10 +101,18 @@ class Member(models.Model):
     approval_remarks = models.TextField(null=True, blank=True)
     approval_date = models.DateField(null=True, blank=True)
     # Attachments
-    attachment_id_copy = models.FileField(upload_to='members/attachments/', null=True, blank=True)
-    attachment_passport_photo = models.ImageField(upload_to='members/attachments/', null=True, blank=True)
-    attachment_proof_initial_deposit = models.FileField(upload_to='members/attachments/', null=True, blank=True)
-    attachment_recommendation_letter = models.FileField(upload_to='members/attachments/', null=True, blank=True)
+    attachment_id_copy = models.FileField(upload_to='members/attachments/', storage=get_blob_storage, null=True, blank=True)
+    attachment_passport_photo = models.ImageField(upload_to='members/attachments/', storage=get_blob_storage, null=True, blank=True)
+    attachment_proof_initial_deposit = models.FileField(upload_to='members/attachments/', storage=get_blob_storage, null=True, blank=True)
+    attachment_recommendation_letter = models.FileField(upload_to='members/attachments/', storage=get_blob_storage, null=True, blank=True)
+    # Resized copies of the photo and image attachments (members/images.py)
+    image_variants = models.JSONField(default=dict, blank=True, editable=False)
+
+    class Meta:
+        indexes = [
+            # Delta sync seeks by (updated_at, id) within Saccos, see api/sync.py
+            models.Index(fields=['sacco', 'updated_at', 'id'], name='members_sacco_updated_idx'),
+        ]
     
     def __str__(self):
         return f"{self.first_name} {self.last_name} ({self.member_number})"
@@ -104,6 +121,31 @@ class Member(models.Model):
     def full_name(self):
         return f"{self.first_name} {self.last_name}"
 
+    def has_financial_history(self):
+        """
+        Whether the member has savings transactions, repayments, a disbursed
+        loan or shares: records already in their Sacco's ledger and rollups
+        """
+        from loans.models import Loan, LoanRepayment
+        from reports.models import AccountMonthlyBalance
+        from savings.models import SavingsTransaction
+
+        return (
+            bool(self.shares_balance)
+            or SavingsTransaction.objects.filter(account__member=self).exists()
+            or LoanRepayment.objects.filter(loan__member=self).exists()
+            or Loan.objects.filter(member=self, disbursement_date__isnull=False).exists()
+            or AccountMonthlyBalance.objects.filter(kind='shares', account_id=self.pk).exists()
+        )
+
+    def clean(self):
+        from django.core.exceptions import ValidationError
+        if self.pk is None:
+            return
+        previous = Member.objects.filter(pk=self.pk).values_list('sacco_id', flat=True).first()
+        if previous is not None and previous != self.sacco_id and self.has_financial_history():
+            raise ValidationError(SACCO_CHANGE_REFUSED)
+
 
 class MemberProfile(models.Model):
     """Detailed member profile information"""
@@ -205,7 +247,7 @@ class Document(models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     owner_content_type = models.ForeignKey('contenttypes.ContentType', on_delete=models.CASCADE, null=True, blank=True)
     object_id = models.PositiveIntegerField(null=True, blank=True)
-    file = models.FileField(upload_to='documents/')
+    file = models.FileField(upload_to='documents/', storage=get_blob_storage)
     file_type = models.CharField(max_length=20, choices=FILE_TYPE_CHOICES)
     uploaded_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True)
     uploaded_at = models.DateTimeField(auto_now_add=True)
@@ -219,6 +261,24 @@ class Document(models.Model):
         return f"{self.file_type} - {self.uploaded_at}"
 
 
+class StoredBlob(models.Model):
+    """A unique uploaded file in the content-addressed store (members/blobs.py)"""
+    name = models.CharField(max_length=255, unique=True)
+    digest = models.CharField(max_length=64, db_index=True)
+    size = models.PositiveBigIntegerField()
+    # Number of model fields pointing at the blob
+    ref_count = models.IntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    released_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        verbose_name = "Stored Blob"
+        verbose_name_plural = "Stored Blobs"
+
+    def __str__(self):
+        return f"{self.name} ({self.ref_count} references)"
+
+
 class AuditLog(models.Model):
     """Audit trail for all critical system activities"""
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
@@ -0,0 +1,103 @@
+"""
+Signal handlers for the members app
+"""
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.utils import timezone
+
+from .blobs import BLOB_FIELDS, acquire, blob_names, release
+from .images import delete_variants, schedule_variants, stale_fields
+from .models import SACCO_CHANGE_REFUSED, Document, Member
+
+
+def queue_image_variants(sender, instance, raw=False, **kwargs):
+    """New or replaced uploads get their resized variants once the save commits"""
+    if raw or not stale_fields(instance):
+        return
+    member_id = instance.pk
+    transaction.on_commit(lambda: schedule_variants(member_id))
+
+
+def remove_image_variants(sender, instance, **kwargs):
+    delete_variants(instance)
+
+
+def remember_blobs(sender, instance, raw=False, update_fields=None, **kwargs):
+    """Blob names held before the save, to diff against afterwards"""
+    fields = BLOB_FIELDS[sender._meta.label]
+    instance._previous_blobs = []
+    if raw or instance._state.adding or (update_fields is not None and not set(fields) & set(update_fields)):
+        return
+    previous = sender.objects.filter(pk=instance.pk).values_list(*fields).first()
+    if previous:
+        instance._previous_blobs = [name for name in previous if name]
+
+
+def count_blob_references(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    previous, current = getattr(instance, '_previous_blobs', []), blob_names(instance)
+    acquire([name for name in current if name not in previous])
+    release([name for name in previous if name not in current])
+    instance._previous_blobs = current
+
+
+def release_blobs(sender, instance, **kwargs):
+    release(blob_names(instance))
+
+
+def remember_sacco(sender, instance, raw=False, update_fields=None, **kwargs):
+    """Refuses a move for members with financial history, also where Member.clean() was not run"""
+    instance._previous_sacco_id = None
+    if raw or instance._state.adding or (update_fields is not None and 'sacco' not in update_fields):
+        return
+    previous = Member.objects.filter(pk=instance.pk).values_list('sacco_id', flat=True).first()
+    if previous is not None and previous != instance.sacco_id and instance.has_financial_history():
+        raise ValidationError(SACCO_CHANGE_REFUSED)
+    instance._previous_sacco_id = previous
+
+
+def move_sacco_rows(sender, instance, raw=False, **kwargs):
+    """
+    A member moved to another Sacco takes the Sacco ids copied on their loans
+    and savings accounts along, and leaves tombstones for all of it in the old
+    Sacco. Only members without financial history move (remember_sacco), so
+    there are no transactions, repayments, ledger entries or rollups to carry over.
+    """
+    previous = getattr(instance, '_previous_sacco_id', None)
+    if raw or previous is None or previous == instance.sacco_id:
+        return
+    from api.models import SyncTombstone
+    from loans.models import Loan
+    from savings.models import SavingsAccount
+
+    rows = {
+        'loans': Loan.objects.filter(member=instance),
+        'savings-accounts': SavingsAccount.objects.filter(member=instance),
+    }
+    # Delta sync clients of the old Sacco drop them as if they had been deleted
+    tombstones = [SyncTombstone(resource='members', record_id=instance.pk, sacco_id=previous)]
+    for resource, queryset in rows.items():
+        tombstones += [
+            SyncTombstone(resource=resource, record_id=pk, sacco_id=previous)
+            for pk in queryset.values_list('pk', flat=True).iterator()
+        ]
+    SyncTombstone.objects.bulk_create(tombstones, batch_size=1000)
+
+    # Moving updated_at too, so delta sync clients of the new Sacco receive the rows
+    moved = {'sacco_id': instance.sacco_id, 'updated_at': timezone.now()}
+    for queryset in rows.values():
+        queryset.update(**moved)
+    instance._previous_sacco_id = instance.sacco_id
+
+
+for _model in (Member, Document):
+    pre_save.connect(remember_blobs, sender=_model, dispatch_uid=f'blobs_pre_save_{_model.__name__}')
+    post_save.connect(count_blob_references, sender=_model, dispatch_uid=f'blobs_save_{_model.__name__}')
+    post_delete.connect(release_blobs, sender=_model, dispatch_uid=f'blobs_delete_{_model.__name__}')
+
+pre_save.connect(remember_sacco, sender=Member, dispatch_uid='tenancy_pre_save_Member')
+post_save.connect(move_sacco_rows, sender=Member, dispatch_uid='tenancy_save_Member')
+post_save.connect(queue_image_variants, sender=Member, dispatch_uid='image_variants_save_Member')
+post_delete.connect(remove_image_variants, sender=Member, dispatch_uid='image_variants_delete_Member')
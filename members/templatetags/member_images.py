@@ -0,0 +1,20 @@
+from django import template
+
+from members.images import variant_url
+
+register = template.Library()
+
+
+@register.simple_tag
+def member_image(member, variant='thumb', field=None):
+    """URL of a resized member image.
+
+    Usage:
+    {% member_image member 'thumb' %} -> list thumbnail of the photo (or passport photo)
+    {% member_image member 'profile' %} -> profile picture
+    {% member_image member 'thumb' 'attachment_passport_photo' %} -> thumbnail of the passport photo
+
+    Falls back to the original upload until its variants are generated, and
+    to '' when the member has no such upload.
+    """
+    return variant_url(member, variant, field)
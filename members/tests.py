@@ -296,4 +296,280 @@ class MemberViewsTest(TestCase):
         self.client.login(username="memberuser", password="member123")
         response = self.client.get(reverse('member_dashboard'))
         self.assertEqual(response.status_code, 200)
-        self.assertContains(response, "Member User")
\ No newline at end of file
+        self.assertContains(response, "Member User")
+
+class MemberImageVariantsTest(TestCase):
+    def setUp(self):
+        import shutil
+        import tempfile
+        from django.test import override_settings
+        media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media, ignore_errors=True)
+        settings_override = override_settings(MEDIA_ROOT=media)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        region = Region.objects.create(name="Photo Region")
+        self.sacco = Sacco.objects.create(
+            name="Photo Sacco", registration_number="PHOTO001", address="Address",
+            phone="1234567890", email="photo@sacco.com", region=region
+        )
+        self.member = Member.objects.create(
+            sacco=self.sacco, member_number="PHOTO-1", first_name="Amina", last_name="Nakato",
+            phone="0700000000", gender="Female", date_of_birth="1990-01-01", home_address="Address",
+            village_town="Town", district="District", date_joined="2024-01-01",
+            photo=self.image_upload('photo.png', (1600, 1200)),
+            attachment_passport_photo=SimpleUploadedFile('passport.pdf', b'%PDF-1.4 not an image'),
+        )
+
+    def image_upload(self, name, size):
+        import io
+        from PIL import Image
+        buffer = io.BytesIO()
+        Image.new('RGBA', size, (200, 30, 30, 255)).save(buffer, 'PNG')
+        return SimpleUploadedFile(name, buffer.getvalue(), content_type='image/png')
+
+    def test_generates_resized_variants(self):
+        from PIL import Image
+        from django.core.files.storage import default_storage
+        from .images import generate_variants, variant_url
+
+        self.assertEqual(generate_variants(self.member.pk), ['photo', 'attachment_passport_photo'])
+        self.member.refresh_from_db()
+        variants = self.member.image_variants
+        self.assertEqual(variants['photo']['source'], self.member.photo.name)
+        with default_storage.open(variants['photo']['thumb']) as thumb:
+            self.assertEqual(Image.open(thumb).size, (64, 64))
+        self.assertLess(default_storage.size(variants['photo']['profile']), self.member.photo.size)
+        # The PDF is recorded without variants and not retried
+        self.assertEqual(variants['attachment_passport_photo'], {'source': self.member.attachment_passport_photo.name})
+        self.assertEqual(generate_variants(self.member.pk), [])
+        self.assertTrue(variant_url(self.member, 'thumb').endswith('-thumb.jpg'))
+
+    def test_replaced_photo_regenerates_after_commit(self):
+        from unittest import mock
+        from django.core.files.storage import default_storage
+        from .images import generate_variants, variant_url
+
+        generate_variants(self.member.pk)
+        self.member.refresh_from_db()
+        old_thumb = self.member.image_variants['photo']['thumb']
+
+        self.member.photo = self.image_upload('new.png', (300, 500))
+        with mock.patch('members.signals.schedule_variants') as schedule:
+            with self.captureOnCommitCallbacks(execute=True):
+                self.member.save()
+        schedule.assert_called_once_with(self.member.pk)
+        # Until the new variants exist, pages get the upload itself
+        self.assertEqual(variant_url(self.member, 'thumb'), self.member.photo.url)
+
+        self.assertEqual(generate_variants(self.member.pk), ['photo'])
+        self.assertFalse(default_storage.exists(old_thumb))
+
+    def test_attachment_variants_stay_private(self):
+        from django.core.files.storage import default_storage
+        from .images import ATTACHMENT_VARIANT_DIR, generate_variants, variant_url
+
+        self.member.attachment_passport_photo = self.image_upload('passport.png', (800, 1000))
+        self.member.save()
+        generate_variants(self.member.pk)
+        self.member.refresh_from_db()
+        thumb = self.member.image_variants['attachment_passport_photo']['thumb']
+        self.assertTrue(thumb.startswith(ATTACHMENT_VARIANT_DIR + '/'))
+
+        url = variant_url(self.member, 'thumb', 'attachment_passport_photo')
+        self.assertEqual(
+            url, reverse('member_attachment', args=[self.member.pk, 'attachment_passport_photo']) + '?inline=1&variant=thumb'
+        )
+        User.objects.create_user(username="photoadmin", password="photo123", is_sacco_admin=True, sacco=self.sacco)
+        self.client.login(username="photoadmin", password="photo123")
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        with default_storage.open(thumb) as stored:
+            self.assertEqual(b''.join(response.streaming_content), stored.read())
+        self.client.logout()
+        self.assertNotEqual(self.client.get(url).status_code, 200)
+
+    def test_retired_previews_are_removed(self):
+        from django.core.files.base import ContentFile
+        from django.core.files.storage import default_storage
+        from .images import generate_variants, stale_fields
+
+        generate_variants(self.member.pk)
+        self.member.refresh_from_db()
+        preview = default_storage.save('members/variants/old-id-preview.jpg', ContentFile(b'jpeg'))
+        variants = dict(self.member.image_variants, attachment_id_copy={'source': 'id.png', 'preview': preview})
+        Member.objects.filter(pk=self.member.pk).update(image_variants=variants)
+        self.member.refresh_from_db()
+
+        self.assertEqual(stale_fields(self.member), ['attachment_id_copy'])
+        generate_variants(self.member.pk)
+        self.member.refresh_from_db()
+        self.assertNotIn('attachment_id_copy', self.member.image_variants)
+        self.assertFalse(default_storage.exists(preview))
+
+    def test_member_image_tag(self):
+        from django.template import Context, Template
+        from .images import generate_variants
+
+        generate_variants(self.member.pk)
+        self.member.refresh_from_db()
+        rendered = Template("{% load member_images %}{% member_image member 'profile' %}").render(
+            Context({'member': self.member})
+        )
+        self.assertTrue(rendered.endswith('-profile.jpg'))
+
+
+class DocumentBlobStorageTest(TestCase):
+    def setUp(self):
+        import shutil
+        import tempfile
+        from django.test import override_settings
+        self.media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media, ignore_errors=True)
+        settings_override = override_settings(MEDIA_ROOT=self.media)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        region = Region.objects.create(name="Blob Region")
+        self.sacco = Sacco.objects.create(
+            name="Blob Sacco", registration_number="BLOB001", address="Address",
+            phone="1234567890", email="blob@sacco.com", region=region
+        )
+
+    def create_member(self, number, **attachments):
+        return Member.objects.create(
+            sacco=self.sacco, member_number=number, first_name="Blob", last_name=number,
+            phone="0700000000", gender="Female", date_of_birth="1990-01-01", home_address="Address",
+            village_town="Town", district="District", date_joined="2024-01-01", **attachments
+        )
+
+    def test_identical_uploads_share_one_blob(self):
+        import os
+        from .models import Document, StoredBlob
+
+        first = self.create_member("B1", attachment_id_copy=SimpleUploadedFile('id.PDF', b'same scan'))
+        second = self.create_member("B2", attachment_id_copy=SimpleUploadedFile('scan.pdf', b'same scan'))
+        document = Document.objects.create(file=SimpleUploadedFile('copy.pdf', b'same scan'), file_type='ID')
+
+        name = first.attachment_id_copy.name
+        self.assertTrue(name.startswith('blobs/') and name.endswith('.pdf'))
+        self.assertEqual(second.attachment_id_copy.name, name)
+        self.assertEqual(document.file.name, name)
+        self.assertEqual(StoredBlob.objects.get().ref_count, 3)
+        self.assertEqual(len(os.listdir(os.path.dirname(first.attachment_id_copy.path))), 1)
+
+    def test_member_documents_reviewed_in_documents_update(self):
+        from django.contrib.contenttypes.models import ContentType
+        from .models import Document, StoredBlob
+
+        member = self.create_member("B5")
+        owner = {'owner_content_type': ContentType.objects.get_for_model(Member), 'object_id': member.pk}
+        # The same receipt uploaded again for the member
+        receipts = [
+            Document.objects.create(file=SimpleUploadedFile(name, b'receipt scan'), file_type='Receipt', **owner)
+            for name in ('receipt.pdf', 'receipt (1).pdf')
+        ]
+        self.assertEqual(receipts[0].file.name, receipts[1].file.name)
+        self.assertEqual(StoredBlob.objects.get().ref_count, 2)
+
+        User.objects.create_user(username="blobsysadmin", password="blob123", is_system_admin=True)
+        self.client.login(username="blobsysadmin", password="blob123")
+        response = self.client.get(reverse('documents_update'), {'sacco': self.sacco.pk})
+        self.assertEqual(response.context['total_documents'], 2)
+        # Blobs are not public media; the page links to the permission-checked download
+        self.assertNotContains(response, receipts[0].file.url)
+        download = reverse('member_document', args=[receipts[0].id])
+        self.assertContains(response, f'href="{download}?inline=1"')
+        self.assertEqual(self.client.get(download).status_code, 200)
+
+        receipts[1].delete()
+        self.assertEqual(StoredBlob.objects.get().ref_count, 1)
+
+    def test_released_blobs_are_collected(self):
+        from datetime import timedelta
+        from django.core.files.storage import default_storage
+        from .blobs import collect_garbage, recount
+        from .models import StoredBlob
+
+        member = self.create_member("B3", attachment_id_copy=SimpleUploadedFile('old.pdf', b'old scan'))
+        other = self.create_member("B4", attachment_id_copy=SimpleUploadedFile('old.pdf', b'old scan'))
+        old_name = member.attachment_id_copy.name
+
+        member.attachment_id_copy = SimpleUploadedFile('new.pdf', b'new scan')
+        member.save()
+        self.assertEqual(StoredBlob.objects.get(name=old_name).ref_count, 1)
+        other.delete()
+        self.assertEqual(StoredBlob.objects.get(name=old_name).ref_count, 0)
+
+        # Kept during the grace period, then removed with its file
+        self.assertEqual(collect_garbage()[0], 0)
+        self.assertEqual(collect_garbage(grace=timedelta(0)), (1, len(b'old scan')))
+        self.assertFalse(default_storage.exists(old_name))
+        self.assertTrue(default_storage.exists(member.attachment_id_copy.name))
+
+        # Bulk changes bypass the signals; recount repairs the counts
+        Member.objects.filter(pk=member.pk).update(attachment_id_copy='')
+        self.assertEqual(recount(), 1)
+        self.assertEqual(StoredBlob.objects.get().ref_count, 0)
+
+
+class ProtectedAttachmentDownloadTest(TestCase):
+    def setUp(self):
+        import shutil
+        import tempfile
+        from django.test import override_settings
+        media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media, ignore_errors=True)
+        settings_override = override_settings(MEDIA_ROOT=media, PROTECTED_MEDIA_ACCEL_PREFIX='')
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        region = Region.objects.create(name="Download Region")
+        self.sacco = Sacco.objects.create(
+            name="Download Sacco", registration_number="DL001", address="Address",
+            phone="1234567890", email="dl@sacco.com", region=region
+        )
+        other_sacco = Sacco.objects.create(
+            name="Other Sacco", registration_number="DL002", address="Address",
+            phone="1234567890", email="other@sacco.com", region=region
+        )
+        User.objects.create_user(username="dladmin", password="dl123", is_sacco_admin=True, sacco=self.sacco)
+        User.objects.create_user(username="otheradmin", password="dl123", is_sacco_admin=True, sacco=other_sacco)
+        self.member = Member.objects.create(
+            sacco=self.sacco, member_number="DL-1", first_name="Zula", last_name="Achen",
+            phone="0700000000", gender="Female", date_of_birth="1990-01-01", home_address="Address",
+            village_town="Town", district="District", date_joined="2024-01-01",
+            attachment_id_copy=SimpleUploadedFile('id.pdf', b'0123456789'),
+        )
+        self.url = reverse('member_attachment', args=[self.member.id, 'attachment_id_copy'])
+
+    def test_streams_with_range_support(self):
+        self.client.login(username="dladmin", password="dl123")
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), b'0123456789')
+        self.assertEqual(response['Content-Disposition'], 'attachment; filename="DL-1-id_copy.pdf"')
+
+        response = self.client.get(self.url, HTTP_RANGE='bytes=2-5')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response['Content-Range'], 'bytes 2-5/10')
+        self.assertEqual(b''.join(response.streaming_content), b'2345')
+        self.assertEqual(self.client.get(self.url, HTTP_RANGE='bytes=20-').status_code, 416)
+
+    def test_hands_transfer_to_nginx(self):
+        from django.test import override_settings
+        self.client.login(username="dladmin", password="dl123")
+        with override_settings(PROTECTED_MEDIA_ACCEL_PREFIX='/protected-media/'):
+            response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['X-Accel-Redirect'], f'/protected-media/{self.member.attachment_id_copy.name}')
+        self.assertEqual(response.content, b'')
+
+    def test_other_sacco_cannot_download(self):
+        self.client.login(username="otheradmin", password="dl123")
+        self.assertEqual(self.client.get(self.url).status_code, 404)
+        self.client.login(username="dladmin", password="dl123")
+        self.assertEqual(
+            self.client.get(reverse('member_attachment', args=[self.member.id, 'notes'])).status_code, 404
+        )
@@ -8,6 +8,8 @@ urlpatterns = [
     path('edit/<int:member_id>/', views.edit_member, name='edit_member'),
     path('bulk-import/', views.bulk_import_members, name='bulk_import_members'),
     path('profile/<int:member_id>/', views.member_profile, name='member_profile'),
+    path('profile/<int:member_id>/attachments/<str:field>/', views.download_member_attachment, name='member_attachment'),
+    path('documents/<uuid:document_id>/', views.download_document, name='member_document'),
     path('groups/', views.member_groups, name='member_groups'),
     path('groups/edit/<int:group_id>/', views.edit_member_group, name='edit_member_group'),
     path('groups/view/<int:group_id>/', views.view_member_group, name='view_member_group'),
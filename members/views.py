@@ -8,7 +8,7 @@ from django.utils.crypto import get_random_string
 from django.utils import timezone
 from django.http import JsonResponse, HttpResponse
 from django.urls import reverse
-from accounts.decorators import sacco_admin_required, admin_or_member_owner_required, member_search_required
+from accounts.decorators import sacco_admin_required, admin_or_member_owner_required, member_search_required, use_read_replica
 from accounts.permissions import filter_queryset_by_user_scope, can_access_member_data, get_accessible_members
 from notifications.services import NotificationService
 from .models import Member, MemberGroup, MemberProfile
@@ -17,6 +17,14 @@ from .bulk_import import MemberBulkImportForm, MemberBulkImporter
 
 User = get_user_model()
 
+# KYC attachments, served only through download_member_attachment
+MEMBER_ATTACHMENT_LABELS = {
+    'attachment_id_copy': 'Copy of National ID',
+    'attachment_passport_photo': 'Passport Photograph',
+    'attachment_proof_initial_deposit': 'Proof of Initial Savings Deposit',
+    'attachment_recommendation_letter': 'Recommendation Letter',
+}
+
 
 @sacco_admin_required
 def members_overview(request):
@@ -62,6 +70,7 @@ def members_overview(request):
 
 
 @sacco_admin_required
+@use_read_replica
 def member_list(request):
     from accounts.permissions import get_accessible_saccos
     from accounts.models import Sacco
@@ -316,7 +325,7 @@ def register_member(request):
                     performed_by=request.user
                 )
                 account.balance = initial_deposit
-                account.save(update_fields=['balance'])
+                account.save(update_fields=['balance', 'updated_at'])
                 
                 # Send welcome notification to new member
                 NotificationService.create_notification(
@@ -420,13 +429,68 @@ def member_profile(request, member_id):
         active_loans_count = 0
         total_savings = 0
 
+    attachments = [
+        (label, field) for field, label in MEMBER_ATTACHMENT_LABELS.items() if getattr(member, field)
+    ]
+
     return render(request, 'members/member_profile.html', {
         'member': member,
         'active_loans_count': active_loans_count,
         'total_savings': total_savings,
+        'attachments': attachments,
     })
 
 
+@admin_or_member_owner_required
+def download_member_attachment(request, member_id, field):
+    """KYC attachment of a member, for users who may see the member's data"""
+    import os
+    from django.http import Http404
+    from accounts.downloads import protected_file_response
+
+    if field not in MEMBER_ATTACHMENT_LABELS:
+        raise Http404('Unknown attachment')
+    member = get_object_or_404(Member, id=member_id)
+    upload = getattr(member, field)
+    if not can_access_member_data(request.user, member) or not upload:
+        raise Http404('Attachment not found')
+    filename = f"{member.member_number}-{field.replace('attachment_', '')}{os.path.splitext(upload.name)[1]}"
+
+    # ?variant=thumb|profile: a resized copy (members/images.py), kept in default storage
+    variant = request.GET.get('variant')
+    if variant:
+        from django.core.files.storage import default_storage
+        from django.db.models.fields.files import FieldFile
+        entry = (member.image_variants or {}).get(field) or {}
+        if variant == 'source' or entry.get('source') != upload.name or not entry.get(variant):
+            raise Http404('Attachment not found')
+        upload = FieldFile(member, upload.field, entry[variant])
+        upload.storage = default_storage
+        filename = f"{member.member_number}-{field.replace('attachment_', '')}-{variant}.jpg"
+    return protected_file_response(request, upload, filename, as_attachment=request.GET.get('inline') != '1')
+
+
+@login_required
+def download_document(request, document_id):
+    """A stored document, if it belongs to a member (directly or through a loan) the user may see"""
+    from django.http import Http404
+    from accounts.downloads import protected_file_response
+    from loans.models import Loan
+    from .models import Document
+
+    document = get_object_or_404(Document.objects.select_related('owner_content_type'), id=document_id)
+    member = None
+    if document.owner_content_type and document.owner_content_type.model_class() is Member:
+        member = Member.objects.filter(pk=document.object_id).first()
+    if member is None:
+        loan = Loan.objects.filter(legal_document=document).select_related('member').first()
+        member = loan.member if loan else None
+    allowed = can_access_member_data(request.user, member) if member else request.user.is_system_admin
+    if not allowed or not document.file:
+        raise Http404('Document not found')
+    return protected_file_response(request, document.file, as_attachment=request.GET.get('inline') != '1')
+
+
 @sacco_admin_required
 def member_groups(request):
     from accounts.permissions import get_accessible_saccos, filter_queryset_by_user_scope
@@ -0,0 +1,384 @@
+"""
+Reconciling mobile money provider statements (MTN, Airtel) against savings
+transactions and loan repayments
+
+Statements are CSV exports that can run to hundreds of thousands of rows, so
+the file is streamed and handled CHUNK_SIZE rows at a time, each chunk in its
+own database transaction that also saves the number of rows read; a run that
+stops resumes after the last chunk it finished.
+
+Each successful statement row is, in order:
+
+1. matched by the provider's transaction id against mobile_money_tx_id. A
+   chunk's ids are looked up with one query per table on the unique index
+   and matched through a dict, so the cost per row stays the same however
+   large the statement or the Sacco;
+2. matched by the counterparty's phone, the exact amount and the nearest
+   time within MATCH_WINDOW against the Sacco's records that have no mobile
+   money id yet. Phones are compared on their last nine digits, taken from
+   members' mobile wallets and phone numbers; a phone shared by several
+   members matches nobody. The provider's id is written onto the matched
+   record, so the ledger moves it to the mobile money account and the next
+   statement matches it by id;
+3. when the import asks for it (auto_post), money received that still
+   matches nothing is deposited into the payer's savings account if the
+   member has exactly one open account. Deposits are posted at
+   reconciliation time like any other; the statement line keeps when the
+   provider received the money.
+
+Whatever is left is flagged as unmatched for review. Rows the provider
+reports as failed or pending, and rows that cannot be read, are counted as
+skipped.
+"""
+import csv
+import io
+import logging
+import re
+from contextlib import closing
+from datetime import datetime, timedelta
+from decimal import Decimal, InvalidOperation
+from itertools import islice
+
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from reports.rollups import SAVINGS_CREDIT_TYPES
+
+from .models import StatementImport, StatementLine
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 500
+MATCH_WINDOW = timedelta(hours=2)
+# A running statement whose checkpoint is older than this was abandoned
+STALE_AFTER = timedelta(minutes=30)
+
+# Statement columns, by the (lower-cased) header names of each provider's exports.
+# payer is the counterparty of money received, payee of money paid out.
+COLUMNS = {
+    'MTN': {
+        'tx_id': ('financial transaction id', 'transaction id', 'id'),
+        'occurred_at': ('date', 'transaction date'),
+        'amount': ('amount',),
+        'payer': ('from', 'from msisdn', 'msisdn'),
+        'payee': ('to', 'to msisdn'),
+        'status': ('status',),
+    },
+    'Airtel': {
+        'tx_id': ('transaction id', 'txn id', 'transaction reference'),
+        'occurred_at': ('transaction date', 'date', 'transaction date time'),
+        'amount': ('amount', 'transaction amount'),
+        'payer': ('sender msisdn', 'msisdn', 'sender'),
+        'payee': ('receiver msisdn', 'receiver'),
+        'status': ('status', 'transaction status'),
+    },
+}
+REQUIRED_COLUMNS = ('tx_id', 'occurred_at', 'amount', 'payer')
+# Provider statuses of money that did not move (TF, TIP: Airtel's failed and in progress)
+SKIPPED_STATUSES = {'failed', 'rejected', 'cancelled', 'expired', 'pending', 'tf', 'tip'}
+DATE_FORMATS = (
+    '%d/%m/%Y %H:%M:%S', '%d/%m/%Y %H:%M', '%d-%m-%Y %H:%M:%S', '%d-%m-%Y %H:%M',
+    '%d-%b-%Y %H:%M:%S', '%d-%b-%y %I:%M:%S %p', '%Y/%m/%d %H:%M:%S',
+)
+
+
+class StatementError(Exception):
+    pass
+
+
+def phone_key(value):
+    """The last nine digits of a phone number, which identify it with or without the country code"""
+    digits = re.sub(r'\D', '', value or '')
+    return digits[-9:] if len(digits) >= 9 else None
+
+
+def _amount(value):
+    amount = Decimal(re.sub(r'[^\d.\-]', '', value))
+    if not amount.is_finite():
+        raise InvalidOperation(value)
+    return amount.quantize(Decimal('0.01'))
+
+
+def _moment(value):
+    moment = parse_datetime(value)
+    if moment is None:
+        for date_format in DATE_FORMATS:
+            try:
+                moment = datetime.strptime(value, date_format)
+                break
+            except ValueError:
+                pass
+    if moment is None:
+        raise ValueError(f'Unrecognised date {value!r}')
+    return moment if timezone.is_aware(moment) else timezone.make_aware(moment)
+
+
+def _parse(row, row_number, index):
+    """The row as an unsaved StatementLine, or None when it is to be skipped"""
+    def cell(field):
+        position = index[field]
+        return row[position].strip() if position is not None and position < len(row) else ''
+
+    if cell('status').lower() in SKIPPED_STATUSES:
+        return None
+    try:
+        amount, occurred_at = _amount(cell('amount')), _moment(cell('occurred_at'))
+    except (InvalidOperation, ValueError):
+        return None
+    tx_id = cell('tx_id')
+    if not tx_id or not amount:
+        return None
+    direction = 'out' if amount < 0 else 'in'
+    phone = cell('payee') if direction == 'out' and cell('payee') else cell('payer')
+    return StatementLine(
+        row_number=row_number, provider_tx_id=tx_id[:100], phone=phone[:20],
+        amount=abs(amount), direction=direction, occurred_at=occurred_at,
+    )
+
+
+def read_rows(statement, start=0):
+    """(row number, StatementLine or None) for the statement's data rows after the first start, streamed"""
+    columns = COLUMNS[statement.provider]
+    with statement.file.open('rb') as raw:
+        reader = csv.reader(io.TextIOWrapper(raw.file, encoding='utf-8-sig', errors='replace', newline=''))
+        header = [name.strip().lower() for name in next(reader, [])]
+        index = {
+            field: next((header.index(name) for name in names if name in header), None)
+            for field, names in columns.items()
+        }
+        missing = [columns[field][0] for field in REQUIRED_COLUMNS if index[field] is None]
+        if missing:
+            raise StatementError(
+                f'Not an {statement.get_provider_display()} statement: missing {", ".join(missing)}.'
+            )
+        for row_number, row in enumerate(islice(reader, start, None), start=start + 1):
+            yield row_number, _parse(row, row_number, index)
+
+
+def phone_directory(sacco_id):
+    """{phone key: member id} for the Sacco's members; phones shared by several members are left out"""
+    from members.models import Member, MemberMobileWallet
+
+    owners = {}
+    sources = (
+        Member.objects.filter(sacco_id=sacco_id).values_list('phone', 'id'),
+        MemberMobileWallet.objects.filter(member__sacco_id=sacco_id).values_list('phone_number', 'member_id'),
+    )
+    for rows in sources:
+        for phone, member_id in rows.iterator(chunk_size=5000):
+            key = phone_key(phone)
+            if key:
+                owners.setdefault(key, set()).add(member_id)
+    return {key: members.pop() for key, members in owners.items() if len(members) == 1}
+
+
+def _link(line, kind, pk, status):
+    if kind == 'savings':
+        line.savings_transaction_id = pk
+    else:
+        line.loan_repayment_id = pk
+    line.status = status
+
+
+def _match_by_id(statement, lines):
+    """Match lines by provider transaction id; returns the lines whose id we do not know"""
+    from loans.models import LoanRepayment
+    from savings.models import SavingsTransaction
+
+    ids = {line.provider_tx_id for line in lines}
+    known = {}
+    for kind, model in (('savings', SavingsTransaction), ('repayment', LoanRepayment)):
+        rows = model.objects.filter(mobile_money_tx_id__in=ids).values_list('mobile_money_tx_id', 'id', 'sacco_id')
+        for tx_id, pk, sacco_id in rows:
+            known[tx_id] = (kind, pk, sacco_id)
+
+    left = []
+    for line in lines:
+        hit = known.get(line.provider_tx_id)
+        if hit is None:
+            left.append(line)
+        elif hit[2] == statement.sacco_id:
+            _link(line, hit[0], hit[1], 'matched')
+        else:
+            # Recorded against another Sacco; flagged rather than matched a second time
+            line.status = 'unmatched'
+    return left
+
+
+def _stamp(model, tx_ids):
+    """Write provider ids onto the records fuzzy matches found"""
+    for record in model.objects.filter(pk__in=tx_ids):
+        record.mobile_money_tx_id = tx_ids[record.pk]
+        # Saved one by one so the ledger re-journals them against mobile money (ledger/signals.py)
+        record.save(update_fields=['mobile_money_tx_id', 'updated_at'])
+
+
+def _match_fuzzy(statement, lines, directory):
+    """Match lines by counterparty, amount and time; returns the lines left over"""
+    from loans.models import LoanRepayment
+    from savings.models import SavingsTransaction
+
+    members = [directory.get(phone_key(line.phone)) for line in lines]
+    wanted = [line for line, member_id in zip(lines, members) if member_id]
+    if not wanted:
+        return lines
+    member_ids = set(filter(None, members))
+    low = min(line.occurred_at for line in wanted) - MATCH_WINDOW
+    high = max(line.occurred_at for line in wanted) + MATCH_WINDOW
+
+    # Candidates bucketed by (member, direction, amount)
+    pool = {}
+    savings = SavingsTransaction.objects.filter(
+        sacco_id=statement.sacco_id, performed_at__range=(low, high),
+        mobile_money_tx_id__isnull=True, account__member_id__in=member_ids,
+    ).values_list('id', 'account__member_id', 'txn_type', 'amount', 'performed_at')
+    for pk, member_id, txn_type, amount, moment in savings:
+        direction = 'in' if txn_type in SAVINGS_CREDIT_TYPES else 'out'
+        pool.setdefault((member_id, direction, amount), []).append((moment, 'savings', pk))
+    repayments = LoanRepayment.objects.filter(
+        sacco_id=statement.sacco_id, payment_date__range=(low, high),
+        mobile_money_tx_id__isnull=True, loan__member_id__in=member_ids,
+    ).values_list('id', 'loan__member_id', 'amount', 'payment_date')
+    for pk, member_id, amount, moment in repayments:
+        pool.setdefault((member_id, 'in', amount), []).append((moment, 'repayment', pk))
+
+    left, claimed, taken = [], {'savings': {}, 'repayment': {}}, set()
+    for line, member_id in zip(lines, members):
+        options = pool.get((member_id, line.direction, line.amount))
+        if not options or line.provider_tx_id in taken:
+            left.append(line)
+            continue
+        best = min(options, key=lambda option: abs(option[0] - line.occurred_at))
+        if abs(best[0] - line.occurred_at) > MATCH_WINDOW:
+            left.append(line)
+            continue
+        options.remove(best)
+        _link(line, best[1], best[2], 'fuzzy')
+        claimed[best[1]][best[2]] = line.provider_tx_id
+        taken.add(line.provider_tx_id)
+
+    _stamp(SavingsTransaction, claimed['savings'])
+    _stamp(LoanRepayment, claimed['repayment'])
+    return left
+
+
+def _post_deposits(statement, lines, directory):
+    """Deposit money received into the payer's only open savings account; returns the lines left over"""
+    from savings.models import SavingsAccount, SavingsTransaction
+
+    payers = [directory.get(phone_key(line.phone)) if line.direction == 'in' else None for line in lines]
+    member_ids = set(filter(None, payers))
+    if not member_ids:
+        return lines
+    accounts = {}
+    open_accounts = SavingsAccount.objects.filter(
+        sacco_id=statement.sacco_id, member_id__in=member_ids, status='Open', is_active=True
+    ).select_for_update()
+    for account in open_accounts:
+        accounts.setdefault(account.member_id, []).append(account)
+
+    left, changed, taken = [], {}, set()
+    for line, member_id in zip(lines, payers):
+        owned = accounts.get(member_id)
+        if not owned or len(owned) > 1 or line.provider_tx_id in taken:
+            left.append(line)
+            continue
+        account = owned[0]
+        account.balance = (account.balance or 0) + line.amount
+        changed[account.pk] = account
+        txn = SavingsTransaction(
+            account=account, sacco_id=account.sacco_id, txn_type='Deposit', amount=line.amount,
+            running_balance=account.balance, reference=line.provider_tx_id,
+            narration=f'{statement.get_provider_display()} payment of {timezone.localtime(line.occurred_at):%d %b %Y %H:%M}',
+            mobile_money_tx_id=line.provider_tx_id, performed_by_id=statement.uploaded_by_id,
+        )
+        # Saved one by one so the ledger and rollups post them (ledger/signals.py)
+        txn.save()
+        line.savings_transaction = txn
+        line.status = 'posted'
+        taken.add(line.provider_tx_id)
+
+    for account in changed.values():
+        account.save(update_fields=['balance', 'updated_at'])
+    return left
+
+
+def reconcile_chunk(statement, lines, directory):
+    """Match, post or flag one chunk of parsed lines in place"""
+    left = _match_by_id(statement, lines)
+    left = _match_fuzzy(statement, left, directory)
+    if statement.auto_post:
+        left = _post_deposits(statement, left, directory)
+    for line in left:
+        line.status = 'unmatched'
+
+
+COUNTERS = {'matched': 'matched', 'fuzzy': 'fuzzy_matched', 'posted': 'posted', 'unmatched': 'unmatched'}
+
+
+def reconcile(statement, chunk_size=CHUNK_SIZE):
+    """Reconcile a statement from its checkpoint to the end of the file"""
+    directory = phone_directory(statement.sacco_id)
+    with closing(read_rows(statement, statement.rows_read)) as rows:
+        while True:
+            chunk = list(islice(rows, chunk_size))
+            if not chunk:
+                break
+            lines = [line for _, line in chunk if line is not None]
+            for line in lines:
+                line.statement = statement
+            with transaction.atomic():
+                reconcile_chunk(statement, lines, directory)
+                StatementLine.objects.bulk_create(lines)
+                for line in lines:
+                    counter = COUNTERS[line.status]
+                    setattr(statement, counter, getattr(statement, counter) + 1)
+                statement.skipped += len(chunk) - len(lines)
+                statement.rows_read = chunk[-1][0]
+                statement.checkpoint_at = timezone.now()
+                statement.save(update_fields=['rows_read', 'checkpoint_at', 'skipped', *COUNTERS.values()])
+
+
+# Worker
+
+def run_statement(statement_id):
+    """Reconcile one queued statement; returns (statement id, final status)"""
+    now = timezone.now()
+    claimed = StatementImport.objects.filter(pk=statement_id, status='queued').update(
+        status='running', started_at=now, checkpoint_at=now
+    )
+    if not claimed:
+        return statement_id, None
+    statement = StatementImport.objects.select_related('sacco').get(pk=statement_id)
+    try:
+        reconcile(statement)
+        statement.status = 'done'
+        statement.error = ''
+    except Exception as exc:
+        logger.exception('Statement reconciliation %s failed', statement_id)
+        statement.status = 'failed'
+        statement.error = str(exc)
+    statement.completed_at = timezone.now()
+    statement.save(update_fields=['status', 'error', 'completed_at'])
+    return statement_id, statement.status
+
+
+def process_queue(limit=None):
+    """
+    Reconcile queued statements, oldest first, picking up abandoned runs
+    where they stopped
+
+    Returns {status: count}.
+    """
+    StatementImport.objects.filter(
+        status='running', checkpoint_at__lt=timezone.now() - STALE_AFTER
+    ).update(status='queued')
+    statement_ids = list(
+        StatementImport.objects.filter(status='queued').order_by('uploaded_at').values_list('pk', flat=True)[:limit]
+    )
+    outcome = {}
+    for _, status in map(run_statement, statement_ids):
+        if status:
+            outcome[status] = outcome.get(status, 0) + 1
+    return outcome
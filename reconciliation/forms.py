@@ -0,0 +1,33 @@
+from django import forms
+
+from .models import StatementImport
+
+
+class StatementUploadForm(forms.Form):
+    sacco = forms.ModelChoiceField(
+        queryset=None,
+        widget=forms.Select(attrs={'class': 'form-select'})
+    )
+    provider = forms.ChoiceField(
+        choices=StatementImport.PROVIDER_CHOICES,
+        widget=forms.Select(attrs={'class': 'form-select'})
+    )
+    file = forms.FileField(
+        label='Statement (CSV)',
+        widget=forms.ClearableFileInput(attrs={'class': 'form-control', 'accept': '.csv,text/csv'})
+    )
+    auto_post = forms.BooleanField(
+        required=False,
+        label='Deposit unmatched payments into the payer\'s savings account',
+        widget=forms.CheckboxInput(attrs={'class': 'form-check-input'})
+    )
+
+    def __init__(self, *args, saccos=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fields['sacco'].queryset = saccos
+
+    def clean_file(self):
+        upload = self.cleaned_data['file']
+        if not upload.name.lower().endswith('.csv'):
+            raise forms.ValidationError('Upload the statement as a CSV file.')
+        return upload
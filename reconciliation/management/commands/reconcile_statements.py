@@ -0,0 +1,67 @@
+"""
+Worker for mobile money statement reconciliation (see reconciliation/engine.py)
+
+Reconciles statements uploaded under Reporting, oldest first, and resumes
+runs that stopped part way. Run it from cron, or keep it running with
+--loop. A statement file can also be queued from disk first:
+
+    python manage.py reconcile_statements --file mtn-2026-09.csv --provider MTN --sacco 4 --auto-post
+"""
+import os
+import time
+
+from django.core.files import File
+from django.core.management.base import BaseCommand, CommandError
+
+from accounts.models import Sacco
+from reconciliation.engine import process_queue
+from reconciliation.models import StatementImport
+
+
+class Command(BaseCommand):
+    help = 'Reconcile queued mobile money statements against savings transactions and loan repayments'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--file', help='First queue this statement CSV')
+        parser.add_argument(
+            '--provider',
+            choices=[choice for choice, _ in StatementImport.PROVIDER_CHOICES],
+            help='Provider of the --file statement'
+        )
+        parser.add_argument('--sacco', type=int, help='Sacco id of the --file statement')
+        parser.add_argument(
+            '--auto-post', action='store_true',
+            help='Deposit unmatched payments into the payer\'s only open savings account'
+        )
+        parser.add_argument('--loop', action='store_true', help='Keep polling the queue')
+        parser.add_argument('--interval', type=int, default=30, help='Seconds between polls with --loop')
+
+    def handle(self, *args, **options):
+        if options['file']:
+            if not options['provider'] or not options['sacco']:
+                raise CommandError('--file needs --provider and --sacco')
+            sacco = Sacco.objects.filter(pk=options['sacco']).first()
+            if sacco is None:
+                raise CommandError(f'No Sacco with id {options["sacco"]}')
+            name = os.path.basename(options['file'])
+            try:
+                with open(options['file'], 'rb') as handle:
+                    statement = StatementImport(
+                        sacco=sacco, provider=options['provider'], original_name=name,
+                        auto_post=options['auto_post'],
+                    )
+                    statement.file.save(name, File(handle), save=False)
+                    statement.save()
+            except OSError as e:
+                raise CommandError(f'Cannot read {options["file"]}: {e}')
+            self.stdout.write(f'Queued {name} as statement {statement.pk}')
+
+        while True:
+            started = time.monotonic()
+            outcome = process_queue()
+            if outcome:
+                summary = ', '.join(f'{count} {status}' for status, count in sorted(outcome.items()))
+                self.stdout.write(self.style.SUCCESS(f'{summary} in {time.monotonic() - started:.1f}s'))
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
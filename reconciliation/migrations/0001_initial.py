@@ -0,0 +1,75 @@
+# Generated by Django 4.2.7 on 2026-10-19 01:21
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('loans', '0008_sync_indexes'),
+        ('accounts', '0002_district_sacco_district'),
+        ('savings', '0005_sync_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StatementImport',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('provider', models.CharField(choices=[('MTN', 'MTN Mobile Money'), ('Airtel', 'Airtel Money')], max_length=20)),
+                ('file', models.FileField(upload_to='reconciliation/statements/%Y/%m/')),
+                ('original_name', models.CharField(blank=True, max_length=255)),
+                ('auto_post', models.BooleanField(default=False)),
+                ('status', models.CharField(choices=[('queued', 'Queued'), ('running', 'Reconciling'), ('done', 'Done'), ('failed', 'Failed')], default='queued', max_length=10)),
+                ('rows_read', models.PositiveIntegerField(default=0)),
+                ('matched', models.PositiveIntegerField(default=0)),
+                ('fuzzy_matched', models.PositiveIntegerField(default=0)),
+                ('posted', models.PositiveIntegerField(default=0)),
+                ('unmatched', models.PositiveIntegerField(default=0)),
+                ('skipped', models.PositiveIntegerField(default=0)),
+                ('error', models.TextField(blank=True)),
+                ('uploaded_at', models.DateTimeField(auto_now_add=True)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('checkpoint_at', models.DateTimeField(blank=True, null=True)),
+                ('completed_at', models.DateTimeField(blank=True, null=True)),
+                ('sacco', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='statement_imports', to='accounts.sacco')),
+                ('uploaded_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-uploaded_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='StatementLine',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('row_number', models.PositiveIntegerField()),
+                ('provider_tx_id', models.CharField(max_length=100)),
+                ('phone', models.CharField(blank=True, max_length=20)),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=14)),
+                ('direction', models.CharField(choices=[('in', 'Received'), ('out', 'Paid out')], max_length=3)),
+                ('occurred_at', models.DateTimeField()),
+                ('status', models.CharField(choices=[('matched', 'Matched by transaction id'), ('fuzzy', 'Matched by phone, amount and time'), ('posted', 'Posted as a deposit'), ('unmatched', 'Unmatched')], max_length=10)),
+                ('loan_repayment', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='loans.loanrepayment')),
+                ('savings_transaction', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='savings.savingstransaction')),
+                ('statement', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='lines', to='reconciliation.statementimport')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['statement', 'status', 'row_number'], name='recon_line_status_idx')],
+                'unique_together': {('statement', 'row_number')},
+            },
+        ),
+        migrations.AddIndex(
+            model_name='statementimport',
+            index=models.Index(fields=['status', 'uploaded_at'], name='reconciliat_status_999c85_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='statementimport',
+            index=models.Index(fields=['sacco', 'uploaded_at'], name='reconciliat_sacco_i_84c551_idx'),
+        ),
+    ]
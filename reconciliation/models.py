@@ -0,0 +1,92 @@
+from django.db import models
+
+from accounts.models import Sacco
+
+
+class StatementImport(models.Model):
+    """
+    A mobile money provider statement uploaded for reconciliation, worked
+    through in the background by the reconcile_statements command (see
+    reconciliation/engine.py). rows_read is the checkpoint a stopped run
+    resumes from; checkpoint_at tells a live run from an abandoned one.
+    """
+    PROVIDER_CHOICES = [
+        ('MTN', 'MTN Mobile Money'),
+        ('Airtel', 'Airtel Money'),
+    ]
+    STATUS_CHOICES = [
+        ('queued', 'Queued'),
+        ('running', 'Reconciling'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ]
+
+    sacco = models.ForeignKey(Sacco, on_delete=models.CASCADE, related_name='statement_imports')
+    provider = models.CharField(max_length=20, choices=PROVIDER_CHOICES)
+    # Kept out of public /media by nginx; serve only through accounts.downloads.protected_file_response
+    file = models.FileField(upload_to='reconciliation/statements/%Y/%m/')
+    original_name = models.CharField(max_length=255, blank=True)
+    # Unmatched money received from a member with a single open savings account is deposited there
+    auto_post = models.BooleanField(default=False)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='queued')
+    rows_read = models.PositiveIntegerField(default=0)
+    matched = models.PositiveIntegerField(default=0)
+    fuzzy_matched = models.PositiveIntegerField(default=0)
+    posted = models.PositiveIntegerField(default=0)
+    unmatched = models.PositiveIntegerField(default=0)
+    skipped = models.PositiveIntegerField(default=0)
+    error = models.TextField(blank=True)
+    uploaded_by = models.ForeignKey('accounts.User', on_delete=models.SET_NULL, null=True, blank=True)
+    uploaded_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    checkpoint_at = models.DateTimeField(null=True, blank=True)
+    completed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-uploaded_at']
+        indexes = [
+            models.Index(fields=['status', 'uploaded_at']),
+            models.Index(fields=['sacco', 'uploaded_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.get_provider_display()} statement - {self.sacco.name} ({self.uploaded_at:%Y-%m-%d})"
+
+
+class StatementLine(models.Model):
+    """One successful statement row and what it was reconciled against"""
+    STATUS_CHOICES = [
+        ('matched', 'Matched by transaction id'),
+        ('fuzzy', 'Matched by phone, amount and time'),
+        ('posted', 'Posted as a deposit'),
+        ('unmatched', 'Unmatched'),
+    ]
+    DIRECTION_CHOICES = [
+        ('in', 'Received'),
+        ('out', 'Paid out'),
+    ]
+
+    statement = models.ForeignKey(StatementImport, on_delete=models.CASCADE, related_name='lines')
+    row_number = models.PositiveIntegerField()
+    provider_tx_id = models.CharField(max_length=100)
+    phone = models.CharField(max_length=20, blank=True)
+    amount = models.DecimalField(max_digits=14, decimal_places=2)
+    direction = models.CharField(max_length=3, choices=DIRECTION_CHOICES)
+    occurred_at = models.DateTimeField()
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES)
+    savings_transaction = models.ForeignKey(
+        'savings.SavingsTransaction', on_delete=models.SET_NULL, null=True, blank=True, related_name='+'
+    )
+    loan_repayment = models.ForeignKey(
+        'loans.LoanRepayment', on_delete=models.SET_NULL, null=True, blank=True, related_name='+'
+    )
+
+    class Meta:
+        unique_together = ('statement', 'row_number')
+        indexes = [
+            # A statement's lines by status in file order, see reconciliation/views.py
+            models.Index(fields=['statement', 'status', 'row_number'], name='recon_line_status_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.provider_tx_id} - {self.amount} ({self.status})"
@@ -0,0 +1,166 @@
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from accounts.models import Region, Sacco, User
+from members.models import Member, MemberMobileWallet
+
+from .models import StatementImport, StatementLine
+
+
+class ReconciliationTest(TestCase):
+    def setUp(self):
+        import shutil
+        import tempfile
+        from django.test import override_settings
+        from loans.models import Loan, LoanProduct, LoanRepayment
+        from savings.models import SavingProduct, SavingsAccount, SavingsTransaction
+        media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media, ignore_errors=True)
+        settings_override = override_settings(MEDIA_ROOT=media)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        cache.clear()
+
+        region = Region.objects.create(name="Recon Region")
+        self.sacco = Sacco.objects.create(
+            name="Recon Sacco", registration_number="REC001", address="Address",
+            phone="1234567890", email="recon@sacco.com", region=region
+        )
+        self.member = Member.objects.create(
+            sacco=self.sacco, member_number="REC-M1", first_name="Test", last_name="Payer",
+            phone="0772 000 001", gender="Female", date_of_birth="1990-01-01", home_address="Address",
+            village_town="Town", district="District", date_joined="2024-01-01"
+        )
+        MemberMobileWallet.objects.create(member=self.member, provider='MTN', phone_number="256772000002")
+        product = SavingProduct.objects.create(sacco=self.sacco, name="Ordinary", product_code="REC-ORD")
+        self.account = SavingsAccount.objects.create(
+            member=self.member, product=product, account_number="SA-REC-1", balance=Decimal('1000')
+        )
+        self.by_id = SavingsTransaction.objects.create(
+            account=self.account, txn_type='Deposit', amount=Decimal('100'), running_balance=Decimal('1000'),
+            mobile_money_tx_id='MP1'
+        )
+        self.by_phone = SavingsTransaction.objects.create(
+            account=self.account, txn_type='Deposit', amount=Decimal('250'), running_balance=Decimal('1000')
+        )
+        loan_product = LoanProduct.objects.create(
+            sacco=self.sacco, name="Business", product_code="REC-BIZ", description="Business loans",
+            interest_rate=Decimal('12'), max_amount=Decimal('100000'), min_amount=Decimal('100'),
+            max_duration_months=24, min_duration_months=1
+        )
+        loan = Loan.objects.create(
+            member=self.member, product=loan_product, loan_ref="REC-1", amount_requested=Decimal('500'),
+            interest_rate=Decimal('12'), duration_months=6, purpose="Stock", status='active',
+        )
+        self.repayment = LoanRepayment.objects.create(loan=loan, amount=Decimal('300'))
+        self.user = User.objects.create_user(
+            username="reconadmin", password="recon12345", is_sacco_admin=True, sacco=self.sacco
+        )
+
+    def statement_csv(self):
+        when = timezone.localtime().strftime('%d/%m/%Y %H:%M:%S')
+        rows = [
+            'Id,Date,Status,Type,From,To,Amount,Currency',
+            f'MP1,{when},SUCCESSFUL,PAYMENT,256772000001,SACCO,100,UGX',
+            f'MP2,{when},SUCCESSFUL,PAYMENT,+256 772 000 001,SACCO,250.00,UGX',
+            f'MP3,{when},SUCCESSFUL,PAYMENT,0772000002,SACCO,"300",UGX',
+            f'MP4,{when},FAILED,PAYMENT,0772000001,SACCO,500,UGX',
+            f'MP5,{when},SUCCESSFUL,PAYMENT,0772000001,SACCO,"1,075",UGX',
+            f'MP6,{when},SUCCESSFUL,PAYMENT,0700999999,SACCO,40,UGX',
+            f'MP7,{when},SUCCESSFUL,TRANSFER,SACCO,0772000001,-60,UGX',
+            'MP8,yesterday,SUCCESSFUL,PAYMENT,0772000001,SACCO,10,UGX',
+        ]
+        return '\n'.join(rows).encode()
+
+    def queue(self, auto_post=True):
+        statement = StatementImport(sacco=self.sacco, provider='MTN', auto_post=auto_post, uploaded_by=self.user)
+        statement.file.save('mtn.csv', ContentFile(self.statement_csv()), save=False)
+        statement.save()
+        return statement
+
+    def test_match_post_and_flag(self):
+        from .engine import process_queue
+        statement = self.queue()
+        self.assertEqual(process_queue(), {'done': 1})
+        statement.refresh_from_db()
+        counts = (statement.rows_read, statement.matched, statement.fuzzy_matched, statement.posted,
+                  statement.unmatched, statement.skipped)
+        self.assertEqual(counts, (8, 1, 2, 1, 2, 2))
+
+        lines = {line.provider_tx_id: line for line in statement.lines.all()}
+        self.assertEqual(lines['MP1'].savings_transaction_id, self.by_id.pk)
+        self.assertEqual((lines['MP2'].status, lines['MP2'].savings_transaction_id), ('fuzzy', self.by_phone.pk))
+        self.assertEqual((lines['MP3'].status, lines['MP3'].loan_repayment_id), ('fuzzy', self.repayment.pk))
+        self.assertEqual([lines['MP6'].status, lines['MP7'].status], ['unmatched', 'unmatched'])
+        self.assertEqual(lines['MP7'].direction, 'out')
+
+        # Fuzzy matches take the provider's id; unmatched money received is deposited
+        self.by_phone.refresh_from_db()
+        self.repayment.refresh_from_db()
+        self.assertEqual((self.by_phone.mobile_money_tx_id, self.repayment.mobile_money_tx_id), ('MP2', 'MP3'))
+        posted = lines['MP5'].savings_transaction
+        self.assertEqual((posted.amount, posted.running_balance, posted.mobile_money_tx_id),
+                         (Decimal('1075'), Decimal('2075'), 'MP5'))
+        self.account.refresh_from_db()
+        self.assertEqual(self.account.balance, Decimal('2075'))
+
+        # The same statement again matches everything it reconciled by id
+        again = self.queue()
+        process_queue()
+        again.refresh_from_db()
+        self.assertEqual((again.matched, again.fuzzy_matched, again.posted, again.unmatched), (4, 0, 0, 2))
+
+    def test_resumes_from_checkpoint(self):
+        from .engine import reconcile
+        statement = self.queue(auto_post=False)
+        statement.rows_read = 4
+        reconcile(statement, chunk_size=2)
+        statement.refresh_from_db()
+        self.assertEqual(statement.rows_read, 8)
+        self.assertEqual(
+            list(statement.lines.values_list('provider_tx_id', flat=True).order_by('row_number')),
+            ['MP5', 'MP6', 'MP7']
+        )
+        # Nothing is read twice
+        reconcile(statement)
+        self.assertEqual(StatementLine.objects.filter(statement=statement).count(), 3)
+
+    def test_upload_and_review(self):
+        from django.core.files.uploadedfile import SimpleUploadedFile
+        from .engine import process_queue
+        self.client.login(username="reconadmin", password="recon12345")
+        upload = SimpleUploadedFile('mtn-sept.csv', self.statement_csv(), content_type='text/csv')
+        response = self.client.post(reverse('reconciliation_statements'), {
+            'sacco': self.sacco.pk, 'provider': 'MTN', 'file': upload,
+        })
+        self.assertRedirects(response, reverse('reconciliation_statements'))
+        statement = StatementImport.objects.get()
+        self.assertEqual((statement.status, statement.original_name), ('queued', 'mtn-sept.csv'))
+
+        process_queue()
+        response = self.client.get(reverse('reconciliation_statement_detail', args=[statement.pk]))
+        self.assertContains(response, 'MP6')
+        self.assertNotContains(response, 'MP1')
+
+        other_sacco = Sacco.objects.create(
+            name="Other Recon Sacco", registration_number="REC002", address="Address",
+            phone="1234567890", email="recon2@sacco.com", region=self.sacco.region
+        )
+        User.objects.create_user(username="otheradmin", password="recon12345", is_sacco_admin=True, sacco=other_sacco)
+        self.client.login(username="otheradmin", password="recon12345")
+        response = self.client.get(reverse('reconciliation_statement_detail', args=[statement.pk]))
+        self.assertEqual(response.status_code, 404)
+
+    def test_rejects_other_formats(self):
+        from .engine import run_statement
+        statement = StatementImport(sacco=self.sacco, provider='Airtel')
+        statement.file.save('airtel.csv', ContentFile(b'Ref,When,Value\nX1,2026-01-01,10\n'), save=False)
+        statement.save()
+        self.assertEqual(run_statement(statement.pk), (statement.pk, 'failed'))
+        statement.refresh_from_db()
+        self.assertIn('Not an Airtel Money statement', statement.error)
@@ -0,0 +1,7 @@
+from django.urls import path
+from . import views
+
+urlpatterns = [
+    path('statements/', views.statement_imports, name='reconciliation_statements'),
+    path('statements/<int:statement_id>/', views.statement_detail, name='reconciliation_statement_detail'),
+]
@@ -0,0 +1,69 @@
+from django.contrib import messages
+from django.http import Http404
+from django.shortcuts import get_object_or_404, redirect, render
+
+from accounts.decorators import sacco_admin_required, use_read_replica
+
+from .forms import StatementUploadForm
+from .models import StatementImport, StatementLine
+
+LINES_PER_PAGE = 100
+
+
+@sacco_admin_required
+def statement_imports(request):
+    """Upload provider statements for reconciliation and follow their progress"""
+    from accounts.permissions import get_accessible_saccos
+    from accounts.scope import get_user_scope
+
+    saccos = get_accessible_saccos(request.user).filter(is_active=True).order_by('name')
+
+    if request.method == 'POST':
+        form = StatementUploadForm(request.POST, request.FILES, saccos=saccos)
+        if form.is_valid():
+            data = form.cleaned_data
+            StatementImport.objects.create(
+                sacco=data['sacco'],
+                provider=data['provider'],
+                file=data['file'],
+                original_name=data['file'].name[:255],
+                auto_post=data['auto_post'],
+                uploaded_by=request.user,
+            )
+            messages.success(request, 'Statement queued for reconciliation.')
+            return redirect('reconciliation_statements')
+    else:
+        form = StatementUploadForm(saccos=saccos, initial={'sacco': request.user.sacco_id})
+
+    statements = get_user_scope(request.user).filter(
+        StatementImport.objects.select_related('sacco', 'uploaded_by'), 'statement_import'
+    )[:100]
+    return render(request, 'reconciliation/statements.html', {'form': form, 'statements': statements})
+
+
+@sacco_admin_required
+@use_read_replica
+def statement_detail(request, statement_id):
+    """A statement's counters and its lines of one status, keyset paged in file order (?after=<row>)"""
+    from accounts.scope import get_user_scope
+
+    statement = get_object_or_404(StatementImport.objects.select_related('sacco'), id=statement_id)
+    if not get_user_scope(request.user).can_access_sacco(statement.sacco_id):
+        raise Http404('Statement not found')
+
+    status = request.GET.get('status', 'unmatched')
+    if status not in dict(StatementLine.STATUS_CHOICES):
+        status = 'unmatched'
+    after = request.GET.get('after', '')
+    lines = StatementLine.objects.filter(statement=statement, status=status).order_by('row_number')
+    if after.isdigit():
+        lines = lines.filter(row_number__gt=int(after))
+    lines = list(lines[:LINES_PER_PAGE + 1])
+
+    return render(request, 'reconciliation/statement_detail.html', {
+        'statement': statement,
+        'status': status,
+        'statuses': StatementLine.STATUS_CHOICES,
+        'lines': lines[:LINES_PER_PAGE],
+        'next_after': lines[LINES_PER_PAGE - 1].row_number if len(lines) > LINES_PER_PAGE else None,
+    })
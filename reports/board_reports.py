@@ -0,0 +1,344 @@
+"""
+DOCX board reports generated in the background
+
+A report is identified by (report type, Sacco, period, data version). The data
+version fingerprints the tables a report reads (row count, latest change and
+amount totals per table), so requesting a report whose data has not changed
+returns the file that was already generated, while any new or edited record
+produces a new version. Tables without an updated_at column only change the
+version through additions, deletions or amount changes.
+
+Requests only queue a GeneratedReport; the generate_board_reports command is
+the worker and builds queued reports in a process pool.
+"""
+import hashlib
+import io
+import logging
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+
+from django.core.files.base import ContentFile
+from django.db import connections
+from django.db.models import Count, Max, Q, Sum
+from django.utils import timezone
+
+from .models import GeneratedReport
+
+logger = logging.getLogger(__name__)
+
+# Bump when the layout of the documents changes so cached files are rebuilt
+FORMAT_VERSION = 1
+
+# A report still 'running' this long after it was claimed belongs to a worker that died
+STALE_AFTER = timedelta(hours=1)
+
+
+def _sources(report_type):
+    """(queryset, sacco path, change marker, amount field) read by each report type"""
+    from expenses.models import Expense
+    from funding.models import Funding, FundsAllocation
+    from loans.models import Loan, LoanInstallment, LoanRepayment
+    from members.models import Member
+    from savings.models import SavingsAccount, SavingsTransaction
+
+    return {
+        'loan': [
+            (Loan.objects.all(), 'sacco_id', 'updated_at', 'amount_approved'),
+            (LoanRepayment.objects.all(), 'sacco_id', 'updated_at', 'amount'),
+            (LoanInstallment.objects.all(), 'loan__sacco_id', 'id', 'amount_due'),
+        ],
+        'member': [
+            (Member.objects.all(), 'sacco_id', 'updated_at', None),
+            (SavingsAccount.objects.all(), 'sacco_id', 'updated_at', 'balance'),
+            (SavingsTransaction.objects.all(), 'sacco_id', 'updated_at', 'amount'),
+        ],
+        'funding': [
+            (Funding.objects.all(), 'sacco_id', 'id', 'amount'),
+            (FundsAllocation.objects.all(), 'funding__sacco_id', 'id', 'allocated_amount'),
+            (Expense.objects.all(), 'sacco_id', 'id', 'amount'),
+        ],
+    }[report_type]
+
+
+def data_version(report_type, sacco_id):
+    """Fingerprint of the data a report of this type reads for a Sacco"""
+    parts = [str(FORMAT_VERSION)]
+    for queryset, sacco_path, marker, amount in _sources(report_type):
+        aggregates = {'rows': Count('pk'), 'latest': Max(marker)}
+        if amount:
+            aggregates['total'] = Sum(amount)
+        state = queryset.filter(**{sacco_path: sacco_id}).aggregate(**aggregates)
+        parts.append(repr(sorted(state.items())))
+    return hashlib.sha256('|'.join(parts).encode()).hexdigest()[:32]
+
+
+def request_report(report_type, sacco, period_start, period_end, user=None):
+    """
+    The report for the Sacco's current data: an existing one when nothing
+    changed since it was generated, otherwise a newly queued one
+    """
+    report, _ = GeneratedReport.objects.get_or_create(
+        report_type=report_type,
+        sacco=sacco,
+        period_start=period_start,
+        period_end=period_end,
+        data_version=data_version(report_type, sacco.id),
+        defaults={'requested_by': user},
+    )
+    if report.status == 'failed':
+        report.status = 'queued'
+        report.error = ''
+        report.save(update_fields=['status', 'error'])
+    return report
+
+
+# Document building
+
+def _period_bounds(report):
+    low = timezone.make_aware(datetime.combine(report.period_start, datetime.min.time()))
+    high = timezone.make_aware(datetime.combine(report.period_end + timedelta(days=1), datetime.min.time()))
+    return low, high
+
+
+def _money(value):
+    return f"UGX {value or 0:,.2f}"
+
+
+def _table(document, headers, rows):
+    table = document.add_table(rows=1, cols=len(headers))
+    table.style = 'Light Grid Accent 1'
+    for cell, header in zip(table.rows[0].cells, headers):
+        cell.text = header
+    for row in rows:
+        for cell, value in zip(table.add_row().cells, row):
+            cell.text = str(value)
+    return table
+
+
+def _summary(document, items):
+    for label, value in items:
+        paragraph = document.add_paragraph(style='List Bullet')
+        paragraph.add_run(f"{label}: ").bold = True
+        paragraph.add_run(str(value))
+
+
+def _loan_report(document, report):
+    from loans.models import Loan, LoanRepayment
+    from .par import par_report
+
+    low, high = _period_bounds(report)
+    loans = Loan.objects.filter(sacco=report.sacco)
+    disbursed = loans.filter(disbursement_date__gte=low, disbursement_date__lt=high).aggregate(
+        count=Count('id'), amount=Sum('amount_approved')
+    )
+    repaid = LoanRepayment.objects.filter(
+        sacco=report.sacco, payment_date__gte=low, payment_date__lt=high
+    ).aggregate(amount=Sum('amount'))['amount']
+
+    par = par_report([report.sacco_id], report.period_end, 'product')
+    document.add_heading('Summary', level=2)
+    _summary(document, [
+        ('Loans disbursed in period', f"{disbursed['count']} ({_money(disbursed['amount'])})"),
+        ('Repayments received in period', _money(repaid)),
+        ('Loans outstanding at period end', par['total']['loans']),
+        ('Outstanding balance at period end', _money(par['total']['balance'])),
+        ('PAR30 at period end', f"{par['total']['par30']}%"),
+    ])
+
+    document.add_heading('Portfolio at risk by product', level=2)
+    _table(
+        document,
+        ['Product', 'Loans', 'Outstanding'] + [bucket['label'] for bucket in par['total']['aging']] + ['PAR30'],
+        [
+            [row['label'], row['loans'], _money(row['balance'])]
+            + [_money(bucket['balance']) for bucket in row['aging']]
+            + [f"{row['par30']}%"]
+            for row in par['rows'] + [par['total']]
+        ],
+    )
+
+    document.add_heading('Loans by status', level=2)
+    statuses = dict(Loan.STATUS_CHOICES)
+    _table(
+        document,
+        ['Status', 'Loans', 'Approved amount'],
+        [
+            [statuses.get(row['status'], row['status']), row['count'], _money(row['amount'])]
+            for row in loans.order_by('status').values('status').annotate(count=Count('id'), amount=Sum('amount_approved'))
+        ],
+    )
+
+
+def _member_report(document, report):
+    from members.models import Member
+    from savings.models import SavingsAccount, SavingsTransaction
+
+    low, high = _period_bounds(report)
+    members = Member.objects.filter(sacco=report.sacco)
+    # distinct: the borrowers filter joins loans, one row per loan
+    counts = members.aggregate(
+        total=Count('id', distinct=True),
+        active=Count('id', filter=Q(status='Active'), distinct=True),
+        new=Count('id', filter=Q(date_joined__gte=report.period_start, date_joined__lte=report.period_end), distinct=True),
+        borrowers=Count('id', filter=Q(loan__isnull=False), distinct=True),
+    )
+    savings = SavingsTransaction.objects.filter(
+        sacco=report.sacco, performed_at__gte=low, performed_at__lt=high
+    ).aggregate(
+        deposits=Sum('amount', filter=Q(txn_type='Deposit')),
+        withdrawals=Sum('amount', filter=Q(txn_type='Withdrawal')),
+    )
+    balance = SavingsAccount.objects.filter(sacco=report.sacco).aggregate(total=Sum('balance'))['total']
+
+    document.add_heading('Summary', level=2)
+    _summary(document, [
+        ('Members', counts['total']),
+        ('Active members', counts['active']),
+        ('New members in period', counts['new']),
+        ('Members with loans', counts['borrowers']),
+        ('Savings deposits in period', _money(savings['deposits'])),
+        ('Savings withdrawals in period', _money(savings['withdrawals'])),
+        ('Total savings balance', _money(balance)),
+    ])
+
+    document.add_heading('Members by status', level=2)
+    _table(
+        document,
+        ['Status', 'Members'],
+        [[row['status'], row['count']] for row in members.order_by('status').values('status').annotate(count=Count('id'))],
+    )
+
+
+def _funding_report(document, report):
+    from expenses.models import Expense
+    from funding.models import Funding, FundsAllocation
+
+    low, high = _period_bounds(report)
+    funding = Funding.objects.filter(sacco=report.sacco)
+    received = funding.filter(received_date__gte=low, received_date__lt=high)
+    allocated = FundsAllocation.objects.filter(
+        funding__sacco=report.sacco, allocated_date__gte=low, allocated_date__lt=high
+    ).aggregate(total=Sum('allocated_amount'))['total']
+    expenses = Expense.objects.filter(
+        sacco=report.sacco, expense_date__gte=report.period_start, expense_date__lte=report.period_end
+    )
+
+    document.add_heading('Summary', level=2)
+    _summary(document, [
+        ('Funding received in period', _money(received.aggregate(total=Sum('amount'))['total'])),
+        ('Funds allocated in period', _money(allocated)),
+        ('Expenses in period', _money(expenses.aggregate(total=Sum('amount'))['total'])),
+    ])
+
+    document.add_heading('Funding received by source', level=2)
+    _table(
+        document,
+        ['Source', 'Grants', 'Amount'],
+        [
+            [row['source__name'], row['count'], _money(row['amount'])]
+            for row in received.order_by('source__name').values('source__name').annotate(count=Count('id'), amount=Sum('amount'))
+        ],
+    )
+
+    document.add_heading('Expenses by category', level=2)
+    _table(
+        document,
+        ['Category', 'Expenses', 'Amount'],
+        [
+            [row['category__name'], row['count'], _money(row['amount'])]
+            for row in expenses.order_by('category__name').values('category__name').annotate(count=Count('id'), amount=Sum('amount'))
+        ],
+    )
+
+
+BUILDERS = {
+    'loan': _loan_report,
+    'member': _member_report,
+    'funding': _funding_report,
+}
+
+
+def build_document(report):
+    """The report as DOCX bytes"""
+    from docx import Document
+
+    document = Document()
+    document.add_heading(f"{report.sacco.name}: {report.get_report_type_display()} report", level=1)
+    document.add_paragraph(
+        f"Period {report.period_start:%d %b %Y} to {report.period_end:%d %b %Y}. "
+        f"Generated {timezone.localtime():%d %b %Y %H:%M}."
+    )
+    BUILDERS[report.report_type](document, report)
+    buffer = io.BytesIO()
+    document.save(buffer)
+    return buffer.getvalue()
+
+
+# Worker
+
+def generate_report(report_id):
+    """Build one queued report; returns (report id, final status)"""
+    claimed = GeneratedReport.objects.filter(pk=report_id, status='queued').update(
+        status='running', started_at=timezone.now()
+    )
+    if not claimed:
+        return report_id, None
+    report = GeneratedReport.objects.select_related('sacco').get(pk=report_id)
+    try:
+        content = build_document(report)
+        report.file.save(report.filename, ContentFile(content), save=False)
+        report.status = 'ready'
+        report.error = ''
+    except Exception as exc:
+        logger.exception('Board report %s failed', report_id)
+        report.status = 'failed'
+        report.error = str(exc)
+    report.completed_at = timezone.now()
+    report.save(update_fields=['file', 'status', 'error', 'completed_at'])
+
+    if report.status == 'ready':
+        # Files of earlier data versions of the same report are superseded
+        superseded = GeneratedReport.objects.filter(
+            report_type=report.report_type,
+            sacco_id=report.sacco_id,
+            period_start=report.period_start,
+            period_end=report.period_end,
+            status__in=['ready', 'failed'],
+        ).exclude(pk=report.pk)
+        for old in superseded:
+            if old.file:
+                old.file.delete(save=False)
+            old.delete()
+    return report_id, report.status
+
+
+def _init_worker():
+    import django
+    django.setup()
+
+
+def process_queue(workers=1, limit=None):
+    """
+    Build queued reports, oldest first, in a pool of worker processes
+
+    Returns {status: count}.
+    """
+    GeneratedReport.objects.filter(
+        status='running', completed_at__isnull=True, started_at__lt=timezone.now() - STALE_AFTER
+    ).update(status='queued')
+    report_ids = list(
+        GeneratedReport.objects.filter(status='queued').order_by('requested_at').values_list('pk', flat=True)[:limit]
+    )
+    if workers <= 1 or len(report_ids) <= 1:
+        statuses = [status for _, status in map(generate_report, report_ids)]
+    else:
+        # Worker processes must open their own database connections
+        connections.close_all()
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+            statuses = [status for _, status in pool.map(generate_report, report_ids)]
+
+    outcome = {}
+    for status in statuses:
+        if status:
+            outcome[status] = outcome.get(status, 0) + 1
+    return outcome
@@ -1,5 +1,5 @@
 from django import forms
-from .models import SaccoReviewPeriod, SaccoKRA, SaccoKPI, SaccoKPIResult
+from .models import SaccoReviewPeriod, SaccoKRA, SaccoKPI, SaccoKPIResult, GeneratedReport
 
 
 class ReviewPeriodForm(forms.ModelForm):
@@ -29,7 +29,7 @@ class KRAForm(forms.ModelForm):
 class KPIForm(forms.ModelForm):
     class Meta:
         model = SaccoKPI
-        fields = ['name', 'description', 'unit', 'target_value', 'weight', 'direction', 'is_active']
+        fields = ['name', 'description', 'unit', 'target_value', 'weight', 'direction', 'metric_source', 'is_active']
         widgets = {
             'name': forms.TextInput(attrs={'class': 'form-control'}),
             'description': forms.Textarea(attrs={'rows': 3, 'class': 'form-control'}),
@@ -37,6 +37,7 @@ class KPIForm(forms.ModelForm):
             'target_value': forms.NumberInput(attrs={'class': 'form-control', 'step': '0.01'}),
             'weight': forms.NumberInput(attrs={'class': 'form-control', 'step': '0.01'}),
             'direction': forms.Select(attrs={'class': 'form-select'}),
+            'metric_source': forms.Select(attrs={'class': 'form-select'}),
             'is_active': forms.CheckboxInput(attrs={'class': 'form-check-input'}),
         }
 
@@ -51,10 +52,62 @@ class KPIResultForm(forms.ModelForm):
         }
 
 
-
-
-
-
-
-
-
+class KPIResultBatchForm(forms.Form):
+    """
+    Actual values of every manually entered KPI of a period, validated and
+    saved together. version carries the period's results_version from when
+    the form was rendered so concurrent edits can be detected.
+    """
+    version = forms.CharField(widget=forms.HiddenInput)
+
+    def __init__(self, *args, kpis=(), **kwargs):
+        super().__init__(*args, **kwargs)
+        # KPIs with a metric source are computed, see reports/metrics.py
+        self.kpis = [kpi for kpi in kpis if not kpi.metric_source]
+        for kpi in self.kpis:
+            self.fields[self.field_name(kpi)] = forms.DecimalField(
+                label=kpi.name,
+                max_digits=16,
+                decimal_places=2,
+                required=False,
+                widget=forms.NumberInput(attrs={'class': 'form-control', 'step': '0.01'}),
+            )
+
+    @staticmethod
+    def field_name(kpi):
+        return f'actual_value_{kpi.id}'
+
+    def entered_values(self):
+        """{kpi: value} for the KPIs that were filled in"""
+        values = {}
+        for kpi in self.kpis:
+            value = self.cleaned_data.get(self.field_name(kpi))
+            if value is not None:
+                values[kpi] = value
+        return values
+
+
+class BoardReportForm(forms.Form):
+    report_type = forms.ChoiceField(
+        choices=GeneratedReport.REPORT_CHOICES,
+        widget=forms.Select(attrs={'class': 'form-select'})
+    )
+    sacco = forms.ModelChoiceField(
+        queryset=None,
+        required=False,
+        empty_label='All my Saccos',
+        widget=forms.Select(attrs={'class': 'form-select'})
+    )
+    period_start = forms.DateField(widget=forms.DateInput(attrs={'type': 'date', 'class': 'form-control'}))
+    period_end = forms.DateField(widget=forms.DateInput(attrs={'type': 'date', 'class': 'form-control'}))
+
+    def __init__(self, *args, saccos=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fields['sacco'].queryset = saccos
+
+    def clean(self):
+        cleaned_data = super().clean()
+        start, end = cleaned_data.get('period_start'), cleaned_data.get('period_end')
+        if start and end and end < start:
+            raise forms.ValidationError('The period must end on or after its start date.')
+        return cleaned_data
@@ -0,0 +1,140 @@
+"""
+Cross-Sacco KPI league table
+
+Each Sacco's scores are frozen into a SaccoPerformanceSnapshot when one of its
+review periods closes (see reports/signals.py). Saccos are compared on periods
+with the same name (e.g. "Q1 2025", as created by the performance views) and on
+KRAs with the same title. Ranks, percentiles and quartile bands are computed by
+the database with window functions over the snapshots of the requested period,
+and the delta against each Sacco's previous closed period with a subquery.
+"""
+from django.db import transaction
+from django.db.models import F, Max, OuterRef, Subquery, Window
+from django.db.models.functions import Ntile, PercentRank, Rank
+
+from .models import SaccoKRASnapshot, SaccoPerformanceSnapshot
+from .scoring import get_scorecard, score_periods
+
+BANDS = {
+    1: 'Top quartile',
+    2: 'Second quartile',
+    3: 'Third quartile',
+    4: 'Bottom quartile',
+}
+
+
+def snapshot_period(period):
+    """Compute and store the scores of a closed period"""
+    scorecard = get_scorecard(period.sacco)
+    scores = score_periods(period.sacco, [period], scorecard)[period.id]
+    with transaction.atomic():
+        snapshot, _ = SaccoPerformanceSnapshot.objects.update_or_create(
+            period=period,
+            defaults={
+                'sacco_id': period.sacco_id,
+                'period_name': period.name,
+                'period_start': period.start_date,
+                'overall_score': scores['overall'],
+            }
+        )
+        snapshot.kra_scores.all().delete()
+        SaccoKRASnapshot.objects.bulk_create([
+            SaccoKRASnapshot(
+                snapshot=snapshot,
+                kra=kra,
+                kra_title=kra.title,
+                score=scores['kras'].get(kra.id, {}).get('score', 0.0),
+                achievement=scores['kras'].get(kra.id, {}).get('achievement', 0.0),
+            )
+            for kra in scorecard
+        ])
+    return snapshot
+
+
+def discard_snapshot(period):
+    """Withdraw a period from the league table when it is reopened"""
+    SaccoPerformanceSnapshot.objects.filter(period=period).delete()
+
+
+def _ranked(queryset, score_field):
+    order = F(score_field).desc()
+    return queryset.annotate(
+        rank=Window(Rank(), order_by=order),
+        percent_rank=Window(PercentRank(), order_by=order),
+        quartile=Window(Ntile(4), order_by=order),
+    ).order_by('rank', 'sacco_name')
+
+
+def league_table(period_name, sacco_ids=None, kra_title=None):
+    """
+    Rank the Saccos that closed a period called period_name, overall or on
+    one KRA, restricted to sacco_ids when given (None means all Saccos)
+
+    Each row has sacco_name, score, previous_score, rank, percent_rank and
+    quartile.
+    """
+    if kra_title:
+        queryset = SaccoKRASnapshot.objects.filter(snapshot__period_name=period_name, kra_title=kra_title)
+        if sacco_ids is not None:
+            queryset = queryset.filter(snapshot__sacco_id__in=sacco_ids)
+        previous = SaccoKRASnapshot.objects.filter(
+            snapshot__sacco_id=OuterRef('snapshot__sacco_id'),
+            kra_title=OuterRef('kra_title'),
+            snapshot__period_start__lt=OuterRef('snapshot__period_start'),
+        ).order_by('-snapshot__period_start').values('score')[:1]
+        queryset = queryset.annotate(
+            sacco_id=F('snapshot__sacco_id'),
+            sacco_name=F('snapshot__sacco__name'),
+            region_name=F('snapshot__sacco__region__name'),
+            previous_score=Subquery(previous),
+        )
+        rows = _ranked(queryset, 'score').values(
+            'sacco_id', 'sacco_name', 'region_name', 'score', 'previous_score',
+            'rank', 'percent_rank', 'quartile'
+        )
+    else:
+        queryset = SaccoPerformanceSnapshot.objects.filter(period_name=period_name)
+        if sacco_ids is not None:
+            queryset = queryset.filter(sacco_id__in=sacco_ids)
+        previous = SaccoPerformanceSnapshot.objects.filter(
+            sacco_id=OuterRef('sacco_id'),
+            period_start__lt=OuterRef('period_start'),
+        ).order_by('-period_start').values('overall_score')[:1]
+        queryset = queryset.annotate(
+            sacco_name=F('sacco__name'),
+            region_name=F('sacco__region__name'),
+            score=F('overall_score'),
+            previous_score=Subquery(previous),
+        )
+        rows = _ranked(queryset, 'overall_score').values(
+            'sacco_id', 'sacco_name', 'region_name', 'score', 'previous_score',
+            'rank', 'percent_rank', 'quartile'
+        )
+
+    table = []
+    for row in rows:
+        row['percentile'] = round((1 - (row['percent_rank'] or 0)) * 100)
+        row['band'] = BANDS.get(row['quartile'], '')
+        row['delta'] = row['score'] - row['previous_score'] if row['previous_score'] is not None else None
+        table.append(row)
+    return table
+
+
+def available_periods(sacco_ids=None):
+    """Names of closed periods that have snapshots, most recent first"""
+    queryset = SaccoPerformanceSnapshot.objects.all()
+    if sacco_ids is not None:
+        queryset = queryset.filter(sacco_id__in=sacco_ids)
+    return list(
+        queryset.values('period_name')
+        .annotate(latest_start=Max('period_start'))
+        .order_by('-latest_start')
+        .values_list('period_name', flat=True)
+    )
+
+
+def available_kras(period_name, sacco_ids=None):
+    queryset = SaccoKRASnapshot.objects.filter(snapshot__period_name=period_name)
+    if sacco_ids is not None:
+        queryset = queryset.filter(snapshot__sacco_id__in=sacco_ids)
+    return list(queryset.order_by('kra_title').values_list('kra_title', flat=True).distinct())
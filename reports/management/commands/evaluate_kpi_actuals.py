@@ -0,0 +1,47 @@
+"""
+Management command to compute the actual values of metric-bound KPIs
+(see reports/metrics.py) for every Sacco's review periods in one run
+
+    python manage.py evaluate_kpi_actuals --period-name "Q1 2025"
+"""
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from reports.metrics import evaluate_actuals
+from reports.models import SaccoReviewPeriod
+
+
+class Command(BaseCommand):
+    help = 'Compute KPI actuals from members, savings and loans for review periods'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--period-name', help='Only periods with this name, e.g. "Q1 2025"')
+        parser.add_argument('--sacco', type=int, help='Only periods of this Sacco id')
+        parser.add_argument(
+            '--include-closed',
+            action='store_true',
+            help='Also recompute closed periods (refreshes their league table snapshots)'
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Show how many results would be written without saving them'
+        )
+
+    def handle(self, *args, **options):
+        statuses = ['draft', 'active'] + (['closed'] if options['include_closed'] else [])
+        periods = SaccoReviewPeriod.objects.filter(status__in=statuses)
+        if options['period_name']:
+            periods = periods.filter(name=options['period_name'])
+        if options['sacco']:
+            periods = periods.filter(sacco_id=options['sacco'])
+
+        periods = list(periods)
+        started = timezone.now()
+        count = evaluate_actuals(periods, dry_run=options['dry_run'])
+        elapsed = (timezone.now() - started).total_seconds()
+
+        verb = 'Would write' if options['dry_run'] else 'Wrote'
+        self.stdout.write(self.style.SUCCESS(
+            f'{verb} {count} KPI result(s) for {len(periods)} period(s) in {elapsed:.1f}s'
+        ))
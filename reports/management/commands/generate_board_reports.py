@@ -0,0 +1,53 @@
+"""
+Worker for DOCX board reports (see reports/board_reports.py)
+
+Builds queued reports in a process pool. Run it from cron, or keep it running
+with --loop. It can also queue a report for every active Sacco first:
+
+    python manage.py generate_board_reports --queue loan --period-start 2025-01-01 --period-end 2025-03-31 --workers 4
+"""
+import time
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from accounts.models import Sacco
+from reports.board_reports import process_queue, request_report
+from reports.models import GeneratedReport
+
+
+class Command(BaseCommand):
+    help = 'Generate queued DOCX board reports in a process pool'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=2, help='Worker processes (default: 2)')
+        parser.add_argument(
+            '--queue',
+            choices=[choice for choice, _ in GeneratedReport.REPORT_CHOICES],
+            help='First queue this report for every active Sacco'
+        )
+        parser.add_argument('--period-start', type=date.fromisoformat, help='Period start (YYYY-MM-DD) for --queue')
+        parser.add_argument('--period-end', type=date.fromisoformat, help='Period end (YYYY-MM-DD) for --queue')
+        parser.add_argument('--loop', action='store_true', help='Keep polling the queue')
+        parser.add_argument('--interval', type=int, default=10, help='Seconds between polls with --loop')
+
+    def handle(self, *args, **options):
+        if options['queue']:
+            if not options['period_start'] or not options['period_end']:
+                raise CommandError('--queue needs --period-start and --period-end')
+            reports = [
+                request_report(options['queue'], sacco, options['period_start'], options['period_end'])
+                for sacco in Sacco.objects.filter(is_active=True).order_by('pk')
+            ]
+            ready = sum(1 for report in reports if report.status == 'ready')
+            self.stdout.write(f'Queued {len(reports) - ready} report(s); {ready} already up to date')
+
+        while True:
+            started = time.monotonic()
+            outcome = process_queue(workers=options['workers'])
+            if outcome:
+                summary = ', '.join(f'{count} {status}' for status, count in sorted(outcome.items()))
+                self.stdout.write(self.style.SUCCESS(f'{summary} in {time.monotonic() - started:.1f}s'))
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
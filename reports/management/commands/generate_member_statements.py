@@ -0,0 +1,85 @@
+"""
+Monthly member statements for every member (see reports/member_statements.py)
+
+Writes one file per member under MEDIA_ROOT/statements/, Sacco by Sacco,
+rendering in a process pool. Re-running the same command resumes Saccos whose
+run was interrupted and skips finished ones:
+
+    python manage.py generate_member_statements --period 2025-03 --format docx --workers 4
+"""
+import calendar
+import os
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from accounts.models import Sacco
+from reports.member_statements import CHUNK_SIZE, generate_statements
+from reports.models import MemberStatementRun
+
+
+def month(value):
+    try:
+        year, month_number = (int(part) for part in value.split('-'))
+        return date(year, month_number, 1)
+    except ValueError:
+        raise ValueError(f'Invalid month: {value}')
+
+
+class Command(BaseCommand):
+    help = 'Generate monthly member statements (savings, loans, repayments, shares) as files'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--period', type=month, help='Month (YYYY-MM); default: last month')
+        parser.add_argument('--sacco', type=int, action='append', help='Only this Sacco id (repeatable)')
+        parser.add_argument(
+            '--format',
+            dest='file_format',
+            choices=[choice for choice, _ in MemberStatementRun.FORMAT_CHOICES],
+            default='html',
+        )
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='Render processes (default: one per CPU)')
+        parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE, help='Members loaded per batch')
+        parser.add_argument('--restart', action='store_true', help='Regenerate Saccos that already finished')
+
+    def handle(self, *args, **options):
+        start_date = options['period'] or (timezone.localdate().replace(day=1) - timedelta(days=1)).replace(day=1)
+        end_date = start_date.replace(day=calendar.monthrange(start_date.year, start_date.month)[1])
+        saccos = Sacco.objects.filter(is_active=True).order_by('pk')
+        if options['sacco']:
+            saccos = Sacco.objects.filter(pk__in=options['sacco']).order_by('pk')
+        if not saccos.exists():
+            raise CommandError('No Saccos to generate statements for')
+
+        self.stdout.write(f"Statements for {start_date:%B %Y} as {options['file_format']}, {options['workers']} worker(s)")
+        totals = {'members': 0, 'failures': 0, 'bytes': 0, 'load_seconds': 0.0, 'total_seconds': 0.0}
+        for sacco in saccos:
+            stats = generate_statements(
+                sacco, start_date, end_date,
+                file_format=options['file_format'],
+                workers=options['workers'],
+                chunk_size=options['chunk_size'],
+                restart=options['restart'],
+                progress=lambda done, total, seconds: self.stdout.write(
+                    f'  {done}/{total} members, {done / seconds if seconds else 0:.0f}/s'
+                ),
+            )
+            for key in totals:
+                totals[key] += stats[key]
+            if not stats['members'] and not stats['failures']:
+                self.stdout.write(f'{sacco.name}: already complete')
+                continue
+            self.stdout.write(self._summary(sacco.name, stats))
+
+        self.stdout.write(self.style.SUCCESS(self._summary('Total', totals)))
+        if totals['failures']:
+            self.stdout.write(self.style.WARNING(f"{totals['failures']} statement(s) failed; see the log"))
+
+    def _summary(self, label, stats):
+        seconds = stats['total_seconds']
+        rate = stats['members'] / seconds if seconds else 0
+        return (
+            f"{label}: {stats['members']} statements, {stats['bytes'] / 1048576:.1f} MB in {seconds:.1f}s "
+            f"({rate:.0f} members/s; {stats['load_seconds']:.1f}s loading data)"
+        )
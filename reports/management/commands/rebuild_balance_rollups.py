@@ -0,0 +1,55 @@
+"""
+Management command to (re)build the monthly savings and loan balance rollups
+
+Without --month or --from, every month from the first movement to the current
+month is rebuilt; run it that way once after deploying the rollups. Later runs
+rebuild from the month of a correction, bulk import or deleted savings
+transaction, none of which reach the rollups live; the nightly run only
+covers last month and this month. Shares rollups are only kept from live
+changes and are left alone.
+"""
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from reports.rollups import REBUILDABLE_KINDS, first_movement_month, month_of, rebuild_rollups
+
+
+def parse_month(value):
+    try:
+        return datetime.strptime(value, '%Y-%m').date()
+    except ValueError:
+        raise CommandError(f'Invalid month "{value}", expected YYYY-MM')
+
+
+class Command(BaseCommand):
+    help = 'Rebuild monthly savings and loan balance rollups from the transactions'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--kind', choices=REBUILDABLE_KINDS, help='Only rebuild this kind (default: all)')
+        parser.add_argument('--month', help='Rebuild only this month, YYYY-MM')
+        parser.add_argument('--from', dest='first', help='First month to rebuild, YYYY-MM')
+        parser.add_argument('--to', dest='last', help='Last month to rebuild, YYYY-MM (default: this month)')
+        parser.add_argument('--sacco', type=int, action='append', help='Only rebuild this Sacco id (repeatable)')
+
+    def handle(self, *args, **options):
+        kinds = [options['kind']] if options['kind'] else list(REBUILDABLE_KINDS)
+        sacco_ids = options['sacco']
+        if options['month']:
+            first = last = parse_month(options['month'])
+        else:
+            first = parse_month(options['first']) if options['first'] else None
+            last = parse_month(options['last']) if options['last'] else month_of(timezone.now())
+
+        for kind in kinds:
+            start = first or first_movement_month(kind, sacco_ids)
+            if start is None:
+                self.stdout.write(f'{kind}: no movements')
+                continue
+            if start > last:
+                raise CommandError(f'--from {start:%Y-%m} is after --to {last:%Y-%m}')
+            rows = rebuild_rollups(kind, start, last, sacco_ids)
+            self.stdout.write(self.style.SUCCESS(
+                f'{kind}: rebuilt {start:%Y-%m} to {last:%Y-%m}, {rows} account-month row(s)'
+            ))
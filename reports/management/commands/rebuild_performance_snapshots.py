@@ -0,0 +1,32 @@
+"""
+Management command to (re)build league table snapshots for closed review periods
+
+Snapshots are normally written when a period closes; run this once after
+deploying the league table, or after changing KRA/KPI definitions that should
+be reflected in past rankings.
+"""
+from django.core.management.base import BaseCommand
+
+from reports.league import snapshot_period
+from reports.models import SaccoReviewPeriod
+
+
+class Command(BaseCommand):
+    help = 'Rebuild Sacco performance snapshots for closed review periods'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sacco', type=int, help='Only rebuild periods of this Sacco id')
+        parser.add_argument('--period-name', help='Only rebuild periods with this name, e.g. "Q1 2025"')
+
+    def handle(self, *args, **options):
+        periods = SaccoReviewPeriod.objects.filter(status='closed').select_related('sacco')
+        if options['sacco']:
+            periods = periods.filter(sacco_id=options['sacco'])
+        if options['period_name']:
+            periods = periods.filter(name=options['period_name'])
+
+        count = 0
+        for period in periods.iterator():
+            snapshot_period(period)
+            count += 1
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {count} performance snapshot(s)'))
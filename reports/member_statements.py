@@ -0,0 +1,324 @@
+"""
+Monthly member statements, generated in bulk
+
+Members of a Sacco are read in id order in chunks. For each chunk everything
+a statement shows is loaded with one ranged query per table (members, savings
+accounts with their opening and closing balances, savings transactions in the
+period, loans with their balance at the period end, repayments in the period),
+never per member. The chunk is then handed to a pool of worker processes that
+render one HTML, CSV or DOCX file per member, while the next chunk is loaded.
+
+Progress is checkpointed on a MemberStatementRun after every chunk, so an
+interrupted run resumes after the last finished chunk. Files are written to
+MEDIA_ROOT/statements/<period>/<sacco>/<member number>.<format>.
+"""
+import csv
+import io
+import logging
+import time
+from concurrent.futures import ProcessPoolExecutor
+from decimal import Decimal
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connections
+from django.db.models import DecimalField, F, OuterRef, Q, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from django.utils.text import get_valid_filename
+
+from .models import MemberStatementRun
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 500
+
+MONEY = DecimalField(max_digits=16, decimal_places=2)
+ZERO = Decimal('0')
+
+
+# Loading
+
+def load_chunk(member_ids, start_date, end_date):
+    """Statement data of the given members for a period: {member id: statement dict}"""
+    from archive.reads import archived_balance_subquery
+    from loans.models import Loan, LoanInstallment, LoanRepayment
+    from members.models import Member
+    from savings.models import SavingsAccount, SavingsTransaction
+    from savings.statements import day_bounds
+
+    low, high = day_bounds(start_date, end_date)
+    statements = {}
+    for member in Member.objects.filter(pk__in=member_ids).values(
+        'id', 'member_number', 'first_name', 'last_name', 'phone', 'shares_balance', 'sacco__name'
+    ):
+        statements[member['id']] = {
+            'member': member,
+            'period_start': start_date,
+            'period_end': end_date,
+            'accounts': [],
+            'loans': [],
+        }
+
+    def running_balance_before(moment):
+        return Subquery(
+            SavingsTransaction.objects.filter(account=OuterRef('pk'), performed_at__lt=moment)
+            .order_by('-performed_at', '-id')
+            .values('running_balance')[:1],
+            output_field=MONEY,
+        )
+
+    def balance_before(moment):
+        # Accounts whose earlier transactions were archived carry the last archived balance
+        return Coalesce(
+            running_balance_before(moment), archived_balance_subquery(moment), Value(ZERO), output_field=MONEY
+        )
+
+    accounts = {}
+    for account in (
+        SavingsAccount.objects.filter(member_id__in=member_ids)
+        .annotate(
+            opening=balance_before(low),
+            closing=balance_before(high),
+        )
+        .order_by('member_id', 'account_number')
+        .values('id', 'member_id', 'account_number', 'product__name', 'opening', 'closing')
+    ):
+        account['transactions'] = []
+        accounts[account['id']] = account
+        statements[account['member_id']]['accounts'].append(account)
+
+    for txn in (
+        SavingsTransaction.objects.filter(account_id__in=accounts, performed_at__gte=low, performed_at__lt=high)
+        .order_by('account_id', 'performed_at', 'id')
+        .values('account_id', 'performed_at', 'txn_type', 'amount', 'running_balance', 'reference')
+    ):
+        accounts[txn['account_id']]['transactions'].append(txn)
+
+    paid = (
+        LoanRepayment.objects.filter(loan=OuterRef('pk'), payment_date__lt=high)
+        .order_by()
+        .values('loan')
+        .annotate(total=Sum('amount'))
+        .values('total')
+    )
+    scheduled = LoanInstallment.objects.filter(loan=OuterRef('pk')).order_by('-number').values('cumulative_due')[:1]
+    loans = {}
+    for loan in (
+        Loan.objects.filter(member_id__in=member_ids, disbursement_date__lt=high)
+        .filter(Q(closed_at__isnull=True) | Q(closed_at__gte=low))
+        .annotate(
+            paid_to_end=Coalesce(Subquery(paid, output_field=MONEY), Value(ZERO), output_field=MONEY),
+            payable=Coalesce(
+                Subquery(scheduled, output_field=MONEY), 'amount_disbursed', 'amount_approved', Value(ZERO),
+                output_field=MONEY,
+            ),
+        )
+        .order_by('member_id', 'disbursement_date')
+        .values(
+            'id', 'member_id', 'loan_ref', 'product__name', 'status', 'disbursement_date',
+            'amount_disbursed', 'amount_approved', 'paid_to_end', 'payable',
+        )
+    ):
+        loan['balance'] = max(loan['payable'] - loan['paid_to_end'], ZERO)
+        loan['repayments'] = []
+        loans[loan['id']] = loan
+        statements[loan['member_id']]['loans'].append(loan)
+
+    for repayment in (
+        LoanRepayment.objects.filter(loan_id__in=loans, payment_date__gte=low, payment_date__lt=high)
+        .order_by('loan_id', 'payment_date', 'id')
+        .values('loan_id', 'payment_date', 'amount', 'payment_method', 'reference_number')
+    ):
+        loans[repayment['loan_id']]['repayments'].append(repayment)
+    return statements
+
+
+# Rendering
+
+def _money(value):
+    return f"{value or 0:,.2f}"
+
+
+def _date(value):
+    return timezone.localtime(value).strftime('%d %b %Y') if value else ''
+
+
+def _html(statement):
+    from django.template.loader import render_to_string
+    return render_to_string('reports/member_statement.html', {'statement': statement}).encode()
+
+
+def _csv(statement):
+    member = statement['member']
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(['Statement', member['sacco__name'], member['member_number'], f"{member['first_name']} {member['last_name']}"])
+    writer.writerow(['Period', statement['period_start'], statement['period_end']])
+    writer.writerow(['Shares balance', member['shares_balance']])
+    writer.writerow([])
+    writer.writerow(['Section', 'Account / loan', 'Date', 'Type', 'Amount', 'Balance', 'Reference'])
+    for account in statement['accounts']:
+        writer.writerow(['Savings', account['account_number'], statement['period_start'], 'Opening balance', '', account['opening'], ''])
+        for txn in account['transactions']:
+            writer.writerow(['Savings', account['account_number'], _date(txn['performed_at']), txn['txn_type'], txn['amount'], txn['running_balance'], txn['reference']])
+        writer.writerow(['Savings', account['account_number'], statement['period_end'], 'Closing balance', '', account['closing'], ''])
+    for loan in statement['loans']:
+        for repayment in loan['repayments']:
+            writer.writerow(['Loan', loan['loan_ref'], _date(repayment['payment_date']), 'Repayment', repayment['amount'], '', repayment['reference_number']])
+        writer.writerow(['Loan', loan['loan_ref'], statement['period_end'], 'Balance', '', loan['balance'], ''])
+    return buffer.getvalue().encode()
+
+
+def _docx(statement):
+    from docx import Document
+
+    member = statement['member']
+    document = Document()
+    document.add_heading(f"{member['sacco__name']}: member statement", level=1)
+    document.add_paragraph(
+        f"{member['first_name']} {member['last_name']} ({member['member_number']}). "
+        f"Period {statement['period_start']:%d %b %Y} to {statement['period_end']:%d %b %Y}. "
+        f"Shares balance UGX {_money(member['shares_balance'])}."
+    )
+
+    def table(headers, rows):
+        grid = document.add_table(rows=1, cols=len(headers))
+        grid.style = 'Light Grid Accent 1'
+        for cell, header in zip(grid.rows[0].cells, headers):
+            cell.text = header
+        for row in rows:
+            for cell, value in zip(grid.add_row().cells, row):
+                cell.text = str(value)
+
+    for account in statement['accounts']:
+        document.add_heading(f"Savings account {account['account_number']} ({account['product__name']})", level=2)
+        table(
+            ['Date', 'Type', 'Amount', 'Balance', 'Reference'],
+            [['', 'Opening balance', '', _money(account['opening']), '']]
+            + [
+                [_date(txn['performed_at']), txn['txn_type'], _money(txn['amount']), _money(txn['running_balance']), txn['reference']]
+                for txn in account['transactions']
+            ]
+            + [['', 'Closing balance', '', _money(account['closing']), '']],
+        )
+    for loan in statement['loans']:
+        document.add_heading(f"Loan {loan['loan_ref'] or ''} ({loan['product__name']})", level=2)
+        table(
+            ['Date', 'Repayment', 'Method', 'Reference'],
+            [
+                [_date(repayment['payment_date']), _money(repayment['amount']), repayment['payment_method'], repayment['reference_number']]
+                for repayment in loan['repayments']
+            ],
+        )
+        document.add_paragraph(f"Balance at period end: UGX {_money(loan['balance'])}")
+    buffer = io.BytesIO()
+    document.save(buffer)
+    return buffer.getvalue()
+
+
+RENDERERS = {'html': _html, 'csv': _csv, 'docx': _docx}
+
+
+def render_statement(statement, file_format):
+    return RENDERERS[file_format](statement)
+
+
+def statement_name(directory, statement, file_format):
+    return f"{directory}/{get_valid_filename(statement['member']['member_number'])}.{file_format}"
+
+
+def write_statement(task):
+    """Pool task: render and store one statement; returns (bytes written, error)"""
+    directory, statement, file_format = task
+    try:
+        content = render_statement(statement, file_format)
+        name = statement_name(directory, statement, file_format)
+        default_storage.delete(name)
+        default_storage.save(name, ContentFile(content))
+        return len(content), None
+    except Exception as exc:
+        logger.exception('Statement of member %s failed', statement['member']['id'])
+        return 0, str(exc)
+
+
+def _init_worker():
+    import django
+    django.setup()
+
+
+# Runs
+
+def generate_statements(sacco, start_date, end_date, file_format='html', workers=1,
+                        chunk_size=CHUNK_SIZE, restart=False, progress=None):
+    """
+    Write the statements of every member of a Sacco for a period, resuming
+    an interrupted run unless restart is set
+
+    Returns stats: members, failures, bytes, load_seconds, total_seconds.
+    """
+    from members.models import Member
+
+    run, _ = MemberStatementRun.objects.get_or_create(
+        sacco=sacco, period_start=start_date, period_end=end_date, file_format=file_format
+    )
+    if restart:
+        run.status, run.last_member_id, run.members_done, run.failures, run.bytes_written = 'running', 0, 0, 0, 0
+        run.completed_at = None
+        run.save()
+    stats = {'members': 0, 'failures': 0, 'bytes': 0, 'load_seconds': 0.0, 'total_seconds': 0.0}
+    if run.status == 'complete':
+        return stats
+
+    started = time.monotonic()
+    members = Member.objects.filter(sacco=sacco).order_by('pk').values_list('pk', flat=True)
+    remaining = members.filter(pk__gt=run.last_member_id).count()
+
+    def chunks():
+        last_id = run.last_member_id
+        while True:
+            ids = list(members.filter(pk__gt=last_id)[:chunk_size])
+            if not ids:
+                return
+            last_id = ids[-1]
+            load_started = time.monotonic()
+            statements = load_chunk(ids, start_date, end_date)
+            stats['load_seconds'] += time.monotonic() - load_started
+            yield last_id, [(run.directory, statements[pk], file_format) for pk in ids if pk in statements]
+
+    def checkpoint(last_id, results):
+        written = [size for size, error in results if not error]
+        failed = len(results) - len(written)
+        MemberStatementRun.objects.filter(pk=run.pk).update(
+            last_member_id=last_id,
+            members_done=F('members_done') + len(written),
+            failures=F('failures') + failed,
+            bytes_written=F('bytes_written') + sum(written),
+            updated_at=timezone.now(),
+        )
+        stats['members'] += len(written)
+        stats['failures'] += failed
+        stats['bytes'] += sum(written)
+        if progress:
+            progress(stats['members'] + stats['failures'], remaining, time.monotonic() - started)
+
+    if workers <= 1:
+        for last_id, tasks in chunks():
+            checkpoint(last_id, [write_statement(task) for task in tasks])
+    else:
+        # Worker processes must open their own database connections
+        connections.close_all()
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+            # Render chunk N in the pool while chunk N + 1 is loaded
+            pending = None
+            for last_id, tasks in chunks():
+                submitted = (last_id, pool.map(write_statement, tasks, chunksize=max(1, len(tasks) // (workers * 4))))
+                if pending:
+                    checkpoint(pending[0], list(pending[1]))
+                pending = submitted
+            if pending:
+                checkpoint(pending[0], list(pending[1]))
+
+    MemberStatementRun.objects.filter(pk=run.pk).update(status='complete', completed_at=timezone.now())
+    stats['total_seconds'] = time.monotonic() - started
+    return stats
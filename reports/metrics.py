@@ -0,0 +1,132 @@
+"""
+KPI actuals derived from operational data
+
+A SaccoKPI with a metric_source gets its actual value computed from members,
+savings transactions and loans instead of being typed in. evaluate_actuals
+works on any number of review periods at once: periods sharing the same dates
+(the usual case, e.g. every Sacco's "Q1 2025") are evaluated together with
+one grouped query per source table covering all their Saccos, and the
+results are upserted in bulk.
+"""
+from collections import defaultdict
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+
+from django.db.models import Count, F, Q, Sum
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import SaccoKPI, SaccoKPIResult
+
+METRIC_SOURCES = dict(SaccoKPI.METRIC_SOURCE_CHOICES)
+
+
+def _day_bounds(start_date, end_date):
+    """Aware datetimes covering start_date to end_date inclusive, as [low, high)"""
+    low = timezone.make_aware(datetime.combine(start_date, time.min))
+    high = timezone.make_aware(datetime.combine(end_date + timedelta(days=1), time.min))
+    return low, high
+
+
+def compute_metrics(sacco_ids, start_date, end_date):
+    """
+    Compute every metric source for the given Saccos over one date range
+
+    Returns {sacco_id: {metric_source: Decimal}}; Saccos without activity get 0.
+    """
+    from members.models import Member
+    from savings.models import SavingsTransaction
+    from loans.models import Loan
+    from .par import par_report
+
+    low, high = _day_bounds(start_date, end_date)
+    metrics = {sacco_id: defaultdict(Decimal) for sacco_id in sacco_ids}
+
+    members = (
+        Member.objects.filter(sacco_id__in=sacco_ids)
+        .order_by()
+        .values('sacco_id')
+        .annotate(
+            active=Count('id', filter=Q(status='Active', date_joined__lte=end_date)),
+            new=Count('id', filter=Q(date_joined__gte=start_date, date_joined__lte=end_date)),
+        )
+    )
+    for row in members:
+        metrics[row['sacco_id']]['members_active'] = Decimal(row['active'])
+        metrics[row['sacco_id']]['members_new'] = Decimal(row['new'])
+
+    savings = (
+        SavingsTransaction.objects.filter(
+            sacco_id__in=sacco_ids, performed_at__gte=low, performed_at__lt=high
+        )
+        .order_by()
+        .values(metric_sacco=F('sacco_id'))
+        .annotate(
+            deposits=Sum('amount', filter=Q(txn_type='Deposit')),
+            withdrawals=Sum('amount', filter=Q(txn_type='Withdrawal')),
+        )
+    )
+    for row in savings:
+        deposits = row['deposits'] or Decimal('0')
+        metrics[row['metric_sacco']]['savings_deposits'] = deposits
+        metrics[row['metric_sacco']]['savings_net'] = deposits - (row['withdrawals'] or Decimal('0'))
+
+    disbursed_in_period = Q(disbursement_date__gte=low, disbursement_date__lt=high)
+    loans = (
+        Loan.objects.filter(sacco_id__in=sacco_ids)
+        .order_by()
+        .values(metric_sacco=F('sacco_id'))
+        .annotate(
+            disbursed_amount=Sum(Coalesce('amount_disbursed', 'amount_approved'), filter=disbursed_in_period),
+            disbursed_count=Count('id', filter=disbursed_in_period),
+        )
+    )
+    for row in loans:
+        sacco_metrics = metrics[row['metric_sacco']]
+        sacco_metrics['loans_disbursed_amount'] = row['disbursed_amount'] or Decimal('0')
+        sacco_metrics['loans_disbursed_count'] = Decimal(row['disbursed_count'])
+
+    for row in par_report(sacco_ids, end_date, 'sacco')['rows']:
+        metrics[row['key']]['portfolio_at_risk'] = row['par30']
+    return metrics
+
+
+def evaluate_actuals(periods, dry_run=False, batch_size=1000):
+    """
+    Compute and store the actual values of every metric-bound KPI for the
+    given review periods
+
+    Returns the number of results written (or that would be written).
+    """
+    from .scoring import upsert_results
+
+    periods = list(periods)
+    sacco_ids = {period.sacco_id for period in periods}
+    kpis_by_sacco = defaultdict(list)
+    for kpi in SaccoKPI.objects.filter(kra__sacco_id__in=sacco_ids, is_active=True).exclude(metric_source='').values(
+        'id', 'metric_source', 'kra__sacco_id'
+    ):
+        kpis_by_sacco[kpi['kra__sacco_id']].append(kpi)
+
+    # Periods with identical dates are evaluated in one pass over the source tables
+    periods_by_range = defaultdict(list)
+    for period in periods:
+        if kpis_by_sacco.get(period.sacco_id):
+            periods_by_range[(period.start_date, period.end_date)].append(period)
+
+    results = []
+    for (start_date, end_date), range_periods in periods_by_range.items():
+        metrics = compute_metrics({period.sacco_id for period in range_periods}, start_date, end_date)
+        for period in range_periods:
+            for kpi in kpis_by_sacco[period.sacco_id]:
+                value = metrics[period.sacco_id][kpi['metric_source']]
+                results.append(SaccoKPIResult(
+                    kpi_id=kpi['id'],
+                    period=period,
+                    actual_value=value,
+                    notes=f"Computed from {METRIC_SOURCES[kpi['metric_source']].lower()}",
+                ))
+
+    if dry_run:
+        return len(results)
+    return upsert_results(results, ['actual_value', 'notes'], batch_size=batch_size)
@@ -0,0 +1,56 @@
+# Generated by Django 4.2.7 on 2026-10-18 23:37
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0002_district_sacco_district'),
+        ('reports', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SaccoPerformanceSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('period_name', models.CharField(db_index=True, max_length=50)),
+                ('period_start', models.DateField()),
+                ('overall_score', models.FloatField(default=0)),
+                ('computed_at', models.DateTimeField(auto_now=True)),
+                ('period', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='snapshot', to='reports.saccoreviewperiod')),
+                ('sacco', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='performance_snapshots', to='accounts.sacco')),
+            ],
+            options={
+                'ordering': ['-period_start', '-overall_score'],
+            },
+        ),
+        migrations.CreateModel(
+            name='SaccoKRASnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kra_title', models.CharField(max_length=200)),
+                ('score', models.FloatField(default=0)),
+                ('achievement', models.FloatField(default=0)),
+                ('kra', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='reports.saccokra')),
+                ('snapshot', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='kra_scores', to='reports.saccoperformancesnapshot')),
+            ],
+            options={
+                'ordering': ['kra_title'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='saccoperformancesnapshot',
+            index=models.Index(fields=['period_name', 'overall_score'], name='reports_sac_period__63150c_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='saccoperformancesnapshot',
+            index=models.Index(fields=['sacco', 'period_start'], name='reports_sac_sacco_i_046cbd_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='saccokrasnapshot',
+            index=models.Index(fields=['kra_title', 'score'], name='reports_sac_kra_tit_171013_idx'),
+        ),
+    ]
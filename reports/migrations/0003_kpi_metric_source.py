@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-18 23:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reports', '0002_performance_snapshots'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='saccokpi',
+            name='metric_source',
+            field=models.CharField(blank=True, choices=[('', 'Manual entry'), ('members_active', 'Active members at period end'), ('members_new', 'New members joined in period'), ('savings_deposits', 'Savings deposits in period'), ('savings_net', 'Net savings mobilised in period'), ('loans_disbursed_amount', 'Loan amount disbursed in period'), ('loans_disbursed_count', 'Loans disbursed in period'), ('portfolio_at_risk', 'Portfolio at risk at period end (%)')], default='', help_text='Compute the actual value from operational data instead of entering it (see reports/metrics.py)', max_length=40),
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 4.2.7 on 2026-10-18 23:58
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reports', '0003_kpi_metric_source'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='saccokpiresult',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+    ]
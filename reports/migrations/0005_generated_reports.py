@@ -0,0 +1,40 @@
+# Generated by Django 4.2.7 on 2026-10-18 23:52
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0002_district_sacco_district'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('reports', '0004_kpiresult_updated_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GeneratedReport',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('report_type', models.CharField(choices=[('loan', 'Loan portfolio'), ('member', 'Membership'), ('funding', 'Funding and expenses')], max_length=20)),
+                ('period_start', models.DateField()),
+                ('period_end', models.DateField()),
+                ('data_version', models.CharField(max_length=64)),
+                ('status', models.CharField(choices=[('queued', 'Queued'), ('running', 'Generating'), ('ready', 'Ready'), ('failed', 'Failed')], default='queued', max_length=10)),
+                ('file', models.FileField(blank=True, upload_to='reports/generated/%Y/%m/')),
+                ('error', models.TextField(blank=True)),
+                ('requested_at', models.DateTimeField(auto_now_add=True)),
+                ('completed_at', models.DateTimeField(blank=True, null=True)),
+                ('download_count', models.PositiveIntegerField(default=0)),
+                ('requested_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL)),
+                ('sacco', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='generated_reports', to='accounts.sacco')),
+            ],
+            options={
+                'ordering': ['-requested_at'],
+                'indexes': [models.Index(fields=['status', 'requested_at'], name='reports_gen_status_411b76_idx')],
+                'unique_together': {('report_type', 'sacco', 'period_start', 'period_end', 'data_version')},
+            },
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 4.2.7 on 2026-10-19 00:08
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0002_district_sacco_district'),
+        ('reports', '0005_generated_reports'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MemberStatementRun',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('period_start', models.DateField()),
+                ('period_end', models.DateField()),
+                ('file_format', models.CharField(choices=[('html', 'HTML'), ('csv', 'CSV'), ('docx', 'Word (DOCX)')], max_length=10)),
+                ('status', models.CharField(choices=[('running', 'Running'), ('complete', 'Complete')], default='running', max_length=10)),
+                ('last_member_id', models.BigIntegerField(default=0)),
+                ('members_done', models.PositiveIntegerField(default=0)),
+                ('failures', models.PositiveIntegerField(default=0)),
+                ('bytes_written', models.PositiveBigIntegerField(default=0)),
+                ('started_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('completed_at', models.DateTimeField(blank=True, null=True)),
+                ('sacco', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='statement_runs', to='accounts.sacco')),
+            ],
+            options={
+                'unique_together': {('sacco', 'period_start', 'period_end', 'file_format')},
+            },
+        ),
+    ]
@@ -0,0 +1,57 @@
+# Generated by Django 4.2.7 on 2026-10-19 00:47
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0002_district_sacco_district'),
+        ('reports', '0006_member_statement_runs'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SaccoMonthlyBalance',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('savings', 'Savings'), ('loan', 'Loans'), ('shares', 'Shares')], max_length=10)),
+                ('month', models.DateField()),
+                ('opening', models.DecimalField(decimal_places=2, default=0, max_digits=16)),
+                ('credits', models.DecimalField(decimal_places=2, default=0, max_digits=16)),
+                ('debits', models.DecimalField(decimal_places=2, default=0, max_digits=16)),
+                ('closing', models.DecimalField(decimal_places=2, default=0, max_digits=16)),
+                ('credit_count', models.IntegerField(default=0)),
+                ('debit_count', models.IntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('sacco', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='balance_rollups', to='accounts.sacco')),
+            ],
+            options={
+                'ordering': ['sacco', 'kind', 'month'],
+                'unique_together': {('sacco', 'kind', 'month')},
+            },
+        ),
+        migrations.CreateModel(
+            name='AccountMonthlyBalance',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('savings', 'Savings'), ('loan', 'Loans'), ('shares', 'Shares')], max_length=10)),
+                ('month', models.DateField()),
+                ('opening', models.DecimalField(decimal_places=2, default=0, max_digits=16)),
+                ('credits', models.DecimalField(decimal_places=2, default=0, max_digits=16)),
+                ('debits', models.DecimalField(decimal_places=2, default=0, max_digits=16)),
+                ('closing', models.DecimalField(decimal_places=2, default=0, max_digits=16)),
+                ('credit_count', models.IntegerField(default=0)),
+                ('debit_count', models.IntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('account_id', models.BigIntegerField()),
+                ('sacco', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='account_balance_rollups', to='accounts.sacco')),
+            ],
+            options={
+                'ordering': ['kind', 'account_id', 'month'],
+                'indexes': [models.Index(fields=['sacco', 'kind', 'month'], name='reports_acct_roll_sacco_idx')],
+                'unique_together': {('kind', 'account_id', 'month')},
+            },
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 4.2.7 on 2026-10-19 01:42
+
+from django.db import migrations, models
+from django.db.models import F
+
+
+def stamp_running_reports(apps, schema_editor):
+    # Reports claimed before this field existed count as started when requested
+    GeneratedReport = apps.get_model('reports', 'GeneratedReport')
+    GeneratedReport.objects.filter(status='running').update(started_at=F('requested_at'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reports', '0007_monthly_balance_rollups'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='generatedreport',
+            name='started_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.RunPython(stamp_running_reports, migrations.RunPython.noop),
+    ]
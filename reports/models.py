@@ -1,5 +1,6 @@
 from django.db import models
 from django.utils import timezone
+from django.utils.text import slugify
 from accounts.models import Sacco
 
 
@@ -52,6 +53,17 @@ class SaccoKPI(models.Model):
         ('ugx', 'UGX'),
     ]
 
+    METRIC_SOURCE_CHOICES = [
+        ('', 'Manual entry'),
+        ('members_active', 'Active members at period end'),
+        ('members_new', 'New members joined in period'),
+        ('savings_deposits', 'Savings deposits in period'),
+        ('savings_net', 'Net savings mobilised in period'),
+        ('loans_disbursed_amount', 'Loan amount disbursed in period'),
+        ('loans_disbursed_count', 'Loans disbursed in period'),
+        ('portfolio_at_risk', 'Portfolio at risk at period end (%)'),
+    ]
+
     kra = models.ForeignKey(SaccoKRA, on_delete=models.CASCADE, related_name='kpis')
     name = models.CharField(max_length=200)
     description = models.TextField(blank=True)
@@ -59,6 +71,10 @@ class SaccoKPI(models.Model):
     target_value = models.DecimalField(max_digits=16, decimal_places=2)
     weight = models.DecimalField(max_digits=5, decimal_places=2, help_text='Weight 0-100')
     direction = models.CharField(max_length=20, choices=DIRECTION_CHOICES, default='higher_is_better')
+    metric_source = models.CharField(
+        max_length=40, choices=METRIC_SOURCE_CHOICES, blank=True, default='',
+        help_text='Compute the actual value from operational data instead of entering it (see reports/metrics.py)'
+    )
     is_active = models.BooleanField(default=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
@@ -76,6 +92,8 @@ class SaccoKPIResult(models.Model):
     notes = models.TextField(blank=True)
     entered_by = models.ForeignKey('accounts.User', on_delete=models.SET_NULL, null=True)
     entered_at = models.DateTimeField(auto_now_add=True)
+    # Part of the concurrency token of batch entry (see reports.scoring.results_version)
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         unique_together = ('kpi', 'period')
@@ -99,4 +117,187 @@ class SaccoKPIResult(models.Model):
         # KPI score = achievement% * (kpi.weight/100)
         return self.achievement_percent * float(self.kpi.weight) / 100.0
 
-# Create your models here.
+
+class SaccoPerformanceSnapshot(models.Model):
+    """
+    Scores of a Sacco for a closed review period, frozen when the period closes
+    so the cross-Sacco league table never has to score results on the fly
+    """
+    sacco = models.ForeignKey(Sacco, on_delete=models.CASCADE, related_name='performance_snapshots')
+    period = models.OneToOneField(SaccoReviewPeriod, on_delete=models.CASCADE, related_name='snapshot')
+    # Copied from the period: Saccos are compared on periods with the same name
+    period_name = models.CharField(max_length=50, db_index=True)
+    period_start = models.DateField()
+    overall_score = models.FloatField(default=0)
+    computed_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['-period_start', '-overall_score']
+        indexes = [
+            models.Index(fields=['period_name', 'overall_score']),
+            models.Index(fields=['sacco', 'period_start']),
+        ]
+
+    def __str__(self):
+        return f"{self.sacco.name} - {self.period_name}: {self.overall_score:.2f}"
+
+
+class SaccoKRASnapshot(models.Model):
+    """Per-KRA part of a SaccoPerformanceSnapshot; KRAs are compared across Saccos by title"""
+    snapshot = models.ForeignKey(SaccoPerformanceSnapshot, on_delete=models.CASCADE, related_name='kra_scores')
+    kra = models.ForeignKey(SaccoKRA, on_delete=models.SET_NULL, null=True, blank=True)
+    kra_title = models.CharField(max_length=200)
+    score = models.FloatField(default=0)
+    achievement = models.FloatField(default=0)
+
+    class Meta:
+        ordering = ['kra_title']
+        indexes = [
+            models.Index(fields=['kra_title', 'score']),
+        ]
+
+    def __str__(self):
+        return f"{self.kra_title}: {self.score:.2f}"
+
+
+class GeneratedReport(models.Model):
+    """
+    A downloadable DOCX board report, built by the background worker (see
+    reports/board_reports.py) and reused while the Sacco's data version for
+    that report is unchanged
+    """
+    REPORT_CHOICES = [
+        ('loan', 'Loan portfolio'),
+        ('member', 'Membership'),
+        ('funding', 'Funding and expenses'),
+    ]
+    STATUS_CHOICES = [
+        ('queued', 'Queued'),
+        ('running', 'Generating'),
+        ('ready', 'Ready'),
+        ('failed', 'Failed'),
+    ]
+
+    report_type = models.CharField(max_length=20, choices=REPORT_CHOICES)
+    sacco = models.ForeignKey(Sacco, on_delete=models.CASCADE, related_name='generated_reports')
+    period_start = models.DateField()
+    period_end = models.DateField()
+    data_version = models.CharField(max_length=64)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='queued')
+    file = models.FileField(upload_to='reports/generated/%Y/%m/', blank=True)
+    error = models.TextField(blank=True)
+    requested_by = models.ForeignKey('accounts.User', on_delete=models.SET_NULL, null=True, blank=True)
+    requested_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    completed_at = models.DateTimeField(null=True, blank=True)
+    download_count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        ordering = ['-requested_at']
+        unique_together = ('report_type', 'sacco', 'period_start', 'period_end', 'data_version')
+        indexes = [
+            models.Index(fields=['status', 'requested_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.get_report_type_display()} - {self.sacco.name} ({self.period_start} to {self.period_end})"
+
+    @property
+    def filename(self):
+        return f"{self.report_type}-report-{slugify(self.sacco.name)}-{self.period_start}-{self.period_end}.docx"
+
+
+class MemberStatementRun(models.Model):
+    """
+    Progress of the monthly member statements of one Sacco, period and file
+    format (see reports/member_statements.py). Members are processed in id
+    order and last_member_id is saved after every chunk, so an interrupted
+    run resumes where it stopped.
+    """
+    FORMAT_CHOICES = [
+        ('html', 'HTML'),
+        ('csv', 'CSV'),
+        ('docx', 'Word (DOCX)'),
+    ]
+    STATUS_CHOICES = [
+        ('running', 'Running'),
+        ('complete', 'Complete'),
+    ]
+
+    sacco = models.ForeignKey(Sacco, on_delete=models.CASCADE, related_name='statement_runs')
+    period_start = models.DateField()
+    period_end = models.DateField()
+    file_format = models.CharField(max_length=10, choices=FORMAT_CHOICES)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='running')
+    last_member_id = models.BigIntegerField(default=0)
+    members_done = models.PositiveIntegerField(default=0)
+    failures = models.PositiveIntegerField(default=0)
+    bytes_written = models.PositiveBigIntegerField(default=0)
+    started_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    completed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        unique_together = ('sacco', 'period_start', 'period_end', 'file_format')
+
+    def __str__(self):
+        return f"{self.sacco.name} statements {self.period_start} to {self.period_end} ({self.file_format})"
+
+    @property
+    def directory(self):
+        return f"statements/{self.period_start}_{self.period_end}/{slugify(self.sacco.name)}"
+
+
+class BalanceRollup(models.Model):
+    """Columns shared by the monthly balance rollups (see reports/rollups.py)"""
+    KIND_CHOICES = [
+        ('savings', 'Savings'),
+        ('loan', 'Loans'),
+        ('shares', 'Shares'),
+    ]
+
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    # First day of the month
+    month = models.DateField()
+    opening = models.DecimalField(max_digits=16, decimal_places=2, default=0)
+    credits = models.DecimalField(max_digits=16, decimal_places=2, default=0)
+    debits = models.DecimalField(max_digits=16, decimal_places=2, default=0)
+    closing = models.DecimalField(max_digits=16, decimal_places=2, default=0)
+    credit_count = models.IntegerField(default=0)
+    debit_count = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        abstract = True
+
+
+class AccountMonthlyBalance(BalanceRollup):
+    """
+    One account's movements in a month. account_id is a SavingsAccount id for
+    savings, a Loan id for loans and a Member id for shares. Months without
+    movements have no row: the balance carries over from the previous one.
+    """
+    sacco = models.ForeignKey(Sacco, on_delete=models.CASCADE, related_name='account_balance_rollups')
+    account_id = models.BigIntegerField()
+
+    class Meta:
+        ordering = ['kind', 'account_id', 'month']
+        unique_together = ('kind', 'account_id', 'month')
+        indexes = [
+            models.Index(fields=['sacco', 'kind', 'month'], name='reports_acct_roll_sacco_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.get_kind_display()} account {self.account_id} - {self.month:%Y-%m}"
+
+
+class SaccoMonthlyBalance(BalanceRollup):
+    """The movements of all of a Sacco's accounts of one kind in a month"""
+    sacco = models.ForeignKey(Sacco, on_delete=models.CASCADE, related_name='balance_rollups')
+
+    class Meta:
+        ordering = ['sacco', 'kind', 'month']
+        unique_together = ('sacco', 'kind', 'month')
+
+    def __str__(self):
+        return f"{self.sacco.name} {self.get_kind_display()} - {self.month:%Y-%m}"
@@ -0,0 +1,205 @@
+"""
+Portfolio at risk (PAR) aging
+
+A loan's days past due is the age of its oldest unpaid installment: the first
+LoanInstallment whose cumulative_due exceeds what was repaid up to the as-of
+date. Both are correlated subqueries on indexed (loan, date) columns, and each
+loan is put in an aging bucket with a CASE expression, so the database returns
+one row per Sacco, group (Sacco, product or loan officer) and bucket instead of
+one row per loan. Loans without an installment schedule are left out.
+
+Results are cached per Sacco, as-of date and grouping. Each Sacco has a
+version counter that loan and repayment changes bump (reports/signals.py).
+Installments are only written in bulk: disbursement saves the loan right after
+building its schedule, and other bulk writers call bump_par_version.
+"""
+import time
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.db.models import (
+    Case, Count, DecimalField, F, IntegerField, OuterRef, Q, Subquery, Sum, Value, When,
+)
+from django.db.models.functions import Coalesce, Greatest
+from django.utils import timezone
+
+from accounts.db_routing import primary_reads
+
+OPEN_LOAN_STATUSES = ('active', 'disbursed', 'defaulted')
+
+# (key, label, minimum days past due), in aging order
+BUCKETS = (
+    ('current', 'Current', 0),
+    ('par1', '1-29 days', 1),
+    ('par30', '30-59 days', 30),
+    ('par60', '60-89 days', 60),
+    ('par90', '90+ days', 90),
+)
+
+# Grouping: (id path, label path) on Loan. The loan officer is the user who captured the loan.
+DIMENSIONS = {
+    'sacco': ('sacco_id', 'member__sacco__name'),
+    'product': ('product_id', 'product__name'),
+    'officer': ('created_by_id', 'created_by__username'),
+}
+
+CACHE_TIMEOUT = 60 * 60 * 24
+VERSION_KEY = 'par:version:{}'
+ENTRY_KEY = 'par:{}:{}:{}:{}'
+
+MONEY = DecimalField(max_digits=16, decimal_places=2)
+
+
+def get_par_version(sacco_id):
+    key = VERSION_KEY.format(sacco_id)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, time.time_ns(), None)
+        version = cache.get(key)
+    return version
+
+
+def bump_par_version(sacco_id):
+    """Mark every cached PAR report of a Sacco stale"""
+    key = VERSION_KEY.format(sacco_id)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, time.time_ns(), None)
+
+
+def aged_loans(sacco_ids, as_of):
+    """
+    Loans outstanding at the end of as_of, annotated with paid, balance
+    (scheduled total less paid), oldest_due and bucket (an index into BUCKETS)
+    """
+    from loans.models import Loan, LoanInstallment, LoanRepayment
+
+    end = timezone.make_aware(datetime.combine(as_of + timedelta(days=1), datetime.min.time()))
+    paid = (
+        LoanRepayment.objects.filter(loan=OuterRef('pk'), payment_date__lt=end)
+        .order_by()
+        .values('loan')
+        .annotate(total=Sum('amount'))
+        .values('total')
+    )
+    scheduled = LoanInstallment.objects.filter(loan=OuterRef('pk')).order_by('-number').values('cumulative_due')[:1]
+    oldest_due = (
+        LoanInstallment.objects.filter(loan=OuterRef('pk'), due_date__lte=as_of, cumulative_due__gt=OuterRef('paid'))
+        .order_by('due_date')
+        .values('due_date')[:1]
+    )
+    # Oldest first, so the first matching threshold wins
+    bucket = Case(
+        *[
+            When(oldest_due__lte=as_of - timedelta(days=days), then=Value(index))
+            for index, (_, _, days) in reversed(list(enumerate(BUCKETS))) if days
+        ],
+        default=Value(0),
+        output_field=IntegerField(),
+    )
+    return (
+        Loan.objects.filter(sacco_id__in=sacco_ids, disbursement_date__lt=end)
+        .filter(Q(status__in=OPEN_LOAN_STATUSES) | Q(closed_at__gte=end))
+        .annotate(
+            paid=Coalesce(Subquery(paid, output_field=MONEY), Value(Decimal('0')), output_field=MONEY),
+            scheduled=Subquery(scheduled, output_field=MONEY),
+        )
+        .filter(scheduled__isnull=False)
+        .annotate(
+            balance=Greatest(F('scheduled') - F('paid'), Value(Decimal('0')), output_field=MONEY),
+            oldest_due=Subquery(oldest_due),
+        )
+        .annotate(bucket=bucket)
+    )
+
+
+def _empty_row(key, label):
+    return {
+        'key': key,
+        'label': label,
+        'loans': 0,
+        'balance': Decimal('0'),
+        'buckets': {name: {'loans': 0, 'balance': Decimal('0')} for name, _, _ in BUCKETS},
+    }
+
+
+def _compute(sacco_ids, as_of, dimension):
+    """{sacco_id: [row, ...]} for the given Saccos in one query"""
+    id_path, label_path = DIMENSIONS[dimension]
+    results = {sacco_id: {} for sacco_id in sacco_ids}
+    grouped = (
+        aged_loans(sacco_ids, as_of)
+        .order_by()
+        .values('bucket', par_sacco=F('sacco_id'), group_key=F(id_path), group_label=F(label_path))
+        .annotate(loans=Count('id'), balance=Sum('balance'))
+    )
+    for row in grouped:
+        groups = results[row['par_sacco']]
+        group = groups.get(row['group_key'])
+        if group is None:
+            group = groups[row['group_key']] = _empty_row(row['group_key'], row['group_label'] or 'Unassigned')
+        bucket = group['buckets'][BUCKETS[row['bucket']][0]]
+        bucket['loans'] += row['loans']
+        bucket['balance'] += row['balance'] or Decimal('0')
+        group['loans'] += row['loans']
+        group['balance'] += row['balance'] or Decimal('0')
+    return {sacco_id: list(groups.values()) for sacco_id, groups in results.items()}
+
+
+def _add_ratios(row):
+    """PAR1/30/60/90: share of the balance at least that many days past due, in %"""
+    at_risk = Decimal('0')
+    for name, _, days in reversed(BUCKETS):
+        if not days:
+            continue
+        at_risk += row['buckets'][name]['balance']
+        row[name] = (at_risk / row['balance'] * 100).quantize(Decimal('0.01')) if row['balance'] else Decimal('0')
+    # Buckets in aging order, for templates
+    row['aging'] = [dict(row['buckets'][name], key=name, label=label) for name, label, _ in BUCKETS]
+    return row
+
+
+def par_report(sacco_ids, as_of=None, dimension='sacco'):
+    """
+    PAR aging for the given Saccos as of a date (default today), grouped by
+    dimension ('sacco', 'product' or 'officer')
+
+    Returns {'as_of', 'dimension', 'rows', 'total'}; each row has key, label,
+    loans, balance, buckets ({bucket key: {'loans', 'balance'}}), aging (the
+    same buckets as an ordered list) and the par1/par30/par60/par90 ratios.
+    """
+    if dimension not in DIMENSIONS:
+        raise ValueError(f'Unknown PAR dimension: {dimension}')
+    as_of = as_of or timezone.localdate()
+    sacco_ids = sorted(set(sacco_ids))
+
+    versions = cache.get_many([VERSION_KEY.format(sacco_id) for sacco_id in sacco_ids])
+    keys = {}
+    for sacco_id in sacco_ids:
+        version = versions.get(VERSION_KEY.format(sacco_id)) or get_par_version(sacco_id)
+        keys[sacco_id] = ENTRY_KEY.format(version, sacco_id, as_of.isoformat(), dimension)
+    cached = cache.get_many(list(keys.values()))
+    per_sacco = {sacco_id: cached[key] for sacco_id, key in keys.items() if key in cached}
+    missing = [sacco_id for sacco_id in sacco_ids if sacco_id not in per_sacco]
+    if missing:
+        with primary_reads():
+            computed = _compute(missing, as_of, dimension)
+        cache.set_many({keys[sacco_id]: rows for sacco_id, rows in computed.items()}, CACHE_TIMEOUT)
+        per_sacco.update(computed)
+
+    merged = {}
+    total = _empty_row(None, 'Total')
+    for rows in per_sacco.values():
+        for row in rows:
+            target = merged.setdefault(row['key'], _empty_row(row['key'], row['label']))
+            for summary in (target, total):
+                summary['loans'] += row['loans']
+                summary['balance'] += row['balance']
+                for name, bucket in row['buckets'].items():
+                    summary['buckets'][name]['loans'] += bucket['loans']
+                    summary['buckets'][name]['balance'] += bucket['balance']
+
+    rows = sorted((_add_ratios(row) for row in merged.values()), key=lambda row: row['balance'], reverse=True)
+    return {'as_of': as_of, 'dimension': dimension, 'rows': rows, 'total': _add_ratios(total)}
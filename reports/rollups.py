@@ -0,0 +1,443 @@
+"""
+Monthly balance rollups for savings, loans and shares
+
+Every account has one AccountMonthlyBalance row per month in which it moved
+(opening, credits, debits, closing and counts), and every Sacco one
+SaccoMonthlyBalance row per kind and month summing its accounts. A month
+without movements has no row; its balance is the closing of the previous one.
+
+Rows are maintained incrementally by post_movement as transactions post
+(reports/signals.py): the month's row is adjusted with F() expressions and,
+for backdated movements, later months of the same account and Sacco are
+shifted by the net change. rebuild_rollups recomputes whole months from the
+raw tables with one grouped query per table and month; it is also how rows
+are first built, and how bulk imports (which send no signals) are caught up.
+
+What a movement is, per kind:
+  savings  Deposits, interest and transfers credit; withdrawals and fees debit.
+  loan     The amount payable (schedule total, else the disbursed or approved
+           amount) credits on disbursement; repayments debit.
+  shares   Changes of Member.shares_balance. There is no share transaction
+           history, so shares rollups cannot be rebuilt.
+
+Rows moved to cold storage (archive app) still count: rebuilds add their
+movements from ArchivedRecord, so archiving never changes a rollup.
+"""
+from collections import defaultdict
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, DecimalField, F, OuterRef, Q, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import AccountMonthlyBalance, SaccoMonthlyBalance
+
+MONEY = DecimalField(max_digits=16, decimal_places=2)
+ZERO = Decimal('0')
+
+SAVINGS_CREDIT_TYPES = ('Deposit', 'Interest', 'Transfer')
+
+REBUILDABLE_KINDS = ('savings', 'loan')
+
+
+# Months
+
+def month_of(moment):
+    """First day of the (local) month of a date or datetime"""
+    if hasattr(moment, 'tzinfo'):
+        moment = timezone.localtime(moment).date() if timezone.is_aware(moment) else moment.date()
+    return moment.replace(day=1)
+
+
+def add_months(month, count):
+    index = month.year * 12 + month.month - 1 + count
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def month_range(first, last):
+    month = first
+    while month <= last:
+        yield month
+        month = add_months(month, 1)
+
+
+def month_bounds(first, last=None):
+    """Aware datetimes covering the months first to last inclusive, as [low, high)"""
+    from savings.statements import day_bounds
+    return day_bounds(first, add_months(last or first, 1) - timedelta(days=1))
+
+
+# Raw movements
+
+class Totals:
+    __slots__ = ('sacco_id', 'credits', 'debits', 'credit_count', 'debit_count')
+
+    def __init__(self, sacco_id):
+        self.sacco_id = sacco_id
+        self.credits = self.debits = ZERO
+        self.credit_count = self.debit_count = 0
+
+    @property
+    def net(self):
+        return self.credits - self.debits
+
+
+def _savings_movements(low, high, by, sacco_ids, account_ids):
+    from savings.models import SavingsTransaction
+
+    sacco_path = 'sacco_id'
+    queryset = SavingsTransaction.objects.filter(performed_at__lt=high)
+    if low is not None:
+        queryset = queryset.filter(performed_at__gte=low)
+    if sacco_ids is not None:
+        queryset = queryset.filter(sacco_id__in=sacco_ids)
+    if account_ids is not None:
+        queryset = queryset.filter(account_id__in=account_ids)
+    credit = Q(txn_type__in=SAVINGS_CREDIT_TYPES)
+    rows = (
+        queryset.order_by()
+        .values(rollup_key=F(sacco_path if by == 'sacco' else 'account_id'), rollup_sacco=F(sacco_path))
+        .annotate(
+            credits=Sum('amount', filter=credit),
+            debits=Sum('amount', filter=~credit),
+            credit_count=Count('id', filter=credit),
+            debit_count=Count('id', filter=~credit),
+        )
+    )
+    movements = {}
+    for row in rows:
+        totals = movements[row['rollup_key']] = Totals(row['rollup_sacco'])
+        totals.credits = row['credits'] or totals.credits
+        totals.debits = row['debits'] or totals.debits
+        totals.credit_count, totals.debit_count = row['credit_count'], row['debit_count']
+    return movements
+
+
+def loan_payable():
+    """What a disbursed loan adds to the loan book: its schedule total, else the disbursed or approved amount"""
+    from loans.models import LoanInstallment
+
+    scheduled = LoanInstallment.objects.filter(loan=OuterRef('pk')).order_by('-number').values('cumulative_due')[:1]
+    return Coalesce(
+        Subquery(scheduled, output_field=MONEY), 'amount_disbursed', 'amount_approved', Value(0),
+        output_field=MONEY,
+    )
+
+
+def _loan_movements(low, high, by, sacco_ids, account_ids):
+    from loans.models import Loan, LoanRepayment
+
+    loans = Loan.objects.filter(disbursement_date__lt=high)
+    repayments = LoanRepayment.objects.filter(payment_date__lt=high)
+    if low is not None:
+        loans = loans.filter(disbursement_date__gte=low)
+        repayments = repayments.filter(payment_date__gte=low)
+    if sacco_ids is not None:
+        loans = loans.filter(sacco_id__in=sacco_ids)
+        repayments = repayments.filter(sacco_id__in=sacco_ids)
+    if account_ids is not None:
+        loans = loans.filter(pk__in=account_ids)
+        repayments = repayments.filter(loan_id__in=account_ids)
+
+    movements = {}
+    disbursed = (
+        loans.order_by()
+        .values(rollup_key=F('sacco_id' if by == 'sacco' else 'id'), rollup_sacco=F('sacco_id'))
+        .annotate(credits=Sum(loan_payable()), credit_count=Count('id'))
+    )
+    for row in disbursed:
+        totals = movements[row['rollup_key']] = Totals(row['rollup_sacco'])
+        totals.credits, totals.credit_count = row['credits'] or totals.credits, row['credit_count']
+    repaid = (
+        repayments.order_by()
+        .values(rollup_key=F('sacco_id' if by == 'sacco' else 'loan_id'), rollup_sacco=F('sacco_id'))
+        .annotate(debits=Sum('amount'), debit_count=Count('id'))
+    )
+    for row in repaid:
+        totals = movements.get(row['rollup_key']) or movements.setdefault(row['rollup_key'], Totals(row['rollup_sacco']))
+        totals.debits, totals.debit_count = row['debits'] or totals.debits, row['debit_count']
+    return movements
+
+
+SOURCES = {
+    'savings': _savings_movements,
+    'loan': _loan_movements,
+}
+
+# (archived model, credit filter, debit filter) of the archived rows of each kind
+ARCHIVED_SOURCES = {
+    'savings': (
+        ('savings.savingstransaction', Q(category__in=SAVINGS_CREDIT_TYPES), ~Q(category__in=SAVINGS_CREDIT_TYPES)),
+    ),
+    'loan': (
+        # Archived loans keep the amount payable they credited, None if never disbursed
+        ('loans.loan', Q(amount__isnull=False), None),
+        ('loans.loanrepayment', None, Q(amount__isnull=False)),
+    ),
+}
+
+
+def _add_archived_movements(movements, kind, low, high, by, sacco_ids, account_ids):
+    from archive.models import ArchivedRecord
+
+    for model, credit, debit in ARCHIVED_SOURCES[kind]:
+        queryset = ArchivedRecord.objects.filter(model=model, occurred_at__lt=high)
+        if low is not None:
+            queryset = queryset.filter(occurred_at__gte=low)
+        if sacco_ids is not None:
+            queryset = queryset.filter(sacco_id__in=sacco_ids)
+        if account_ids is not None:
+            queryset = queryset.filter(parent_id__in=account_ids)
+        sums = {}
+        if credit is not None:
+            sums.update(credits=Sum('amount', filter=credit), credit_count=Count('id', filter=credit))
+        if debit is not None:
+            sums.update(debits=Sum('amount', filter=debit), debit_count=Count('id', filter=debit))
+        rows = (
+            queryset.order_by()
+            .values(rollup_key=F('sacco_id' if by == 'sacco' else 'parent_id'), rollup_sacco=F('sacco_id'))
+            .annotate(**sums)
+        )
+        for row in rows:
+            totals = movements.get(row['rollup_key']) or movements.setdefault(row['rollup_key'], Totals(row['rollup_sacco']))
+            totals.credits += row.get('credits') or ZERO
+            totals.debits += row.get('debits') or ZERO
+            totals.credit_count += row.get('credit_count', 0)
+            totals.debit_count += row.get('debit_count', 0)
+
+
+def raw_movements(kind, low, high, by='account', sacco_ids=None, account_ids=None):
+    """
+    Movements of the raw transactions in [low, high) (low None for all history),
+    grouped by account or by Sacco: {account or Sacco id: Totals}
+    """
+    if kind not in SOURCES:
+        return {}
+    movements = SOURCES[kind](low, high, by, sacco_ids, account_ids)
+    _add_archived_movements(movements, kind, low, high, by, sacco_ids, account_ids)
+    return movements
+
+
+# Incremental maintenance
+
+def _adjust(queryset, credits, debits, credit_count, debit_count):
+    return queryset.update(
+        credits=F('credits') + credits,
+        debits=F('debits') + debits,
+        credit_count=F('credit_count') + credit_count,
+        debit_count=F('debit_count') + debit_count,
+        closing=F('closing') + (credits - debits),
+        updated_at=timezone.now(),
+    )
+
+
+def _apply(model, keys, month, opening_from_history, credits, debits, credit_count, debit_count):
+    rows = model.objects.filter(**keys)
+    if not _adjust(rows.filter(month=month), credits, debits, credit_count, debit_count):
+        opening = rows.filter(month__lt=month).order_by('-month').values_list('closing', flat=True).first()
+        if opening is None:
+            opening = opening_from_history()
+        try:
+            with transaction.atomic():
+                model.objects.create(
+                    **keys, month=month, opening=opening, closing=opening + credits - debits,
+                    credits=credits, debits=debits, credit_count=credit_count, debit_count=debit_count,
+                )
+        except IntegrityError:
+            # Created by a concurrent posting
+            _adjust(rows.filter(month=month), credits, debits, credit_count, debit_count)
+    net = credits - debits
+    if net and month < month_of(timezone.now()):
+        rows.filter(month__gt=month).update(opening=F('opening') + net, closing=F('closing') + net)
+
+
+def post_movement(kind, sacco_id, account_id, moment, credits=0, debits=0, credit_count=0, debit_count=0):
+    """
+    Add one movement (or, with negative amounts and counts, take one back) to
+    the account's and its Sacco's rollups for the month of moment
+    """
+    month = month_of(moment)
+    low, _ = month_bounds(month)
+    credits, debits = Decimal(credits), Decimal(debits)
+
+    def account_history():
+        totals = raw_movements(kind, None, low, account_ids=[account_id]).get(account_id)
+        return totals.net if totals else ZERO
+
+    def sacco_history():
+        totals = raw_movements(kind, None, low, by='sacco', sacco_ids=[sacco_id]).get(sacco_id)
+        return totals.net if totals else ZERO
+
+    with transaction.atomic():
+        _apply(
+            AccountMonthlyBalance, {'kind': kind, 'account_id': account_id, 'sacco_id': sacco_id}, month,
+            account_history, credits, debits, credit_count, debit_count,
+        )
+        _apply(
+            SaccoMonthlyBalance, {'kind': kind, 'sacco_id': sacco_id}, month,
+            sacco_history, credits, debits, credit_count, debit_count,
+        )
+
+
+# Rebuilding
+
+def _latest_closings(queryset, key, before):
+    """{key: closing} of each key's last row before a month"""
+    earlier = queryset.filter(month__lt=before)
+    last_month = earlier.filter(**{key: OuterRef(key)}).order_by('-month').values('month')[:1]
+    return dict(earlier.filter(month=Subquery(last_month)).values_list(key, 'closing'))
+
+
+def _rebase_later(queryset, key, after, old, new):
+    """Shift rows after a month by how much each key's closing at that month changed"""
+    later = queryset.filter(month__gt=after)
+    for value in set(old) | set(new):
+        delta = new.get(value, ZERO) - old.get(value, ZERO)
+        if delta:
+            later.filter(**{key: value}).update(opening=F('opening') + delta, closing=F('closing') + delta)
+
+
+def rebuild_rollups(kind, first_month, last_month, sacco_ids=None, batch_size=1000):
+    """
+    Recompute the rollups of a kind for the months first_month to last_month
+    from the raw transactions, optionally for some Saccos only
+
+    Balances carried into first_month come from the rows of earlier months
+    when there are any, and from the whole history otherwise, so the first
+    build must start at the earliest month with movements. Rows after
+    last_month are re-based on the rebuilt closings. Returns the number of
+    account rows written.
+    """
+    if kind not in REBUILDABLE_KINDS:
+        raise ValueError(f'{kind} rollups have no transaction history to rebuild from')
+
+    accounts = AccountMonthlyBalance.objects.filter(kind=kind)
+    saccos = SaccoMonthlyBalance.objects.filter(kind=kind)
+    if sacco_ids is not None:
+        accounts, saccos = accounts.filter(sacco_id__in=sacco_ids), saccos.filter(sacco_id__in=sacco_ids)
+
+    # Closings before the rebuild, to re-base any later months on
+    rebase = saccos.filter(month__gt=last_month).exists()
+    if rebase:
+        after_last = add_months(last_month, 1)
+        old_account_closings = _latest_closings(accounts, 'account_id', after_last)
+        old_sacco_closings = _latest_closings(saccos, 'sacco_id', after_last)
+
+    if accounts.filter(month__lt=first_month).exists():
+        account_balances = _latest_closings(accounts, 'account_id', first_month)
+        sacco_balances = _latest_closings(saccos, 'sacco_id', first_month)
+    else:
+        low, _ = month_bounds(first_month)
+        account_balances = {
+            key: totals.net for key, totals in raw_movements(kind, None, low, sacco_ids=sacco_ids).items()
+        }
+        sacco_balances = {
+            key: totals.net for key, totals in raw_movements(kind, None, low, by='sacco', sacco_ids=sacco_ids).items()
+        }
+
+    written = 0
+    for month in month_range(first_month, last_month):
+        low, high = month_bounds(month)
+        account_rows, sacco_totals = [], defaultdict(lambda: [0, 0, 0, 0])
+        for account_id, totals in raw_movements(kind, low, high, sacco_ids=sacco_ids).items():
+            opening = account_balances.get(account_id, 0)
+            closing = account_balances[account_id] = opening + totals.net
+            account_rows.append(AccountMonthlyBalance(
+                kind=kind, sacco_id=totals.sacco_id, account_id=account_id, month=month,
+                opening=opening, credits=totals.credits, debits=totals.debits, closing=closing,
+                credit_count=totals.credit_count, debit_count=totals.debit_count,
+            ))
+            sacco_total = sacco_totals[totals.sacco_id]
+            sacco_total[0] += totals.credits
+            sacco_total[1] += totals.debits
+            sacco_total[2] += totals.credit_count
+            sacco_total[3] += totals.debit_count
+
+        sacco_rows = []
+        for sacco_id, (credits, debits, credit_count, debit_count) in sacco_totals.items():
+            opening = sacco_balances.get(sacco_id, 0)
+            closing = sacco_balances[sacco_id] = opening + credits - debits
+            sacco_rows.append(SaccoMonthlyBalance(
+                kind=kind, sacco_id=sacco_id, month=month, opening=opening, credits=credits, debits=debits,
+                closing=closing, credit_count=credit_count, debit_count=debit_count,
+            ))
+
+        with transaction.atomic():
+            accounts.filter(month=month).delete()
+            saccos.filter(month=month).delete()
+            AccountMonthlyBalance.objects.bulk_create(account_rows, batch_size=batch_size)
+            SaccoMonthlyBalance.objects.bulk_create(sacco_rows, batch_size=batch_size)
+        written += len(account_rows)
+
+    if rebase:
+        with transaction.atomic():
+            _rebase_later(accounts, 'account_id', last_month, old_account_closings, account_balances)
+            _rebase_later(saccos, 'sacco_id', last_month, old_sacco_closings, sacco_balances)
+    return written
+
+
+def first_movement_month(kind, sacco_ids=None):
+    """Month of the earliest raw movement of a kind, or None"""
+    from archive.models import ArchivedRecord
+    from loans.models import Loan, LoanRepayment
+    from savings.models import SavingsTransaction
+
+    if kind == 'savings':
+        queryset = SavingsTransaction.objects.all()
+        if sacco_ids is not None:
+            queryset = queryset.filter(sacco_id__in=sacco_ids)
+        moments = [queryset.order_by('performed_at').values_list('performed_at', flat=True).first()]
+    else:
+        loans = Loan.objects.filter(disbursement_date__isnull=False)
+        repayments = LoanRepayment.objects.all()
+        if sacco_ids is not None:
+            loans = loans.filter(sacco_id__in=sacco_ids)
+            repayments = repayments.filter(sacco_id__in=sacco_ids)
+        moments = [
+            loans.order_by('disbursement_date').values_list('disbursement_date', flat=True).first(),
+            repayments.order_by('payment_date').values_list('payment_date', flat=True).first(),
+        ]
+    archived = ArchivedRecord.objects.filter(
+        model__in=[model for model, _, _ in ARCHIVED_SOURCES[kind]], amount__isnull=False
+    )
+    if sacco_ids is not None:
+        archived = archived.filter(sacco_id__in=sacco_ids)
+    moments.append(archived.order_by('occurred_at').values_list('occurred_at', flat=True).first())
+    moments = [moment for moment in moments if moment is not None]
+    return month_of(min(moments)) if moments else None
+
+
+# Reading
+
+def sacco_series(kind, sacco_ids, first_month, last_month):
+    """
+    Month by month totals of a kind over some Saccos, from the Sacco rollups
+
+    Returns one dict per month (month, opening, credits, debits, closing,
+    credit_count, debit_count); months in which a Sacco did not move carry its
+    previous closing.
+    """
+    rows = SaccoMonthlyBalance.objects.filter(kind=kind, sacco_id__in=sacco_ids)
+    balances = _latest_closings(rows, 'sacco_id', first_month)
+    by_month = defaultdict(list)
+    for row in rows.filter(month__gte=first_month, month__lte=last_month).values(
+        'sacco_id', 'month', 'credits', 'debits', 'closing', 'credit_count', 'debit_count'
+    ):
+        by_month[row['month']].append(row)
+
+    series = []
+    for month in month_range(first_month, last_month):
+        opening = sum(balances.values(), ZERO)
+        entry = {
+            'month': month, 'opening': opening, 'credits': ZERO, 'debits': ZERO,
+            'credit_count': 0, 'debit_count': 0,
+        }
+        for row in by_month.get(month, ()):
+            balances[row['sacco_id']] = row['closing']
+            for field in ('credits', 'debits', 'credit_count', 'debit_count'):
+                entry[field] += row[field]
+        entry['closing'] = sum(balances.values(), ZERO)
+        series.append(entry)
+    return series
@@ -0,0 +1,184 @@
+"""
+Set-based KPI scoring
+
+Achievement and weighted score are computed by the database for every result
+of the requested review periods in a single annotated query, mirroring
+SaccoKPIResult.achievement_percent / weighted_score. KRA and overall rollups
+are summed from those rows.
+
+Scores of closed periods no longer change, so they are cached without expiry.
+The cached entry remembers the Sacco's KRA/KPI definitions version, so editing
+a KRA or KPI (weights, targets, activation) makes it stale. Entering or
+deleting results and changing a period's status drop the entry through
+invalidate_period_scores (signals in reports/signals.py; bulk paths must call
+it explicitly, upsert_results does).
+"""
+import time
+
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+from django.db.models import Case, Count, F, FloatField, Max, Prefetch, Value, When
+from django.db.models.functions import Cast, Greatest, Least
+
+from accounts.db_routing import primary_reads
+
+from .models import SaccoKPI, SaccoKPIResult, SaccoKRA
+
+PERIOD_KEY = 'kpi_scores:period:{}'
+DEFINITIONS_VERSION_KEY = 'kpi_scores:definitions:{}'
+
+
+def get_definitions_version(sacco_id):
+    key = DEFINITIONS_VERSION_KEY.format(sacco_id)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, time.time_ns(), None)
+        version = cache.get(key)
+    return version
+
+
+def bump_definitions_version(sacco_id):
+    """Mark every cached score of a Sacco stale after its KRAs or KPIs change"""
+    key = DEFINITIONS_VERSION_KEY.format(sacco_id)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, time.time_ns(), None)
+
+
+def invalidate_period_scores(period_ids):
+    """Drop cached scores for the given review periods"""
+    cache.delete_many([PERIOD_KEY.format(period_id) for period_id in period_ids])
+
+
+def results_version(period):
+    """
+    Concurrency token for the results of a period: changes whenever a result
+    is added, edited or deleted
+    """
+    state = SaccoKPIResult.objects.filter(period=period).aggregate(count=Count('id'), latest=Max('updated_at'))
+    latest = state['latest'].isoformat() if state['latest'] else ''
+    return f"{state['count']}:{latest}"
+
+
+def upsert_results(results, update_fields, batch_size=1000):
+    """
+    Insert or update SaccoKPIResult instances on their (kpi, period) key in
+    bulk, then refresh cached scores and league snapshots of the periods
+    touched (bulk_create sends no signals)
+    """
+    from .league import snapshot_period
+
+    if not results:
+        return 0
+    SaccoKPIResult.objects.bulk_create(
+        results,
+        batch_size=batch_size,
+        update_conflicts=True,
+        unique_fields=['kpi', 'period'],
+        update_fields=list(update_fields) + ['updated_at'],
+    )
+    periods = {result.period.id: result.period for result in results}
+    invalidate_period_scores(list(periods))
+    for period in periods.values():
+        if period.status == 'closed':
+            snapshot_period(period)
+    return len(results)
+
+
+def achievement_expression():
+    """SQL equivalent of SaccoKPIResult.achievement_percent"""
+    actual = Cast('actual_value', FloatField())
+    target = Cast('kpi__target_value', FloatField())
+    return Case(
+        When(kpi__direction='higher_is_better', kpi__target_value=0, then=Value(0.0)),
+        When(kpi__direction='higher_is_better', then=actual / target * Value(100.0)),
+        # lower is better: capped at 200%, and 0 when nothing was recorded
+        When(actual_value=0, then=Value(0.0)),
+        default=Greatest(Value(0.0), Least(Value(200.0), target / actual * Value(100.0))),
+        output_field=FloatField(),
+    )
+
+
+def get_scorecard(sacco):
+    """Active KRAs of a Sacco with their active KPIs prefetched"""
+    return list(
+        SaccoKRA.objects.filter(sacco=sacco, is_active=True).prefetch_related(
+            Prefetch('kpis', queryset=SaccoKPI.objects.filter(is_active=True), to_attr='active_kpis')
+        )
+    )
+
+
+def _compute(scorecard, period_ids):
+    """Score the given periods against the scorecard in one query"""
+    kpi_to_kra = {kpi.id: kra.id for kra in scorecard for kpi in kra.active_kpis}
+    scores = {
+        period_id: {'overall': 0.0, 'kras': {}, 'kpis': {}}
+        for period_id in period_ids
+    }
+    if not kpi_to_kra or not period_ids:
+        return scores
+
+    rows = (
+        SaccoKPIResult.objects
+        .filter(period_id__in=period_ids, kpi_id__in=list(kpi_to_kra))
+        .annotate(achievement=achievement_expression())
+        .annotate(score=F('achievement') * Cast('kpi__weight', FloatField()) / Value(100.0))
+        .values('id', 'period_id', 'kpi_id', 'actual_value', 'achievement', 'score')
+    )
+    for row in rows:
+        period = scores[row['period_id']]
+        period['kpis'][row['kpi_id']] = {
+            'id': row['id'],
+            'actual_value': row['actual_value'],
+            'achievement': row['achievement'] or 0.0,
+            'score': row['score'] or 0.0,
+        }
+
+    # KRA rollups: score is the sum of KPI scores, achievement the mean over
+    # all active KPIs (missing results count as 0)
+    for period in scores.values():
+        for kra in scorecard:
+            results = [period['kpis'][kpi.id] for kpi in kra.active_kpis if kpi.id in period['kpis']]
+            kra_score = sum(result['score'] for result in results)
+            achievement_sum = sum(result['achievement'] for result in results)
+            period['kras'][kra.id] = {
+                'score': kra_score,
+                'achievement': achievement_sum / len(kra.active_kpis) if kra.active_kpis else 0.0,
+            }
+            period['overall'] += kra_score
+    return scores
+
+
+def score_periods(sacco, periods, scorecard=None):
+    """
+    Return {period id: {'overall', 'kras': {kra id: {...}}, 'kpis': {kpi id: {...}}}}
+    for the given review periods of a Sacco
+
+    Closed periods are served from the cache when possible; everything else is
+    computed together in a single query.
+    """
+    version = get_definitions_version(sacco.id)
+    periods = list(periods)
+    closed_ids = [period.id for period in periods if period.status == 'closed']
+    cached = cache.get_many([PERIOD_KEY.format(period_id) for period_id in closed_ids])
+
+    scores = {}
+    for period_id in closed_ids:
+        entry = cached.get(PERIOD_KEY.format(period_id))
+        if entry and entry['version'] == version:
+            scores[period_id] = entry['scores']
+
+    missing = [period.id for period in periods if period.id not in scores]
+    if missing:
+        with primary_reads():
+            # A scorecard the caller read from the replica may predate the current definitions version
+            if scorecard is None or any(kra._state.db != DEFAULT_DB_ALIAS for kra in scorecard):
+                scorecard = get_scorecard(sacco)
+            computed = _compute(scorecard, missing)
+        scores.update(computed)
+        cache.set_many({
+            PERIOD_KEY.format(period_id): {'version': version, 'scores': computed[period_id]}
+            for period_id in missing if period_id in closed_ids
+        }, None)
+    return scores
@@ -0,0 +1,198 @@
+"""
+Signal handlers for the reports app
+"""
+from django.db.models.signals import post_save, post_delete, pre_save
+from django.db.models import F
+from django.utils import timezone
+
+from loans.models import Loan, LoanRepayment
+from members.models import Member
+from savings.models import SavingsTransaction
+
+from .models import SaccoReviewPeriod, SaccoKRA, SaccoKPI, SaccoKPIResult
+from .league import discard_snapshot, snapshot_period
+from .par import bump_par_version
+from .rollups import SAVINGS_CREDIT_TYPES, loan_payable, month_of, post_movement
+from .scoring import bump_definitions_version, invalidate_period_scores
+
+
+def invalidate_result_scores(sender, instance, **kwargs):
+    """Entering, editing or deleting a result changes its period's scores"""
+    invalidate_period_scores([instance.period_id])
+    # Late corrections to a closed period also refresh its league table snapshot
+    period = SaccoReviewPeriod.objects.filter(pk=instance.period_id, status='closed').select_related('sacco').first()
+    if period is not None:
+        snapshot_period(period)
+
+
+def invalidate_period(sender, instance, **kwargs):
+    """A period's status decides whether its scores may be cached"""
+    invalidate_period_scores([instance.pk])
+
+
+def snapshot_closed_period(sender, instance, **kwargs):
+    """Publish a period to the league table when it closes, withdraw it when reopened"""
+    if instance.status == 'closed':
+        snapshot_period(instance)
+    else:
+        discard_snapshot(instance)
+
+
+def invalidate_kra_definitions(sender, instance, **kwargs):
+    bump_definitions_version(instance.sacco_id)
+
+
+def invalidate_kpi_definitions(sender, instance, **kwargs):
+    sacco_id = SaccoKRA.objects.filter(pk=instance.kra_id).values_list('sacco_id', flat=True).first()
+    if sacco_id is not None:
+        bump_definitions_version(sacco_id)
+
+
+def invalidate_loan_par(sender, instance, **kwargs):
+    if instance.sacco_id is not None:
+        bump_par_version(instance.sacco_id)
+
+
+def invalidate_loan_repayment_par(sender, instance, **kwargs):
+    """Repayments change the days past due of their loan"""
+    if instance.sacco_id is not None:
+        bump_par_version(instance.sacco_id)
+
+
+def _post_savings(sacco_id, transaction, sign):
+    credit = transaction.txn_type in SAVINGS_CREDIT_TYPES
+    amount, count = sign * transaction.amount, sign
+    post_movement(
+        'savings', sacco_id, transaction.account_id, transaction.performed_at,
+        credits=amount if credit else 0, debits=0 if credit else amount,
+        credit_count=count if credit else 0, debit_count=0 if credit else count,
+    )
+
+
+def remember_savings_transaction(sender, instance, raw=False, **kwargs):
+    """Edits take the transaction as it was out of the rollups before adding it back"""
+    instance._rollup_previous = None
+    if raw or instance._state.adding:
+        return
+    instance._rollup_previous = (
+        SavingsTransaction.objects.filter(pk=instance.pk)
+        .only('sacco_id', 'account_id', 'txn_type', 'amount', 'performed_at')
+        .first()
+    )
+
+
+def roll_up_savings_transaction(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    previous = getattr(instance, '_rollup_previous', None)
+    if previous is not None:
+        _post_savings(previous.sacco_id, previous, -1)
+    _post_savings(instance.sacco_id, instance, 1)
+    instance._rollup_previous = None
+
+
+def remember_repayment(sender, instance, raw=False, **kwargs):
+    instance._rollup_previous = None
+    if raw or instance._state.adding:
+        return
+    instance._rollup_previous = LoanRepayment.objects.filter(pk=instance.pk).values_list('loan_id', 'amount', 'payment_date').first()
+
+
+def _post_repayment(loan_id, amount, payment_date, sign):
+    sacco_id = Loan.objects.filter(pk=loan_id).values_list('sacco_id', flat=True).first()
+    if sacco_id is not None:
+        post_movement('loan', sacco_id, loan_id, payment_date, debits=sign * amount, debit_count=sign)
+
+
+def roll_up_repayment(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    previous = getattr(instance, '_rollup_previous', None)
+    if previous is not None:
+        _post_repayment(*previous, -1)
+    _post_repayment(instance.loan_id, instance.amount, instance.payment_date, 1)
+    instance._rollup_previous = None
+
+
+def take_back_repayment(sender, instance, **kwargs):
+    _post_repayment(instance.loan_id, instance.amount, instance.payment_date, -1)
+
+
+def roll_up_disbursement(sender, instance, raw=False, **kwargs):
+    """
+    A loan credits the loan book once, in its disbursement month. Saves that
+    change the disbursement date or amount move the credit.
+    """
+    from .models import AccountMonthlyBalance
+    if raw:
+        return
+    recorded = list(
+        AccountMonthlyBalance.objects.filter(kind='loan', account_id=instance.pk, credit_count__gt=0)
+        .values_list('sacco_id', 'month', 'credits', 'credit_count')
+    )
+    expected = None
+    if instance.disbursement_date is not None:
+        payable = Loan.objects.filter(pk=instance.pk).annotate(payable=loan_payable()).values_list(
+            'sacco_id', 'payable'
+        ).first()
+        if payable is not None:
+            expected = (payable[0], month_of(instance.disbursement_date), payable[1], 1)
+    if recorded == ([expected] if expected else []):
+        return
+    for sacco_id, month, credits, credit_count in recorded:
+        post_movement('loan', sacco_id, instance.pk, month, credits=-credits, credit_count=-credit_count)
+    if expected:
+        post_movement('loan', expected[0], instance.pk, instance.disbursement_date, credits=expected[2], credit_count=1)
+
+
+def remember_shares(sender, instance, raw=False, update_fields=None, **kwargs):
+    instance._previous_shares = None
+    if raw or (update_fields is not None and 'shares_balance' not in update_fields):
+        instance._previous_shares = instance.shares_balance
+    elif not instance._state.adding:
+        instance._previous_shares = Member.objects.filter(pk=instance.pk).values_list('shares_balance', flat=True).first()
+
+
+def roll_up_shares(sender, instance, raw=False, **kwargs):
+    """Changes of a member's shares balance are the shares movements"""
+    if raw:
+        return
+    change = (instance.shares_balance or 0) - (getattr(instance, '_previous_shares', None) or 0)
+    instance._previous_shares = instance.shares_balance
+    if change > 0:
+        post_movement('shares', instance.sacco_id, instance.pk, timezone.now(), credits=change, credit_count=1)
+    elif change < 0:
+        post_movement('shares', instance.sacco_id, instance.pk, timezone.now(), debits=-change, debit_count=1)
+
+
+HANDLERS = (
+    (SaccoKPIResult, invalidate_result_scores),
+    (SaccoReviewPeriod, invalidate_period),
+    (SaccoKRA, invalidate_kra_definitions),
+    (SaccoKPI, invalidate_kpi_definitions),
+)
+
+for _model, _handler in HANDLERS:
+    post_save.connect(_handler, sender=_model, dispatch_uid=f'kpi_scores_save_{_model.__name__}')
+    post_delete.connect(_handler, sender=_model, dispatch_uid=f'kpi_scores_delete_{_model.__name__}')
+
+# Loans only on save: a delete handler would stop bulk loan deletes (and member
+# cascades) from running as single DELETE statements
+post_save.connect(invalidate_loan_par, sender=Loan, dispatch_uid='par_save_Loan')
+post_save.connect(invalidate_loan_repayment_par, sender=LoanRepayment, dispatch_uid='par_save_LoanRepayment')
+post_delete.connect(invalidate_loan_repayment_par, sender=LoanRepayment, dispatch_uid='par_delete_LoanRepayment')
+
+post_save.connect(snapshot_closed_period, sender=SaccoReviewPeriod, dispatch_uid='league_snapshot_save_SaccoReviewPeriod')
+
+# Monthly balance rollups. Savings transactions, loans and members only on
+# save, like the PAR handlers above; deletes and bulk writes are caught up
+# with the rebuild_balance_rollups command: the nightly run covers last month
+# and this month, older ones need --from <month> (cron_setup.md).
+pre_save.connect(remember_savings_transaction, sender=SavingsTransaction, dispatch_uid='rollups_pre_save_SavingsTransaction')
+post_save.connect(roll_up_savings_transaction, sender=SavingsTransaction, dispatch_uid='rollups_save_SavingsTransaction')
+pre_save.connect(remember_repayment, sender=LoanRepayment, dispatch_uid='rollups_pre_save_LoanRepayment')
+post_save.connect(roll_up_repayment, sender=LoanRepayment, dispatch_uid='rollups_save_LoanRepayment')
+post_delete.connect(take_back_repayment, sender=LoanRepayment, dispatch_uid='rollups_delete_LoanRepayment')
+post_save.connect(roll_up_disbursement, sender=Loan, dispatch_uid='rollups_save_Loan')
+pre_save.connect(remember_shares, sender=Member, dispatch_uid='rollups_pre_save_Member')
+post_save.connect(roll_up_shares, sender=Member, dispatch_uid='rollups_save_Member')
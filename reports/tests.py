@@ -1,3 +1,566 @@
+from datetime import date
+from decimal import Decimal
+
+from django.core.cache import cache
 from django.test import TestCase
+from django.urls import reverse
+
+from accounts.models import Region, Sacco, User
+from .models import SaccoReviewPeriod, SaccoKRA, SaccoKPI, SaccoKPIResult
+from .scoring import results_version, score_periods
+
+
+class KPIScoringTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        region = Region.objects.create(name="Scoring Region")
+        self.sacco = Sacco.objects.create(
+            name="Scoring Sacco", registration_number="SCORE001", address="Address",
+            phone="1234567890", email="score@sacco.com", region=region
+        )
+        self.kra = SaccoKRA.objects.create(sacco=self.sacco, title="Growth", weight=Decimal('50'))
+        self.higher = SaccoKPI.objects.create(
+            kra=self.kra, name="Members", target_value=Decimal('200'), weight=Decimal('60')
+        )
+        self.lower = SaccoKPI.objects.create(
+            kra=self.kra, name="PAR", target_value=Decimal('5'), weight=Decimal('40'),
+            direction='lower_is_better'
+        )
+        self.closed = SaccoReviewPeriod.objects.create(
+            sacco=self.sacco, name="Q1", start_date=date(2024, 1, 1), end_date=date(2024, 3, 31), status='closed'
+        )
+        self.active = SaccoReviewPeriod.objects.create(
+            sacco=self.sacco, name="Q2", start_date=date(2024, 4, 1), end_date=date(2024, 6, 30), status='active'
+        )
+        self.results = [
+            SaccoKPIResult.objects.create(kpi=self.higher, period=self.closed, actual_value=Decimal('150')),
+            SaccoKPIResult.objects.create(kpi=self.lower, period=self.closed, actual_value=Decimal('2')),
+            SaccoKPIResult.objects.create(kpi=self.higher, period=self.active, actual_value=Decimal('250')),
+        ]
+
+    def test_scores_match_model_properties(self):
+        scores = score_periods(self.sacco, [self.closed, self.active])
+        for result in self.results:
+            row = scores[result.period_id]['kpis'][result.kpi_id]
+            self.assertAlmostEqual(row['achievement'], result.achievement_percent, places=4)
+            self.assertAlmostEqual(row['score'], result.weighted_score, places=4)
+        closed_total = sum(r.weighted_score for r in self.results if r.period_id == self.closed.id)
+        self.assertAlmostEqual(scores[self.closed.id]['overall'], closed_total, places=4)
+        # The lower-is-better KPI has no result in the active period and counts as 0
+        self.assertAlmostEqual(scores[self.active.id]['kras'][self.kra.id]['achievement'], 125.0 / 2, places=4)
+
+    def test_closed_period_served_from_cache_until_results_change(self):
+        score_periods(self.sacco, [self.closed])
+        with self.assertNumQueries(0):
+            score_periods(self.sacco, [self.closed])
+
+        result = self.results[0]
+        result.actual_value = Decimal('200')
+        result.save()
+        scores = score_periods(self.sacco, [self.closed])
+        self.assertAlmostEqual(scores[self.closed.id]['kpis'][self.higher.id]['achievement'], 100.0, places=4)
+
+    def test_kpi_change_makes_cached_scores_stale(self):
+        score_periods(self.sacco, [self.closed])
+        self.higher.weight = Decimal('30')
+        self.higher.save()
+        scores = score_periods(self.sacco, [self.closed])
+        self.assertAlmostEqual(scores[self.closed.id]['kpis'][self.higher.id]['score'], 75.0 * 30 / 100, places=4)
+
+    def test_performance_overview_renders(self):
+        User.objects.create_user(username="scoreadmin", password="scoreadmin123", is_sacco_admin=True, sacco=self.sacco)
+        self.client.login(username="scoreadmin", password="scoreadmin123")
+        response = self.client.get(reverse('reports_performance'), {'period': self.closed.id})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['trend_labels'], ['Q1', 'Q2'])
+
+
+class PerformanceLeagueTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.region = Region.objects.create(name="League Region")
+        self.saccos = []
+        for index, actual in enumerate([50, 150, 100]):
+            sacco = Sacco.objects.create(
+                name=f"League Sacco {index}", registration_number=f"LEAGUE{index}", address="Address",
+                phone="1234567890", email=f"league{index}@sacco.com", region=self.region
+            )
+            kra = SaccoKRA.objects.create(sacco=sacco, title="Growth", weight=Decimal('100'))
+            kpi = SaccoKPI.objects.create(kra=kra, name="Members", target_value=Decimal('100'), weight=Decimal('100'))
+            previous = SaccoReviewPeriod.objects.create(
+                sacco=sacco, name="Q4 2024", start_date=date(2024, 10, 1), end_date=date(2024, 12, 31)
+            )
+            SaccoKPIResult.objects.create(kpi=kpi, period=previous, actual_value=Decimal('80'))
+            previous.status = 'closed'
+            previous.save()
+            period = SaccoReviewPeriod.objects.create(
+                sacco=sacco, name="Q1 2025", start_date=date(2025, 1, 1), end_date=date(2025, 3, 31)
+            )
+            SaccoKPIResult.objects.create(kpi=kpi, period=period, actual_value=Decimal(actual))
+            period.status = 'closed'
+            period.save()
+            self.saccos.append(sacco)
+
+    def test_closing_a_period_ranks_saccos_with_delta(self):
+        from .league import league_table
+        rows = league_table("Q1 2025")
+        self.assertEqual([row['sacco_name'] for row in rows], ["League Sacco 1", "League Sacco 2", "League Sacco 0"])
+        self.assertEqual([row['rank'] for row in rows], [1, 2, 3])
+        self.assertEqual(rows[0]['quartile'], 1)
+        self.assertAlmostEqual(rows[0]['delta'], 70.0)
+        self.assertAlmostEqual(rows[2]['delta'], -30.0)
+
+    def test_reopening_withdraws_snapshot(self):
+        from .league import league_table
+        period = SaccoReviewPeriod.objects.get(sacco=self.saccos[1], name="Q1 2025")
+        period.status = 'active'
+        period.save()
+        self.assertEqual(len(league_table("Q1 2025")), 2)
+
+    def test_league_view_scoped_to_region(self):
+        User.objects.create_user(
+            username="leagueregional", password="leaguepass123", is_regional_admin=True, region=self.region
+        )
+        self.client.login(username="leagueregional", password="leaguepass123")
+        response = self.client.get(reverse('reports_performance_league'), {'kra': 'Growth'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['sacco_count'], 3)
+        self.assertEqual(response.context['kra_title'], 'Growth')
+
+
+class KPIActualsTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        from members.models import Member
+        region = Region.objects.create(name="Metrics Region")
+        self.sacco = Sacco.objects.create(
+            name="Metrics Sacco", registration_number="METRIC001", address="Address",
+            phone="1234567890", email="metrics@sacco.com", region=region
+        )
+        for index, joined in enumerate([date(2024, 12, 1), date(2025, 2, 1), date(2025, 5, 1)]):
+            Member.objects.create(
+                sacco=self.sacco, member_number=f"METRIC{index}", first_name="Test", last_name=f"Member {index}",
+                phone="1234567890", gender="Female", date_of_birth="1990-01-01", home_address="Address",
+                village_town="Town", district="District", date_joined=joined
+            )
+        kra = SaccoKRA.objects.create(sacco=self.sacco, title="Growth", weight=Decimal('100'))
+        self.active = SaccoKPI.objects.create(
+            kra=kra, name="Active members", target_value=Decimal('4'), weight=Decimal('50'),
+            metric_source='members_active'
+        )
+        self.new = SaccoKPI.objects.create(
+            kra=kra, name="New members", target_value=Decimal('2'), weight=Decimal('50'),
+            metric_source='members_new'
+        )
+        self.period = SaccoReviewPeriod.objects.create(
+            sacco=self.sacco, name="Q1 2025", start_date=date(2025, 1, 1), end_date=date(2025, 3, 31)
+        )
+
+    def test_evaluate_actuals_upserts_results(self):
+        from members.models import Member
+        from .metrics import evaluate_actuals
+        self.assertEqual(evaluate_actuals([self.period]), 2)
+        results = {r.kpi_id: r.actual_value for r in SaccoKPIResult.objects.filter(period=self.period)}
+        self.assertEqual(results, {self.active.id: Decimal('2'), self.new.id: Decimal('1')})
+
+        Member.objects.filter(member_number="METRIC0").update(status='Inactive')
+        evaluate_actuals([self.period])
+        self.assertEqual(SaccoKPIResult.objects.filter(period=self.period).count(), 2)
+        self.assertEqual(SaccoKPIResult.objects.get(kpi=self.active, period=self.period).actual_value, Decimal('1'))
+
+    def test_manual_entry_skips_automatic_kpis(self):
+        User.objects.create_user(username="metricsadmin", password="metrics123", is_sacco_admin=True, sacco=self.sacco)
+        self.client.login(username="metricsadmin", password="metrics123")
+        url = reverse('reports_performance_results')
+        self.client.post(f"{url}?period={self.period.id}", {
+            'version': results_version(self.period), f'actual_value_{self.active.id}': '99',
+        })
+        self.assertFalse(SaccoKPIResult.objects.filter(kpi=self.active).exists())
+        self.client.post(f"{url}?period={self.period.id}", {'action': 'evaluate'})
+        self.assertEqual(SaccoKPIResult.objects.get(kpi=self.active, period=self.period).actual_value, Decimal('2'))
+
+
+class KPIResultBatchEntryTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        region = Region.objects.create(name="Batch Region")
+        self.sacco = Sacco.objects.create(
+            name="Batch Sacco", registration_number="BATCH001", address="Address",
+            phone="1234567890", email="batch@sacco.com", region=region
+        )
+        kra = SaccoKRA.objects.create(sacco=self.sacco, title="Growth", weight=Decimal('100'))
+        self.members = SaccoKPI.objects.create(kra=kra, name="Members", target_value=Decimal('100'), weight=Decimal('50'))
+        self.loans = SaccoKPI.objects.create(kra=kra, name="Loans", target_value=Decimal('10'), weight=Decimal('50'))
+        self.period = SaccoReviewPeriod.objects.create(
+            sacco=self.sacco, name="Q1 2025", start_date=date(2025, 1, 1), end_date=date(2025, 3, 31), status='active'
+        )
+        SaccoKPIResult.objects.create(kpi=self.members, period=self.period, actual_value=Decimal('40'))
+        User.objects.create_user(username="batchadmin", password="batch123", is_sacco_admin=True, sacco=self.sacco)
+        self.client.login(username="batchadmin", password="batch123")
+        self.url = f"{reverse('reports_performance_results')}?period={self.period.id}"
+
+    def values(self):
+        return dict(SaccoKPIResult.objects.filter(period=self.period).values_list('kpi_id', 'actual_value'))
+
+    def test_batch_updates_and_creates_results(self):
+        response = self.client.get(self.url)
+        version = response.context['form']['version'].value()
+        self.client.post(self.url, {
+            'version': version,
+            f'actual_value_{self.members.id}': '80',
+            f'actual_value_{self.loans.id}': '7.5',
+        })
+        self.assertEqual(self.values(), {self.members.id: Decimal('80'), self.loans.id: Decimal('7.5')})
+        scores = score_periods(self.sacco, [self.period])
+        self.assertAlmostEqual(scores[self.period.id]['overall'], 80 * 0.5 + 75 * 0.5, places=4)
+
+    def test_invalid_value_rejects_whole_batch(self):
+        response = self.client.post(self.url, {
+            'version': results_version(self.period),
+            f'actual_value_{self.members.id}': '80',
+            f'actual_value_{self.loans.id}': 'lots',
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.values(), {self.members.id: Decimal('40')})
+
+    def test_stale_version_does_not_overwrite(self):
+        version = results_version(self.period)
+        other = SaccoKPIResult.objects.get(kpi=self.members, period=self.period)
+        other.actual_value = Decimal('60')
+        other.save()
+
+        response = self.client.post(self.url, {'version': version, f'actual_value_{self.members.id}': '80'})
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.context['conflict'])
+        self.assertEqual(self.values(), {self.members.id: Decimal('60')})
+        # Submitting again with the refreshed token goes through
+        self.client.post(self.url, {
+            'version': response.context['form']['version'].value(), f'actual_value_{self.members.id}': '80',
+        })
+        self.assertEqual(self.values(), {self.members.id: Decimal('80')})
+
+
+class PortfolioAtRiskTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        from datetime import datetime
+        from django.utils import timezone
+        from loans.models import Loan, LoanProduct
+        from loans.schedule import generate_schedule
+        from members.models import Member
+        region = Region.objects.create(name="PAR Region")
+        self.sacco = Sacco.objects.create(
+            name="PAR Sacco", registration_number="PAR001", address="Address",
+            phone="1234567890", email="par@sacco.com", region=region
+        )
+        member = Member.objects.create(
+            sacco=self.sacco, member_number="PAR-M1", first_name="Test", last_name="Borrower",
+            phone="1234567890", gender="Female", date_of_birth="1990-01-01", home_address="Address",
+            village_town="Town", district="District", date_joined="2024-01-01"
+        )
+        product = LoanProduct.objects.create(
+            sacco=self.sacco, name="Business", product_code="PAR-BIZ", description="Business loans",
+            interest_rate=Decimal('12'), interest_type='Flat', max_amount=Decimal('100000'),
+            min_amount=Decimal('100'), max_duration_months=24, min_duration_months=1
+        )
+        self.loans = []
+        for paid_installments in (0, 3, 4):
+            loan = Loan.objects.create(
+                member=member, product=product, loan_ref=f"PAR-{paid_installments}", amount_requested=Decimal('1200'), amount_approved=Decimal('1200'),
+                interest_rate=Decimal('12'), interest_type='Flat', duration_months=12, purpose="Stock",
+                status='disbursed', disbursement_date=timezone.make_aware(datetime(2025, 1, 10)),
+            )
+            generate_schedule(loan)
+            if paid_installments:
+                repayment = loan.repayments.create(amount=Decimal('112') * paid_installments)
+                loan.repayments.filter(pk=repayment.pk).update(payment_date=timezone.make_aware(datetime(2025, 5, 1)))
+            self.loans.append(loan)
+        cache.clear()
+
+    def test_schedule_adds_up(self):
+        loan = self.loans[0]
+        installments = list(loan.installments.all())
+        self.assertEqual(len(installments), 12)
+        self.assertEqual(sum(i.amount_due for i in installments), Decimal('1344.00'))
+        self.assertEqual(installments[-1].cumulative_due, Decimal('1344.00'))
+        self.assertEqual(installments[0].due_date, date(2025, 2, 10))
+        self.assertEqual(loan.maturity_date.date(), date(2026, 1, 10))
+
+    def test_aging_buckets_as_of_date(self):
+        from .par import par_report
+        report = par_report([self.sacco.id], date(2025, 5, 15))
+        row = report['rows'][0]
+        self.assertEqual(row['loans'], 3)
+        self.assertEqual(row['balance'], Decimal('3248.00'))
+        self.assertEqual(row['buckets']['par90']['balance'], Decimal('1344.00'))
+        self.assertEqual(row['buckets']['par1']['balance'], Decimal('1008.00'))
+        self.assertEqual(row['buckets']['current']['loans'], 1)
+        self.assertEqual(row['par1'], Decimal('72.41'))
+        self.assertEqual(row['par90'], Decimal('41.38'))
+        # Before the first due date nothing is late
+        self.assertEqual(par_report([self.sacco.id], date(2025, 2, 10))['total']['par1'], Decimal('0'))
+
+    def test_cached_per_day_until_repayment(self):
+        from .par import par_report
+        par_report([self.sacco.id], date(2025, 5, 15), 'product')
+        with self.assertNumQueries(0):
+            par_report([self.sacco.id], date(2025, 5, 15), 'product')
+        self.loans[0].repayments.create(amount=Decimal('112'))
+        report = par_report([self.sacco.id], date(2025, 5, 15), 'product')
+        # The new repayment is dated today, after the as-of date, but the entry was recomputed
+        self.assertEqual(report['rows'][0]['label'], 'Business')
+        self.assertEqual(report['total']['buckets']['par90']['balance'], Decimal('1344.00'))
+
+
+class BoardReportTest(TestCase):
+    def setUp(self):
+        import shutil
+        import tempfile
+        from django.test import override_settings
+        media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media, ignore_errors=True)
+        settings_override = override_settings(MEDIA_ROOT=media)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        cache.clear()
+        region = Region.objects.create(name="Board Region")
+        self.sacco = Sacco.objects.create(
+            name="Board Sacco", registration_number="BOARD001", address="Address",
+            phone="1234567890", email="board@sacco.com", region=region
+        )
+        User.objects.create_user(username="boardadmin", password="board123", is_sacco_admin=True, sacco=self.sacco)
+        self.client.login(username="boardadmin", password="board123")
+        self.form = {'report_type': 'member', 'sacco': self.sacco.id, 'period_start': '2025-01-01', 'period_end': '2025-03-31'}
+
+    def add_member(self, number):
+        from members.models import Member
+        Member.objects.create(
+            sacco=self.sacco, member_number=f"BOARD{number}", first_name="Test", last_name="Member",
+            phone="1234567890", gender="Male", date_of_birth="1990-01-01", home_address="Address",
+            village_town="Town", district="District", date_joined="2025-02-01"
+        )
+
+    def test_generated_once_and_reused_until_data_changes(self):
+        from .board_reports import process_queue
+        from .models import GeneratedReport
+        self.add_member(1)
+        response = self.client.post(reverse('reports_board_reports'), self.form)
+        self.assertRedirects(response, reverse('reports_board_reports'))
+        self.assertEqual(process_queue(), {'ready': 1})
+        report = GeneratedReport.objects.get()
+        self.assertTrue(report.file.name.endswith('.docx'))
+
+        # Same data: served from the stored file without queuing anything
+        response = self.client.post(reverse('reports_board_reports'), self.form)
+        self.assertRedirects(response, reverse('reports_board_report_download', args=[report.id]), fetch_redirect_response=False)
+        download = self.client.get(reverse('reports_board_report_download', args=[report.id]))
+        self.assertEqual(download.status_code, 200)
+        self.assertTrue(b''.join(download.streaming_content).startswith(b'PK'))
+
+        # New data: a new version is queued and replaces the old file once built
+        self.add_member(2)
+        self.client.post(reverse('reports_board_reports'), self.form)
+        self.assertEqual(GeneratedReport.objects.filter(status='queued').count(), 1)
+        process_queue()
+        self.assertEqual(list(GeneratedReport.objects.values_list('status', flat=True)), ['ready'])
+        self.assertNotEqual(GeneratedReport.objects.get().pk, report.pk)
+
+    def test_only_long_running_reports_are_requeued(self):
+        from datetime import timedelta
+        from django.utils import timezone
+        from .board_reports import STALE_AFTER, process_queue
+        from .models import GeneratedReport
+        now = timezone.now()
+        # Waited in the queue for hours but only just claimed: left to its worker
+        recent = GeneratedReport.objects.create(
+            report_type='member', sacco=self.sacco, period_start='2025-01-01', period_end='2025-03-31',
+            data_version='a', status='running', started_at=now
+        )
+        abandoned = GeneratedReport.objects.create(
+            report_type='loan', sacco=self.sacco, period_start='2025-01-01', period_end='2025-03-31',
+            data_version='b', status='running', started_at=now - STALE_AFTER - timedelta(minutes=1)
+        )
+        GeneratedReport.objects.filter(pk__in=[recent.pk, abandoned.pk]).update(requested_at=now - timedelta(hours=5))
+        self.assertEqual(process_queue(), {'ready': 1})
+        recent.refresh_from_db()
+        abandoned.refresh_from_db()
+        self.assertEqual((recent.status, abandoned.status), ('running', 'ready'))
+
+
+class MemberStatementBatchTest(TestCase):
+    def setUp(self):
+        import shutil
+        import tempfile
+        from django.test import override_settings
+        self.media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media, ignore_errors=True)
+        settings_override = override_settings(MEDIA_ROOT=self.media)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        from django.utils import timezone
+        from datetime import datetime
+        from members.models import Member
+        from savings.models import SavingProduct, SavingsAccount, SavingsTransaction
+        region = Region.objects.create(name="Statement Batch Region")
+        self.sacco = Sacco.objects.create(
+            name="Statement Batch Sacco", registration_number="SBATCH001", address="Address",
+            phone="1234567890", email="sbatch@sacco.com", region=region
+        )
+        product = SavingProduct.objects.create(sacco=self.sacco, name="Ordinary", product_code="ORD")
+        self.members = []
+        for number in range(3):
+            member = Member.objects.create(
+                sacco=self.sacco, member_number=f"SB/{number}", first_name="Test", last_name="Member",
+                phone="1234567890", gender="Male", date_of_birth="1990-01-01", home_address="Address",
+                village_town="Town", district="District", date_joined="2024-01-01"
+            )
+            account = SavingsAccount.objects.create(member=member, product=product, account_number=f"SA-SB-{number}")
+            # One deposit before the period and one inside it
+            for day, balance in ((date(2025, 1, 20), Decimal('100')), (date(2025, 2, 10), Decimal('250'))):
+                txn = SavingsTransaction.objects.create(
+                    account=account, txn_type='Deposit', amount=Decimal('100'), running_balance=balance
+                )
+                performed_at = timezone.make_aware(datetime.combine(day, datetime.min.time()))
+                SavingsTransaction.objects.filter(pk=txn.pk).update(performed_at=performed_at)
+            self.members.append(member)
+
+    def test_chunk_loaded_with_fixed_queries(self):
+        from .member_statements import load_chunk
+        # One query per table whatever the chunk size (no loans, so no repayment query)
+        with self.assertNumQueries(4):
+            statements = load_chunk([m.pk for m in self.members], date(2025, 2, 1), date(2025, 2, 28))
+        account = statements[self.members[0].pk]['accounts'][0]
+        self.assertEqual((account['opening'], account['closing']), (Decimal('100'), Decimal('250')))
+        self.assertEqual(len(account['transactions']), 1)
+
+    def test_run_writes_files_and_resumes(self):
+        import os
+        from .member_statements import generate_statements
+        from .models import MemberStatementRun
+
+        # An interrupted run that finished the first member's chunk
+        run = MemberStatementRun.objects.create(
+            sacco=self.sacco, period_start=date(2025, 2, 1), period_end=date(2025, 2, 28),
+            file_format='csv', last_member_id=self.members[0].pk, members_done=1,
+        )
+        stats = generate_statements(self.sacco, date(2025, 2, 1), date(2025, 2, 28), 'csv', chunk_size=1)
+        self.assertEqual(stats['members'], 2)
+        run.refresh_from_db()
+        self.assertEqual((run.status, run.members_done, run.last_member_id), ('complete', 3, self.members[2].pk))
+        directory = os.path.join(self.media, run.directory)
+        self.assertEqual(sorted(os.listdir(directory)), ['SB1.csv', 'SB2.csv'])
+        with open(os.path.join(directory, 'SB1.csv')) as handle:
+            self.assertIn('Closing balance', handle.read())
+
+        # A complete run is not repeated unless restarted
+        self.assertEqual(generate_statements(self.sacco, date(2025, 2, 1), date(2025, 2, 28), 'csv')['members'], 0)
+        stats = generate_statements(self.sacco, date(2025, 2, 1), date(2025, 2, 28), 'csv', restart=True)
+        self.assertEqual(stats['members'], 3)
+        self.assertEqual(len(os.listdir(directory)), 3)
+
+
+class BalanceRollupTest(TestCase):
+    def setUp(self):
+        from members.models import Member
+        from savings.models import SavingProduct, SavingsAccount
+        region = Region.objects.create(name="Rollup Region")
+        self.sacco = Sacco.objects.create(
+            name="Rollup Sacco", registration_number="ROLL001", address="Address",
+            phone="1234567890", email="roll@sacco.com", region=region
+        )
+        self.member = Member.objects.create(
+            sacco=self.sacco, member_number="ROLL-M1", first_name="Test", last_name="Saver",
+            phone="1234567890", gender="Female", date_of_birth="1990-01-01", home_address="Address",
+            village_town="Town", district="District", date_joined="2024-01-01"
+        )
+        product = SavingProduct.objects.create(sacco=self.sacco, name="Ordinary", product_code="ROLL-ORD")
+        self.account = SavingsAccount.objects.create(member=self.member, product=product, account_number="SA-ROLL-1")
+
+    def post(self, txn_type, amount, day=None):
+        from datetime import datetime
+        from django.utils import timezone
+        from savings.models import SavingsTransaction
+        txn = SavingsTransaction.objects.create(
+            account=self.account, txn_type=txn_type, amount=Decimal(amount), running_balance=Decimal('0')
+        )
+        if day is not None:
+            performed_at = timezone.make_aware(datetime.combine(day, datetime.min.time()))
+            SavingsTransaction.objects.filter(pk=txn.pk).update(performed_at=performed_at)
+        return txn
+
+    def rows(self):
+        from .models import AccountMonthlyBalance
+        return list(
+            AccountMonthlyBalance.objects.filter(kind='savings', account_id=self.account.pk)
+            .values_list('month', 'opening', 'credits', 'debits', 'closing', 'credit_count', 'debit_count')
+        )
+
+    def test_postings_update_account_and_sacco_rows(self):
+        from django.utils import timezone
+        from .models import SaccoMonthlyBalance
+        from .rollups import month_of
+        self.post('Deposit', '500')
+        txn = self.post('Withdrawal', '120')
+        month = month_of(timezone.now())
+        self.assertEqual(self.rows(), [(month, 0, 500, 120, 380, 1, 1)])
+        # Editing a transaction replaces its movement
+        txn.amount = Decimal('100')
+        txn.save()
+        sacco_row = SaccoMonthlyBalance.objects.get(sacco=self.sacco, kind='savings', month=month)
+        self.assertEqual((sacco_row.debits, sacco_row.closing, sacco_row.debit_count), (100, 400, 1))
+
+    def test_rebuild_from_transactions_and_series_carry_forward(self):
+        from django.utils import timezone
+        from .rollups import month_of, rebuild_rollups, sacco_series
+        # Backdated with update(), so only a rebuild sees the real months
+        self.post('Deposit', '1000', date(2025, 1, 15))
+        self.post('Fee', '50', date(2025, 1, 20))
+        self.post('Deposit', '300', date(2025, 3, 2))
+        rebuild_rollups('savings', date(2025, 1, 1), month_of(timezone.now()))
+        self.assertEqual(self.rows(), [
+            (date(2025, 1, 1), 0, 1000, 50, 950, 1, 1),
+            (date(2025, 3, 1), 950, 300, 0, 1250, 1, 0),
+        ])
+        with self.assertNumQueries(2):
+            series = sacco_series('savings', [self.sacco.pk], date(2024, 12, 1), date(2025, 3, 1))
+        self.assertEqual([m['closing'] for m in series], [0, 950, 950, 1250])
+        self.assertEqual(series[2]['credits'], 0)
+
+        # Rebuilding one month re-bases the months after it
+        self.post('Withdrawal', '200', date(2025, 1, 25))
+        rebuild_rollups('savings', date(2025, 1, 1), date(2025, 1, 1))
+        self.assertEqual(self.rows()[1], (date(2025, 3, 1), 750, 300, 0, 1050, 1, 0))
+
+    def test_loan_disbursement_and_repayments(self):
+        from datetime import datetime
+        from django.utils import timezone
+        from loans.models import Loan, LoanProduct
+        from .models import AccountMonthlyBalance
+        product = LoanProduct.objects.create(
+            sacco=self.sacco, name="Business", product_code="ROLL-BIZ", description="Business loans",
+            interest_rate=Decimal('12'), max_amount=Decimal('100000'), min_amount=Decimal('100'),
+            max_duration_months=24, min_duration_months=1
+        )
+        loan = Loan.objects.create(
+            member=self.member, product=product, amount_requested=Decimal('1200'), amount_approved=Decimal('1200'),
+            interest_rate=Decimal('12'), duration_months=12, purpose="Stock", status='approved',
+        )
+        self.assertFalse(AccountMonthlyBalance.objects.filter(kind='loan').exists())
+        loan.status, loan.disbursement_date = 'disbursed', timezone.make_aware(datetime(2025, 2, 3))
+        loan.save()
+        loan.save()
+        loan.repayments.create(amount=Decimal('200'))
+        rows = AccountMonthlyBalance.objects.filter(kind='loan', account_id=loan.pk).order_by('month')
+        self.assertEqual([(r.month, r.credits, r.debits, r.closing) for r in rows][0], (date(2025, 2, 1), 1200, 0, 1200))
+        self.assertEqual(rows.last().closing, 1000)
 
-# Create your tests here.
+    def test_share_changes(self):
+        from .models import AccountMonthlyBalance
+        self.member.shares_balance = Decimal('300')
+        self.member.save()
+        self.member.shares_balance = Decimal('250')
+        self.member.save()
+        row = AccountMonthlyBalance.objects.get(kind='shares', account_id=self.member.pk)
+        self.assertEqual((row.credits, row.debits, row.closing), (300, 50, 250))
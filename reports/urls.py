@@ -6,8 +6,11 @@ urlpatterns = [
     path('loan/', views.loan_report, name='loan_report'),
     path('member/', views.member_report, name='member_report'),
     path('funding/', views.funding_report, name='funding_report'),
+    path('board/', views.board_reports, name='reports_board_reports'),
+    path('board/<int:report_id>/download/', views.download_board_report, name='reports_board_report_download'),
     # Performance (KRAs & KPIs)
     path('performance/', views.performance_overview, name='reports_performance'),
+    path('performance/league/', views.performance_league, name='reports_performance_league'),
     path('performance/kras/', views.manage_kras, name='reports_performance_kras'),
     path('performance/kpis/<int:kra_id>/', views.manage_kpis, name='reports_performance_kpis'),
     path('performance/periods/', views.manage_periods, name='reports_performance_periods'),
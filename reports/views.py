@@ -1,10 +1,12 @@
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib import messages
-from django.db.models import Sum
+from django.db import transaction
+from django.db.models import F, Sum
 from django.utils import timezone
-from accounts.decorators import sacco_admin_required
-from .models import SaccoReviewPeriod, SaccoKRA, SaccoKPI, SaccoKPIResult
-from .forms import ReviewPeriodForm, KRAForm, KPIForm, KPIResultForm
+from accounts.decorators import sacco_admin_required, regional_admin_required, use_read_replica
+from .models import SaccoReviewPeriod, SaccoKRA, SaccoKPI, SaccoKPIResult, GeneratedReport
+from .forms import ReviewPeriodForm, KRAForm, KPIForm, KPIResultForm, KPIResultBatchForm, BoardReportForm
+from .scoring import get_scorecard, invalidate_period_scores, results_version, score_periods, upsert_results
 
 
 def _get_or_create_active_quarter(sacco):
@@ -38,6 +40,7 @@ def _get_or_create_active_quarter(sacco):
 
 
 @sacco_admin_required
+@use_read_replica
 def performance_overview(request):
     from accounts.models import Sacco
     
@@ -69,40 +72,33 @@ def performance_overview(request):
     else:
         period = active_period
 
-    kras = SaccoKRA.objects.filter(sacco=sacco, is_active=True).prefetch_related('kpis')
-    kpis = SaccoKPI.objects.filter(kra__sacco=sacco, is_active=True)
-    results = SaccoKPIResult.objects.filter(period=period, kpi__kra__sacco=sacco).select_related('kpi', 'kpi__kra')
+    periods = SaccoReviewPeriod.objects.filter(sacco=sacco).order_by('-start_date')
+    recent_periods = list(periods[:6])[::-1]
+
+    # Score the selected period and the trend periods together (see reports/scoring.py)
+    scorecard = get_scorecard(sacco)
+    scores = score_periods(sacco, {p.id: p for p in recent_periods + [period]}.values(), scorecard)
+    period_scores = scores[period.id]
 
-    # Build scoring
-    kpi_id_to_result = {r.kpi_id: r for r in results}
     kra_rows = []
-    overall_score = 0.0
-    for kra in kras:
-        kra_score_sum = 0.0
-        kra_achievements = []
+    for kra in scorecard:
         kpi_rows = []
-        for kpi in kra.kpis.filter(is_active=True):
-            res = kpi_id_to_result.get(kpi.id)
-            achievement = res.achievement_percent if res else 0.0
-            score = res.weighted_score if res else 0.0
-            kra_score_sum += score
-            kra_achievements.append(achievement)
+        for kpi in kra.active_kpis:
+            res = period_scores['kpis'].get(kpi.id)
             kpi_rows.append({
                 'kpi': kpi,
                 'result': res,
-                'achievement': round(achievement, 2),
-                'score': round(score, 2),
+                'achievement': round(res['achievement'], 2) if res else 0.0,
+                'score': round(res['score'], 2) if res else 0.0,
             })
-        kra_achievement_avg = round(sum(kra_achievements) / len(kra_achievements), 2) if kra_achievements else 0.0
+        kra_score = period_scores['kras'].get(kra.id, {'score': 0.0, 'achievement': 0.0})
         kra_rows.append({
             'kra': kra,
             'kpis': kpi_rows,
-            'kra_score': round(kra_score_sum, 2),
-            'kra_achievement': kra_achievement_avg,
+            'kra_score': round(kra_score['score'], 2),
+            'kra_achievement': round(kra_score['achievement'], 2),
         })
-        overall_score += kra_score_sum
-
-    periods = SaccoReviewPeriod.objects.filter(sacco=sacco).order_by('-start_date')
+    overall_score = period_scores['overall']
     
     # Get all accessible saccos for system admin dropdown
     accessible_saccos = None
@@ -111,16 +107,8 @@ def performance_overview(request):
         accessible_saccos = get_accessible_saccos(request.user).select_related('region').order_by('name')
 
     # Build score trend over recent periods (overall score)
-    trend_labels = []
-    trend_scores = []
-    recent_periods = list(periods[:6])[::-1]
-    for p in recent_periods:
-        p_results = SaccoKPIResult.objects.filter(period=p, kpi__kra__sacco=sacco).select_related('kpi')
-        total = 0.0
-        for r in p_results:
-            total += r.weighted_score
-        trend_labels.append(p.name)
-        trend_scores.append(round(total, 2))
+    trend_labels = [p.name for p in recent_periods]
+    trend_scores = [round(scores[p.id]['overall'], 2) for p in recent_periods]
 
     context = {
         'period': period,
@@ -135,6 +123,91 @@ def performance_overview(request):
     return render(request, 'reports/performance_overview.html', context)
 
 
+@regional_admin_required
+@use_read_replica
+def performance_league(request):
+    """Rank all accessible Saccos on a closed review period, overall or on one KRA"""
+    from accounts.scope import get_user_scope
+    from .league import available_kras, available_periods, league_table
+
+    scope = get_user_scope(request.user)
+    sacco_ids = None if scope.is_all else sorted(scope.sacco_ids)
+
+    period_names = available_periods(sacco_ids)
+    period_name = request.GET.get('period') or (period_names[0] if period_names else None)
+    kra_titles = available_kras(period_name, sacco_ids) if period_name else []
+    kra_title = request.GET.get('kra') or None
+    if kra_title not in kra_titles:
+        kra_title = None
+
+    rows = league_table(period_name, sacco_ids, kra_title) if period_name else []
+    scores = sorted(row['score'] for row in rows)
+    
+    context = {
+        'rows': rows,
+        'period_names': period_names,
+        'period_name': period_name,
+        'kra_titles': kra_titles,
+        'kra_title': kra_title,
+        'sacco_count': len(rows),
+        'median_score': scores[len(scores) // 2] if scores else None,
+        'top_score': scores[-1] if scores else None,
+    }
+    return render(request, 'reports/performance_league.html', context)
+
+
+@sacco_admin_required
+def board_reports(request):
+    """Request DOCX board reports and download the ones that are ready"""
+    from accounts.permissions import get_accessible_saccos
+    from accounts.scope import get_user_scope
+    from .board_reports import request_report
+
+    scope = get_user_scope(request.user)
+    saccos = get_accessible_saccos(request.user).filter(is_active=True).order_by('name')
+
+    if request.method == 'POST':
+        form = BoardReportForm(request.POST, saccos=saccos)
+        if form.is_valid():
+            data = form.cleaned_data
+            targets = [data['sacco']] if data['sacco'] else list(saccos)
+            reports = [
+                request_report(data['report_type'], sacco, data['period_start'], data['period_end'], request.user)
+                for sacco in targets
+            ]
+            ready = [report for report in reports if report.status == 'ready']
+            if len(reports) == 1 and ready:
+                # Nothing changed since it was last generated
+                return redirect('reports_board_report_download', report_id=ready[0].id)
+            messages.success(
+                request,
+                f'{len(reports) - len(ready)} report(s) queued for generation, {len(ready)} already up to date.'
+            )
+            return redirect('reports_board_reports')
+    else:
+        today = timezone.localdate()
+        form = BoardReportForm(saccos=saccos, initial={
+            'period_start': today.replace(day=1),
+            'period_end': today,
+        })
+
+    reports = scope.filter(GeneratedReport.objects.select_related('sacco', 'requested_by'), 'generated_report')[:100]
+    return render(request, 'reports/board_reports.html', {'form': form, 'reports': reports})
+
+
+@sacco_admin_required
+def download_board_report(request, report_id):
+    from django.http import Http404
+    from accounts.downloads import protected_file_response
+    from accounts.scope import get_user_scope
+
+    report = get_object_or_404(GeneratedReport.objects.select_related('sacco'), id=report_id, status='ready')
+    if not get_user_scope(request.user).can_access_sacco(report.sacco_id) or not report.file:
+        raise Http404('Report not found')
+    GeneratedReport.objects.filter(pk=report.pk).update(download_count=F('download_count') + 1)
+    return protected_file_response(request, report.file, report.filename)
+
+
 @sacco_admin_required
 def manage_kras(request):
     from accounts.models import Sacco
@@ -305,7 +378,9 @@ def manage_periods(request):
             period.sacco = sacco
             # ensure only one active period
             if period.status == 'active':
-                SaccoReviewPeriod.objects.filter(sacco=sacco, status='active').update(status='draft')
+                demoted = SaccoReviewPeriod.objects.filter(sacco=sacco, status='active')
+                invalidate_period_scores(list(demoted.values_list('id', flat=True)))
+                demoted.update(status='draft')
             period.save()
             messages.success(request, 'Review period saved')
             if request.user.is_system_admin:
@@ -352,30 +427,58 @@ def enter_results(request):
     else:
         period = SaccoReviewPeriod.objects.filter(sacco=sacco, status='active').first() or _get_or_create_active_quarter(sacco)
 
-    kpis = SaccoKPI.objects.filter(kra__sacco=sacco, is_active=True).select_related('kra')
+    kpis = list(SaccoKPI.objects.filter(kra__sacco=sacco, is_active=True).select_related('kra'))
     existing_results = {r.kpi_id: r for r in SaccoKPIResult.objects.filter(period=period, kpi__in=kpis)}
 
+    if request.method == 'POST' and request.POST.get('action') == 'evaluate':
+        from .metrics import evaluate_actuals
+        computed = evaluate_actuals([period])
+        messages.success(request, f'Computed {computed} automatic KPI result(s) for {period.name}.')
+        return redirect(f"{request.path}?sacco={sacco.id}&period={period.id}")
+
+    conflict = False
     if request.method == 'POST':
-        # Bulk submit, iterate over posted KPI fields like actual_value_<kpi_id>
-        saved = 0
-        for kpi in kpis:
-            field_name = f"actual_value_{kpi.id}"
-            if field_name in request.POST and request.POST.get(field_name) != '':
-                try:
-                    val = float(request.POST.get(field_name))
-                except ValueError:
-                    continue
-                obj = existing_results.get(kpi.id)
-                if obj is None:
-                    obj = SaccoKPIResult(kpi=kpi, period=period, entered_by=request.user)
-                obj.actual_value = val
-                obj.save()
-                saved += 1
-        messages.success(request, f'Saved {saved} KPI result(s) for {period.name}.')
-        if request.user.is_system_admin:
-            from django.urls import reverse
-            return redirect(f"{reverse('reports_performance_results')}?sacco={sacco.id}")
-        return redirect('reports_performance_results')
+        # The whole sheet is validated and written as one batch
+        form = KPIResultBatchForm(request.POST, kpis=kpis)
+        if form.is_valid():
+            with transaction.atomic():
+                # Lock the period so two admins cannot both pass the version check
+                SaccoReviewPeriod.objects.select_for_update().filter(pk=period.pk).exists()
+                conflict = results_version(period) != form.cleaned_data['version']
+                if not conflict:
+                    saved = upsert_results(
+                        [
+                            SaccoKPIResult(kpi=kpi, period=period, actual_value=value, entered_by=request.user)
+                            for kpi, value in form.entered_values().items()
+                        ],
+                        ['actual_value', 'entered_by'],
+                    )
+            if not conflict:
+                messages.success(request, f'Saved {saved} KPI result(s) for {period.name}.')
+                if request.user.is_system_admin:
+                    from django.urls import reverse
+                    return redirect(f"{reverse('reports_performance_results')}?sacco={sacco.id}")
+                return redirect('reports_performance_results')
+            # Keep the submitted values but show what the other admin saved
+            messages.error(
+                request,
+                f'Results for {period.name} were changed by someone else while you were editing. '
+                'Their values are shown under each field; review and save again.'
+            )
+            existing_results = {r.kpi_id: r for r in SaccoKPIResult.objects.filter(period=period, kpi__in=kpis)}
+            data = request.POST.copy()
+            data['version'] = results_version(period)
+            form = KPIResultBatchForm(data, kpis=kpis)
+    else:
+        initial = {'version': results_version(period)}
+        for kpi_id, result in existing_results.items():
+            initial[f'actual_value_{kpi_id}'] = result.actual_value
+        form = KPIResultBatchForm(initial=initial, kpis=kpis)
+
+    for kpi in kpis:
+        kpi.result = existing_results.get(kpi.id)
+        if not kpi.metric_source:
+            kpi.field = form[KPIResultBatchForm.field_name(kpi)]
 
     # Prepare rows per KRA
     kra_to_kpis = {}
@@ -392,6 +495,8 @@ def enter_results(request):
         'period': period,
         'kra_to_kpis': kra_to_kpis,
         'existing_results': existing_results,
+        'form': form,
+        'conflict': conflict,
         'sacco': sacco,
         'accessible_saccos': accessible_saccos,
     }
@@ -410,10 +515,11 @@ def reports_index(request):
 
 
 @login_required
+@use_read_replica
 def loan_report(request):
     """Comprehensive loan report with statistics and data"""
     # Get loan statistics for the current user's sacco
-    loans = Loan.objects.filter(member__sacco=request.user.sacco)
+    loans = Loan.objects.filter(sacco=request.user.sacco)
     
     # Calculate statistics
     total_loans = loans.count()
@@ -425,7 +531,7 @@ def loan_report(request):
     
     # Total repayments
     total_repayments = LoanRepayment.objects.filter(
-        loan__member__sacco=request.user.sacco
+        sacco=request.user.sacco
     ).aggregate(
         total=Sum('amount')
     )['total'] or 0
@@ -454,11 +560,34 @@ def loan_report(request):
         'status_breakdown': status_breakdown,
         'recent_loans': recent_loans,
     }
-    
-    return render(request, 'reports/loan_report.html', {'stats': stats})
+
+    # Portfolio at risk aging across every Sacco the user can see
+    from datetime import date
+    from accounts.models import Sacco
+    from accounts.scope import get_user_scope
+    from .par import BUCKETS, DIMENSIONS, par_report
+
+    scope = get_user_scope(request.user)
+    sacco_ids = Sacco.objects.values_list('id', flat=True) if scope.is_all else scope.sacco_ids
+    try:
+        as_of = date.fromisoformat(request.GET.get('as_of', ''))
+    except ValueError:
+        as_of = timezone.localdate()
+    dimension = request.GET.get('group', 'sacco')
+    if dimension not in DIMENSIONS:
+        dimension = 'sacco'
+    par = par_report(sacco_ids, as_of, dimension)
+
+    return render(request, 'reports/loan_report.html', {
+        'stats': stats,
+        'par': par,
+        'par_buckets': BUCKETS,
+        'par_groups': [('sacco', 'Sacco'), ('product', 'Loan product'), ('officer', 'Loan officer')],
+    })
 
 
 @login_required
+@use_read_replica
 def member_report(request):
     """Comprehensive member report with statistics and data"""
     from members.models import Member
@@ -491,14 +620,14 @@ def member_report(request):
     
     # Calculate total savings for members
     total_savings = SavingsAccount.objects.filter(
-        member__sacco=request.user.sacco
+        sacco=request.user.sacco
     ).aggregate(
         total=Sum('balance')
     )['total'] or 0
     
     # Get members with loans
     members_with_loans = members.filter(
-        id__in=Loan.objects.filter(member__sacco=request.user.sacco).values_list('member_id', flat=True).distinct()
+        id__in=Loan.objects.filter(sacco=request.user.sacco).values_list('member_id', flat=True).distinct()
     ).count()
     
     stats = {
@@ -516,6 +645,7 @@ def member_report(request):
 
 
 @login_required
+@use_read_replica
 def funding_report(request):
     """Comprehensive funding report with statistics and data"""
     # Get funding statistics
@@ -50,6 +50,10 @@ INSTALLED_APPS = [
     'projects',
     'expenses',
     'reports',
+    'ledger',
+    'archive',
+    'api',
+    'reconciliation',
     'notifications',
 ]
 
@@ -59,7 +63,10 @@ MIDDLEWARE = [
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'accounts.middleware.ReadReplicaStickinessMiddleware',  # Primary reads right after a write (replica only)
     'accounts.middleware.InactivityLogoutMiddleware',  # Inactivity logout middleware
+    'accounts.middleware.PerformanceMonitoringMiddleware',  # Per-request timings and query counts
+    'accounts.middleware.NPlusOneDetectionMiddleware',  # Repeated query shapes (development only)
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -97,6 +104,32 @@ DATABASES = {
     }
 }
 
+# Read replica for dashboards, reports and exports (accounts/db_routing.py).
+# Set DB_REPLICA_NAME to a copy of the database kept in step with the primary;
+# without it every read goes to the primary. Users stay on the primary for
+# REPLICA_STICKY_SECONDS after a write so they see their own changes.
+if os.getenv('DB_REPLICA_NAME'):
+    DATABASES['replica'] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': os.getenv('DB_REPLICA_NAME'),
+        'TEST': {'MIRROR': 'default'},
+    }
+DATABASE_ROUTERS = ['accounts.db_routing.ReplicaRouter']
+REPLICA_DATABASE_ALIAS = 'replica'
+REPLICA_STICKY_SECONDS = int(os.getenv('REPLICA_STICKY_SECONDS', 15))
+
+
+# Cache
+# The reference data cache (accounts/reference_data.py) keeps its version counter
+# here; use a shared backend (Redis, see settings_production.py) when running
+# several worker processes so invalidations reach all of them.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'sacco-default',
+    }
+}
+
 
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
@@ -193,8 +226,32 @@ LOGGING = {
             'filename': BASE_DIR / 'logs' / 'app.log',
             'formatter': 'verbose',
         },
+        'nplusone': {
+            'class': 'logging.handlers.RotatingFileHandler',
+            'filename': BASE_DIR / 'logs' / 'nplusone.log',
+            'maxBytes': 5 * 1024 * 1024,
+            'backupCount': 2,
+            'formatter': 'verbose',
+        },
+        'slow_requests': {
+            'class': 'logging.handlers.RotatingFileHandler',
+            'filename': BASE_DIR / 'logs' / 'slow_requests.log',
+            'maxBytes': 5 * 1024 * 1024,
+            'backupCount': 5,
+            'formatter': 'verbose',
+        },
     },
     'loggers': {
+        'sacco.performance.nplusone': {
+            'handlers': ['nplusone'],
+            'level': 'WARNING',
+            'propagate': False,
+        },
+        'sacco.performance.slow': {
+            'handlers': ['slow_requests'],
+            'level': 'WARNING',
+            'propagate': False,
+        },
         'django': {
             'handlers': ['console', 'file'],
             'level': 'INFO',
@@ -206,6 +263,30 @@ LOGGING = {
     },
 }
 
+# Performance monitoring (accounts/middleware.py, accounts/instrumentation.py)
+PERFORMANCE_MONITORING_ENABLED = True
+PERFORMANCE_SLOW_REQUEST_MS = int(os.getenv('PERFORMANCE_SLOW_REQUEST_MS', 1000))
+PERFORMANCE_WINDOW_SECONDS = 3600  # One histogram bucket per hour
+PERFORMANCE_RETENTION_WINDOWS = 24  # Keep a rolling day of buckets
+METRICS_TOKEN = os.getenv('METRICS_TOKEN', '')  # Bearer token for Prometheus scrapes of /metrics
+
+# N+1 query detection (accounts/nplusone.py); NPLUSONE_RAISE=1 makes offending requests error
+NPLUSONE_ENABLED = DEBUG
+NPLUSONE_THRESHOLD = int(os.getenv('NPLUSONE_THRESHOLD', 10))  # Repeats of one query shape per request
+NPLUSONE_RAISE = os.getenv('NPLUSONE_RAISE', '') in ('1', 'true', 'True')
+
+# Protected media (accounts/downloads.py): when set, permission-checked downloads are handed to
+# this internal nginx location with X-Accel-Redirect instead of being streamed by Django
+PROTECTED_MEDIA_ACCEL_PREFIX = os.getenv('PROTECTED_MEDIA_ACCEL_PREFIX', '')
+
+# Cold storage (archive/archiver.py): closed loans and savings transactions older than this
+# many days are moved out of the hot tables by the archive_records command
+ARCHIVE_RETENTION_DAYS = int(os.getenv('ARCHIVE_RETENTION_DAYS', 365 * 7))
+
+# Delta sync (api/sync.py): deletions are remembered this many days; clients
+# that last synced earlier must download everything again
+SYNC_TOMBSTONE_RETENTION_DAYS = int(os.getenv('SYNC_TOMBSTONE_RETENTION_DAYS', 90))
+
 # Create logs directory if it doesn't exist
 LOGS_DIR = BASE_DIR / 'logs'
 if not LOGS_DIR.exists():
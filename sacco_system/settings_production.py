@@ -33,6 +33,11 @@ INSTALLED_APPS = [
     'projects',
     'expenses',
     'reports',
+    'ledger',
+    'archive',
+    'api',
+    'reconciliation',
+    'notifications',
 ]
 
 MIDDLEWARE = [
@@ -42,6 +47,8 @@ MIDDLEWARE = [
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'accounts.middleware.ReadReplicaStickinessMiddleware',
+    'accounts.middleware.PerformanceMonitoringMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -81,6 +88,18 @@ DATABASES = {
     }
 }
 
+# Streaming replica serving dashboards, reports and exports (accounts/db_routing.py)
+if config('DB_REPLICA_HOST', default=''):
+    DATABASES['replica'] = {
+        **DATABASES['default'],
+        'HOST': config('DB_REPLICA_HOST'),
+        'PORT': config('DB_REPLICA_PORT', default=DATABASES['default']['PORT']),
+        'TEST': {'MIRROR': 'default'},
+    }
+DATABASE_ROUTERS = ['accounts.db_routing.ReplicaRouter']
+REPLICA_DATABASE_ALIAS = 'replica'
+REPLICA_STICKY_SECONDS = config('REPLICA_STICKY_SECONDS', default=15, cast=int)
+
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -171,6 +190,14 @@ LOGGING = {
             'class': 'logging.StreamHandler',
             'formatter': 'simple',
         },
+        'slow_requests': {
+            'level': 'WARNING',
+            'class': 'logging.handlers.RotatingFileHandler',
+            'filename': BASE_DIR / 'logs' / 'slow_requests.log',
+            'maxBytes': 10 * 1024 * 1024,
+            'backupCount': 10,
+            'formatter': 'verbose',
+        },
     },
     'root': {
         'handlers': ['console', 'file'],
@@ -187,9 +214,32 @@ LOGGING = {
             'level': 'INFO',
             'propagate': False,
         },
+        'sacco.performance.slow': {
+            'handlers': ['slow_requests'],
+            'level': 'WARNING',
+            'propagate': False,
+        },
     },
 }
 
+# Performance monitoring
+PERFORMANCE_MONITORING_ENABLED = config('PERFORMANCE_MONITORING_ENABLED', default=True, cast=bool)
+PERFORMANCE_SLOW_REQUEST_MS = config('PERFORMANCE_SLOW_REQUEST_MS', default=1000, cast=int)
+PERFORMANCE_WINDOW_SECONDS = 3600
+PERFORMANCE_RETENTION_WINDOWS = 24
+METRICS_TOKEN = config('METRICS_TOKEN', default='')
+
+# Protected media (accounts/downloads.py): permission-checked downloads are handed
+# to nginx's internal /protected-media/ location (nginx.conf) with X-Accel-Redirect
+PROTECTED_MEDIA_ACCEL_PREFIX = config('PROTECTED_MEDIA_ACCEL_PREFIX', default='/protected-media/')
+
+# Cold storage (archive/archiver.py): closed loans and savings transactions older
+# than this many days are moved out of the hot tables by archive_records
+ARCHIVE_RETENTION_DAYS = config('ARCHIVE_RETENTION_DAYS', default=365 * 7, cast=int)
+
+# Delta sync (api/sync.py): deletions are remembered this many days
+SYNC_TOMBSTONE_RETENTION_DAYS = config('SYNC_TOMBSTONE_RETENTION_DAYS', default=90, cast=int)
+
 # Cache Configuration (Redis recommended for production)
 CACHES = {
     'default': {
@@ -25,6 +25,7 @@ urlpatterns = [
     path('', account_views.login_view, name='login'),
     path('dashboard/', account_views.dashboard, name='dashboard'),
     path('admin-dashboard/', account_views.admin_dashboard, name='admin_dashboard'),
+    path('metrics', account_views.metrics, name='metrics'),
     path('accounts/', include('accounts.urls')),
     path('members/', include('members.urls')),
     path('savings/', include('savings.urls')),
@@ -33,6 +34,9 @@ urlpatterns = [
     path('projects/', include('projects.urls')),
     path('expenses/', include('expenses.urls')),
     path('reports/', include('reports.urls')),
+    path('ledger/', include('ledger.urls')),
+    path('api/', include('api.urls')),
+    path('reconciliation/', include('reconciliation.urls')),
     path('notifications/', include('notifications.urls')),
 ]
 
@@ -71,7 +71,7 @@ class AddSavingsForm(forms.ModelForm):
             instance.save()
             # Update the account's current balance to reflect the new running balance
             account.balance = instance.running_balance
-            account.save(update_fields=['balance'])
+            account.save(update_fields=['balance', 'updated_at'])
         return instance
 
 
@@ -122,3 +122,28 @@ class SavingProductForm(forms.ModelForm):
             cleaned_data['term_months'] = None
         
         return cleaned_data
+
+
+class StatementFilterForm(forms.Form):
+    start_date = forms.DateField(required=False, widget=forms.DateInput(attrs={'type': 'date', 'class': 'form-control'}))
+    end_date = forms.DateField(required=False, widget=forms.DateInput(attrs={'type': 'date', 'class': 'form-control'}))
+    after = forms.IntegerField(required=False, min_value=1, widget=forms.HiddenInput)
+    include_archived = forms.BooleanField(
+        required=False, label='Include archived',
+        widget=forms.CheckboxInput(attrs={'class': 'form-check-input'}),
+    )
+
+    # Range shown when no dates are given
+    DEFAULT_DAYS = 90
+
+    def clean(self):
+        from datetime import timedelta
+        from django.utils import timezone
+
+        cleaned_data = super().clean()
+        end_date = cleaned_data.get('end_date') or timezone.localdate()
+        start_date = cleaned_data.get('start_date') or end_date - timedelta(days=self.DEFAULT_DAYS)
+        if start_date > end_date:
+            self.add_error('start_date', 'Start date must be on or before the end date.')
+        cleaned_data['start_date'], cleaned_data['end_date'] = start_date, end_date
+        return cleaned_data
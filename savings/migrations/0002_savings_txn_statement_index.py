@@ -0,0 +1,17 @@
+# Generated by Django 4.2.7 on 2026-10-19 00:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('savings', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='savingstransaction',
+            index=models.Index(fields=['account', 'performed_at', 'id'], name='savings_txn_acct_perf_idx'),
+        ),
+    ]
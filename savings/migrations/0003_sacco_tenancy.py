@@ -0,0 +1,33 @@
+# Generated by Django 4.2.7 on 2026-10-19 01:03
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0002_district_sacco_district'),
+        ('savings', '0002_savings_txn_statement_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='savingsaccount',
+            name='sacco',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='accounts.sacco'),
+        ),
+        migrations.AddField(
+            model_name='savingstransaction',
+            name='sacco',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='accounts.sacco'),
+        ),
+        migrations.AddIndex(
+            model_name='savingsaccount',
+            index=models.Index(fields=['sacco', 'status'], name='savings_acct_sacco_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='savingstransaction',
+            index=models.Index(fields=['sacco', 'performed_at', 'id'], name='savings_txn_sacco_perf_idx'),
+        ),
+    ]
@@ -0,0 +1,40 @@
+"""
+Copy each savings account's Sacco from its member and each transaction's from
+its account
+
+Rows are updated a range of ids at a time, each range committed on its own
+(the migration is not atomic), so large tables are never locked as a whole.
+"""
+from django.db import migrations
+from django.db.models import Max, OuterRef, Subquery
+
+CHUNK_SIZE = 5000
+
+
+def backfill_chunked(model, sacco):
+    last = model.objects.aggregate(last=Max('pk'))['last'] or 0
+    for low in range(0, last, CHUNK_SIZE):
+        model.objects.filter(pk__gt=low, pk__lte=low + CHUNK_SIZE, sacco__isnull=True).update(sacco_id=sacco)
+
+
+def backfill_sacco(apps, schema_editor):
+    Member = apps.get_model('members', 'Member')
+    SavingsAccount = apps.get_model('savings', 'SavingsAccount')
+    SavingsTransaction = apps.get_model('savings', 'SavingsTransaction')
+    backfill_chunked(SavingsAccount, Subquery(Member.objects.filter(pk=OuterRef('member_id')).values('sacco_id')[:1]))
+    backfill_chunked(
+        SavingsTransaction, Subquery(SavingsAccount.objects.filter(pk=OuterRef('account_id')).values('sacco_id')[:1])
+    )
+
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    dependencies = [
+        ('savings', '0003_sacco_tenancy'),
+        ('members', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_sacco, migrations.RunPython.noop),
+    ]
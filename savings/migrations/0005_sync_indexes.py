@@ -0,0 +1,21 @@
+# Generated by Django 4.2.7 on 2026-10-19 01:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('savings', '0004_backfill_sacco'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='savingsaccount',
+            index=models.Index(fields=['sacco', 'updated_at', 'id'], name='savings_acct_sacco_updated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='savingstransaction',
+            index=models.Index(fields=['sacco', 'updated_at', 'id'], name='savings_txn_sacco_updated_idx'),
+        ),
+    ]
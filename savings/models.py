@@ -1,5 +1,6 @@
 from django.db import models
 from accounts.models import Sacco
+from accounts.tenancy import TenantManager
 from members.models import Member
 
 
@@ -29,6 +30,8 @@ class SavingsAccount(models.Model):
     ]
     
     member = models.ForeignKey(Member, on_delete=models.CASCADE)
+    # The member's Sacco, copied on save so scoped queries need no join (accounts/tenancy.py)
+    sacco = models.ForeignKey(Sacco, on_delete=models.CASCADE, null=True, blank=True, editable=False, related_name='+')
     product = models.ForeignKey(SavingProduct, on_delete=models.CASCADE)
     account_number = models.CharField(max_length=50, unique=True)
     opened_date = models.DateField(auto_now_add=True)
@@ -41,6 +44,20 @@ class SavingsAccount(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     created_by = models.ForeignKey('accounts.User', on_delete=models.SET_NULL, null=True)
+
+    objects = TenantManager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['sacco', 'status'], name='savings_acct_sacco_status_idx'),
+            # Delta sync seeks by (updated_at, id) within Saccos, see api/sync.py
+            models.Index(fields=['sacco', 'updated_at', 'id'], name='savings_acct_sacco_updated_idx'),
+        ]
+
+    def save(self, *args, **kwargs):
+        if self.sacco_id is None and self.member_id:
+            self.sacco_id = self.member.sacco_id
+        super().save(*args, **kwargs)
     
     def __str__(self):
         return f"{self.member.full_name} - {self.product.name}"
@@ -56,6 +73,7 @@ class SavingsTransaction(models.Model):
     ]
     
     account = models.ForeignKey(SavingsAccount, on_delete=models.CASCADE, related_name='transactions')
+    sacco = models.ForeignKey(Sacco, on_delete=models.CASCADE, null=True, blank=True, editable=False, related_name='+')
     txn_type = models.CharField(max_length=20, choices=TRANSACTION_TYPES)
     amount = models.DecimalField(max_digits=14, decimal_places=2)
     running_balance = models.DecimalField(max_digits=14, decimal_places=2)
@@ -68,5 +86,21 @@ class SavingsTransaction(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    objects = TenantManager()
+
+    class Meta:
+        indexes = [
+            # Statements seek by account and (performed_at, id), see savings/statements.py
+            models.Index(fields=['account', 'performed_at', 'id'], name='savings_txn_acct_perf_idx'),
+            # Scoped transaction lists page by (performed_at, id) within Saccos
+            models.Index(fields=['sacco', 'performed_at', 'id'], name='savings_txn_sacco_perf_idx'),
+            models.Index(fields=['sacco', 'updated_at', 'id'], name='savings_txn_sacco_updated_idx'),
+        ]
+
+    def save(self, *args, **kwargs):
+        if self.sacco_id is None and self.account_id:
+            self.sacco_id = self.account.sacco_id or self.account.member.sacco_id
+        super().save(*args, **kwargs)
+    
     def __str__(self):
         return f"{self.account} - {self.txn_type} - {self.amount}"
\ No newline at end of file
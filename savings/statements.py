@@ -0,0 +1,120 @@
+"""
+Savings statements over a date range
+
+Every SavingsTransaction stores the account's running_balance after it, so a
+statement never sums history: the opening balance is the running_balance of
+the last transaction before the range, and the closing balance that of the
+last one inside it. Both are single seeks on the (account, performed_at, id)
+index, and pages are read with keyset pagination on the same index (the
+cursor is the last transaction shown), so a page of a ten-year statement
+costs the same few indexed reads as one of last month's.
+
+Transactions older than the retention window live in the archive
+(archive/archiver.py). Balances fall back to the last archived transaction
+when no live one precedes a date, and with include_archived the archived
+transactions of the range are merged into the pages.
+"""
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import SavingsTransaction
+
+PAGE_SIZE = 100
+
+ORDER = ('performed_at', 'id')
+
+
+def day_bounds(start_date, end_date):
+    """Aware datetimes covering start_date to end_date inclusive, as [low, high)"""
+    low = timezone.make_aware(datetime.combine(start_date, time.min))
+    high = timezone.make_aware(datetime.combine(end_date + timedelta(days=1), time.min))
+    return low, high
+
+
+def balance_before(account_id, moment):
+    """The account's balance just before a moment: running_balance of the preceding transaction"""
+    from archive.reads import archived_balance_before
+
+    previous = (
+        SavingsTransaction.objects.filter(account_id=account_id, performed_at__lt=moment)
+        .order_by('-performed_at', '-id')
+        .values_list('running_balance', flat=True)
+        .first()
+    )
+    if previous is None:
+        previous = archived_balance_before(account_id, moment)
+    return previous if previous is not None else Decimal('0')
+
+
+def after_row(queryset, cursor):
+    """Rows of queryset that come after the transaction `cursor` in (performed_at, id) order"""
+    return queryset.filter(
+        Q(performed_at__gt=cursor.performed_at) | Q(performed_at=cursor.performed_at, id__gt=cursor.id)
+    )
+
+
+def read_page(queryset, after=None, page_size=PAGE_SIZE, archived=None):
+    """
+    One page of transactions in (performed_at, id) order
+
+    after is the id of the last transaction of the previous page; it must be
+    in queryset (or archived). archived, an archive.reads.ArchivedTransactions,
+    merges archived transactions into the page. Returns (rows, cursor row or
+    None, next cursor or None).
+    """
+    cursor = None
+    if after:
+        cursor = queryset.filter(pk=after).only('id', 'performed_at', 'running_balance').first()
+        if cursor is None and archived is not None:
+            cursor = archived.get(after)
+        if cursor is not None:
+            queryset = after_row(queryset, cursor)
+    rows = list(queryset.order_by(*ORDER)[:page_size + 1])
+    if archived is not None:
+        rows = sorted(rows + archived.after(cursor, page_size + 1), key=lambda row: (row.performed_at, row.id))
+        rows = rows[:page_size + 1]
+    next_cursor = rows[page_size - 1].id if len(rows) > page_size else None
+    return rows[:page_size], cursor, next_cursor
+
+
+def account_statement(account, start_date, end_date, after=None, page_size=PAGE_SIZE, include_archived=False):
+    """
+    One page of an account statement
+
+    Returns a dict with the range's opening_balance and closing_balance, the
+    page's rows, brought_forward (balance before the first row of the page)
+    and next_cursor for the following page (None on the last one). Archived
+    transactions are listed only with include_archived.
+    """
+    low, high = day_bounds(start_date, end_date)
+    opening = balance_before(account.pk, low)
+    closing = balance_before(account.pk, high)
+    in_range = SavingsTransaction.objects.filter(account=account, performed_at__gte=low, performed_at__lt=high)
+    archived = None
+    if include_archived:
+        from archive.reads import ArchivedTransactions
+        archived = ArchivedTransactions(account.pk, low, high)
+    rows, cursor, next_cursor = read_page(in_range, after, page_size, archived)
+    return {
+        'account': account,
+        'start_date': start_date,
+        'end_date': end_date,
+        'opening_balance': opening,
+        'closing_balance': closing,
+        'net_change': closing - opening,
+        'brought_forward': cursor.running_balance if cursor is not None else opening,
+        'rows': rows,
+        'next_cursor': next_cursor,
+    }
+
+
+def scope_transactions(queryset, start_date, end_date, after=None, page_size=PAGE_SIZE):
+    """One page of the transactions of many accounts (no balances) over a date range"""
+    low, high = day_bounds(start_date, end_date)
+    rows, _, next_cursor = read_page(
+        queryset.filter(performed_at__gte=low, performed_at__lt=high), after, page_size
+    )
+    return {'start_date': start_date, 'end_date': end_date, 'rows': rows, 'next_cursor': next_cursor}
@@ -1,3 +1,71 @@
+from datetime import date, datetime
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
 from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from accounts.models import Region, Sacco
+from members.models import Member
+from .models import SavingProduct, SavingsAccount, SavingsTransaction
+
+User = get_user_model()
+
+
+class SavingsStatementTest(TestCase):
+    def setUp(self):
+        region = Region.objects.create(name="Statement Region")
+        self.sacco = Sacco.objects.create(
+            name="Statement Sacco", registration_number="STMT001", address="Address",
+            phone="1234567890", email="stmt@sacco.com", region=region
+        )
+        User.objects.create_user(username="stmtadmin", password="stmt123", is_sacco_admin=True, sacco=self.sacco)
+        member = Member.objects.create(
+            sacco=self.sacco, member_number="STMT-1", first_name="Grace", last_name="Auma",
+            phone="0700000000", gender="Female", date_of_birth="1990-01-01", home_address="Address",
+            village_town="Town", district="District", date_joined="2020-01-01",
+        )
+        product = SavingProduct.objects.create(sacco=self.sacco, name="Ordinary", product_code="ORD")
+        self.account = SavingsAccount.objects.create(member=member, product=product, account_number="SA-STMT-1")
+
+        # One deposit of 100 on the 1st of every month of 2023 and 2024
+        balance = Decimal('0')
+        for year in (2023, 2024):
+            for month in range(1, 13):
+                balance += 100
+                txn = SavingsTransaction.objects.create(
+                    account=self.account, txn_type='Deposit', amount=Decimal('100'), running_balance=balance
+                )
+                performed_at = timezone.make_aware(datetime(year, month, 1, 10))
+                SavingsTransaction.objects.filter(pk=txn.pk).update(performed_at=performed_at)
+
+    def test_balances_come_from_neighbouring_rows(self):
+        from .statements import account_statement
+
+        with self.assertNumQueries(3):
+            statement = account_statement(self.account, date(2024, 1, 1), date(2024, 6, 30), page_size=4)
+        self.assertEqual(statement['opening_balance'], Decimal('1200'))
+        self.assertEqual(statement['closing_balance'], Decimal('1800'))
+        self.assertEqual(statement['net_change'], Decimal('600'))
+        self.assertEqual(len(statement['rows']), 4)
+
+        # The next page starts after the cursor and brings its balance forward
+        second = account_statement(self.account, date(2024, 1, 1), date(2024, 6, 30), statement['next_cursor'], 4)
+        self.assertEqual(second['brought_forward'], Decimal('1600'))
+        self.assertEqual([row.running_balance for row in second['rows']], [Decimal('1700'), Decimal('1800')])
+        self.assertIsNone(second['next_cursor'])
+
+    def test_statement_view_pages_through_range(self):
+        self.client.login(username="stmtadmin", password="stmt123")
+        url = reverse('savings_statements')
+        response = self.client.get(url, {'account': self.account.id, 'start_date': '2023-01-01', 'end_date': '2024-12-31'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.context['transactions']), 24)
+        self.assertIsNone(response.context['next_query'])
+
+        response = self.client.get(url, {'start_date': '2024-12-01', 'end_date': '2024-12-31'})
+        self.assertEqual([row.running_balance for row in response.context['transactions']], [Decimal('2400')])
 
-# Create your tests here.
+        response = self.client.get(url, {'account': self.account.id, 'start_date': '2024-12-31', 'end_date': '2024-01-01'})
+        self.assertIsNone(response.context['statement'])
@@ -4,7 +4,7 @@ from django.contrib import messages
 from django.db.models import Sum
 from django.http import JsonResponse, HttpResponse
 from django.urls import reverse
-from accounts.decorators import sacco_admin_required, admin_or_member_owner_required
+from accounts.decorators import sacco_admin_required, admin_or_member_owner_required, use_read_replica
 from accounts.permissions import filter_queryset_by_user_scope, can_access_member_data, get_accessible_members, get_accessible_saccos
 from accounts.models import Sacco
 from notifications.services import NotificationService
@@ -23,7 +23,7 @@ def add_savings_transaction(request):
         sacco = getattr(request.user, 'sacco', None)
         accounts_qs = SavingsAccount.objects.all()
         if sacco:
-            accounts_qs = accounts_qs.filter(member__sacco=sacco)
+            accounts_qs = accounts_qs.filter(sacco=sacco)
         form.fields['account'].queryset = accounts_qs
         if form.is_valid():
             savings = form.save(commit=False)
@@ -50,7 +50,7 @@ def add_savings_transaction(request):
         sacco = getattr(request.user, 'sacco', None)
         accounts_qs = SavingsAccount.objects.all()
         if sacco:
-            accounts_qs = accounts_qs.filter(member__sacco=sacco)
+            accounts_qs = accounts_qs.filter(sacco=sacco)
         form.fields['account'].queryset = accounts_qs
     
     context = {
@@ -164,7 +164,7 @@ def edit_savings_account(request, account_id):
             messages.error(request, 'You do not have access to this account.')
             return redirect('savings_accounts')
     else:
-        account = get_object_or_404(SavingsAccount, id=account_id, member__sacco=request.user.sacco)
+        account = get_object_or_404(SavingsAccount, id=account_id, sacco=request.user.sacco)
     
     # Get selected sacco from query parameter (for system/regional admins)
     selected_sacco_id = request.POST.get('sacco') if request.method == 'POST' else request.GET.get('sacco')
@@ -237,6 +237,7 @@ def edit_savings_account(request, account_id):
 
 
 @sacco_admin_required
+@use_read_replica
 def savings_accounts(request):
     # Get accessible saccos for selector
     accessible_saccos = get_accessible_saccos(request.user)
@@ -264,7 +265,7 @@ def savings_accounts(request):
             selected_sacco = Sacco.objects.get(id=selected_sacco_id)
             # Verify user has access to this sacco
             if selected_sacco in accessible_saccos:
-                accounts = accounts.filter(member__sacco=selected_sacco)
+                accounts = accounts.filter(sacco=selected_sacco)
         except Sacco.DoesNotExist:
             pass
     
@@ -313,7 +314,7 @@ def savings_overview(request):
     # Build summary by sacco
     sacco_summaries = []
     for sacco in accessible_saccos:
-        sacco_accounts = all_accounts.filter(member__sacco=sacco)
+        sacco_accounts = all_accounts.filter(sacco=sacco)
         total_accounts = sacco_accounts.count()
         active_accounts = sacco_accounts.filter(is_active=True).count()
         total_balance = sacco_accounts.aggregate(total=Sum('balance'))['total'] or 0
@@ -343,31 +344,52 @@ def savings_overview(request):
 
 @sacco_admin_required
 def savings_statements(request):
+    from .forms import StatementFilterForm
+    from .statements import account_statement, scope_transactions
+
     accounts = filter_queryset_by_user_scope(
-        SavingsAccount.objects.all(),
+        SavingsAccount.objects.select_related('member').order_by('account_number'),
         request.user,
         'savings'
     )
     account_id = request.GET.get('account')
+    account = None
     if account_id:
-        account = get_object_or_404(SavingsAccount, id=account_id)
+        account = get_object_or_404(SavingsAccount.objects.select_related('member'), id=account_id)
         # Check if user can access this account
         if not can_access_member_data(request.user, account.member):
             messages.error(request, 'Access denied.')
             return redirect('savings_accounts')
-        transactions = SavingsTransaction.objects.filter(account=account).order_by('-created_at')
-    else:
-        account = None
-        transactions = filter_queryset_by_user_scope(
-            SavingsTransaction.objects.all(),
-            request.user,
-            'savings_transaction'
-        ).order_by('-created_at')
-    
+
+    form = StatementFilterForm(request.GET)
+    statement = None
+    if form.is_valid():
+        start_date, end_date, after = form.cleaned_data['start_date'], form.cleaned_data['end_date'], form.cleaned_data['after']
+        if account:
+            statement = account_statement(
+                account, start_date, end_date, after, include_archived=form.cleaned_data['include_archived']
+            )
+        else:
+            transactions = filter_queryset_by_user_scope(
+                SavingsTransaction.objects.select_related('account__member'),
+                request.user,
+                'savings_transaction'
+            )
+            statement = scope_transactions(transactions, start_date, end_date, after)
+
+    next_query = None
+    if statement and statement['next_cursor']:
+        query = request.GET.copy()
+        query['after'] = statement['next_cursor']
+        next_query = query.urlencode()
+
     return render(request, 'savings/statements.html', {
         'account': account,
-        'transactions': transactions,
-        'accounts': accounts
+        'accounts': accounts,
+        'form': form,
+        'statement': statement,
+        'transactions': statement['rows'] if statement else [],
+        'next_query': next_query,
     })
 
 
@@ -466,7 +488,7 @@ def api_create_account(request):
             
             # Auto-generate account number if not provided
             if not account_number:
-                last_account = SavingsAccount.objects.filter(member__sacco=request.user.sacco).order_by('-id').first()
+                last_account = SavingsAccount.objects.filter(sacco=request.user.sacco).order_by('-id').first()
                 if last_account and last_account.account_number:
                     try:
                         last_num = int(last_account.account_number)